@@ -2,7 +2,7 @@
 
 void BLEParentService::begin(const String& deviceName) {
     BLEDevice::init(deviceName.c_str());
-    esp_err_t mtuResult = BLEDevice::setMTU(185);
+    esp_err_t mtuResult = BLEDevice::setMTU(BLE_REQUESTED_MTU);
     if (mtuResult != ESP_OK) {
         Serial.printf("[BLE] MTU request failed: %d\n", mtuResult);
     }
@@ -53,6 +53,7 @@ void BLEParentService::begin(const String& deviceName) {
     _themesChar = svc->createCharacteristic(
         BLE_THEMES_UUID,
         BLECharacteristic::PROPERTY_READ);
+    _themesChar->setCallbacks(new ConfigResponseCB(this));
 
     // --- Command characteristic (write-only app buttons) -------------------
     _commandChar = svc->createCharacteristic(
@@ -73,6 +74,7 @@ void BLEParentService::begin(const String& deviceName) {
         BLECharacteristic::PROPERTY_READ |
         BLECharacteristic::PROPERTY_NOTIFY);
     _configResponseChar->addDescriptor(new BLE2902());
+    _configResponseChar->setCallbacks(new ConfigResponseCB(this));
     _configResponseChar->setValue("{\"id\":0,\"ok\":true}");
 
     // --- Notice channel ---------------------------------------------------
@@ -85,6 +87,12 @@ void BLEParentService::begin(const String& deviceName) {
     _noticeChar->addDescriptor(new BLE2902());
     _noticeChar->setValue("{}");
 
+    _notify[NotifyVolume].chr     = _volChar;
+    _notify[NotifyKillswitch].chr = _killChar;
+    _notify[NotifyTheme].chr      = _themeChar;
+    _notify[NotifyStatus].chr     = _statusChar;
+    _notify[NotifyNotice].chr     = _noticeChar;
+
     svc->start();
 
     BLEAdvertising* adv = BLEDevice::getAdvertising();
@@ -107,26 +115,26 @@ void BLEParentService::updateVolume(uint8_t volumePct) {
     if (!_volChar) return;
     if (volumePct > 100) volumePct = 100;
     _volChar->setValue(&volumePct, 1);
-    if (_connected) _volChar->notify();
+    queueNotify(NotifyVolume, String(volumePct));
 }
 
 void BLEParentService::updateKillswitch(bool active) {
     if (!_killChar) return;
     uint8_t value = active ? 1 : 0;
     _killChar->setValue(&value, 1);
-    if (_connected) _killChar->notify();
+    queueNotify(NotifyKillswitch, active ? "1" : "0");
 }
 
 void BLEParentService::updateTheme(const String& theme) {
     if (!_themeChar) return;
     _themeChar->setValue(theme.c_str());
-    if (_connected) _themeChar->notify();
+    queueNotify(NotifyTheme, theme);
 }
 
 void BLEParentService::updateStatus(const String& status) {
     if (!_statusChar) return;
     _statusChar->setValue(status.c_str());
-    if (_connected) _statusChar->notify();
+    queueNotify(NotifyStatus, status);
 }
 
 void BLEParentService::updateThemes(const String& themesJson) {
@@ -134,23 +142,87 @@ void BLEParentService::updateThemes(const String& themesJson) {
     _themesChar->setValue(themesJson.c_str());
 }
 
-void BLEParentService::updateConfigResponse(const String& responseJson) {
+void BLEParentService::updateConfigResponse(const char* responseJson, size_t length) {
+    // A response that does not fit one notification at the negotiated MTU
+    // arrives truncated; the app reads the full value back before the next
+    // queued command may run.
+    _configResponseAwaitingRead = _connected && length + ATT_HEADER_BYTES > _peerMtu;
+    uint8_t* bytes = reinterpret_cast<uint8_t*>(const_cast<char*>(responseJson));
     if (_configResponseChar) {
-        _configResponseChar->setValue(responseJson.c_str());
+        _configResponseChar->setValue(bytes, length);
         if (_connected) _configResponseChar->notify();
     }
     // Legacy/cache-safe config transport: command writes JSON, themes read
     // returns the response. This keeps config usable when CoreBluetooth caches
     // the old six-characteristic GATT table and cannot see configResponse yet.
     if (_themesChar) {
-        _themesChar->setValue(responseJson.c_str());
+        _themesChar->setValue(bytes, length);
     }
 }
 
 void BLEParentService::updateNotice(const String& noticeJson) {
     if (!_noticeChar) return;
+    NotifySlot& slot = _notify[NotifyNotice];
+    if (slot.dirty && _connected && slot.pending != noticeJson) {
+        sendNotify(NotifyNotice, millis());  // do not lose the earlier notice
+    }
     _noticeChar->setValue(noticeJson.c_str());
-    if (_connected) _noticeChar->notify();
+    queueNotify(NotifyNotice, noticeJson);
+}
+
+// ---------------------------------------------------------------------------
+// Deferred notifies
+// ---------------------------------------------------------------------------
+void BLEParentService::queueNotify(NotifyChar which, const String& value) {
+    if (!_connected) return;  // a client reads current values when it subscribes
+    NotifySlot& slot = _notify[which];
+    if (slot.dirty) {
+        _notifyStats.suppressed++;  // the pending value never goes out
+    }
+    if (which != NotifyNotice && value == slot.lastSent) {
+        _notifyStats.suppressed++;
+        slot.dirty = false;
+        return;
+    }
+    slot.pending = value;
+    slot.dirty = true;
+}
+
+void BLEParentService::sendNotify(NotifyChar which, uint32_t nowMs) {
+    NotifySlot& slot = _notify[which];
+    slot.chr->notify();
+    slot.lastSent = slot.pending;
+    slot.lastNotifyMs = nowMs;
+    slot.dirty = false;
+    _notifyStats.sent++;
+}
+
+void BLEParentService::flushNotifies(uint32_t minIntervalMs) {
+    bool connected = _connected;
+    if (connected != _notifyClientSeen) {
+        // A new client starts from what it reads; an old one is gone.
+        _notifyClientSeen = connected;
+        for (NotifySlot& slot : _notify) {
+            slot.dirty = false;
+            slot.lastSent = "";
+        }
+        if (!connected) logNotifyStats();
+    }
+    if (!connected) return;
+
+    uint32_t now = millis();
+    for (int i = 0; i < NotifyCount; i++) {
+        NotifySlot& slot = _notify[i];
+        if (slot.dirty && slot.chr && now - slot.lastNotifyMs >= minIntervalMs) {
+            sendNotify(static_cast<NotifyChar>(i), now);
+        }
+    }
+}
+
+void BLEParentService::logNotifyStats() const {
+    Serial.printf("[BLE] Notifies sent=%lu suppressed=%lu\n",
+                  static_cast<unsigned long>(_notifyStats.sent),
+                  static_cast<unsigned long>(_notifyStats.suppressed));
 }
 
 void BLEParentService::updateDeviceName(const String& deviceName) {
@@ -201,11 +273,12 @@ bool BLEParentService::pollThemeChange(String& out) {
     return true;
 }
 
-bool BLEParentService::pollCommand(uint8_t& out) {
+bool BLEParentService::pollCommand(uint8_t& out, uint32_t* writtenAtUs) {
     portENTER_CRITICAL(&_mux);
     bool hasValue = _newCommand;
     if (hasValue) {
         out = _pendingCommand;
+        if (writtenAtUs) *writtenAtUs = _pendingCommandAtUs;
         _newCommand = false;
     }
     portEXIT_CRITICAL(&_mux);
@@ -214,12 +287,17 @@ bool BLEParentService::pollCommand(uint8_t& out) {
 }
 
 bool BLEParentService::pollConfigCommand(String& out) {
-    char command[sizeof(_pendingConfigCommand)];
+    if (_configResponseAwaitingRead) {
+        return false;  // cleared by ConfigResponseCB::onRead() or a disconnect
+    }
+
+    char command[sizeof(_pendingConfigCommands[0])];
     portENTER_CRITICAL(&_mux);
-    bool hasValue = _newConfigCommand;
+    bool hasValue = _configQueueCount > 0;
     if (hasValue) {
-        memcpy(command, _pendingConfigCommand, sizeof(command));
-        _newConfigCommand = false;
+        memcpy(command, _pendingConfigCommands[_configQueueHead], sizeof(command));
+        _configQueueHead = (_configQueueHead + 1) % BLE_CONFIG_QUEUE_DEPTH;
+        _configQueueCount = _configQueueCount - 1;
     }
     portEXIT_CRITICAL(&_mux);
     if (!hasValue) return false;
@@ -22,6 +22,18 @@
 //   configCmd  (JSON string, write)         — settings/scan command
 //   configResp (JSON string, read/notify)   — settings/scan response
 //
+// Config commands are queued (BLE_CONFIG_QUEUE_DEPTH deep) so the app can
+// pipeline several requests; responses carry the request id and are notified
+// one at a time.
+//
+// updateVolume/Killswitch/Theme/Status/Notice set the value at once (reads
+// always see it) but only mark the characteristic dirty. flushNotifies(),
+// called from the main loop, sends one notify per dirty characteristic once
+// it has been quiet for the given interval. A value equal to the last one
+// notified is not sent again, and a value replaced before it went out is
+// skipped; both count as suppressed. Notices are one-shot messages, so a
+// pending notice is sent before a different one replaces it.
+//
 // Callbacks fire in a BLE stack task; they set thread-safe flags that the
 // main loop reads via the pollXxx() methods.
 //
@@ -31,6 +43,7 @@
 //   ble.updateStatus("idle");     // push state string to notify clients
 //
 //   // In loop():
+//   ble.flushNotifies(BLE_NOTIFY_MIN_INTERVAL_MS);
 //   if (uint8_t v; ble.pollVolumeChange(v))   { ... apply volume ... }
 //   if (bool on; ble.pollKillswitch(on))      { ... handle killswitch ... }
 //   if (String t; ble.pollThemeChange(t))     { ... switch theme ... }
@@ -43,13 +56,14 @@ public:
     // Start BLE advertising; call after NVS is ready
     void begin(const String& deviceName);
 
-    // Push current values to all subscribed clients
+    // Set current values; subscribed clients are notified by flushNotifies()
     void updateVolume(uint8_t volumePct);
     void updateKillswitch(bool active);
     void updateTheme(const String& theme);
     void updateStatus(const String& status);
     void updateThemes(const String& themesJson);
-    void updateConfigResponse(const String& responseJson);
+    // Copies the response (the config response buffer, see JsonWriter).
+    void updateConfigResponse(const char* responseJson, size_t length);
     void updateDeviceName(const String& deviceName);
 
     // Push a one-shot notice for the app to display. |noticeJson| is the full
@@ -69,12 +83,27 @@ public:
     // Poll for theme change; fills |out| with new theme name
     bool pollThemeChange(String& out);
 
-    // Poll for app command; out: 1=song, 2=animal, 3=stop, 4=loop on, 5=loop off
-    bool pollCommand(uint8_t& out);
+    // Poll for app command; out: 1=song, 2=animal, 3=stop, 4=loop on, 5=loop off.
+    // writtenAtUs (optional) gets the micros() of the characteristic write.
+    bool pollCommand(uint8_t& out, uint32_t* writtenAtUs = nullptr);
 
-    // Poll for JSON config command from the app
+    // Poll for the oldest queued JSON config command from the app. Returns
+    // false while a response too long for one notification is still waiting
+    // to be read back, so a pipelined command cannot overwrite it.
     bool pollConfigCommand(String& out);
 
+    // Send pending notifies for characteristics whose last notify is at
+    // least minIntervalMs old. Call from loop().
+    void flushNotifies(uint32_t minIntervalMs);
+
+    struct NotifyStats {
+        uint32_t sent       = 0;
+        uint32_t suppressed = 0;  // duplicates and values replaced before sending
+    };
+    NotifyStats notifyStats() const { return _notifyStats; }
+    // Prints "[BLE] Notifies sent=N suppressed=M" (also on every disconnect).
+    void logNotifyStats() const;
+
     // True if at least one BLE central is connected
     bool isConnected() const;
 
@@ -93,6 +122,22 @@ private:
     BLECharacteristic* _configResponseChar = nullptr;
     BLECharacteristic* _noticeChar = nullptr;
 
+    // Deferred notify state per notifying characteristic (main loop only)
+    enum NotifyChar { NotifyVolume, NotifyKillswitch, NotifyTheme, NotifyStatus, NotifyNotice, NotifyCount };
+    struct NotifySlot {
+        BLECharacteristic* chr = nullptr;
+        String   pending;          // value set but not yet notified
+        String   lastSent;         // last value notified to this client
+        bool     dirty = false;
+        uint32_t lastNotifyMs = 0;
+    };
+    NotifySlot  _notify[NotifyCount];
+    bool        _notifyClientSeen = false;  // _connected as of the last flush
+    NotifyStats _notifyStats;
+
+    void queueNotify(NotifyChar which, const String& value);
+    void sendNotify(NotifyChar which, uint32_t nowMs);
+
     // Pending events set by BLE callbacks, consumed by poll methods
     volatile bool    _newVolume     = false;
     volatile uint8_t _pendingVolume = 0;
@@ -105,24 +150,56 @@ private:
 
     volatile bool    _newCommand = false;
     volatile uint8_t _pendingCommand = 0;
+    volatile uint32_t _pendingCommandAtUs = 0;
+
+    // FIFO of config command JSON written by the app; head is the oldest.
+    char             _pendingConfigCommands[BLE_CONFIG_QUEUE_DEPTH][BLE_CONFIG_COMMAND_MAX_BYTES] = {{0}};
+    volatile uint8_t _configQueueHead = 0;
+    volatile uint8_t _configQueueCount = 0;
 
-    volatile bool    _newConfigCommand = false;
-    char             _pendingConfigCommand[384] = {0};
+    // Set when the last config response exceeded one notification; cleared
+    // when the app reads it back or disconnects.
+    volatile bool     _configResponseAwaitingRead = false;
+    // ATT MTU of the current connection: the BLE default until the central
+    // negotiates a larger one (up to BLE_REQUESTED_MTU).
+    static constexpr uint16_t DEFAULT_ATT_MTU = 23;
+    static constexpr size_t   ATT_HEADER_BYTES = 3;
+    volatile uint16_t _peerMtu = DEFAULT_ATT_MTU;
 
     volatile bool    _connected = false;
     volatile bool    _restartAdvPending = false;
     portMUX_TYPE     _mux = portMUX_INITIALIZER_UNLOCKED;
 
+    // Append a config command to the FIFO; caller holds _mux. A full queue
+    // drops the command and the app times that request out.
+    void enqueueConfigCommandLocked(const std::string& value) {
+        if (_configQueueCount >= BLE_CONFIG_QUEUE_DEPTH) {
+            return;
+        }
+        uint8_t slot = (_configQueueHead + _configQueueCount) % BLE_CONFIG_QUEUE_DEPTH;
+        size_t n = value.copy(_pendingConfigCommands[slot],
+                              sizeof(_pendingConfigCommands[slot]) - 1);
+        _pendingConfigCommands[slot][n] = '\0';
+        _configQueueCount = _configQueueCount + 1;
+    }
+
     // Server callbacks (connect/disconnect)
     class ServerCB : public BLEServerCallbacks {
     public:
         explicit ServerCB(BLEParentService* owner) : _owner(owner) {}
         void onConnect(BLEServer*) override {
+            _owner->_peerMtu = DEFAULT_ATT_MTU;
+            _owner->_configResponseAwaitingRead = false;
             _owner->_connected = true;
             Serial.println("[BLE] Client connected");
         }
+        void onMtuChanged(BLEServer*, esp_ble_gatts_cb_param_t* param) override {
+            _owner->_peerMtu = param->mtu.mtu;
+            Serial.printf("[BLE] MTU %u\n", static_cast<unsigned>(param->mtu.mtu));
+        }
         void onDisconnect(BLEServer*) override {
             _owner->_connected = false;
+            _owner->_configResponseAwaitingRead = false;  // nobody left to read it
             _owner->_restartAdvPending = true;  // defer out of BT stack callback
             Serial.println("[BLE] Client disconnected");
         }
@@ -188,12 +265,10 @@ private:
             portENTER_CRITICAL(&_owner->_mux);
             char first = value[0];
             if (first == '{') {
-                size_t n = value.copy(_owner->_pendingConfigCommand,
-                                      sizeof(_owner->_pendingConfigCommand) - 1);
-                _owner->_pendingConfigCommand[n] = '\0';
-                _owner->_newConfigCommand = true;
+                _owner->enqueueConfigCommandLocked(value);
             } else {
                 _owner->_pendingCommand = static_cast<uint8_t>(first);
+                _owner->_pendingCommandAtUs = micros();
                 _owner->_newCommand = true;
             }
             portEXIT_CRITICAL(&_owner->_mux);
@@ -208,13 +283,22 @@ private:
         void onWrite(BLECharacteristic* c) override {
             std::string value = c->getValue();
             portENTER_CRITICAL(&_owner->_mux);
-            size_t n = value.copy(_owner->_pendingConfigCommand,
-                                  sizeof(_owner->_pendingConfigCommand) - 1);
-            _owner->_pendingConfigCommand[n] = '\0';
-            _owner->_newConfigCommand = true;
+            _owner->enqueueConfigCommandLocked(value);
             portEXIT_CRITICAL(&_owner->_mux);
         }
     private:
         BLEParentService* _owner;
     };
+
+    // Read-back of a long config response (direct or legacy transport)
+    // releases the next queued command.
+    class ConfigResponseCB : public BLECharacteristicCallbacks {
+    public:
+        explicit ConfigResponseCB(BLEParentService* owner) : _owner(owner) {}
+        void onRead(BLECharacteristic*) override {
+            _owner->_configResponseAwaitingRead = false;
+        }
+    private:
+        BLEParentService* _owner;
+    };
 };
@@ -0,0 +1,61 @@
+#include "BootTrace.h"
+#include <Arduino.h>
+#include <esp_timer.h>
+
+namespace BootTrace {
+
+namespace {
+
+constexpr int PHASE_COUNT = static_cast<int>(Phase::Count);
+
+const char* const PHASE_NAMES[PHASE_COUNT] = {
+    "serial", "wake_state", "nvs", "inputs", "i2s", "bt",
+    "sd", "config", "catalog", "ble", "ready", "first_loop",
+};
+
+int64_t g_endUs[PHASE_COUNT] = {0};
+uint32_t g_durationUs[PHASE_COUNT] = {0};
+int64_t g_lastEndUs = 0;
+
+}  // namespace
+
+void mark(Phase phase) {
+    int index = static_cast<int>(phase);
+    if (index < 0 || index >= PHASE_COUNT || g_endUs[index] != 0) return;
+    int64_t now = esp_timer_get_time();
+    g_endUs[index] = now;
+    g_durationUs[index] = static_cast<uint32_t>(now - g_lastEndUs);
+    g_lastEndUs = now;
+}
+
+uint32_t phaseUs(Phase phase) {
+    int index = static_cast<int>(phase);
+    if (index < 0 || index >= PHASE_COUNT) return 0;
+    return g_durationUs[index];
+}
+
+uint32_t totalUs() { return static_cast<uint32_t>(g_lastEndUs); }
+
+const char* phaseName(Phase phase) {
+    int index = static_cast<int>(phase);
+    if (index < 0 || index >= PHASE_COUNT) return "?";
+    return PHASE_NAMES[index];
+}
+
+void emit(const char* wake) {
+    // Built into one buffer so the line is never split by other output.
+    char line[320];
+    int n = snprintf(line, sizeof(line), "[BootTrace] v=1 wake=%s", wake);
+    for (int i = 0; i < PHASE_COUNT && n > 0 && n < static_cast<int>(sizeof(line)); i++) {
+        if (g_endUs[i] == 0) continue;
+        n += snprintf(line + n, sizeof(line) - n, " %s=%lu", PHASE_NAMES[i],
+                      static_cast<unsigned long>(g_durationUs[i]));
+    }
+    if (n > 0 && n < static_cast<int>(sizeof(line))) {
+        snprintf(line + n, sizeof(line) - n, " total=%lu",
+                 static_cast<unsigned long>(totalUs()));
+    }
+    Serial.println(line);
+}
+
+}  // namespace BootTrace
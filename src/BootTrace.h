@@ -0,0 +1,42 @@
+#pragma once
+
+#include <cstdint>
+
+// ---------------------------------------------------------------------------
+// BootTrace — per-phase boot timing
+//
+// setup() marks the end of each phase with an esp_timer timestamp (µs since
+// the app started). Once the first loop() pass is done, emit() prints every
+// phase duration as one machine-parseable line:
+//
+//   [BootTrace] v=1 wake=deep_sleep serial=503112 wake_state=1804 ... total=2412077
+//
+// tools/boot_trace_report.py aggregates these lines over many boots.
+// ---------------------------------------------------------------------------
+namespace BootTrace {
+
+enum class Phase : uint8_t {
+    Serial,      // UART, amp mute, settle delay
+    WakeState,   // wake cause, bedtime clock, peripheral power
+    Nvs,
+    Inputs,      // buttons + state machine
+    I2s,
+    BtStack,     // A2DP sink and Bluedroid start
+    SdMount,
+    Config,      // config.json
+    Catalog,     // theme list + priority themes
+    Ble,
+    Ready,       // rest of setup()
+    FirstLoop,
+    Count,
+};
+
+void mark(Phase phase);
+// Duration of a phase in µs (time since the previous marked phase), or 0 if
+// it was skipped (e.g. no SD card).
+uint32_t phaseUs(Phase phase);
+uint32_t totalUs();
+const char* phaseName(Phase phase);
+void emit(const char* wake);
+
+}  // namespace BootTrace
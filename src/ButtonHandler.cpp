@@ -1,102 +1,175 @@
 #include "ButtonHandler.h"
+#include <atomic>
+
+namespace {
+
+struct Edge {
+    uint32_t atUs;
+    uint8_t  button;
+    bool     pressed;
+};
+
+static_assert((BUTTON_EDGE_QUEUE_DEPTH & (BUTTON_EDGE_QUEUE_DEPTH - 1)) == 0,
+              "BUTTON_EDGE_QUEUE_DEPTH must be a power of two");
+
+// Single producer: Arduino-ESP32 runs every GPIO handler from one interrupt
+// on one core, so the two button ISRs never preempt each other. The main
+// loop is the only consumer.
+Edge s_edges[BUTTON_EDGE_QUEUE_DEPTH];
+std::atomic<uint32_t> s_head{0};  // next slot the ISR writes
+std::atomic<uint32_t> s_tail{0};  // next slot update() reads
+std::atomic<bool>     s_overflow{false};
+std::atomic<uint32_t> s_dropped{0};
+
+bool popEdge(Edge& out) {
+    uint32_t tail = s_tail.load(std::memory_order_relaxed);
+    if (tail == s_head.load(std::memory_order_acquire)) return false;
+    out = s_edges[tail & (BUTTON_EDGE_QUEUE_DEPTH - 1)];
+    s_tail.store(tail + 1, std::memory_order_release);
+    return true;
+}
+
+void IRAM_ATTR onBtn1Edge() {
+    ButtonHandler::pushEdge(0, digitalRead(PIN_BTN1) == LOW, micros());
+}
+
+void IRAM_ATTR onBtn2Edge() {
+    ButtonHandler::pushEdge(1, digitalRead(PIN_BTN2) == LOW, micros());
+}
+
+// True if a is later than b, across micros() wraparound.
+bool isLater(uint32_t a, uint32_t b) {
+    return static_cast<int32_t>(a - b) > 0;
+}
+
+bool withinBothWindow(uint32_t a, uint32_t b) {
+    uint32_t gap = isLater(a, b) ? a - b : b - a;
+    return gap < BOTH_PRESS_WINDOW_MS * 1000UL;
+}
+
+}  // namespace
 
 void ButtonHandler::begin() {
     pinMode(PIN_BTN1, INPUT_PULLUP);
     pinMode(PIN_BTN2, INPUT_PULLUP);
+
+    // A button held at boot is seen as pressed now, as if it had just closed.
+    _lastUs = micros();
+    resyncLevels(_lastUs);
+    attachInterrupt(digitalPinToInterrupt(PIN_BTN1), onBtn1Edge, CHANGE);
+    attachInterrupt(digitalPinToInterrupt(PIN_BTN2), onBtn2Edge, CHANGE);
+}
+
+bool IRAM_ATTR ButtonHandler::pushEdge(uint8_t button, bool pressed, uint32_t atUs) {
+    uint32_t head = s_head.load(std::memory_order_relaxed);
+    if (head - s_tail.load(std::memory_order_acquire) >= BUTTON_EDGE_QUEUE_DEPTH) {
+        s_dropped.fetch_add(1, std::memory_order_relaxed);
+        s_overflow.store(true, std::memory_order_release);
+        return false;
+    }
+    s_edges[head & (BUTTON_EDGE_QUEUE_DEPTH - 1)] = Edge{atUs, button, pressed};
+    s_head.store(head + 1, std::memory_order_release);
+    return true;
+}
+
+uint32_t ButtonHandler::droppedEdges() {
+    return s_dropped.load(std::memory_order_relaxed);
 }
 
 // ---------------------------------------------------------------------------
 // update() — call every loop iteration
 // ---------------------------------------------------------------------------
 void ButtonHandler::update() {
-    updateOne(_b1, PIN_BTN1);
-    updateOne(_b2, PIN_BTN2);
-
-    bool pressed1 = _b1.debounced;
-    bool pressed2 = _b2.debounced;
-
-    // Both-held tracking
-    if (pressed1 && pressed2) {
-        if (!_bothCurrentlyHeld) {
-            _bothCurrentlyHeld = true;
-            _bothHeldSinceMs   = millis();
-        }
-    } else {
-        _bothCurrentlyHeld = false;
-        _bothHeldSinceMs   = 0;
+    Edge edge;
+    while (popEdge(edge)) {
+        // An edge queued while the previous update() read the clock may be a
+        // few µs older than _lastUs; never replay time backwards.
+        uint32_t atUs = isLater(_lastUs, edge.atUs) ? _lastUs : edge.atUs;
+        _lastUs = atUs;
+        settle(_b1, atUs);
+        settle(_b2, atUs);
+        applyEdge(edge.button == 0 ? _b1 : _b2, edge.pressed, atUs);
     }
 
-    // Simultaneous-press event: if one button just transitioned to pressed
-    // while the other was already pressed (within BOTH_PRESS_WINDOW_MS),
-    // emit a "both" event and clear any individual events for those presses.
-    if (_b1.pendingEvent && _b2.pendingEvent) {
-        // Both registered a press — fire both event regardless of timing
-        _evtBoth        = true;
+    uint32_t nowUs = micros();
+    if (isLater(nowUs, _lastUs)) _lastUs = nowUs;
+    nowUs = _lastUs;
+    // Edges were lost, so the replayed levels may be stale: read the pins.
+    if (s_overflow.exchange(false, std::memory_order_acq_rel)) resyncLevels(nowUs);
+    settle(_b1, nowUs);
+    settle(_b2, nowUs);
+
+    // Simultaneous-press event: both presses became stable within
+    // BOTH_PRESS_WINDOW_MS of each other, whichever came first and whether or
+    // not the first is still held. Clear the individual events for them.
+    bool both = false;
+    if (_b1.pendingEvent && (_b2.pendingEvent || _b2.debounced)) {
+        both = withinBothWindow(_b1.pressedAtUs, _b2.pressedAtUs);
+    }
+    if (!both && _b2.pendingEvent && _b1.debounced) {
+        both = withinBothWindow(_b1.pressedAtUs, _b2.pressedAtUs);
+    }
+    if (both) {
+        _evtBoth         = true;
         _b1.pendingEvent = false;
         _b2.pendingEvent = false;
         return;
     }
 
-    if (_b1.pendingEvent && pressed2) {
-        // btn1 just pressed while btn2 was already held
-        if ((millis() - _b2PressedAtMs) < BOTH_PRESS_WINDOW_MS) {
-            _evtBoth        = true;
-            _b1.pendingEvent = false;
-            return;
-        }
+    // Flush individual events once the window for a second press has passed
+    const uint32_t windowUs = BOTH_PRESS_WINDOW_MS * 1000UL;
+    if (_b1.pendingEvent && (nowUs - _b1.pressedAtUs) > windowUs) {
+        _evt1            = true;
+        _b1.pendingEvent = false;
     }
-
-    if (_b2.pendingEvent && pressed1) {
-        // btn2 just pressed while btn1 was already held
-        if ((millis() - _b1PressedAtMs) < BOTH_PRESS_WINDOW_MS) {
-            _evtBoth        = true;
-            _b2.pendingEvent = false;
-            return;
-        }
+    if (_b2.pendingEvent && (nowUs - _b2.pressedAtUs) > windowUs) {
+        _evt2            = true;
+        _b2.pendingEvent = false;
     }
+}
 
-    // Flush individual events if no simultaneous press detected yet
-    if (_b1.pendingEvent) {
-        // Wait a short window to see if btn2 also comes in
-        if ((millis() - _b1.pressedAtMs) > BOTH_PRESS_WINDOW_MS) {
-            _evt1            = true;
-            _b1.pendingEvent = false;
-        }
-    }
-    if (_b2.pendingEvent) {
-        if ((millis() - _b2.pressedAtMs) > BOTH_PRESS_WINDOW_MS) {
-            _evt2            = true;
-            _b2.pendingEvent = false;
-        }
-    }
+// ---------------------------------------------------------------------------
+// applyEdge() — record a raw level change of one button
+// ---------------------------------------------------------------------------
+void ButtonHandler::applyEdge(BtnState& b, bool pressed, uint32_t atUs) {
+    if (pressed == b.raw) return;
+    b.raw          = pressed;
+    b.lastChangeUs = atUs;
+    if (pressed && !b.debounced && b.edgeUs == 0) b.edgeUs = atUs;
 }
 
 // ---------------------------------------------------------------------------
-// updateOne() — debounce a single button
+// settle() — commit a level that has been stable for DEBOUNCE_MS by atUs
 // ---------------------------------------------------------------------------
-void ButtonHandler::updateOne(BtnState& b, int pin) {
-    bool raw = (digitalRead(pin) == LOW);  // active LOW
+void ButtonHandler::settle(BtnState& b, uint32_t atUs) {
+    const uint32_t debounceUs = DEBOUNCE_MS * 1000UL;
+    if ((atUs - b.lastChangeUs) < debounceUs) return;
+    if (b.raw == b.debounced) {
+        if (!b.raw) b.edgeUs = 0;  // a glitch, not a press
+        return;
+    }
 
-    if (raw != b.raw) {
-        b.raw          = raw;
-        b.lastChangeMs = millis();
+    b.debounced = b.raw;
+    if (b.debounced) {
+        // Rising edge (button pressed), dated when it became stable
+        b.pendingEvent = true;
+        b.pressedAtUs  = b.lastChangeUs + debounceUs;
+        b.pressEdgeUs  = b.edgeUs;
+        b.edgeUs       = 0;
     }
 
-    if ((millis() - b.lastChangeMs) >= DEBOUNCE_MS) {
-        bool stable = b.raw;
-        if (stable != b.debounced) {
-            b.debounced = stable;
-            if (stable) {
-                // Rising edge (button pressed)
-                b.pendingEvent  = true;
-                b.pressedAtMs   = millis();
-
-                // Record press time for simultaneous detection
-                if (pin == PIN_BTN1) _b1PressedAtMs = b.pressedAtMs;
-                if (pin == PIN_BTN2) _b2PressedAtMs = b.pressedAtMs;
-            }
-        }
+    bool bothHeld = _b1.debounced && _b2.debounced;
+    if (bothHeld && !_bothCurrentlyHeld) {
+        _bothHeldSinceUs = isLater(_b1.pressedAtUs, _b2.pressedAtUs) ? _b1.pressedAtUs : _b2.pressedAtUs;
     }
+    _bothCurrentlyHeld = bothHeld;
+}
+
+void ButtonHandler::resyncLevels(uint32_t atUs) {
+    settle(_b1, atUs);
+    settle(_b2, atUs);
+    applyEdge(_b1, digitalRead(PIN_BTN1) == LOW, atUs);
+    applyEdge(_b2, digitalRead(PIN_BTN2) == LOW, atUs);
 }
 
 // ---------------------------------------------------------------------------
@@ -131,5 +204,6 @@ bool ButtonHandler::isBothHeld() const {
 
 uint32_t ButtonHandler::bothHeldDurationMs() const {
     if (!_bothCurrentlyHeld) return 0;
-    return millis() - _bothHeldSinceMs;
+    uint32_t nowUs = micros();
+    return isLater(nowUs, _bothHeldSinceUs) ? (nowUs - _bothHeldSinceUs) / 1000UL : 0;
 }
@@ -16,16 +16,23 @@
 //   if (btn.wasBtn2Pressed())  { ... }
 //   if (btn.wasBothPressed())  { ... }
 //   if (btn.isBothHeld(3000))  { ... }  // held ≥ 3 s
+//
+// Each GPIO change interrupt pushes {button, level, micros()} into a
+// lock-free single-producer/single-consumer queue. update() replays the
+// queued edges in order, so debounce and the both-press window are judged on
+// edge timestamps rather than on when the main loop happened to poll. A
+// press and release that both fall inside one slow loop pass still count.
 // ---------------------------------------------------------------------------
 
 class ButtonHandler {
 public:
     ButtonHandler() = default;
 
-    // Configure GPIO pins; call once in setup()
+    // Configure GPIO pins and attach the edge interrupts; call once in setup()
     void begin();
 
-    // Poll button state — call every loop iteration (≤10 ms period recommended)
+    // Replay queued edges — call every loop iteration. The loop period only
+    // delays when events are seen, not how they are timed.
     void update();
 
     // Consume events: each returns true once per physical press, then resets
@@ -42,14 +49,28 @@ public:
     // How long (ms) both buttons have been held continuously (0 if not both held)
     uint32_t bothHeldDurationMs() const;
 
+    // micros() of the first contact edge of the press behind the last
+    // btn1/btn2 event, before debouncing (press-to-sound tracing).
+    uint32_t btn1PressEdgeUs() const { return _b1.pressEdgeUs; }
+    uint32_t btn2PressEdgeUs() const { return _b2.pressEdgeUs; }
+
+    // Queue one edge (button 0 = btn1, 1 = btn2). Called from the GPIO ISRs;
+    // native tests call it to inject synthetic edge sequences. Returns false
+    // (and forces a level resync on the next update()) when the queue is full.
+    static bool pushEdge(uint8_t button, bool pressed, uint32_t atUs);
+
+    // Edges lost to a full queue since boot.
+    static uint32_t droppedEdges();
+
 private:
-    // Per-button state
+    // Per-button state; all times are micros()
     struct BtnState {
-        bool     raw        = false;  // current raw reading (LOW = pressed)
+        bool     raw        = false;  // last level seen (true = pressed)
         bool     debounced  = false;  // stable debounced state
-        bool     lastDebounced = false;
-        uint32_t lastChangeMs = 0;    // time of last raw change
-        uint32_t pressedAtMs  = 0;    // time debounced press was detected
+        uint32_t lastChangeUs = 0;    // time of last raw change
+        uint32_t pressedAtUs  = 0;    // time the press became stable
+        uint32_t edgeUs       = 0;    // first raw contact of a press in progress
+        uint32_t pressEdgeUs  = 0;    // edgeUs of the last accepted press
         bool     pendingEvent = false;
     };
 
@@ -60,13 +81,14 @@ private:
     bool _evt2      = false;
     bool _evtBoth   = false;
 
-    // For simultaneous-press detection
-    uint32_t _b1PressedAtMs = 0;   // time btn1 last became pressed
-    uint32_t _b2PressedAtMs = 0;   // time btn2 last became pressed
-
     // Both-held tracking
     bool     _bothCurrentlyHeld = false;
-    uint32_t _bothHeldSinceMs   = 0;
+    uint32_t _bothHeldSinceUs   = 0;
+
+    // Latest time replayed; edges never move the clock backwards.
+    uint32_t _lastUs = 0;
 
-    void updateOne(BtnState& b, int pin);
+    void applyEdge(BtnState& b, bool pressed, uint32_t atUs);
+    void settle(BtnState& b, uint32_t atUs);
+    void resyncLevels(uint32_t atUs);
 };
@@ -35,6 +35,7 @@ static constexpr int PIN_LED        = 2;   // On-board LED
 // ---------------------------------------------------------------------------
 static constexpr uint32_t DEBOUNCE_MS          = 50;    // Button debounce window
 static constexpr uint32_t BOTH_PRESS_WINDOW_MS = 100;   // Max gap for "both pressed"
+static constexpr size_t   BUTTON_EDGE_QUEUE_DEPTH = 32; // Edges buffered between update() calls (power of 2)
 static constexpr uint32_t KILLSWITCH_MS        = 10UL * 60UL * 1000UL;  // 10 minutes
 static constexpr bool     DEFAULT_SLEEP_ENABLED = true;
 static constexpr uint32_t SLEEP_NORMAL_IDLE_MS = 10UL * 60UL * 1000UL;
@@ -52,12 +53,44 @@ static constexpr bool    DEFAULT_BEDTIME_ENABLED = true;
 static constexpr uint16_t DEFAULT_BEDTIME_START_MINUTES = 18U * 60U + 30U;
 static constexpr uint16_t DEFAULT_BEDTIME_END_MINUTES = 6U * 60U + 30U;
 static constexpr uint8_t DEFAULT_BEDTIME_VOLUME_CAP_PCT = 45;
+// The A2DP ring is reserved once at 8 KB (~46 ms of 44.1 kHz 16-bit stereo).
+// How much of it must fill before I2S starts is tuned per connection by
+// PrefetchTuner from the sink's underflow/drop counters: 40% is ~19 ms, 75%
+// ~35 ms and leaves one 2 KB packet of headroom. With adaptive prefetch off it
+// stays at START.
 static constexpr int     BT_A2DP_RINGBUFFER_BYTES = 8 * 1024;
+static constexpr bool     BT_A2DP_ADAPTIVE_PREFETCH = true;
+static constexpr uint8_t  BT_A2DP_PREFETCH_MIN_PCT = 40;
+static constexpr uint8_t  BT_A2DP_PREFETCH_MAX_PCT = 75;
+static constexpr uint8_t  BT_A2DP_PREFETCH_START_PCT = 55;
+static constexpr uint8_t  BT_A2DP_PREFETCH_STEP_PCT = 10;
+static constexpr uint32_t BT_A2DP_PREFETCH_WINDOW_MS = 10000;
+static constexpr uint8_t  BT_A2DP_PREFETCH_CALM_WINDOWS = 6;  // one quiet minute per step down
+// While streaming, a BtRx trace event this often records the bytes received,
+// so tools/a2dp_ring_sim.py can replay real arrivals. 0 turns it off.
+static constexpr uint32_t BT_A2DP_RX_TRACE_MS = 50;
 static constexpr int     BT_A2DP_I2S_TASK_STACK_BYTES = 2048;
+// SD read-ahead for local WAV playback: a task fills a byte ring from the card
+// so main-loop SD work cannot starve the decoder. 12 KB is ~70 ms of 44.1 kHz
+// 16-bit stereo PCM. Allocated on the first local file and released for BT.
+static constexpr size_t   SD_READAHEAD_RING_BYTES = 12 * 1024;
+static constexpr size_t   SD_READAHEAD_READ_BYTES = 2048;
+static constexpr uint32_t SD_READAHEAD_TASK_STACK_BYTES = 3072;
+static constexpr int      SD_READAHEAD_TASK_PRIORITY = 2;
+static constexpr int      SD_READAHEAD_TASK_CORE = 0;
+// In loop mode the next song is opened and its header parsed this long before
+// the current one ends, so the handover adds no silence.
+static constexpr uint32_t GAPLESS_PREPARE_BEFORE_END_MS = 3000;
 
 // BLE parent controls are live session controls for local SD/WAV playback.
 static constexpr bool ENABLE_BLE_PARENT_SERVICE = true;
 
+// Hot-path events (BT callbacks, volume, read-ahead stats) go to a binary
+// ring instead of Serial.printf. The main loop writes a few frames per pass
+// while the UART has room; tools/trace_decode.py turns them back into lines.
+static constexpr int TRACE_RING_RECORDS = 64;
+static constexpr int TRACE_DRAIN_FRAMES_PER_LOOP = 4;
+
 // ---------------------------------------------------------------------------
 // SD file paths
 // ---------------------------------------------------------------------------
@@ -87,10 +120,44 @@ static constexpr size_t BLE_THEMES_MAX_BYTES = 512;
 static constexpr int BLE_MAX_THEMES = 16;
 static constexpr int BLE_CONFIG_THEME_PAGE_SIZE = 1;
 static constexpr int BLE_CONFIG_SONG_PAGE_SIZE = 2;
+// Config commands the app may have in flight at once. Writes are queued in
+// arrival order and answered one per loop pass, each response tagged with its
+// request id so the app can match notifications to pending requests.
+static constexpr int BLE_CONFIG_QUEUE_DEPTH = 4;
+// Size of one queued config command slot, NUL included. Longer writes are
+// cut, so the app splits `batch` edits into parts below this size.
+static constexpr size_t BLE_CONFIG_COMMAND_MAX_BYTES = 384;
+// MTU requested in BLEParentService::begin(). A config response longer than
+// the negotiated MTU minus the 3-byte ATT header is truncated in the notify
+// and the app reads the full value back, so the next queued command is held
+// until that read arrives or the app disconnects.
+static constexpr uint16_t BLE_REQUESTED_MTU = 185;
+// Largest config response: one characteristic value. Responses are written
+// into a static buffer of this size; one that would not fit is answered with
+// an error instead.
+static constexpr size_t BLE_CONFIG_RESPONSE_MAX_BYTES = 512;
+// Minimum gap between notifies of one status characteristic (volume,
+// killswitch, theme, status, notice). Longer while a Classic BT source is
+// connected, when BLE shares the radio with A2DP.
+static constexpr uint32_t BLE_NOTIFY_MIN_INTERVAL_MS = 100;
+static constexpr uint32_t BLE_NOTIFY_MIN_INTERVAL_BT_MS = 500;
+// Largest `batch` edit (all parts together); the per-item result list in the
+// reply has to fit one 512-byte characteristic value.
+static constexpr int BLE_CONFIG_BATCH_MAX_ITEMS = 128;
+// Time the main loop spends per pass on the background catalog build while no
+// WAV is playing (during playback it reads one file per pass instead).
+static constexpr uint32_t CATALOG_BUILD_SLICE_MS = 8;
+// App edits to config.json / metadata.json are applied in RAM at once and
+// written back once no further edit has arrived for this long, so a burst of
+// toggles costs one SD write per file.
+static constexpr uint32_t CATALOG_FLUSH_DEBOUNCE_MS = 1500;
 static constexpr int CONFIG_MAX_DISABLED_THEMES = 64;
 static constexpr int CONFIG_MAX_DISABLED_SONGS = 128;
 static constexpr int CONFIG_SCAN_MAX_THEMES = 64;
 static constexpr int CONFIG_SCAN_MAX_SONGS = 128;
+// Serialized scanThemes/scanSongs pages kept between requests. The app
+// re-scans on every open, so a handful of pages covers the usual screens.
+static constexpr int CONFIG_PAGE_CACHE_ENTRIES = 8;
 
 // ---------------------------------------------------------------------------
 // NVS namespace / keys
@@ -1,6 +1,7 @@
 #include "ContentCatalog.h"
 #include <esp_heap_caps.h>
-#include <utility>
+#include <string.h>
+#include "NameIndex.h"
 
 namespace ContentCatalog {
 namespace {
@@ -78,52 +79,46 @@ bool setListMember(JsonDocument& doc, const char* key, const String& name,
     return true;
 }
 
-void appendThemeRow(String& json, const ThemeStats& stats) {
-    if (!json.endsWith("[")) json += ",";
-    json += "{\"id\":\"";
-    json += jsonEscape(stats.id);
-    json += "\",\"name\":\"";
-    json += jsonEscape(stats.name);
-    json += "\",\"enabled\":";
-    json += stats.enabled ? "true" : "false";
-    json += ",\"disabledByUser\":";
-    json += stats.disabledByUser ? "true" : "false";
-    json += ",\"shuffle\":";
-    json += stats.shuffle ? "true" : "false";
-    json += ",\"special\":";
-    json += stats.special ? "true" : "false";
-    json += ",\"canDisable\":";
-    json += stats.canDisable ? "true" : "false";
-    json += ",\"canSetDefault\":";
-    json += stats.canSetDefault ? "true" : "false";
-    json += ",\"activeValid\":";
-    json += stats.enabledValidSongs;
-    json += ",\"total\":";
-    json += stats.totalSongs;
-    json += ",\"errors\":";
-    json += stats.errorSongs;
-    json += "}";
-}
-
-void appendSongRow(String& json, const String& fileName, const WavInfo& wav,
-                   bool enabled) {
-    if (!json.endsWith("[")) json += ",";
-    json += "{\"file\":\"";
-    json += jsonEscape(fileName);
-    json += "\",\"enabled\":";
-    json += enabled ? "true" : "false";
-    json += ",\"ok\":";
-    json += wav.supported ? "true" : "false";
-    json += ",\"sizeBytes\":";
-    json += wav.sizeBytes;
-    json += ",\"durationMs\":";
-    json += wav.durationMs;
-    if (!wav.supported) {
-        json += ",\"error\":\"";
-        json += jsonEscape(wav.error);
-        json += "\"";
-    }
-    json += "}";
+// Rows are written from the pre-escaped catalog names; the caller adds the
+// separating commas.
+void writeThemeRow(JsonWriter& out, const CachedTheme& theme) {
+    int total = 0;
+    int playable = 0;
+    int errors = 0;
+    for (const CachedSong& s : theme.songs()) {
+        total++;
+        if (!s.supported()) {
+            errors++;
+        } else if (!s.disabled) {
+            playable++;
+        }
+    }
+    out.raw("{\"id\":").escaped(theme.idJson());
+    out.raw(",\"name\":").escaped(theme.nameJson());
+    out.raw(",\"enabled\":").boolean(!theme.disabledByUser && playable > 0);
+    out.raw(",\"disabledByUser\":").boolean(theme.disabledByUser);
+    out.raw(",\"shuffle\":").boolean(theme.shuffle);
+    out.raw(",\"special\":").boolean(theme.special);
+    out.raw(",\"canDisable\":").boolean(!theme.special);
+    out.raw(",\"canSetDefault\":").boolean(!theme.special);
+    out.raw(",\"activeValid\":").num(playable);
+    out.raw(",\"total\":").num(total);
+    out.raw(",\"errors\":").num(errors);
+    out.raw("}");
+}
+
+void writeSongRow(JsonWriter& out, const CachedSong& song) {
+    out.raw("{\"file\":").escaped(song.fileJson());
+    out.raw(",\"enabled\":").boolean(!song.disabled);
+    out.raw(",\"ok\":").boolean(song.supported());
+    out.raw(",\"sizeBytes\":").num(song.sizeBytes);
+    out.raw(",\"durationMs\":").num(song.durationMs);
+    if (!song.supported()) {
+        char text[WAV_ERROR_TEXT_MAX];
+        size_t len = formatWavError(song.error, song.errorValue, text, sizeof(text));
+        out.raw(",\"error\":").str(text, len);
+    }
+    out.raw("}");
 }
 
 }  // namespace
@@ -164,47 +159,47 @@ bool isAnimalsTheme(const String& themeId) {
 }
 
 String jsonEscape(const String& input) {
+    const char* text = input.c_str();
+    if (!JsonWriter::needsEscape(text, input.length())) return input;
     String out;
     out.reserve(input.length() + 8);
-    static const char* hex = "0123456789ABCDEF";
-
+    char escaped[7];
     for (size_t i = 0; i < input.length(); i++) {
-        unsigned char c = static_cast<unsigned char>(input[i]);
-        switch (c) {
-            case '"':  out += "\\\""; break;
-            case '\\': out += "\\\\"; break;
-            case '\b': out += "\\b";  break;
-            case '\f': out += "\\f";  break;
-            case '\n': out += "\\n";  break;
-            case '\r': out += "\\r";  break;
-            case '\t': out += "\\t";  break;
-            default:
-                if (c < 0x20) {
-                    out += "\\u00";
-                    out += hex[c >> 4];
-                    out += hex[c & 0x0F];
-                } else {
-                    out += static_cast<char>(c);
-                }
-                break;
-        }
+        size_t n = JsonWriter::escapeByte(static_cast<unsigned char>(text[i]), escaped);
+        escaped[n] = '\0';
+        out += escaped;
     }
     return out;
 }
 
-String formatTimeOfDay(uint16_t minuteOfDay) {
+void formatTimeOfDay(uint16_t minuteOfDay, char* out, size_t size) {
     if (minuteOfDay >= 24U * 60U) {
         minuteOfDay = 24U * 60U - 1U;
     }
+    snprintf(out, size, "%02u:%02u", minuteOfDay / 60U, minuteOfDay % 60U);
+}
+
+String formatTimeOfDay(uint16_t minuteOfDay) {
     char buf[6];
-    snprintf(buf, sizeof(buf), "%02u:%02u", minuteOfDay / 60U, minuteOfDay % 60U);
+    formatTimeOfDay(minuteOfDay, buf, sizeof(buf));
     return String(buf);
 }
 
 JsonDocument readJsonFile(const String& path) {
     JsonDocument doc;
     File f = SD.open(path.c_str());
-    if (!f) return doc;
+    if (!f) {
+        // A write interrupted between remove and rename leaves only the
+        // fully written temp file; use it and finish the rename.
+        String tmpPath = path + ".tmp";
+        f = SD.open(tmpPath.c_str());
+        if (!f) return doc;
+        f.close();
+        Serial.printf("[Config] Recovering %s from %s\n", path.c_str(), tmpPath.c_str());
+        SD.rename(tmpPath.c_str(), path.c_str());
+        f = SD.open(path.c_str());
+        if (!f) return doc;
+    }
     DeserializationError err = deserializeJson(doc, f);
     f.close();
     if (err) {
@@ -219,15 +214,29 @@ JsonDocument readThemeMetadata(const String& themePath) {
 }
 
 bool writeJsonFile(const String& path, JsonDocument& doc) {
-    SD.remove(path.c_str());
-    File f = SD.open(path.c_str(), FILE_WRITE);
+    // Write the whole document to a temp file first, so a power cut never
+    // leaves a truncated or missing file: either the old file is intact, or
+    // readJsonFile() picks the complete temp file up on the next read.
+    String tmpPath = path + ".tmp";
+    File f = SD.open(tmpPath.c_str(), FILE_WRITE);
     if (!f) {
-        Serial.printf("[Config] Cannot write %s\n", path.c_str());
+        Serial.printf("[Config] Cannot write %s\n", tmpPath.c_str());
         return false;
     }
-    serializeJsonPretty(doc, f);
-    f.println();
+    size_t expected = measureJson(doc);
+    size_t written = serializeJson(doc, f);
     f.close();
+    if (written != expected) {
+        Serial.printf("[Config] Short write to %s (%u of %u bytes)\n", tmpPath.c_str(),
+                      static_cast<unsigned>(written), static_cast<unsigned>(expected));
+        SD.remove(tmpPath.c_str());
+        return false;
+    }
+    SD.remove(path.c_str());
+    if (!SD.rename(tmpPath.c_str(), path.c_str())) {
+        Serial.printf("[Config] Cannot rename %s to %s\n", tmpPath.c_str(), path.c_str());
+        return false;
+    }
     return true;
 }
 
@@ -244,14 +253,6 @@ bool nameInJsonArray(JsonVariantConst value, const String& name) {
     return false;
 }
 
-bool isThemeDisabled(const String& themeId) {
-    if (isAnimalsTheme(themeId)) {
-        return false;
-    }
-    JsonDocument doc = readJsonFile(SD_CONFIG_FILE);
-    return nameInJsonArray(doc["disabledThemes"], themeId);
-}
-
 bool isSongDisabled(const JsonDocument& metadata, const String& fileName) {
     return nameInJsonArray(metadata["disabledSongs"], fileName);
 }
@@ -262,7 +263,7 @@ WavInfo inspectWav(File& entry) {
     entry.seek(0);
 
     if (info.sizeBytes < 12) {
-        info.error = "File is too small";
+        info.error = WavError::TooSmall;
         return info;
     }
 
@@ -271,7 +272,7 @@ WavInfo inspectWav(File& entry) {
         riff[0] != 'R' || riff[1] != 'I' || riff[2] != 'F' || riff[3] != 'F' ||
         riff[8] != 'W' || riff[9] != 'A' || riff[10] != 'V' || riff[11] != 'E') {
         entry.seek(0);
-        info.error = "Missing RIFF/WAVE header";
+        info.error = WavError::MissingRiffHeader;
         return info;
     }
 
@@ -289,27 +290,27 @@ WavInfo inspectWav(File& entry) {
         uint32_t chunkSize = le32(chunk + 4);
         uint32_t dataStart = pos + 8;
         if (dataStart > info.sizeBytes || chunkSize > (info.sizeBytes - dataStart)) {
-            info.error = "Invalid WAV chunk size";
+            info.error = WavError::BadChunkSize;
             entry.seek(0);
             return info;
         }
         uint32_t next = dataStart + chunkSize + (chunkSize & 1);
         if (next < dataStart) {
-            info.error = "Invalid WAV chunk size";
+            info.error = WavError::BadChunkSize;
             entry.seek(0);
             return info;
         }
 
         if (chunk[0] == 'f' && chunk[1] == 'm' && chunk[2] == 't' && chunk[3] == ' ') {
             if (chunkSize < 16 || dataStart + 16 > info.sizeBytes) {
-                info.error = "Invalid fmt chunk";
+                info.error = WavError::BadFmtChunk;
                 entry.seek(0);
                 return info;
             }
             uint8_t fmt[16];
             entry.seek(dataStart);
             if (!readFully(entry, fmt, sizeof(fmt))) {
-                info.error = "Cannot read fmt chunk";
+                info.error = WavError::UnreadableFmtChunk;
                 entry.seek(0);
                 return info;
             }
@@ -319,6 +320,7 @@ WavInfo inspectWav(File& entry) {
             info.bitsPerSample = le16(fmt + 14);
             fmtFound = true;
         } else if (chunk[0] == 'd' && chunk[1] == 'a' && chunk[2] == 't' && chunk[3] == 'a') {
+            info.dataOffset = dataStart;
             info.dataBytes = chunkSize;
             dataFound = true;
         }
@@ -328,29 +330,33 @@ WavInfo inspectWav(File& entry) {
 
     entry.seek(0);
     if (!fmtFound) {
-        info.error = "Missing fmt chunk";
+        info.error = WavError::MissingFmtChunk;
         return info;
     }
     if (!dataFound || info.dataBytes == 0) {
-        info.error = "Missing audio data";
+        info.error = WavError::MissingAudioData;
         return info;
     }
 
     info.valid = true;
     if (info.audioFormat != 1) {
-        info.error = String("Unsupported WAV format: ") + info.audioFormat;
+        info.error = WavError::UnsupportedFormat;
+        info.errorValue = info.audioFormat;
         return info;
     }
     if (info.sampleRate != SAMPLE_RATE) {
-        info.error = String("Invalid sample rate: ") + info.sampleRate + " Hz";
+        info.error = WavError::BadSampleRate;
+        info.errorValue = info.sampleRate;
         return info;
     }
     if (info.channels != CHANNELS) {
-        info.error = String("Invalid channel count: ") + info.channels;
+        info.error = WavError::BadChannelCount;
+        info.errorValue = info.channels;
         return info;
     }
     if (info.bitsPerSample != BITS_PER_SAMPLE) {
-        info.error = String("Invalid bit depth: ") + info.bitsPerSample + "-bit";
+        info.error = WavError::BadBitDepth;
+        info.errorValue = info.bitsPerSample;
         return info;
     }
 
@@ -363,9 +369,39 @@ WavInfo inspectWav(File& entry) {
     return info;
 }
 
+size_t formatWavError(WavError error, uint32_t value, char* out, size_t size) {
+    const char* text = "Unknown WAV error";
+    const char* unit = "";
+    bool withValue = false;
+    switch (error) {
+        case WavError::None:               text = ""; break;
+        case WavError::TooSmall:           text = "File is too small"; break;
+        case WavError::MissingRiffHeader:  text = "Missing RIFF/WAVE header"; break;
+        case WavError::BadChunkSize:       text = "Invalid WAV chunk size"; break;
+        case WavError::BadFmtChunk:        text = "Invalid fmt chunk"; break;
+        case WavError::UnreadableFmtChunk: text = "Cannot read fmt chunk"; break;
+        case WavError::MissingFmtChunk:    text = "Missing fmt chunk"; break;
+        case WavError::MissingAudioData:   text = "Missing audio data"; break;
+        case WavError::UnsupportedFormat:  text = "Unsupported WAV format: "; withValue = true; break;
+        case WavError::BadSampleRate:      text = "Invalid sample rate: "; unit = " Hz"; withValue = true; break;
+        case WavError::BadChannelCount:    text = "Invalid channel count: "; withValue = true; break;
+        case WavError::BadBitDepth:        text = "Invalid bit depth: "; unit = "-bit"; withValue = true; break;
+    }
+    int n = withValue ? snprintf(out, size, "%s%lu%s", text, static_cast<unsigned long>(value), unit)
+                      : snprintf(out, size, "%s", text);
+    if (n < 0) return 0;
+    return static_cast<size_t>(n) < size ? static_cast<size_t>(n) : size - 1;
+}
+
+String wavErrorText(WavError error, uint32_t value) {
+    char text[WAV_ERROR_TEXT_MAX];
+    formatWavError(error, value, text, sizeof(text));
+    return String(text);
+}
+
 String formatWavDetails(const WavInfo& info) {
     if (!info.supported) {
-        return info.error;
+        return wavErrorText(info.error, info.errorValue);
     }
     String out = String(info.sampleRate / 1000.0f, 1);
     out += " kHz ";
@@ -375,78 +411,441 @@ String formatWavDetails(const WavInfo& info) {
 }
 
 // ---------------------------------------------------------------------------
-// In-RAM catalog (built once at boot by buildCatalog())
+// In-RAM catalog (built once per boot, incrementally from loop())
 // ---------------------------------------------------------------------------
 namespace {
 
+constexpr size_t NAME_ARENA_INITIAL_BYTES = 4096;
+constexpr size_t SONGS_INITIAL_CAPACITY = 128;
+constexpr size_t INTERN_INDEX_INITIAL_SLOTS = 256;
+// A FAT long name is up to 255 UTF-16 units, so at most 765 UTF-8 bytes
+// (Hebrew letters take two each). The arena stores a two-byte length.
+constexpr size_t MAX_NAME_BYTES = 765;
+constexpr size_t NAME_HEADER_BYTES = 3;  // length (little-endian), flags
+
 std::vector<CachedTheme> g_themes;  // song themes sorted by id, Animals last
+std::vector<CachedSong> g_songs;    // every theme's songs, one range per theme
+// Interned names: [len lo][len hi][flags][bytes...]['\0'], then the JSON-escaped
+// text (NUL-terminated) for names flagged NAME_NEEDS_ESCAPE.
+std::vector<char> g_names;
 bool g_catalogReady = false;
 
-void sortSongsByName(std::vector<CachedSong>& songs) {
-    for (size_t i = 1; i < songs.size(); i++) {
-        CachedSong key = std::move(songs[i]);
-        size_t j = i;
-        while (j > 0 && songs[j - 1].file.compareTo(key.file) > 0) {
-            songs[j] = std::move(songs[j - 1]);
-            j--;
+// Write journal: edits change g_config / the catalog right away and are
+// persisted later by flushPendingWrites().
+JsonDocument g_config;  // config.json as read at build time plus edits
+bool g_configDirty = false;
+uint32_t g_lastEditMs = 0;
+
+// Build-time open-addressing index over g_names (slot = ref + 1, 0 = empty).
+// Only needed while names are being added; released once the build is done.
+std::vector<uint32_t> g_internIndex;
+size_t g_internCount = 0;
+
+// Serialized scan pages: everything after the `{"id":N` prefix, so answering a
+// repeated scan is one copy. Least recently used entry is replaced; any
+// catalog edit or theme load drops them all. Dropped entries keep their
+// buffers, so refilling the cache does not allocate once it has warmed up.
+enum class PageKind : uint8_t { Themes, Songs };
+
+struct CachedPage {
+    bool valid = false;
+    PageKind kind = PageKind::Themes;
+    int theme = -1;   // theme index of a songs page
+    int page = 0;
+    int pageSize = 0;
+    uint32_t lastUse = 0;
+    String body;
+};
+CachedPage g_pageCache[CONFIG_PAGE_CACHE_ENTRIES];
+uint32_t g_pageCacheTick = 0;
+
+void dropPageCache() {
+    for (CachedPage& entry : g_pageCache) {
+        entry.valid = false;
+    }
+}
+
+// Write a cached page with this request's id; false on a miss.
+bool writeCachedPage(JsonWriter& out, uint32_t requestId, PageKind kind, int theme,
+                     int page, int pageSize) {
+    for (CachedPage& entry : g_pageCache) {
+        if (entry.valid && entry.kind == kind && entry.theme == theme &&
+            entry.page == page && entry.pageSize == pageSize) {
+            entry.lastUse = ++g_pageCacheTick;
+            out.raw("{\"id\":").num(requestId).raw(entry.body.c_str(), entry.body.length());
+            return true;
         }
-        songs[j] = std::move(key);
     }
+    return false;
 }
 
-// Walk one theme directory exactly once: read its metadata, inspect every WAV
-// header, and fill the cached song list. Used for /songs themes and /animals.
-void loadThemeContents(CachedTheme& theme, const String& themePath) {
-    JsonDocument meta = readThemeMetadata(themePath);
-    const char* displayName = meta["name"] | "";
-    theme.name = (displayName && displayName[0] != '\0')
-        ? String(displayName)
-        : (theme.special ? String(ANIMALS_DISPLAY_NAME) : theme.id);
-    theme.shuffle = meta["shuffle"] | theme.special;  // animals default to shuffle
+// Keep the page body just written (from bodyStart on) in the unused or least
+// recently used slot. Pages that overflowed the response are not kept.
+void storeCachedPage(const JsonWriter& out, size_t bodyStart, PageKind kind, int theme,
+                     int page, int pageSize) {
+    if (out.overflowed()) return;
+    CachedPage* victim = &g_pageCache[0];
+    for (CachedPage& entry : g_pageCache) {
+        if (!entry.valid) {
+            victim = &entry;
+            break;
+        }
+        if (entry.lastUse < victim->lastUse) victim = &entry;
+    }
+    victim->valid = true;
+    victim->kind = kind;
+    victim->theme = theme;
+    victim->page = page;
+    victim->pageSize = pageSize;
+    victim->lastUse = ++g_pageCacheTick;
+    victim->body = "";
+    victim->body.concat(out.c_str() + bodyStart, out.length() - bodyStart);
+}
 
-    File dir = SD.open(themePath.c_str());
-    if (!dir || !dir.isDirectory()) {
-        return;
+uint32_t hashName(const char* text, size_t len) {
+    uint32_t h = 2166136261UL;  // FNV-1a
+    for (size_t i = 0; i < len; i++) {
+        h ^= static_cast<uint8_t>(text[i]);
+        h *= 16777619UL;
     }
-    while (true) {
-        File entry = dir.openNextFile();
-        if (!entry) break;
-        String fileName = baseNameOf(String(entry.name()));
-        if (!entry.isDirectory() && !isIgnoredFilesystemEntry(fileName) && isWavName(fileName)) {
-            CachedSong song;
-            song.file = fileName;
-            WavInfo wav = inspectWav(entry);
-            song.sizeBytes = wav.sizeBytes;
-            song.durationMs = wav.durationMs;
-            song.supported = wav.supported;
-            if (!wav.supported) {
-                song.error = wav.error;
-            }
-            song.disabled = isSongDisabled(meta, fileName);
-            theme.songs.push_back(std::move(song));
+    return h;
+}
+
+constexpr uint8_t NAME_NEEDS_ESCAPE = 0x01;
+
+const char* nameText(uint32_t ref) {
+    if (static_cast<size_t>(ref) + NAME_HEADER_BYTES >= g_names.size()) return "";
+    return &g_names[ref + NAME_HEADER_BYTES];
+}
+
+size_t nameLength(uint32_t ref) {
+    if (static_cast<size_t>(ref) + 1 >= g_names.size()) return 0;
+    return static_cast<uint8_t>(g_names[ref]) |
+           static_cast<size_t>(static_cast<uint8_t>(g_names[ref + 1])) << 8;
+}
+
+// The name as it goes between quotes in JSON; the name itself when it has
+// nothing to escape, which is almost always.
+const char* jsonText(uint32_t ref) {
+    if (static_cast<size_t>(ref) + NAME_HEADER_BYTES >= g_names.size()) return "";
+    if ((static_cast<uint8_t>(g_names[ref + 2]) & NAME_NEEDS_ESCAPE) == 0) return nameText(ref);
+    return nameText(ref) + nameLength(ref) + 1;
+}
+
+// Names longer than MAX_NAME_BYTES are left out of the catalog with a log
+// line rather than cut: a cut name no longer opens on the card.
+bool nameFits(const char* what, const char* text, size_t len) {
+    if (len <= MAX_NAME_BYTES) return true;
+    Serial.printf("[Catalog] Skipping %s with a %u-byte name (max %u): %s\n", what,
+                  static_cast<unsigned>(len), static_cast<unsigned>(MAX_NAME_BYTES), text);
+    return false;
+}
+
+void insertInternSlot(uint32_t ref) {
+    const size_t mask = g_internIndex.size() - 1;
+    size_t slot = hashName(nameText(ref), nameLength(ref)) & mask;
+    while (g_internIndex[slot] != 0) {
+        slot = (slot + 1) & mask;
+    }
+    g_internIndex[slot] = ref + 1;
+}
+
+void growInternIndex() {
+    std::vector<uint32_t> old;
+    old.swap(g_internIndex);
+    g_internIndex.assign(old.empty() ? INTERN_INDEX_INITIAL_SLOTS : old.size() * 2, 0);
+    for (uint32_t slot : old) {
+        if (slot != 0) insertInternSlot(slot - 1);
+    }
+}
+
+// Return the arena offset of `text`, appending it on first use. Callers check
+// nameFits() first.
+uint32_t internName(const char* text, size_t len) {
+    if ((g_internCount + 1) * 2 > g_internIndex.size()) {
+        growInternIndex();
+    }
+    const size_t mask = g_internIndex.size() - 1;
+    size_t slot = hashName(text, len) & mask;
+    while (g_internIndex[slot] != 0) {
+        uint32_t ref = g_internIndex[slot] - 1;
+        if (nameLength(ref) == len && memcmp(nameText(ref), text, len) == 0) {
+            return ref;
+        }
+        slot = (slot + 1) & mask;
+    }
+
+    uint32_t ref = static_cast<uint32_t>(g_names.size());
+    const bool escape = JsonWriter::needsEscape(text, len);
+    g_names.push_back(static_cast<char>(len & 0xFF));
+    g_names.push_back(static_cast<char>(len >> 8));
+    g_names.push_back(static_cast<char>(escape ? NAME_NEEDS_ESCAPE : 0));
+    g_names.insert(g_names.end(), text, text + len);
+    g_names.push_back('\0');
+    if (escape) {
+        char escaped[6];
+        for (size_t i = 0; i < len; i++) {
+            size_t n = JsonWriter::escapeByte(static_cast<unsigned char>(text[i]), escaped);
+            g_names.insert(g_names.end(), escaped, escaped + n);
         }
-        entry.close();
+        g_names.push_back('\0');
     }
-    dir.close();
-    sortSongsByName(theme.songs);
+    g_internIndex[slot] = ref + 1;
+    g_internCount++;
+    return ref;
+}
+
+uint32_t internName(const String& text) {
+    return internName(text.c_str(), text.length());
+}
+
+void resetCatalogStorage() {
+    g_themes.clear();
+    g_songs.clear();
+    g_names.clear();
+    g_internIndex.clear();
+    g_internCount = 0;
+    g_names.reserve(NAME_ARENA_INITIAL_BYTES);
+    g_songs.reserve(SONGS_INITIAL_CAPACITY);
+    dropPageCache();
+    internName("", 0);  // ref 0 is the empty name, so default records read as ""
+}
+
+// Drop build-only state and give back the growth slack of the arrays.
+void compactCatalogStorage() {
+    std::vector<uint32_t>().swap(g_internIndex);
+    g_internCount = 0;
+    g_names.shrink_to_fit();
+    g_songs.shrink_to_fit();
+    g_themes.shrink_to_fit();
+}
+
+size_t catalogBytes() {
+    return g_names.capacity() +
+           g_songs.capacity() * sizeof(CachedSong) +
+           g_themes.capacity() * sizeof(CachedTheme);
+}
+
+void sortSongsByName(uint32_t first, uint32_t count) {
+    CachedSong* songs = g_songs.data() + first;
+    for (uint32_t i = 1; i < count; i++) {
+        CachedSong key = songs[i];
+        uint32_t j = i;
+        while (j > 0 && strcmp(nameText(songs[j - 1].fileRef), nameText(key.fileRef)) > 0) {
+            songs[j] = songs[j - 1];
+            j--;
+        }
+        songs[j] = key;
+    }
+}
+
+// Incremental build state. A theme directory is walked exactly once: its
+// metadata is read when the walk starts, every WAV header is inspected as the
+// walk advances, and the theme's songs are appended to the shared array. The
+// walk can be split across loop() passes, so the in-progress theme publishes
+// its songs (songCount, loaded) only once the walk finishes and they are sorted.
+struct BuildState {
+    bool active = false;
+    int theme = -1;              // index into g_themes being walked, -1 if none
+    File dir;
+    JsonDocument meta;
+    uint32_t startMs = 0;
+    size_t largestBefore = 0;
+};
+BuildState g_build;
+
+void startThemeWalk(int index) {
+    CachedTheme& theme = g_themes[index];
+    String themePath = pathForThemeId(theme.id());
+    g_build.meta = readThemeMetadata(themePath);
+    const char* displayName = g_build.meta["name"] | "";
+    if (displayName && displayName[0] != '\0' &&
+        nameFits("theme display name", displayName, strlen(displayName))) {
+        theme.nameRef = internName(displayName, strlen(displayName));
+    } else if (theme.special) {
+        theme.nameRef = internName(ANIMALS_DISPLAY_NAME, strlen(ANIMALS_DISPLAY_NAME));
+    } else {
+        theme.nameRef = theme.idRef;
+    }
+    theme.shuffle = g_build.meta["shuffle"] | theme.special;  // animals default to shuffle
+    theme.firstSong = static_cast<uint32_t>(g_songs.size());
+    theme.songCount = 0;
+
+    g_build.theme = index;
+    g_build.dir = SD.open(themePath.c_str());
+    if (g_build.dir && !g_build.dir.isDirectory()) {
+        g_build.dir.close();
+    }
+}
+
+// Inspect the next directory entry of the theme being walked. Returns false
+// once the directory is exhausted.
+bool walkNextThemeEntry() {
+    if (!g_build.dir) return false;
+    File entry = g_build.dir.openNextFile();
+    if (!entry) return false;
+    String fileName = baseNameOf(String(entry.name()));
+    if (!entry.isDirectory() && !isIgnoredFilesystemEntry(fileName) && isWavName(fileName) &&
+        nameFits("song", fileName.c_str(), fileName.length())) {
+        CachedSong song;
+        song.fileRef = internName(fileName);
+        WavInfo wav = inspectWav(entry);
+        song.sizeBytes = wav.sizeBytes;
+        song.durationMs = wav.durationMs;
+        song.error = wav.supported ? WavError::None : wav.error;
+        song.errorValue = wav.errorValue;
+        song.disabled = isSongDisabled(g_build.meta, fileName);
+        g_songs.push_back(song);
+    }
+    entry.close();
+    return true;
+}
+
+void finishThemeWalk() {
+    CachedTheme& theme = g_themes[g_build.theme];
+    if (g_build.dir) g_build.dir.close();
+    theme.songCount = static_cast<uint32_t>(g_songs.size()) - theme.firstSong;
+    sortSongsByName(theme.firstSong, theme.songCount);
+    theme.loaded = true;
+    dropPageCache();
+    g_build.meta.clear();
+    g_build.theme = -1;
+}
+
+void loadThemeNow(int index) {
+    if (index < 0 || g_themes[index].loaded) return;
+    startThemeWalk(index);
+    while (walkNextThemeEntry()) {
+    }
+    finishThemeWalk();
+}
+
+// Song themes are sorted by id and Animals is always last, so a binary search
+// over the song themes plus a look at the last entry covers every id.
+int themeIndexOf(const char* themeId) {
+    if (g_themes.empty()) return -1;
+    const size_t songThemes = g_themes.size() - 1;
+    int index = NameIndex::find(themeId, songThemes,
+                                [](size_t i) { return g_themes[i].id(); });
+    if (index >= 0) return index;
+    return strcmp(g_themes[songThemes].id(), themeId) == 0 ? static_cast<int>(songThemes) : -1;
+}
+
+int themeIndexOf(const String& themeId) {
+    return themeIndexOf(themeId.c_str());
+}
+
+int nextUnloadedTheme() {
+    for (size_t i = 0; i < g_themes.size(); i++) {
+        if (!g_themes[i].loaded) return static_cast<int>(i);
+    }
+    return -1;
+}
+
+void finishCatalogBuild() {
+    compactCatalogStorage();
+    g_build.active = false;
+    g_catalogReady = true;
+    dropPageCache();  // pages built so far say catalogReady:false
+
+    const size_t largestAfter = heap_caps_get_largest_free_block(MALLOC_CAP_8BIT);
+    Serial.printf("[Catalog] Built in %lums: %u themes, %u files, %u bytes (names=%u) "
+                  "(free=%u largest=%u, delta=%ld)\n",
+                  static_cast<unsigned long>(millis() - g_build.startMs),
+                  static_cast<unsigned>(g_themes.size()),
+                  static_cast<unsigned>(g_songs.size()),
+                  static_cast<unsigned>(catalogBytes()),
+                  static_cast<unsigned>(g_names.size()),
+                  heap_caps_get_free_size(MALLOC_CAP_8BIT),
+                  static_cast<unsigned>(largestAfter),
+                  static_cast<long>(largestAfter) - static_cast<long>(g_build.largestBefore));
 }
 
 CachedTheme* mutableFindTheme(const String& themeId) {
-    for (CachedTheme& t : g_themes) {
-        if (t.id == themeId) return &t;
+    int index = themeIndexOf(themeId);
+    return index < 0 ? nullptr : &g_themes[index];
+}
+
+// Index into g_songs of a theme's file (songs are sorted by name), or -1.
+int songIndexOf(const CachedTheme& theme, const char* fileName) {
+    if (theme.firstSong + theme.songCount > g_songs.size()) return -1;
+    const CachedSong* songs = g_songs.data() + theme.firstSong;
+    int index = NameIndex::find(fileName, theme.songCount,
+                                [songs](size_t i) { return songs[i].file(); });
+    return index < 0 ? -1 : static_cast<int>(theme.firstSong) + index;
+}
+
+bool themeHasSong(const CachedTheme& theme, const char* fileName) {
+    return songIndexOf(theme, fileName) >= 0;
+}
+
+// Rewrite a theme's metadata.json from the catalog in one pass. Keys the
+// firmware does not manage, and disabled entries for files that are no longer
+// on the card, are carried over from the existing file.
+bool writeThemeMetadata(const CachedTheme& theme) {
+    String path = pathForThemeId(theme.id()) + "/" + METADATA_FILE;
+    JsonDocument doc = readJsonFile(path);
+    doc["schemaVersion"] = 2;
+    doc["name"] = theme.name();
+    doc["shuffle"] = theme.shuffle;
+
+    JsonDocument list;
+    JsonArray disabledSongs = list.to<JsonArray>();
+    if (doc["disabledSongs"].is<JsonArrayConst>()) {
+        for (JsonVariantConst item : doc["disabledSongs"].as<JsonArrayConst>()) {
+            const char* fileName = item | "";
+            if (fileName && fileName[0] != '\0' && !themeHasSong(theme, fileName) &&
+                disabledSongs.size() < static_cast<size_t>(CONFIG_MAX_DISABLED_SONGS)) {
+                disabledSongs.add(fileName);
+            }
+        }
+    }
+    for (const CachedSong& s : theme.songs()) {
+        if (s.disabled && disabledSongs.size() < static_cast<size_t>(CONFIG_MAX_DISABLED_SONGS)) {
+            disabledSongs.add(s.file());
+        }
     }
-    return nullptr;
+    doc["disabledSongs"] = disabledSongs;
+    return writeJsonFile(path, doc);
 }
 
 }  // namespace
 
-void buildCatalog() {
-    uint32_t startMs = millis();
-    g_themes.clear();
+const char* CachedSong::file() const { return nameText(fileRef); }
+
+const char* CachedSong::fileJson() const { return jsonText(fileRef); }
+
+const char* CachedTheme::id() const { return nameText(idRef); }
+
+const char* CachedTheme::name() const { return nameText(nameRef); }
+
+const char* CachedTheme::idJson() const { return jsonText(idRef); }
+
+const char* CachedTheme::nameJson() const { return jsonText(nameRef); }
+
+SongRange CachedTheme::songs() const {
+    SongRange range;
+    if (songCount > 0 && firstSong + songCount <= g_songs.size()) {
+        range.first = g_songs.data() + firstSong;
+        range.count = songCount;
+    }
+    return range;
+}
+
+void beginCatalogBuild(const String* priorityThemes, int priorityCount) {
+    // Pending edits live in the catalog being discarded.
+    flushPendingWrites(true);
+    if (g_build.dir) g_build.dir.close();
+    g_build.meta.clear();
+    g_build.theme = -1;
+    g_build.startMs = millis();
+    g_build.largestBefore = heap_caps_get_largest_free_block(MALLOC_CAP_8BIT);
+    resetCatalogStorage();
     g_catalogReady = false;
 
-    JsonDocument config = readJsonFile(SD_CONFIG_FILE);
+    g_config = readJsonFile(SD_CONFIG_FILE);
 
+    // List the theme folders only; their contents are walked later.
     File root = SD.open(SONGS_ROOT);
     if (root && root.isDirectory()) {
         while (true) {
@@ -455,53 +854,106 @@ void buildCatalog() {
             String id = baseNameOf(String(entry.name()));
             bool isDir = entry.isDirectory();
             entry.close();
-            if (!isDir || isIgnoredFilesystemEntry(id)) {
+            if (!isDir || isIgnoredFilesystemEntry(id) ||
+                !nameFits("theme folder", id.c_str(), id.length())) {
                 continue;
             }
             CachedTheme theme;
-            theme.id = id;
+            theme.idRef = internName(id);
+            theme.nameRef = theme.idRef;
             theme.special = false;
-            theme.disabledByUser = nameInJsonArray(config["disabledThemes"], id);
-            loadThemeContents(theme, String(SONGS_ROOT) + "/" + id);
-            g_themes.push_back(std::move(theme));
+            theme.disabledByUser = nameInJsonArray(g_config["disabledThemes"], id);
+            g_themes.push_back(theme);
         }
         root.close();
     }
 
     // Sort song themes by id (Animals is appended after, so it stays last).
     for (size_t i = 1; i < g_themes.size(); i++) {
-        CachedTheme key = std::move(g_themes[i]);
+        CachedTheme key = g_themes[i];
         size_t j = i;
-        while (j > 0 && g_themes[j - 1].id.compareTo(key.id) > 0) {
-            g_themes[j] = std::move(g_themes[j - 1]);
+        while (j > 0 && strcmp(g_themes[j - 1].id(), key.id()) > 0) {
+            g_themes[j] = g_themes[j - 1];
             j--;
         }
-        g_themes[j] = std::move(key);
+        g_themes[j] = key;
     }
 
     // Animals: reserved, non-disableable theme that always appears last.
     CachedTheme animals;
-    animals.id = ANIMALS_THEME_ID;
+    animals.idRef = internName(ANIMALS_THEME_ID, strlen(ANIMALS_THEME_ID));
     animals.special = true;
     animals.disabledByUser = false;
-    loadThemeContents(animals, String(ANIMALS_PATH));
-    g_themes.push_back(std::move(animals));
+    g_themes.push_back(animals);
 
-    g_catalogReady = true;
+    // The themes the buttons play first, then Animals, so both buttons work
+    // before the rest of the card has been read.
+    for (int i = 0; i < priorityCount; i++) {
+        loadThemeNow(themeIndexOf(priorityThemes[i]));
+    }
+    loadThemeNow(static_cast<int>(g_themes.size()) - 1);
+    g_build.active = true;
+
+    Serial.printf("[Catalog] %u themes listed, priority themes loaded in %lums\n",
+                  static_cast<unsigned>(g_themes.size()),
+                  static_cast<unsigned long>(millis() - g_build.startMs));
+    if (nextUnloadedTheme() < 0) {
+        finishCatalogBuild();
+    }
+}
 
-    int totalSongs = 0;
-    for (const CachedTheme& t : g_themes) {
-        totalSongs += static_cast<int>(t.songs.size());
+bool continueCatalogBuild(uint32_t budgetMs) {
+    if (!g_build.active) return false;
+
+    bool themeLoaded = false;
+    uint32_t sliceStartMs = millis();
+    do {
+        if (g_build.theme < 0) {
+            int next = nextUnloadedTheme();
+            if (next < 0) {
+                finishCatalogBuild();
+                return themeLoaded;
+            }
+            startThemeWalk(next);
+        }
+        if (!walkNextThemeEntry()) {
+            finishThemeWalk();
+            themeLoaded = true;
+        }
+    } while (millis() - sliceStartMs < budgetMs);
+
+    if (nextUnloadedTheme() < 0 && g_build.theme < 0) {
+        finishCatalogBuild();
     }
-    Serial.printf("[Catalog] Built in %lums: %u themes, %d files (free=%u largest=%u)\n",
-                  static_cast<unsigned long>(millis() - startMs),
-                  static_cast<unsigned>(g_themes.size()), totalSongs,
-                  heap_caps_get_free_size(MALLOC_CAP_8BIT),
-                  heap_caps_get_largest_free_block(MALLOC_CAP_8BIT));
+    return themeLoaded;
+}
+
+void ensureThemeLoaded(const String& themeId) {
+    int index = themeIndexOf(themeId);
+    if (index < 0 || g_themes[index].loaded) return;
+    // Finish the walk in progress first so every theme's songs stay contiguous.
+    if (g_build.theme >= 0) {
+        while (walkNextThemeEntry()) {
+        }
+        finishThemeWalk();
+    }
+    loadThemeNow(index);
 }
 
 bool catalogReady() { return g_catalogReady; }
 
+Footprint footprint() {
+    Footprint fp;
+    fp.themes = g_themes.capacity() * sizeof(CachedTheme);
+    fp.songs = g_songs.capacity() * sizeof(CachedSong);
+    fp.names = g_names.capacity();
+    fp.index = g_internIndex.capacity() * sizeof(uint32_t);
+    for (const CachedPage& entry : g_pageCache) {
+        if (entry.body.length() > 0) fp.pages += entry.body.length() + 1;
+    }
+    return fp;
+}
+
 int themeCount() { return static_cast<int>(g_themes.size()); }
 
 const CachedTheme& themeAt(int index) { return g_themes[index]; }
@@ -510,6 +962,14 @@ const CachedTheme* findTheme(const String& themeId) {
     return mutableFindTheme(themeId);
 }
 
+const CachedSong* findSong(const String& themeId, const String& fileName) {
+    ensureThemeLoaded(themeId);
+    const CachedTheme* theme = findTheme(themeId);
+    if (theme == nullptr) return nullptr;
+    int index = songIndexOf(*theme, fileName.c_str());
+    return index < 0 ? nullptr : &g_songs[index];
+}
+
 ThemeStats scanThemeStats(const String& themeId, bool /*validateWavs*/) {
     // Served entirely from the in-RAM catalog — no SD access.
     ThemeStats stats;
@@ -525,12 +985,12 @@ ThemeStats scanThemeStats(const String& themeId, bool /*validateWavs*/) {
         return stats;
     }
 
-    stats.name = theme->name;
+    stats.name = theme->name();
     stats.shuffle = theme->shuffle;
     stats.disabledByUser = theme->disabledByUser;
-    for (const CachedSong& s : theme->songs) {
+    for (const CachedSong& s : theme->songs()) {
         stats.totalSongs++;
-        if (!s.supported) {
+        if (!s.supported()) {
             stats.errorSongs++;
         } else if (!s.disabled) {
             stats.enabledValidSongs++;
@@ -541,75 +1001,90 @@ ThemeStats scanThemeStats(const String& themeId, bool /*validateWavs*/) {
     return stats;
 }
 
-String buildThemesPageJson(uint32_t requestId, int page, int pageSize) {
+void writeThemesPageJson(JsonWriter& out, uint32_t requestId, int page, int pageSize) {
     if (page < 0) page = 0;
     if (pageSize <= 0) pageSize = BLE_CONFIG_THEME_PAGE_SIZE;
+    if (writeCachedPage(out, requestId, PageKind::Themes, -1, page, pageSize)) return;
 
     int count = themeCount();  // song themes + the reserved Animals row
     int start = page * pageSize;
     int end = start + pageSize;
 
-    String json = "{\"id\":";
-    json += requestId;
-    json += ",\"ok\":true,\"op\":\"scanThemes\",\"page\":";
-    json += page;
-    json += ",\"hasMore\":";
-    json += (end < count) ? "true" : "false";
-    json += ",\"themes\":[";
-
+    out.raw("{\"id\":").num(requestId);
+    size_t bodyStart = out.length();
+    out.raw(",\"ok\":true,\"op\":\"scanThemes\",");
+    if (!g_catalogReady) out.raw("\"catalogReady\":false,");
+    out.raw("\"page\":").num(page);
+    out.raw(",\"hasMore\":").boolean(end < count);
+    out.raw(",\"themes\":[");
     for (int i = start; i < count && i < end; i++) {
-        ThemeStats stats = scanThemeStats(themeAt(i).id, false);
-        appendThemeRow(json, stats);
+        if (i > start) out.raw(",");
+        writeThemeRow(out, g_themes[i]);
     }
-
-    json += "]}";
-    return json;
+    out.raw("]}");
+    storeCachedPage(out, bodyStart, PageKind::Themes, -1, page, pageSize);
 }
 
-String buildSongsPageJson(uint32_t requestId, const String& themeId,
-                          int page, int pageSize) {
+void writeSongsPageJson(JsonWriter& out, uint32_t requestId, const String& themeId,
+                        int page, int pageSize) {
     if (page < 0) page = 0;
     if (pageSize <= 0) pageSize = BLE_CONFIG_SONG_PAGE_SIZE;
 
-    ThemeStats stats = scanThemeStats(themeId, false);
-    const CachedTheme* theme = findTheme(themeId);
-    int fileCount = theme ? static_cast<int>(theme->songs.size()) : 0;
+    int index = themeIndexOf(themeId);
+    if (index < 0) {
+        // Unknown theme: echo the id back, uncached.
+        out.raw("{\"id\":").num(requestId);
+        out.raw(",\"ok\":true,\"op\":\"scanSongs\",");
+        if (!g_catalogReady) out.raw("\"catalogReady\":false,");
+        out.raw("\"theme\":").str(themeId.c_str(), themeId.length());
+        out.raw(",\"name\":");
+        if (isAnimalsTheme(themeId)) {
+            out.str(ANIMALS_DISPLAY_NAME);
+        } else {
+            out.str(themeId.c_str(), themeId.length());
+        }
+        out.raw(",\"themeEnabled\":false,\"disabledByUser\":false,\"shuffle\":false,"
+                "\"errors\":0,\"page\":").num(page);
+        out.raw(",\"songs\":[],\"hasMore\":false}");
+        return;
+    }
+    if (writeCachedPage(out, requestId, PageKind::Songs, index, page, pageSize)) return;
+
+    const CachedTheme& theme = g_themes[index];
+    SongRange songs = theme.songs();
+    int fileCount = static_cast<int>(songs.size());
     int start = page * pageSize;
     int end = start + pageSize;
+    int playable = 0;
+    int errors = 0;
+    for (const CachedSong& s : songs) {
+        if (!s.supported()) {
+            errors++;
+        } else if (!s.disabled) {
+            playable++;
+        }
+    }
 
-    String json = "{\"id\":";
-    json += requestId;
-    json += ",\"ok\":true,\"op\":\"scanSongs\",\"theme\":\"";
-    json += jsonEscape(themeId);
-    json += "\",\"name\":\"";
-    json += jsonEscape(stats.name);
-    json += "\",\"themeEnabled\":";
-    json += stats.enabled ? "true" : "false";
-    json += ",\"disabledByUser\":";
-    json += stats.disabledByUser ? "true" : "false";
-    json += ",\"shuffle\":";
-    json += stats.shuffle ? "true" : "false";
-    json += ",\"errors\":";
-    json += stats.errorSongs;
-    json += ",\"page\":";
-    json += page;
-    json += ",\"songs\":[";
-
+    out.raw("{\"id\":").num(requestId);
+    size_t bodyStart = out.length();
+    out.raw(",\"ok\":true,\"op\":\"scanSongs\",");
+    if (!g_catalogReady) out.raw("\"catalogReady\":false,");
+    out.raw("\"theme\":").escaped(theme.idJson());
+    out.raw(",\"name\":").escaped(theme.nameJson());
+    out.raw(",\"themeEnabled\":").boolean(!theme.disabledByUser && playable > 0);
+    out.raw(",\"disabledByUser\":").boolean(theme.disabledByUser);
+    out.raw(",\"shuffle\":").boolean(theme.shuffle);
+    out.raw(",\"errors\":").num(errors);
+    out.raw(",\"page\":").num(page);
+    out.raw(",\"songs\":[");
     int limit = end < fileCount ? end : fileCount;
     for (int i = start; i < limit; i++) {
-        const CachedSong& s = theme->songs[i];
-        WavInfo wav;
-        wav.supported = s.supported;
-        wav.sizeBytes = s.sizeBytes;
-        wav.durationMs = s.durationMs;
-        wav.error = s.error;
-        appendSongRow(json, s.file, wav, !s.disabled);
+        if (i > start) out.raw(",");
+        writeSongRow(out, songs[i]);
     }
-
-    json += "],\"hasMore\":";
-    json += (end < fileCount) ? "true" : "false";
-    json += "}";
-    return json;
+    out.raw("],\"hasMore\":").boolean(end < fileCount);
+    out.raw("}");
+    storeCachedPage(out, bodyStart, PageKind::Songs, index, page, pageSize);
 }
 
 bool updateSdConfig(uint8_t defaultVolumePct, const String& defaultTheme,
@@ -618,7 +1093,7 @@ bool updateSdConfig(uint8_t defaultVolumePct, const String& defaultTheme,
                     bool bedtimeEnabled, uint16_t bedtimeStartMinutes,
                     uint16_t bedtimeEndMinutes, const String& bedtimeTheme,
                     uint8_t bedtimeVolumeCapPct) {
-    JsonDocument doc = readJsonFile(SD_CONFIG_FILE);
+    JsonDocument& doc = g_config;
     doc["schemaVersion"] = 2;
     doc["defaultVolumePct"] = defaultVolumePct > 100 ? 100 : defaultVolumePct;
     doc["defaultTheme"] = defaultTheme;
@@ -642,14 +1117,16 @@ bool updateSdConfig(uint8_t defaultVolumePct, const String& defaultTheme,
     bedtime["theme"] = bedtimeTheme.isEmpty() ? String(DEFAULT_BEDTIME_THEME) : bedtimeTheme;
     bedtime["volumeCapPct"] = bedtimeVolumeCapPct > 100 ? 100 : bedtimeVolumeCapPct;
 
-    return writeJsonFile(SD_CONFIG_FILE, doc);
+    g_configDirty = true;
+    g_lastEditMs = millis();
+    return true;
 }
 
 bool setThemeDisabled(const String& themeId, bool disabled) {
     if (isAnimalsTheme(themeId)) {
         return true;
     }
-    JsonDocument doc = readJsonFile(SD_CONFIG_FILE);
+    JsonDocument& doc = g_config;
     doc["schemaVersion"] = 2;
     if (!doc["defaultVolumePct"].is<int>()) {
         doc["defaultVolumePct"] = DEFAULT_VOLUME_PCT;
@@ -658,62 +1135,82 @@ bool setThemeDisabled(const String& themeId, bool disabled) {
         doc["defaultTheme"] = DEFAULT_THEME;
     }
     setListMember(doc, "disabledThemes", themeId, disabled, CONFIG_MAX_DISABLED_THEMES);
-    bool ok = writeJsonFile(SD_CONFIG_FILE, doc);
-    if (ok) {
-        if (CachedTheme* t = mutableFindTheme(themeId)) {
-            t->disabledByUser = disabled;
-        }
+    if (CachedTheme* t = mutableFindTheme(themeId)) {
+        t->disabledByUser = disabled;
+        dropPageCache();
     }
-    return ok;
+    g_configDirty = true;
+    g_lastEditMs = millis();
+    return true;
 }
 
 bool setThemeShuffle(const String& themeId, bool shuffle) {
-    String themePath = pathForThemeId(themeId);
-    String path = themePath + "/" + METADATA_FILE;
-    JsonDocument doc = readJsonFile(path);
-    doc["schemaVersion"] = 2;
-    const char* existingName = doc["name"] | "";
-    if (!existingName || existingName[0] == '\0') {
-        doc["name"] = isAnimalsTheme(themeId) ? ANIMALS_DISPLAY_NAME : themeId;
-    }
-    doc["shuffle"] = shuffle;
-    if (!doc["disabledSongs"].is<JsonArray>()) {
-        doc["disabledSongs"].to<JsonArray>();
-    }
-    bool ok = writeJsonFile(path, doc);
-    if (ok) {
-        if (CachedTheme* t = mutableFindTheme(themeId)) {
-            t->shuffle = shuffle;
-        }
+    // Metadata is rewritten from the catalog, so the theme must be fully read.
+    ensureThemeLoaded(themeId);
+    CachedTheme* t = mutableFindTheme(themeId);
+    if (t == nullptr) {
+        return false;
     }
-    return ok;
+    t->shuffle = shuffle;
+    t->metadataDirty = true;
+    dropPageCache();
+    g_lastEditMs = millis();
+    return true;
 }
 
 bool setSongDisabled(const String& themeId, const String& fileName, bool disabled) {
-    String themePath = pathForThemeId(themeId);
-    String path = themePath + "/" + METADATA_FILE;
-    JsonDocument doc = readJsonFile(path);
-    doc["schemaVersion"] = 2;
-    const char* existingName = doc["name"] | "";
-    if (!existingName || existingName[0] == '\0') {
-        doc["name"] = isAnimalsTheme(themeId) ? ANIMALS_DISPLAY_NAME : themeId;
-    }
-    if (!doc["shuffle"].is<bool>()) {
-        doc["shuffle"] = isAnimalsTheme(themeId);
-    }
-    setListMember(doc, "disabledSongs", fileName, disabled, CONFIG_MAX_DISABLED_SONGS);
-    bool ok = writeJsonFile(path, doc);
-    if (ok) {
-        if (CachedTheme* t = mutableFindTheme(themeId)) {
-            for (CachedSong& s : t->songs) {
-                if (s.file == fileName) {
-                    s.disabled = disabled;
-                    break;
-                }
-            }
-        }
+    ensureThemeLoaded(themeId);
+    CachedTheme* t = mutableFindTheme(themeId);
+    if (t == nullptr) {
+        return false;
+    }
+    int index = songIndexOf(*t, fileName.c_str());
+    if (index < 0) {
+        return false;
+    }
+    g_songs[index].disabled = disabled;
+    t->metadataDirty = true;
+    dropPageCache();
+    g_lastEditMs = millis();
+    return true;
+}
+
+bool hasPendingWrites() {
+    if (g_configDirty) return true;
+    for (const CachedTheme& t : g_themes) {
+        if (t.metadataDirty) return true;
+    }
+    return false;
+}
+
+bool flushPendingWrites(bool force) {
+    if (!force && millis() - g_lastEditMs < CATALOG_FLUSH_DEBOUNCE_MS) {
+        return false;
+    }
+    bool wrote = false;
+    if (g_configDirty) {
+        g_configDirty = !writeJsonFile(SD_CONFIG_FILE, g_config);
+        if (g_configDirty) g_lastEditMs = millis();  // retry after another debounce
+        wrote = true;
+        if (!force) return wrote;
+    }
+    for (CachedTheme& t : g_themes) {
+        if (!t.metadataDirty) continue;
+        t.metadataDirty = !writeThemeMetadata(t);
+        if (t.metadataDirty) g_lastEditMs = millis();
+        wrote = true;
+        if (!force) return wrote;
+    }
+    return wrote;
+}
+
+const JsonDocument& configDocument() { return g_config; }
+
+bool isThemeDisabled(const String& themeId) {
+    if (isAnimalsTheme(themeId)) {
+        return false;
     }
-    return ok;
+    return nameInJsonArray(g_config["disabledThemes"], themeId);
 }
 
 }  // namespace ContentCatalog
@@ -4,9 +4,28 @@
 #include <SD.h>
 #include <vector>
 #include "Config.h"
+#include "JsonWriter.h"
 
 namespace ContentCatalog {
 
+// Why a WAV file cannot be played. Kept as a one-byte code (plus the offending
+// header value where one applies) so cached songs carry no heap strings; the
+// UI text is produced on demand by wavErrorText().
+enum class WavError : uint8_t {
+    None = 0,
+    TooSmall,
+    MissingRiffHeader,
+    BadChunkSize,
+    BadFmtChunk,
+    UnreadableFmtChunk,
+    MissingFmtChunk,
+    MissingAudioData,
+    UnsupportedFormat,
+    BadSampleRate,
+    BadChannelCount,
+    BadBitDepth,
+};
+
 struct WavInfo {
     bool valid = false;
     bool supported = false;
@@ -15,9 +34,11 @@ struct WavInfo {
     uint16_t channels = 0;
     uint32_t sampleRate = 0;
     uint16_t bitsPerSample = 0;
+    uint32_t dataOffset = 0;   // file offset of the first PCM byte
     uint32_t dataBytes = 0;
     uint32_t durationMs = 0;
-    String error;
+    WavError error = WavError::None;
+    uint32_t errorValue = 0;
 };
 
 struct ThemeStats {
@@ -37,58 +58,122 @@ struct ThemeStats {
 // ---------------------------------------------------------------------------
 // In-RAM catalog
 //
-// The SD card is read exactly once, at boot, into these structures; every
+// The SD card is read exactly once, after boot, into these structures; every
 // other code path (playback file lists, BLE theme list, settings scans) is
 // served from RAM. Audio format is fixed (44.1 kHz / 16-bit / stereo), so the
 // per-song record only keeps what the settings UI shows — no sample
 // rate/channel/bit fields. Edits flip the cached flags in place; the SD is
 // re-read only on reboot, which is acceptable because the card is inaccessible
 // while the toy is in use.
+//
+// Storage is a handful of large blocks rather than thousands of small ones:
+// every theme id, theme name and file name is interned once into a single
+// name arena (length-prefixed, NUL-terminated), and all songs live in one
+// array with each theme owning a contiguous range of it. Records refer to
+// names by arena offset, so the catalog allocates nothing per song. A name
+// that needs JSON escaping is stored escaped as well, so the *Json()
+// accessors never build a string.
+//
+// The settings scan pages (writeThemesPageJson / writeSongsPageJson) are kept
+// serialized in a CONFIG_PAGE_CACHE_ENTRIES-slot LRU keyed by (op, theme,
+// page, page size). The edit functions below, theme loads and the end of the
+// build drop the whole cache, so a page is never served stale.
 // ---------------------------------------------------------------------------
 struct CachedSong {
-    String   file;             // filename (basename), no directory
-    String   error;            // diagnostic for the UI; empty when supported
+    uint32_t fileRef = 0;        // arena offset of the basename, no directory
     uint32_t sizeBytes = 0;
     uint32_t durationMs = 0;
-    bool     supported = false;  // playable: PCM 44.1 kHz / 16-bit / stereo
-    bool     disabled  = false;  // parent-disabled via metadata.json
+    uint32_t errorValue = 0;     // offending header value, see WavError
+    WavError error = WavError::None;
+    bool     disabled = false;   // parent-disabled via metadata.json
+
+    // Playable: PCM 44.1 kHz / 16-bit / stereo.
+    bool supported() const { return error == WavError::None; }
+    const char* file() const;
+    const char* fileJson() const;  // file(), JSON-escaped
+};
+
+// View of one theme's songs inside the shared song array. Only valid until the
+// catalog is rebuilt.
+struct SongRange {
+    const CachedSong* first = nullptr;
+    size_t count = 0;
+
+    const CachedSong* begin() const { return first; }
+    const CachedSong* end() const { return first + count; }
+    size_t size() const { return count; }
+    bool empty() const { return count == 0; }
+    const CachedSong& operator[](size_t index) const { return first[index]; }
 };
 
 struct CachedTheme {
-    String id;
-    String name;
+    uint32_t idRef = 0;
+    uint32_t nameRef = 0;
+    uint32_t firstSong = 0;          // range in the shared song array,
+    uint32_t songCount = 0;          // sorted by filename
     bool   shuffle = false;
     bool   disabledByUser = false;  // from config.json disabledThemes
     bool   special = false;          // the reserved Animals theme
-    std::vector<CachedSong> songs;   // sorted by filename
+    bool   loaded = false;           // folder walked; songs() is complete
+    bool   metadataDirty = false;    // edited; metadata.json not yet written
+
+    const char* id() const;
+    const char* name() const;
+    const char* idJson() const;    // id(), JSON-escaped
+    const char* nameJson() const;  // name(), JSON-escaped
+    SongRange songs() const;
 
     // Count of songs that would actually play (supported and not disabled).
     int playableCount() const {
         int n = 0;
-        for (const CachedSong& s : songs) {
-            if (s.supported && !s.disabled) n++;
+        for (const CachedSong& s : songs()) {
+            if (s.supported() && !s.disabled) n++;
         }
         return n;
     }
 };
 
-// Build (or rebuild) the whole catalog with a single pass over the SD card.
-// Call once at boot after SD.begin().
-void buildCatalog();
+// Incremental build for boot. beginCatalogBuild() lists the theme folders and
+// loads the given themes plus Animals right away; continueCatalogBuild() walks
+// the remaining folders a slice at a time (at least one file per call) and
+// returns true when another theme finished loading. Until the build is done,
+// unloaded themes are listed with no songs and catalogReady() is false.
+void beginCatalogBuild(const String* priorityThemes, int priorityCount);
+bool continueCatalogBuild(uint32_t budgetMs);
+// Load one theme immediately if the background build has not reached it yet.
+void ensureThemeLoaded(const String& themeId);
 bool catalogReady();
 
+// Heap held by the catalog's arrays (their capacity, not their size) and by
+// the page cache's bodies, for the getMemory report.
+struct Footprint {
+    uint32_t themes = 0;
+    uint32_t songs = 0;
+    uint32_t names = 0;
+    uint32_t index = 0;  // intern index; 0 once the build is done
+    uint32_t pages = 0;
+
+    uint32_t total() const { return themes + songs + names + index + pages; }
+};
+Footprint footprint();
+
 // All themes, in display order: song themes sorted by id, then Animals last.
 int themeCount();
 const CachedTheme& themeAt(int index);
 
-// Lookup by id (handles ANIMALS_THEME_ID); nullptr if unknown.
+// Lookup by id (handles ANIMALS_THEME_ID); nullptr if unknown. Both lookups
+// binary-search the sorted theme ids / file names (see NameIndex.h).
 const CachedTheme* findTheme(const String& themeId);
+// Lookup of one file in a theme, reading the theme first if the background
+// build has not reached it yet; nullptr if either is unknown.
+const CachedSong* findSong(const String& themeId, const String& fileName);
 
 String baseNameOf(const String& path);
 bool isIgnoredFilesystemEntry(const String& name);
 bool isAnimalsTheme(const String& themeId);
 String jsonEscape(const String& input);
 String formatTimeOfDay(uint16_t minuteOfDay);
+void formatTimeOfDay(uint16_t minuteOfDay, char* out, size_t size);  // "HH:MM", size >= 6
 
 JsonDocument readJsonFile(const String& path);
 JsonDocument readThemeMetadata(const String& themePath);
@@ -99,13 +184,23 @@ bool isThemeDisabled(const String& themeId);
 bool isSongDisabled(const JsonDocument& metadata, const String& fileName);
 
 WavInfo inspectWav(File& entry);
+// Longest wavErrorText(), NUL included.
+static constexpr size_t WAV_ERROR_TEXT_MAX = 48;
+// wavErrorText() into a caller buffer; returns the length written.
+size_t formatWavError(WavError error, uint32_t value, char* out, size_t size);
+String wavErrorText(WavError error, uint32_t value);
 String formatWavDetails(const WavInfo& info);
 
 ThemeStats scanThemeStats(const String& themeId, bool validateWavs = true);
-String buildThemesPageJson(uint32_t requestId, int page, int pageSize);
-String buildSongsPageJson(uint32_t requestId, const String& themeId,
-                          int page, int pageSize);
-
+// scanThemes / scanSongs responses, written into the config response buffer.
+void writeThemesPageJson(JsonWriter& out, uint32_t requestId, int page, int pageSize);
+void writeSongsPageJson(JsonWriter& out, uint32_t requestId, const String& themeId,
+                        int page, int pageSize);
+
+// Edits update the catalog (and the in-RAM config.json) immediately and are
+// queued for writing; flushPendingWrites() persists them once edits have been
+// quiet for CATALOG_FLUSH_DEBOUNCE_MS, one file per call, or everything at
+// once when forced (before sleep). Returns true if a write was attempted.
 bool updateSdConfig(uint8_t defaultVolumePct, const String& defaultTheme,
                     bool sleepEnabled, uint32_t sleepNormalIdleSec,
                     uint32_t sleepVibrationWakeIdleSec, uint32_t sleepBleIdleSec,
@@ -115,5 +210,10 @@ bool updateSdConfig(uint8_t defaultVolumePct, const String& defaultTheme,
 bool setThemeDisabled(const String& themeId, bool disabled);
 bool setThemeShuffle(const String& themeId, bool shuffle);
 bool setSongDisabled(const String& themeId, const String& fileName, bool disabled);
+bool hasPendingWrites();
+bool flushPendingWrites(bool force);
+
+// config.json as last read from SD or edited through the setters above.
+const JsonDocument& configDocument();
 
 }  // namespace ContentCatalog
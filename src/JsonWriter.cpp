@@ -0,0 +1,146 @@
+#include "JsonWriter.h"
+
+#include <cstring>
+
+JsonWriter::JsonWriter(char* buffer, size_t capacity) : _buf(buffer), _cap(capacity) {
+    clear();
+}
+
+void JsonWriter::clear() {
+    _len = 0;
+    _overflow = false;
+    _buf[0] = '\0';
+}
+
+void JsonWriter::rewind(size_t mark) {
+    if (mark < _len) _len = mark;
+    _overflow = false;
+    _buf[_len] = '\0';
+}
+
+// True if len more chars fit; otherwise marks the writer overflowed. Once
+// overflowed, nothing more is written until rewind() or clear().
+bool JsonWriter::reserve(size_t len) {
+    if (_overflow || len > remaining()) {
+        _overflow = true;
+        return false;
+    }
+    return true;
+}
+
+JsonWriter& JsonWriter::raw(const char* text) {
+    return raw(text, strlen(text));
+}
+
+JsonWriter& JsonWriter::raw(const char* text, size_t len) {
+    if (!reserve(len)) return *this;
+    memcpy(_buf + _len, text, len);
+    _len += len;
+    _buf[_len] = '\0';
+    return *this;
+}
+
+JsonWriter& JsonWriter::str(const char* text) {
+    return str(text, strlen(text));
+}
+
+JsonWriter& JsonWriter::str(const char* text, size_t len) {
+    if (!reserve(escapedLength(text, len) + 2)) return *this;
+    _buf[_len++] = '"';
+    for (size_t i = 0; i < len; i++) {
+        _len += escapeByte(static_cast<unsigned char>(text[i]), _buf + _len);
+    }
+    _buf[_len++] = '"';
+    _buf[_len] = '\0';
+    return *this;
+}
+
+JsonWriter& JsonWriter::escaped(const char* text) {
+    size_t len = strlen(text);
+    if (!reserve(len + 2)) return *this;
+    _buf[_len++] = '"';
+    memcpy(_buf + _len, text, len);
+    _len += len;
+    _buf[_len++] = '"';
+    _buf[_len] = '\0';
+    return *this;
+}
+
+JsonWriter& JsonWriter::boolean(bool value) {
+    return value ? raw("true", 4) : raw("false", 5);
+}
+
+JsonWriter& JsonWriter::writeSigned(long long value) {
+    if (value >= 0) return writeUnsigned(static_cast<unsigned long long>(value));
+    // Negate in unsigned arithmetic so LLONG_MIN does not overflow.
+    unsigned long long magnitude = 0ULL - static_cast<unsigned long long>(value);
+    char digits[21];
+    size_t n = 0;
+    do {
+        digits[n++] = static_cast<char>('0' + magnitude % 10);
+        magnitude /= 10;
+    } while (magnitude != 0);
+    if (!reserve(n + 1)) return *this;
+    _buf[_len++] = '-';
+    while (n > 0) _buf[_len++] = digits[--n];
+    _buf[_len] = '\0';
+    return *this;
+}
+
+JsonWriter& JsonWriter::writeUnsigned(unsigned long long value) {
+    char digits[20];
+    size_t n = 0;
+    do {
+        digits[n++] = static_cast<char>('0' + value % 10);
+        value /= 10;
+    } while (value != 0);
+    if (!reserve(n)) return *this;
+    while (n > 0) _buf[_len++] = digits[--n];
+    _buf[_len] = '\0';
+    return *this;
+}
+
+size_t JsonWriter::escapeByte(unsigned char c, char* out) {
+    static const char* hex = "0123456789ABCDEF";
+    switch (c) {
+        case '"':  out[0] = '\\'; out[1] = '"';  return 2;
+        case '\\': out[0] = '\\'; out[1] = '\\'; return 2;
+        case '\b': out[0] = '\\'; out[1] = 'b';  return 2;
+        case '\f': out[0] = '\\'; out[1] = 'f';  return 2;
+        case '\n': out[0] = '\\'; out[1] = 'n';  return 2;
+        case '\r': out[0] = '\\'; out[1] = 'r';  return 2;
+        case '\t': out[0] = '\\'; out[1] = 't';  return 2;
+        default:
+            if (c < 0x20) {
+                memcpy(out, "\\u00", 4);
+                out[4] = hex[c >> 4];
+                out[5] = hex[c & 0x0F];
+                return 6;
+            }
+            out[0] = static_cast<char>(c);
+            return 1;
+    }
+}
+
+bool JsonWriter::needsEscape(const char* text, size_t len) {
+    for (size_t i = 0; i < len; i++) {
+        unsigned char c = static_cast<unsigned char>(text[i]);
+        if (c == '"' || c == '\\' || c < 0x20) return true;
+    }
+    return false;
+}
+
+size_t JsonWriter::escapedLength(const char* text, size_t len) {
+    size_t total = 0;
+    for (size_t i = 0; i < len; i++) {
+        unsigned char c = static_cast<unsigned char>(text[i]);
+        if (c == '"' || c == '\\' || c == '\b' || c == '\f' || c == '\n' || c == '\r' || c == '\t') {
+            total += 2;
+        } else if (c < 0x20) {
+            total += 6;
+        } else {
+            total += 1;
+        }
+    }
+    return total;
+}
@@ -0,0 +1,71 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+
+// ---------------------------------------------------------------------------
+// JsonWriter — JSON text written into a fixed, caller-owned buffer
+//
+// Config responses are written straight into one static buffer sized to the
+// characteristic value instead of growing a String a piece at a time, so
+// answering a command allocates nothing while the BT stack wants the heap.
+//
+// Every append checks the exact space left before writing. A piece that
+// does not fit is not written at all and marks the writer overflowed; the
+// text is always NUL-terminated. mark()/rewind() drop a partly written row,
+// so a list can stop at the last row that fits.
+//
+// Usage:
+//   static char buf[512];
+//   JsonWriter out(buf, sizeof(buf));
+//   out.raw("{\"id\":").num(id).raw(",\"name\":").str(name).raw("}");
+//   if (!out.overflowed()) send(out.c_str(), out.length());
+// ---------------------------------------------------------------------------
+class JsonWriter {
+public:
+    // capacity counts the terminating NUL, so at most capacity - 1 chars.
+    JsonWriter(char* buffer, size_t capacity);
+
+    void clear();
+
+    JsonWriter& raw(const char* text);
+    JsonWriter& raw(const char* text, size_t len);
+    // Quoted and escaped.
+    JsonWriter& str(const char* text);
+    JsonWriter& str(const char* text, size_t len);
+    // Quoted; text is already JSON-escaped (catalog *Json() names).
+    JsonWriter& escaped(const char* text);
+    JsonWriter& boolean(bool value);
+
+    JsonWriter& num(int value)                { return writeSigned(value); }
+    JsonWriter& num(long value)               { return writeSigned(value); }
+    JsonWriter& num(long long value)          { return writeSigned(value); }
+    JsonWriter& num(unsigned int value)       { return writeUnsigned(value); }
+    JsonWriter& num(unsigned long value)      { return writeUnsigned(value); }
+    JsonWriter& num(unsigned long long value) { return writeUnsigned(value); }
+
+    const char* c_str() const { return _buf; }
+    size_t length() const { return _len; }
+    size_t capacity() const { return _cap - 1; }
+    size_t remaining() const { return _cap - 1 - _len; }
+    bool overflowed() const { return _overflow; }
+
+    size_t mark() const { return _len; }
+    // Cut the text back to a mark() and clear the overflow flag.
+    void rewind(size_t mark);
+
+    // Write the JSON escape of one byte into out (1-6 chars, no NUL).
+    static size_t escapeByte(unsigned char c, char* out);
+    static bool needsEscape(const char* text, size_t len);
+    static size_t escapedLength(const char* text, size_t len);
+
+private:
+    char*  _buf;
+    size_t _cap;
+    size_t _len = 0;
+    bool   _overflow = false;
+
+    bool reserve(size_t len);
+    JsonWriter& writeSigned(long long value);
+    JsonWriter& writeUnsigned(unsigned long long value);
+};
@@ -17,15 +17,27 @@ public:
         return ensureI2SResources(true);
     }
 
-    void printStats(const char* tag = "BT") {
+    uint32_t underflowCount() const { return underflows; }
+    uint32_t dropCount() const { return drops; }
+    uint32_t rxByteCount() const { return rxBytes; }
+    uint32_t txByteCount() const { return txBytes; }
+    int ringBytes() const { return i2s_ringbuffer_size; }
+    int prefetchPercent() const { return i2s_ringbuffer_prefetch_percent; }
+    bool audioActive() const { return is_i2s_active; }
+
+    uint32_t bufferedBytes() {
         UBaseType_t bytesWaiting = 0;
         if (s_ringbuf_i2s != nullptr) {
             vRingbufferGetInfo(s_ringbuf_i2s, nullptr, nullptr, nullptr, nullptr, &bytesWaiting);
         }
+        return bytesWaiting;
+    }
 
-        Serial.printf("[%s] Stats rb=%u/%dB rx=%luB tx=%luB underflows=%lu drops=%lu mode=%d active=%d\n",
+    void printStats(const char* tag = "BT") {
+        Serial.printf("[%s] Stats rb=%u/%dB prefetch=%d%% rx=%luB tx=%luB underflows=%lu drops=%lu mode=%d active=%d\n",
                       tag,
-                      static_cast<unsigned>(bytesWaiting), i2s_ringbuffer_size,
+                      static_cast<unsigned>(bufferedBytes()), i2s_ringbuffer_size,
+                      i2s_ringbuffer_prefetch_percent,
                       static_cast<unsigned long>(rxBytes),
                       static_cast<unsigned long>(txBytes),
                       static_cast<unsigned long>(underflows),
@@ -77,7 +89,10 @@ protected:
             if (item_size == 0 || data == nullptr) {
                 if (is_i2s_active && ringbuffer_mode != RINGBUFFER_MODE_PREFETCHING) {
                     underflows++;
+                    // Wait for write_audio() to refill to the prefetch level
+                    // instead of trickling out each packet as it arrives.
                     ringbuffer_mode = RINGBUFFER_MODE_PREFETCHING;
+                    is_starting = true;
                 }
                 continue;
             }
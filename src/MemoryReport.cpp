@@ -0,0 +1,182 @@
+#include "MemoryReport.h"
+
+#include <cstdio>
+#include <esp_heap_caps.h>
+#include <freertos/FreeRTOS.h>
+#include <freertos/task.h>
+
+#include "Config.h"
+
+namespace MemoryReport {
+
+namespace {
+
+#ifdef CONFIG_ARDUINO_LOOP_STACK_SIZE
+constexpr uint32_t LOOP_STACK_BYTES = CONFIG_ARDUINO_LOOP_STACK_SIZE;
+#else
+constexpr uint32_t LOOP_STACK_BYTES = 8192;  // arduino-esp32 default
+#endif
+#ifdef CONFIG_BT_BTC_TASK_STACK_SIZE
+constexpr uint32_t BTC_STACK_BYTES = CONFIG_BT_BTC_TASK_STACK_SIZE;
+#else
+constexpr uint32_t BTC_STACK_BYTES = 0;
+#endif
+#ifdef CONFIG_BT_BTU_TASK_STACK_SIZE
+constexpr uint32_t BTU_STACK_BYTES = CONFIG_BT_BTU_TASK_STACK_SIZE;
+#else
+constexpr uint32_t BTU_STACK_BYTES = 0;
+#endif
+#ifdef CONFIG_ESP_TIMER_TASK_STACK_SIZE
+constexpr uint32_t TIMER_STACK_BYTES = CONFIG_ESP_TIMER_TASK_STACK_SIZE;
+#else
+constexpr uint32_t TIMER_STACK_BYTES = 0;
+#endif
+
+struct HeapSpec {
+    const char* name;
+    uint32_t caps;
+};
+
+const HeapSpec HEAPS[HEAP_COUNT] = {
+    {"8bit", MALLOC_CAP_8BIT},
+    {"internal", MALLOC_CAP_INTERNAL},
+    {"dma", MALLOC_CAP_DMA},
+    {"32bit", MALLOC_CAP_32BIT},
+};
+
+// Our own tasks first: their stack sizes are the ones Config.h can change.
+const Task TASKS[] = {
+    {"loopTask", LOOP_STACK_BYTES, 0},
+    {"BtI2STask", static_cast<uint32_t>(BT_A2DP_I2S_TASK_STACK_BYTES), 0},
+    {"WavReadAhead", SD_READAHEAD_TASK_STACK_BYTES, 0},
+    {"BtAppTask", 0, 0},
+    {"BTC_TASK", BTC_STACK_BYTES, 0},
+    {"BTU_TASK", BTU_STACK_BYTES, 0},
+    {"btController", 0, 0},
+    {"esp_timer", TIMER_STACK_BYTES, 0},
+    {"ipc0", 0, 0},
+    {"ipc1", 0, 0},
+};
+constexpr int TASK_TABLE_SIZE = sizeof(TASKS) / sizeof(TASKS[0]);
+static_assert(TASK_TABLE_SIZE <= MAX_TASKS, "MemoryReport task table larger than MAX_TASKS");
+
+}  // namespace
+
+void capture(Snapshot& snap) {
+    for (int i = 0; i < HEAP_COUNT; i++) {
+        Heap& heap = snap.heaps[i];
+        heap.name = HEAPS[i].name;
+        heap.freeBytes = heap_caps_get_free_size(HEAPS[i].caps);
+        heap.largestBlock = heap_caps_get_largest_free_block(HEAPS[i].caps);
+        heap.minFreeBytes = heap_caps_get_minimum_free_size(HEAPS[i].caps);
+    }
+
+    snap.taskCount = 0;
+    for (const Task& spec : TASKS) {
+        TaskHandle_t handle = xTaskGetHandle(spec.name);
+        if (handle == nullptr) continue;
+        Task& task = snap.tasks[snap.taskCount++];
+        task = spec;
+        task.minFreeBytes = uxTaskGetStackHighWaterMark(handle);
+    }
+
+    snap.blockCount = 0;
+}
+
+bool addBlock(Snapshot& snap, const char* name, uint32_t bytes) {
+    if (snap.blockCount >= MAX_BLOCKS) return false;
+    snap.blocks[snap.blockCount++] = {name, bytes};
+    return true;
+}
+
+uint32_t blockTotal(const Snapshot& snap) {
+    uint32_t total = 0;
+    for (int i = 0; i < snap.blockCount; i++) total += snap.blocks[i].bytes;
+    return total;
+}
+
+void print(const Snapshot& snap, const char* blockGroup) {
+    char line[200];
+    for (const Heap& heap : snap.heaps) {
+        snprintf(line, sizeof(line), "[Mem] v=1 heap=%s free=%lu largest=%lu min=%lu", heap.name,
+                 static_cast<unsigned long>(heap.freeBytes),
+                 static_cast<unsigned long>(heap.largestBlock),
+                 static_cast<unsigned long>(heap.minFreeBytes));
+        Serial.println(line);
+    }
+    for (int i = 0; i < snap.taskCount; i++) {
+        const Task& task = snap.tasks[i];
+        snprintf(line, sizeof(line), "[Mem] v=1 task=%s stack=%lu free=%lu", task.name,
+                 static_cast<unsigned long>(task.stackBytes),
+                 static_cast<unsigned long>(task.minFreeBytes));
+        Serial.println(line);
+    }
+    if (snap.blockCount == 0) return;
+
+    int n = snprintf(line, sizeof(line), "[Mem] v=1 %s", blockGroup);
+    for (int i = 0; i < snap.blockCount && n > 0 && n < static_cast<int>(sizeof(line)); i++) {
+        n += snprintf(line + n, sizeof(line) - n, " %s=%lu", snap.blocks[i].name,
+                      static_cast<unsigned long>(snap.blocks[i].bytes));
+    }
+    if (n > 0 && n < static_cast<int>(sizeof(line))) {
+        snprintf(line + n, sizeof(line) - n, " total=%lu",
+                 static_cast<unsigned long>(blockTotal(snap)));
+    }
+    Serial.println(line);
+}
+
+int pageCount(const Snapshot& snap) {
+    return 2 + (snap.taskCount + TASKS_PER_PAGE - 1) / TASKS_PER_PAGE;
+}
+
+void writePageJson(JsonWriter& out, uint32_t requestId, int page, const Snapshot& snap) {
+    const int lastPage = pageCount(snap) - 1;
+    if (page < 0) page = 0;
+    if (page > lastPage) page = lastPage;
+
+    out.raw("{\"id\":").num(requestId);
+    out.raw(",\"ok\":true,\"op\":\"getMemory\",\"page\":").num(page);
+    out.raw(",\"hasMore\":").boolean(page < lastPage);
+
+    if (page == 0) {
+        out.raw(",\"heaps\":[");
+        for (int i = 0; i < HEAP_COUNT; i++) {
+            const Heap& heap = snap.heaps[i];
+            if (i) out.raw(",");
+            out.raw("{\"name\":\"").raw(heap.name);
+            out.raw("\",\"free\":").num(heap.freeBytes);
+            out.raw(",\"largest\":").num(heap.largestBlock);
+            out.raw(",\"min\":").num(heap.minFreeBytes);
+            out.raw("}");
+        }
+        out.raw("]}");
+        return;
+    }
+
+    if (page == 1) {
+        out.raw(",\"blocks\":[");
+        for (int i = 0; i < snap.blockCount; i++) {
+            if (i) out.raw(",");
+            out.raw("{\"name\":\"").raw(snap.blocks[i].name);
+            out.raw("\",\"bytes\":").num(snap.blocks[i].bytes);
+            out.raw("}");
+        }
+        out.raw("],\"blockTotal\":").num(blockTotal(snap));
+        out.raw("}");
+        return;
+    }
+
+    out.raw(",\"tasks\":[");
+    const int first = (page - 2) * TASKS_PER_PAGE;
+    for (int i = first; i < snap.taskCount && i < first + TASKS_PER_PAGE; i++) {
+        const Task& task = snap.tasks[i];
+        if (i > first) out.raw(",");
+        out.raw("{\"name\":\"").raw(task.name);
+        out.raw("\",\"stack\":").num(task.stackBytes);
+        out.raw(",\"free\":").num(task.minFreeBytes);
+        out.raw("}");
+    }
+    out.raw("]}");
+}
+
+}  // namespace MemoryReport
@@ -0,0 +1,69 @@
+#pragma once
+
+#include <Arduino.h>
+#include <cstdint>
+#include "JsonWriter.h"
+
+// ---------------------------------------------------------------------------
+// MemoryReport — task stack high-water marks and heap headroom
+//
+// capture() reads, for each task in the table in MemoryReport.cpp, the least
+// stack it has ever had free (FreeRTOS high-water mark, in bytes on the
+// ESP32), and free / largest block / lowest-ever free for each heap
+// capability. Tasks that do not exist yet (BT stack not started) are left
+// out. The caller adds the long-lived blocks it owns, such as the catalog's
+// arrays, so this module depends on nothing above FreeRTOS.
+//
+// print() writes one `[Mem] v=1 ...` line per heap, task and block set for
+// tools/memory_report.py; the parent app's `getMemory` config op pages the
+// same snapshot: page 0 holds the heaps, page 1 the blocks, later pages the
+// tasks, TASKS_PER_PAGE at a time.
+// ---------------------------------------------------------------------------
+namespace MemoryReport {
+
+struct Heap {
+    const char* name;
+    uint32_t freeBytes;
+    uint32_t largestBlock;
+    uint32_t minFreeBytes;  // lowest free since boot
+};
+
+struct Task {
+    const char* name;
+    uint32_t stackBytes;  // configured size; 0 when the task is not ours to size
+    uint32_t minFreeBytes;
+};
+
+// Heap held by one subsystem's long-lived allocation.
+struct Block {
+    const char* name;
+    uint32_t bytes;
+};
+
+static constexpr int HEAP_COUNT = 4;
+static constexpr int MAX_TASKS = 12;
+static constexpr int MAX_BLOCKS = 6;
+static constexpr int TASKS_PER_PAGE = 6;
+
+struct Snapshot {
+    Heap heaps[HEAP_COUNT];
+    Task tasks[MAX_TASKS];
+    int taskCount = 0;
+    Block blocks[MAX_BLOCKS];
+    int blockCount = 0;
+};
+
+// Fills heaps and tasks and clears the blocks.
+void capture(Snapshot& snap);
+// False once MAX_BLOCKS are set.
+bool addBlock(Snapshot& snap, const char* name, uint32_t bytes);
+uint32_t blockTotal(const Snapshot& snap);
+
+// `[Mem]` lines; blocks go on one line under the given group name.
+void print(const Snapshot& snap, const char* blockGroup);
+
+int pageCount(const Snapshot& snap);
+// One getMemory page. Same paging fields as getPerf.
+void writePageJson(JsonWriter& out, uint32_t requestId, int page, const Snapshot& snap);
+
+}  // namespace MemoryReport
@@ -0,0 +1,34 @@
+#pragma once
+
+#include <cstddef>
+#include <cstring>
+
+// ---------------------------------------------------------------------------
+// NameIndex — binary search over names kept in strcmp order
+//
+// The catalog already stores song themes sorted by id and each theme's songs
+// sorted by file name, so that order doubles as the lookup index: no hash
+// table, no extra memory, O(log n) strcmp calls per lookup. nameAt(i) returns
+// the i-th name of the sorted range.
+// ---------------------------------------------------------------------------
+namespace NameIndex {
+
+// Index of `name` in the `count` sorted entries, or -1 if absent.
+template <typename NameAt>
+int find(const char* name, size_t count, NameAt nameAt) {
+    size_t lo = 0;
+    size_t hi = count;
+    while (lo < hi) {
+        size_t mid = lo + (hi - lo) / 2;
+        int cmp = strcmp(nameAt(mid), name);
+        if (cmp == 0) return static_cast<int>(mid);
+        if (cmp < 0) {
+            lo = mid + 1;
+        } else {
+            hi = mid;
+        }
+    }
+    return -1;
+}
+
+}  // namespace NameIndex
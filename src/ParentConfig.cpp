@@ -53,21 +53,14 @@ uint8_t readPercent(JsonObjectConst obj, const char* key, uint8_t fallback) {
 }  // namespace
 
 bool ParentConfig::load() {
-    _defaultVolumePct = DEFAULT_VOLUME_PCT;
-    _defaultTheme     = DEFAULT_THEME;
-    _disabledThemeCount = 0;
-    _sleepEnabled = DEFAULT_SLEEP_ENABLED;
-    _sleepNormalIdleMs = SLEEP_NORMAL_IDLE_MS;
-    _sleepVibrationWakeIdleMs = SLEEP_VIB_WAKE_IDLE_MS;
-    _sleepBleIdleMs = SLEEP_BLE_IDLE_MS;
-    _bedtimeEnabled = DEFAULT_BEDTIME_ENABLED;
-    _bedtimeStartMinutes = DEFAULT_BEDTIME_START_MINUTES;
-    _bedtimeEndMinutes = DEFAULT_BEDTIME_END_MINUTES;
-    _bedtimeTheme = DEFAULT_BEDTIME_THEME;
-    _bedtimeVolumeCapPct = DEFAULT_BEDTIME_VOLUME_CAP_PCT;
-
     File f = SD.open(SD_CONFIG_FILE);
     if (!f) {
+        // Left behind if power was cut between removing the old file and
+        // renaming the new one; ContentCatalog finishes the rename.
+        f = SD.open((String(SD_CONFIG_FILE) + ".tmp").c_str());
+    }
+    if (!f) {
+        reset();
         Serial.printf("[Config] %s not found; using firmware defaults\n", SD_CONFIG_FILE);
         return false;
     }
@@ -76,10 +69,32 @@ bool ParentConfig::load() {
     DeserializationError err = deserializeJson(doc, f);
     f.close();
     if (err) {
+        reset();
         Serial.printf("[Config] Failed to parse %s: %s; using defaults\n",
                       SD_CONFIG_FILE, err.c_str());
         return false;
     }
+    apply(doc);
+    return true;
+}
+
+void ParentConfig::reset() {
+    _defaultVolumePct = DEFAULT_VOLUME_PCT;
+    _defaultTheme     = DEFAULT_THEME;
+    _disabledThemeCount = 0;
+    _sleepEnabled = DEFAULT_SLEEP_ENABLED;
+    _sleepNormalIdleMs = SLEEP_NORMAL_IDLE_MS;
+    _sleepVibrationWakeIdleMs = SLEEP_VIB_WAKE_IDLE_MS;
+    _sleepBleIdleMs = SLEEP_BLE_IDLE_MS;
+    _bedtimeEnabled = DEFAULT_BEDTIME_ENABLED;
+    _bedtimeStartMinutes = DEFAULT_BEDTIME_START_MINUTES;
+    _bedtimeEndMinutes = DEFAULT_BEDTIME_END_MINUTES;
+    _bedtimeTheme = DEFAULT_BEDTIME_THEME;
+    _bedtimeVolumeCapPct = DEFAULT_BEDTIME_VOLUME_CAP_PCT;
+}
+
+void ParentConfig::apply(const JsonDocument& doc) {
+    reset();
 
     int vol = doc["defaultVolumePct"] | DEFAULT_VOLUME_PCT;
     if (vol < 0) vol = 0;
@@ -91,8 +106,8 @@ bool ParentConfig::load() {
         _defaultTheme = theme;
     }
 
-    if (doc["disabledThemes"].is<JsonArray>()) {
-        for (JsonVariantConst item : doc["disabledThemes"].as<JsonArray>()) {
+    if (doc["disabledThemes"].is<JsonArrayConst>()) {
+        for (JsonVariantConst item : doc["disabledThemes"].as<JsonArrayConst>()) {
             const char* disabledTheme = item | "";
             if (disabledTheme && disabledTheme[0] != '\0' &&
                 _disabledThemeCount < CONFIG_MAX_DISABLED_THEMES) {
@@ -101,8 +116,8 @@ bool ParentConfig::load() {
         }
     }
 
-    if (doc["sleep"].is<JsonObject>()) {
-        JsonObject sleep = doc["sleep"].as<JsonObject>();
+    if (doc["sleep"].is<JsonObjectConst>()) {
+        JsonObjectConst sleep = doc["sleep"].as<JsonObjectConst>();
         _sleepEnabled = sleep["enabled"] | DEFAULT_SLEEP_ENABLED;
         _sleepNormalIdleMs = readSecondsMs(sleep, "normalIdleSec", SLEEP_NORMAL_IDLE_MS);
         _sleepVibrationWakeIdleMs = readSecondsMs(
@@ -110,15 +125,17 @@ bool ParentConfig::load() {
         _sleepBleIdleMs = readSecondsMs(sleep, "bleIdleSec", SLEEP_BLE_IDLE_MS);
     }
 
-    if (doc["bedtime"].is<JsonObject>()) {
-        JsonObject bedtime = doc["bedtime"].as<JsonObject>();
+    if (doc["bedtime"].is<JsonObjectConst>()) {
+        JsonObjectConst bedtime = doc["bedtime"].as<JsonObjectConst>();
         _bedtimeEnabled = bedtime["enabled"] | DEFAULT_BEDTIME_ENABLED;
         _bedtimeStartMinutes = readTimeMinutes(
             bedtime, "startTime", DEFAULT_BEDTIME_START_MINUTES);
         _bedtimeEndMinutes = readTimeMinutes(
             bedtime, "endTime", DEFAULT_BEDTIME_END_MINUTES);
-        const char* bedtimeTheme = bedtime["theme"] | DEFAULT_BEDTIME_THEME;
-        if (bedtimeTheme && bedtimeTheme[0] != '\0') {
+        // Trimmed here, like BLE edits, so the main loop can compare it as is.
+        String bedtimeTheme = bedtime["theme"] | DEFAULT_BEDTIME_THEME;
+        bedtimeTheme.trim();
+        if (!bedtimeTheme.isEmpty()) {
             _bedtimeTheme = bedtimeTheme;
         }
         _bedtimeVolumeCapPct = readPercent(
@@ -137,7 +154,6 @@ bool ParentConfig::load() {
                   _bedtimeStartMinutes / 60, _bedtimeStartMinutes % 60,
                   _bedtimeEndMinutes / 60, _bedtimeEndMinutes % 60,
                   _bedtimeTheme.c_str(), _bedtimeVolumeCapPct);
-    return true;
 }
 
 bool ParentConfig::isThemeDisabled(const String& theme) const {
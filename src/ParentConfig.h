@@ -1,5 +1,6 @@
 #pragma once
 #include <Arduino.h>
+#include <ArduinoJson.h>
 #include "Config.h"
 
 // ---------------------------------------------------------------------------
@@ -14,9 +15,12 @@ public:
 
     // Load settings from SD_CONFIG_FILE. SD must already be mounted.
     bool load();
+    // Apply an already-parsed config.json (e.g. the catalog's in-RAM copy
+    // after an edit that has not been written back yet).
+    void apply(const JsonDocument& doc);
 
     uint8_t defaultVolumePct() const { return _defaultVolumePct; }
-    String defaultTheme() const { return _defaultTheme; }
+    const String& defaultTheme() const { return _defaultTheme; }
     bool isThemeDisabled(const String& theme) const;
     bool sleepEnabled() const { return _sleepEnabled; }
     uint32_t sleepNormalIdleMs() const { return _sleepNormalIdleMs; }
@@ -25,10 +29,12 @@ public:
     bool bedtimeEnabled() const { return _bedtimeEnabled; }
     uint16_t bedtimeStartMinutes() const { return _bedtimeStartMinutes; }
     uint16_t bedtimeEndMinutes() const { return _bedtimeEndMinutes; }
-    String bedtimeTheme() const { return _bedtimeTheme; }
+    const String& bedtimeTheme() const { return _bedtimeTheme; }
     uint8_t bedtimeVolumeCapPct() const { return _bedtimeVolumeCapPct; }
 
 private:
+    void reset();
+
     uint8_t _defaultVolumePct = DEFAULT_VOLUME_PCT;
     String  _defaultTheme     = DEFAULT_THEME;
     String  _disabledThemes[CONFIG_MAX_DISABLED_THEMES];
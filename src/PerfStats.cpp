@@ -0,0 +1,117 @@
+#include "PerfStats.h"
+#include "BootTrace.h"
+
+namespace PerfStats {
+
+namespace {
+
+constexpr int METRIC_COUNT = static_cast<int>(Metric::Count);
+
+const uint32_t BUCKET_UPPER_US[BUCKET_COUNT] = {
+    100, 250, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000, 0,
+};
+
+const char* const METRIC_NAMES[METRIC_COUNT] = {"loop", "wav", "config", "sd"};
+
+struct Histogram {
+    uint32_t buckets[BUCKET_COUNT];
+    uint32_t count;
+    uint32_t maxUs;
+    uint64_t sumUs;
+};
+
+Histogram g_histograms[METRIC_COUNT] = {};
+uint32_t g_sinceMs = 0;
+portMUX_TYPE g_lock = portMUX_INITIALIZER_UNLOCKED;
+
+int bucketFor(uint32_t us) {
+    for (int i = 0; i < BUCKET_COUNT - 1; i++) {
+        if (us < BUCKET_UPPER_US[i]) return i;
+    }
+    return BUCKET_COUNT - 1;
+}
+
+void writeBootPage(JsonWriter& out) {
+    out.raw(",\"metric\":\"boot\",\"phasesUs\":{");
+    bool first = true;
+    for (int i = 0; i < static_cast<int>(BootTrace::Phase::Count); i++) {
+        BootTrace::Phase phase = static_cast<BootTrace::Phase>(i);
+        uint32_t us = BootTrace::phaseUs(phase);
+        if (us == 0) continue;
+        if (!first) out.raw(",");
+        first = false;
+        out.str(BootTrace::phaseName(phase)).raw(":").num(us);
+    }
+    out.raw("},\"totalUs\":").num(BootTrace::totalUs());
+}
+
+}  // namespace
+
+void record(Metric metric, uint32_t us) {
+    int index = static_cast<int>(metric);
+    if (index < 0 || index >= METRIC_COUNT) return;
+    int bucket = bucketFor(us);
+    portENTER_CRITICAL(&g_lock);
+    Histogram& h = g_histograms[index];
+    h.buckets[bucket]++;
+    h.count++;
+    h.sumUs += us;
+    if (us > h.maxUs) h.maxUs = us;
+    portEXIT_CRITICAL(&g_lock);
+}
+
+void reset() {
+    portENTER_CRITICAL(&g_lock);
+    for (Histogram& h : g_histograms) h = Histogram{};
+    portEXIT_CRITICAL(&g_lock);
+    g_sinceMs = millis();
+}
+
+uint32_t bucketUpperUs(int bucket) {
+    if (bucket < 0 || bucket >= BUCKET_COUNT) return 0;
+    return BUCKET_UPPER_US[bucket];
+}
+
+const char* metricName(Metric metric) {
+    int index = static_cast<int>(metric);
+    if (index < 0 || index >= METRIC_COUNT) return "?";
+    return METRIC_NAMES[index];
+}
+
+void writePageJson(JsonWriter& out, uint32_t requestId, int page) {
+    if (page < 0) page = 0;
+    if (page > METRIC_COUNT) page = METRIC_COUNT;
+
+    out.raw("{\"id\":").num(requestId);
+    out.raw(",\"ok\":true,\"op\":\"getPerf\",\"page\":").num(page);
+    out.raw(",\"hasMore\":").boolean(page < METRIC_COUNT);
+    out.raw(",\"sinceMs\":").num(static_cast<uint32_t>(millis() - g_sinceMs));
+
+    if (page == METRIC_COUNT) {
+        writeBootPage(out);
+        out.raw("}");
+        return;
+    }
+
+    portENTER_CRITICAL(&g_lock);
+    Histogram h = g_histograms[page];
+    portEXIT_CRITICAL(&g_lock);
+
+    out.raw(",\"metric\":\"").raw(METRIC_NAMES[page]);
+    out.raw("\",\"n\":").num(h.count);
+    out.raw(",\"maxUs\":").num(h.maxUs);
+    out.raw(",\"meanUs\":").num(h.count ? static_cast<uint32_t>(h.sumUs / h.count) : 0U);
+    out.raw(",\"bucketsUs\":[");
+    for (int i = 0; i < BUCKET_COUNT - 1; i++) {
+        if (i) out.raw(",");
+        out.num(BUCKET_UPPER_US[i]);
+    }
+    out.raw("],\"h\":[");
+    for (int i = 0; i < BUCKET_COUNT; i++) {
+        if (i) out.raw(",");
+        out.num(h.buckets[i]);
+    }
+    out.raw("]}");
+}
+
+}  // namespace PerfStats
@@ -0,0 +1,37 @@
+#pragma once
+
+#include <Arduino.h>
+#include <cstdint>
+#include "JsonWriter.h"
+
+// ---------------------------------------------------------------------------
+// PerfStats — fixed-bucket latency histograms for real-time headroom
+//
+// Each metric counts samples into BUCKET_COUNT buckets with fixed upper
+// bounds (bucketUpperUs()); the last bucket is open-ended. Samples may be
+// recorded from any task. The parent app's `getPerf` config op reads one
+// metric per page and `resetPerf` clears them all.
+// ---------------------------------------------------------------------------
+namespace PerfStats {
+
+enum class Metric : uint8_t {
+    Loop,           // main loop period, start to start (includes the yield delay)
+    WavLoop,        // WavPlayer::loop() while a file is playing
+    ConfigCommand,  // one BLE config command, parse to response
+    SdRead,         // one read-ahead SD read
+    Count,
+};
+
+static constexpr int BUCKET_COUNT = 11;
+
+void record(Metric metric, uint32_t us);
+void reset();
+
+uint32_t bucketUpperUs(int bucket);  // 0 for the open-ended last bucket
+const char* metricName(Metric metric);
+
+// One getPerf page: pages 0..Count-1 are the histograms, the last page is
+// the boot phase trace. Same paging fields as scanThemes.
+void writePageJson(JsonWriter& out, uint32_t requestId, int page);
+
+}  // namespace PerfStats
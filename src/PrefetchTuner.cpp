@@ -0,0 +1,96 @@
+#include "PrefetchTuner.h"
+
+namespace {
+
+// A step down that is followed by underflows doubles the quiet time needed
+// before the next one, up to this many times calmWindows.
+constexpr uint8_t MAX_CALM_BACKOFF = 8;
+
+uint8_t clampPct(uint8_t pct, const PrefetchTuner::Settings& s) {
+    if (pct < s.minPct) return s.minPct;
+    if (pct > s.maxPct) return s.maxPct;
+    return pct;
+}
+
+uint8_t stepDown(uint8_t pct, const PrefetchTuner::Settings& s) {
+    return pct >= s.minPct + s.stepPct ? static_cast<uint8_t>(pct - s.stepPct) : s.minPct;
+}
+
+}  // namespace
+
+PrefetchTuner::PrefetchTuner(const Settings& settings)
+    : _settings(settings),
+      _level(clampPct(settings.startPct, settings)),
+      _calmNeeded(settings.calmWindows) {}
+
+void PrefetchTuner::reset(uint32_t nowMs, uint32_t underflows, uint32_t drops) {
+    _level = clampPct(_settings.startPct, _settings);
+    _seenUnderflows = underflows;
+    _seenDrops = drops;
+    _windowUnderflows = 0;
+    _windowDrops = 0;
+    _lastWindowUnderflows = 0;
+    _lastWindowDrops = 0;
+    _streamedMs = 0;
+    _lastUpdateMs = nowMs;
+    _calm = 0;
+    _calmNeeded = _settings.calmWindows;
+    _lastChangeLowered = false;
+}
+
+bool PrefetchTuner::update(uint32_t nowMs, uint32_t underflows, uint32_t drops, bool streaming) {
+    uint32_t elapsedMs = nowMs - _lastUpdateMs;
+    _lastUpdateMs = nowMs;
+    // Counters only ever grow; anything seen while not streaming (the last
+    // underflow as a stream stops) is left out of the window.
+    uint32_t newUnderflows = underflows - _seenUnderflows;
+    uint32_t newDrops = drops - _seenDrops;
+    _seenUnderflows = underflows;
+    _seenDrops = drops;
+    if (!streaming) {
+        return false;
+    }
+
+    _windowUnderflows += newUnderflows;
+    _windowDrops += newDrops;
+    _streamedMs += elapsedMs;
+    if (_streamedMs < _settings.windowMs) {
+        return false;
+    }
+    return finishWindow();
+}
+
+bool PrefetchTuner::finishWindow() {
+    _lastWindowUnderflows = _windowUnderflows;
+    _lastWindowDrops = _windowDrops;
+    _windowUnderflows = 0;
+    _windowDrops = 0;
+    _streamedMs = 0;
+
+    uint8_t next = _level;
+    if (_lastWindowUnderflows > 0) {
+        _calm = 0;
+        if (_lastChangeLowered && _calmNeeded < _settings.calmWindows * MAX_CALM_BACKOFF) {
+            _calmNeeded = static_cast<uint8_t>(_calmNeeded * 2);
+        }
+        next = clampPct(static_cast<uint8_t>(_level + _settings.stepPct), _settings);
+    } else if (_lastWindowDrops > 0) {
+        _calm = 0;
+        next = stepDown(_level, _settings);
+    } else if (++_calm >= _calmNeeded) {
+        _calm = 0;
+        next = stepDown(_level, _settings);
+    }
+
+    if (next == _level) {
+        return false;
+    }
+    _lastChangeLowered = next < _level;
+    if (_lastChangeLowered) {
+        _lowers++;
+    } else {
+        _raises++;
+    }
+    _level = next;
+    return true;
+}
@@ -0,0 +1,69 @@
+#pragma once
+
+#include <cstdint>
+
+// ---------------------------------------------------------------------------
+// PrefetchTuner — adaptive A2DP prefetch level from live underflow stats
+//
+// The A2DP ring is allocated once at its full size. The prefetch level is how
+// full it must get before I2S starts (or restarts after an underflow), so it
+// is the latency a phone pays. A fixed level trades latency against stutter
+// blindly; this picks it per connection instead.
+//
+// update() is fed the sink's running underflow and drop counters. Counts are
+// summed over windowMs of streaming time:
+//   - any underflow in a window raises the level one step (jittery phone);
+//   - drops without underflows lower it one step (ring overflowing, so less
+//     prefetch leaves more headroom for bursts);
+//   - calmWindows quiet windows in a row lower it one step, so a phone that
+//     stopped stuttering drifts back towards low latency. A step down that
+//     brings the underflows back doubles the quiet time the next one needs.
+// The level stays within [minPct, maxPct] of the ring. reset() goes back to
+// startPct for a new connection.
+// ---------------------------------------------------------------------------
+class PrefetchTuner {
+public:
+    struct Settings {
+        uint8_t  minPct;
+        uint8_t  maxPct;
+        uint8_t  startPct;
+        uint8_t  stepPct;
+        uint32_t windowMs;
+        uint8_t  calmWindows;
+    };
+
+    explicit PrefetchTuner(const Settings& settings);
+
+    void reset(uint32_t nowMs, uint32_t underflows, uint32_t drops);
+    // Returns true when levelPct() changed.
+    bool update(uint32_t nowMs, uint32_t underflows, uint32_t drops, bool streaming);
+
+    uint8_t levelPct() const { return _level; }
+    const Settings& settings() const { return _settings; }
+    // Counts of the window in progress and of the last finished one.
+    uint32_t windowUnderflows() const { return _windowUnderflows; }
+    uint32_t windowDrops() const { return _windowDrops; }
+    uint32_t lastWindowUnderflows() const { return _lastWindowUnderflows; }
+    uint32_t lastWindowDrops() const { return _lastWindowDrops; }
+    uint32_t raises() const { return _raises; }
+    uint32_t lowers() const { return _lowers; }
+
+private:
+    Settings _settings;
+    uint8_t  _level;
+    uint32_t _seenUnderflows = 0;
+    uint32_t _seenDrops = 0;
+    uint32_t _windowUnderflows = 0;
+    uint32_t _windowDrops = 0;
+    uint32_t _lastWindowUnderflows = 0;
+    uint32_t _lastWindowDrops = 0;
+    uint32_t _streamedMs = 0;
+    uint32_t _lastUpdateMs = 0;
+    uint8_t  _calm = 0;
+    uint8_t  _calmNeeded;
+    bool     _lastChangeLowered = false;
+    uint32_t _raises = 0;
+    uint32_t _lowers = 0;
+
+    bool finishWindow();
+};
@@ -0,0 +1,93 @@
+#include "PressTrace.h"
+#include <Arduino.h>
+#include <esp_timer.h>
+#include <cstdio>
+
+namespace PressTrace {
+
+namespace {
+
+constexpr int STAGE_COUNT = static_cast<int>(Stage::Count);
+// A press that has not produced sound by then failed or was superseded.
+constexpr uint32_t ABANDON_AFTER_US = 3000000;
+
+// Each name is the span that ends at that stage.
+const char* const SPAN_NAMES[STAGE_COUNT] = {
+    "", "debounce", "dispatch", "lookup", "open", "first_write",
+};
+
+struct Record {
+    bool active = false;
+    bool finished = false;
+    Source source = Source::Button;
+    const char* action = "";
+    uint32_t atUs[STAGE_COUNT] = {0};
+    bool marked[STAGE_COUNT] = {false};
+};
+
+Record g_record;
+
+uint32_t nowUs() { return static_cast<uint32_t>(esp_timer_get_time()); }
+
+}  // namespace
+
+void begin(Source source, const char* action, uint32_t pressUs, uint32_t acceptedUs) {
+    g_record = Record{};
+    g_record.active = true;
+    g_record.source = source;
+    g_record.action = action;
+    g_record.atUs[static_cast<int>(Stage::Press)] = pressUs;
+    g_record.marked[static_cast<int>(Stage::Press)] = true;
+    g_record.atUs[static_cast<int>(Stage::Accepted)] = acceptedUs;
+    g_record.marked[static_cast<int>(Stage::Accepted)] = true;
+}
+
+void mark(Stage stage) {
+    int index = static_cast<int>(stage);
+    if (!g_record.active || g_record.finished || index <= 0 || index >= STAGE_COUNT) return;
+    if (g_record.marked[index]) return;
+    g_record.atUs[index] = nowUs();
+    g_record.marked[index] = true;
+    if (stage == Stage::FirstWrite) g_record.finished = true;
+}
+
+void cancel() { g_record.active = false; }
+
+size_t format(char* out, size_t size) {
+    if (!g_record.active || !g_record.finished || size == 0) return 0;
+    int n = snprintf(out, size, "[PressTrace] v=1 src=%s ev=%s",
+                     g_record.source == Source::Ble ? "ble" : "button", g_record.action);
+    uint32_t previous = g_record.atUs[0];
+    for (int i = 1; i < STAGE_COUNT && n > 0 && n < static_cast<int>(size); i++) {
+        if (!g_record.marked[i]) continue;
+        n += snprintf(out + n, size - n, " %s=%lu", SPAN_NAMES[i],
+                      static_cast<unsigned long>(g_record.atUs[i] - previous));
+        previous = g_record.atUs[i];
+    }
+    if (n > 0 && n < static_cast<int>(size)) {
+        n += snprintf(out + n, size - n, " total=%lu\n",
+                      static_cast<unsigned long>(previous - g_record.atUs[0]));
+    }
+    if (n <= 0 || n >= static_cast<int>(size)) return 0;
+    return static_cast<size_t>(n);
+}
+
+void poll() {
+    if (!g_record.active) return;
+    if (!g_record.finished) {
+        if (nowUs() - g_record.atUs[0] > ABANDON_AFTER_US) g_record.active = false;
+        return;
+    }
+    char line[160];
+    size_t len = format(line, sizeof(line));
+    if (len == 0) {
+        g_record.active = false;
+        return;
+    }
+    // Never block the audio path: wait for a pass where the line fits.
+    if (Serial.availableForWrite() < static_cast<int>(len)) return;
+    Serial.write(reinterpret_cast<const uint8_t*>(line), len);
+    g_record.active = false;
+}
+
+}  // namespace PressTrace
@@ -0,0 +1,46 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+
+// ---------------------------------------------------------------------------
+// PressTrace — press-to-sound latency, one record per song/animal press
+//
+// A press from a doll button or a BLE `command` write starts a record.
+// Later code marks each stage it passes through, and the first decoder write
+// of the new file completes it. The main loop then prints one line, but only
+// when the UART has room for all of it:
+//
+//   [PressTrace] v=1 src=button ev=song debounce=52210 dispatch=180 lookup=950 open=7320 first_write=2410 total=63070
+//
+// Values are µs per stage; a stage that was not passed is omitted (a "next
+// song" press skips the state machine). tools/trace_report.py aggregates
+// these lines into per-stage percentiles.
+// ---------------------------------------------------------------------------
+namespace PressTrace {
+
+enum class Source : uint8_t { Button, Ble };
+
+enum class Stage : uint8_t {
+    Press,       // contact edge (button) or characteristic write (BLE)
+    Accepted,    // debounced and read by the main loop
+    Dispatched,  // state-machine transition handled (handleStateEntry)
+    Lookup,      // catalog lookup and play list done; file open starts
+    Opened,      // WAV opened, header validated, decoder reset
+    FirstWrite,  // first PCM bytes written to the decoder / I2S
+    Count,
+};
+
+// `action` is a string literal: song, animal, next_song or next_animal.
+void begin(Source source, const char* action, uint32_t pressUs, uint32_t acceptedUs);
+void mark(Stage stage);
+void cancel();
+
+// Call from loop(): prints a finished record once the UART has room and
+// drops a record that never reached audio.
+void poll();
+
+// Formats the finished record; returns 0 if there is none.
+size_t format(char* out, size_t size);
+
+}  // namespace PressTrace
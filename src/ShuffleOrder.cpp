@@ -0,0 +1,60 @@
+#include "ShuffleOrder.h"
+
+namespace ShuffleOrder {
+namespace {
+
+constexpr uint8_t ROUNDS = 4;
+
+uint32_t mix(uint32_t x) {
+    x ^= x >> 16;
+    x *= 0x7FEB352DU;
+    x ^= x >> 15;
+    x *= 0x846CA68BU;
+    x ^= x >> 16;
+    return x;
+}
+
+uint32_t feistel(const Order& order, uint32_t value) {
+    const uint32_t mask = (1UL << order.halfBits) - 1UL;
+    uint32_t left = value >> order.halfBits;
+    uint32_t right = value & mask;
+    for (uint8_t round = 0; round < ROUNDS; round++) {
+        uint32_t key = mix(order.seed + 0x9E3779B9U * (round + 1U));
+        uint32_t next = left ^ (mix(right ^ key) & mask);
+        left = right;
+        right = next;
+    }
+    return (left << order.halfBits) | right;
+}
+
+}  // namespace
+
+Order make(uint16_t count, bool shuffle, uint32_t seed) {
+    Order order;
+    order.count = count;
+    order.shuffled = shuffle && count > 1;
+    order.seed = seed;
+    uint8_t halfBits = 1;
+    while ((1UL << (2 * halfBits)) < count) {
+        halfBits++;
+    }
+    order.halfBits = halfBits;
+    return order;
+}
+
+uint16_t at(const Order& order, uint16_t position) {
+    if (order.count == 0) return 0;
+    if (position >= order.count) position %= order.count;
+    if (!order.shuffled) return position;
+
+    // The Feistel network permutes the whole 4^halfBits domain; walking the
+    // cycle from an in-range start always returns to the range in a few steps
+    // (the domain is at most 4x count), which keeps the result a bijection.
+    uint32_t value = position;
+    do {
+        value = feistel(order, value);
+    } while (value >= order.count);
+    return static_cast<uint16_t>(value);
+}
+
+}  // namespace ShuffleOrder
@@ -0,0 +1,26 @@
+#pragma once
+
+#include <cstdint>
+
+// ---------------------------------------------------------------------------
+// ShuffleOrder — playback order for a rotation without storing a permutation
+//
+// at(order, position) maps a cursor position in [0, count) to an entry index
+// in [0, count). Shuffled orders use a keyed 4-round Feistel network over the
+// smallest even-bit power-of-two domain that covers count, cycle-walking any
+// result that lands past the end, so every seed is a full bijection and a
+// reshuffle is just a new seed. Unshuffled orders are the identity.
+// ---------------------------------------------------------------------------
+namespace ShuffleOrder {
+
+struct Order {
+    uint16_t count = 0;
+    uint8_t halfBits = 0;   // Feistel half width; domain is 4^halfBits
+    bool shuffled = false;
+    uint32_t seed = 0;
+};
+
+Order make(uint16_t count, bool shuffle, uint32_t seed);
+uint16_t at(const Order& order, uint16_t position);
+
+}  // namespace ShuffleOrder
@@ -42,33 +42,78 @@ void StateMachine::begin() {
 // ---------------------------------------------------------------------------
 bool StateMachine::ensureQueue() {
     if (!_queue) {
-        _queue = xQueueCreate(16, sizeof(QueueItem));
+        _queue = xQueueCreate(16, sizeof(Event));
     }
     return _queue != nullptr;
 }
 
 // ---------------------------------------------------------------------------
+void StateMachine::enqueue(Event e) {
+    // Non-blocking; drop if full. Counted here, logged from process().
+    bool sent = xQueueSend(_queue, &e, 0) == pdTRUE;
+    portENTER_CRITICAL(&_slotMux);
+    _stats.posted++;
+    if (!sent) {
+        _stats.dropped++;
+        if (e == Event::VOLUME_CHANGED) _volumeQueued = false;
+        if (e == Event::THEME_CHANGED) _themeQueued = false;
+    }
+    portEXIT_CRITICAL(&_slotMux);
+}
+
 void StateMachine::postEvent(Event e) {
     if (!ensureQueue()) {
         return;
     }
-    QueueItem item{};
-    item.event = e;
-    xQueueSend(_queue, &item, 0);  // non-blocking; drop if full
+    enqueue(e);
 }
 
 void StateMachine::postStringEvent(Event e, const String& payload) {
     if (!ensureQueue()) {
         return;
     }
-    QueueItem item{};
-    item.event = e;
-    if (e == Event::THEME_CHANGED) {
-        strncpy(item.theme, payload.c_str(), sizeof(item.theme) - 1);
-    } else if (e == Event::VOLUME_CHANGED) {
-        item.volume = (uint8_t)payload.toInt();
+    if (e != Event::VOLUME_CHANGED && e != Event::THEME_CHANGED) {
+        enqueue(e);
+        return;
+    }
+
+    // Overwrite the slot; only queue an event if none is waiting already.
+    bool alreadyQueued;
+    portENTER_CRITICAL(&_slotMux);
+    if (e == Event::VOLUME_CHANGED) {
+        _slotVolume = (uint8_t)payload.toInt();
+        alreadyQueued = _volumeQueued;
+        _volumeQueued = true;
+    } else {
+        strncpy(_slotTheme, payload.c_str(), sizeof(_slotTheme) - 1);
+        _slotTheme[sizeof(_slotTheme) - 1] = '\0';
+        alreadyQueued = _themeQueued;
+        _themeQueued = true;
     }
-    xQueueSend(_queue, &item, 0);
+    if (alreadyQueued) {
+        _stats.posted++;
+        _stats.merged++;
+    }
+    portEXIT_CRITICAL(&_slotMux);
+    if (!alreadyQueued) {
+        enqueue(e);
+    }
+}
+
+StateMachine::QueueStats StateMachine::queueStats() const {
+    portENTER_CRITICAL(&_slotMux);
+    QueueStats stats = _stats;
+    portEXIT_CRITICAL(&_slotMux);
+    return stats;
+}
+
+void StateMachine::printQueueStats() const {
+    QueueStats stats = queueStats();
+    char line[80];
+    snprintf(line, sizeof(line), "[SM] Queue posted=%lu merged=%lu dropped=%lu",
+             static_cast<unsigned long>(stats.posted), static_cast<unsigned long>(stats.merged),
+             static_cast<unsigned long>(stats.dropped));
+    Serial.println(line);
 }
 
 // ---------------------------------------------------------------------------
@@ -85,9 +130,17 @@ bool StateMachine::process() {
     }
 
     State before = _state;
-    QueueItem item{};
-    while (xQueueReceive(_queue, &item, 0) == pdTRUE) {
-        handleEvent(item);
+    Event e = Event::NONE;
+    while (xQueueReceive(_queue, &e, 0) == pdTRUE) {
+        handleEvent(e);
+    }
+
+    QueueStats stats = queueStats();
+    if (stats.dropped != _loggedDropped) {
+        Serial.printf("[SM] %u event(s) dropped (queue full)\n",
+                      (unsigned)(stats.dropped - _loggedDropped));
+        _loggedDropped = stats.dropped;
+        printQueueStats();
     }
 
     updateLed();
@@ -115,19 +168,26 @@ void StateMachine::transition(State next) {
 }
 
 // ---------------------------------------------------------------------------
-void StateMachine::handleEvent(const QueueItem& item) {
-    Event e = item.event;
+void StateMachine::handleEvent(Event e) {
     Serial.printf("[SM] State=%s Event=%s\n", stateToString(_state), eventToString(e));
 
     // --- VOLUME_CHANGED is state-independent ---
     if (e == Event::VOLUME_CHANGED) {
-        _pendingVolume = item.volume;
+        portENTER_CRITICAL(&_slotMux);
+        _pendingVolume = _slotVolume;
+        _volumeQueued = false;
+        portEXIT_CRITICAL(&_slotMux);
         return;  // caller handles volume application
     }
 
     // --- THEME_CHANGED can arrive in any state; store for caller ---
     if (e == Event::THEME_CHANGED) {
-        _pendingTheme = String(item.theme);
+        char theme[sizeof(_slotTheme)];
+        portENTER_CRITICAL(&_slotMux);
+        memcpy(theme, _slotTheme, sizeof(theme));
+        _themeQueued = false;
+        portEXIT_CRITICAL(&_slotMux);
+        _pendingTheme = String(theme);
         return;
     }
 
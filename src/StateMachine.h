@@ -1,5 +1,6 @@
 #pragma once
 #include <Arduino.h>
+#include <freertos/FreeRTOS.h>
 #include "Config.h"
 
 // ---------------------------------------------------------------------------
@@ -16,6 +17,12 @@
 // pending writes to the main loop, which then posts state-machine events.
 // The machine runs entirely in the main loop (not thread-safe by itself),
 // while BT callbacks use xQueueSend() to post events safely.
+//
+// VOLUME_CHANGED and THEME_CHANGED only carry the latest value, so they are
+// coalesced: the value goes into a single slot and at most one event of each
+// kind waits in the queue. A slider drag that posts while the first volume
+// event is still queued just overwrites the slot, and process() handles the
+// last value once. The queue itself carries one byte per event.
 // ---------------------------------------------------------------------------
 
 enum class State {
@@ -26,7 +33,7 @@ enum class State {
     KILLSWITCH,
 };
 
-enum class Event {
+enum class Event : uint8_t {
     NONE,
     BUTTON1_PRESS,       // btn1 short press
     BUTTON2_PRESS,       // btn2 short press
@@ -42,6 +49,7 @@ enum class Event {
     LOOP_OFF,            // BLE song-loop mode disabled
     KILLSWITCH_EXPIRED,  // 10-min timer elapsed
 };
+static_assert(sizeof(Event) == 1, "event queue items are meant to be one byte");
 
 const char* stateToString(State s);
 const char* eventToString(Event e);
@@ -71,6 +79,18 @@ public:
     String pendingTheme() const  { return _pendingTheme;  }
     uint8_t pendingVolume() const { return _pendingVolume; }
 
+    // Event queue counters since boot. merged: volume/theme posts folded into
+    // an event already queued. dropped: posts lost because the queue was full.
+    struct QueueStats {
+        uint32_t posted  = 0;
+        uint32_t merged  = 0;
+        uint32_t dropped = 0;
+    };
+    QueueStats queueStats() const;
+    // One `[SM] Queue posted=... merged=... dropped=...` line; printed after
+    // a drop and with the memory report.
+    void printQueueStats() const;
+
     // True if killswitch timer has expired (main loop should post KILLSWITCH_EXPIRED)
     bool killswitchTimerExpired() const;
     uint32_t killswitchRemainingMs() const;
@@ -90,14 +110,18 @@ private:
 
     uint32_t _killswitchStartMs = 0;
 
-    // FreeRTOS event queue
+    // FreeRTOS event queue of Event values, one byte each
     QueueHandle_t _queue = nullptr;
 
-    struct QueueItem {
-        Event  event;
-        uint8_t volume;          // valid for VOLUME_CHANGED
-        char    theme[64];       // valid for THEME_CHANGED
-    };
+    // Latest-value slots for the coalesced events, guarded by _slotMux.
+    // *Queued is true while that event sits in the queue.
+    mutable portMUX_TYPE _slotMux = portMUX_INITIALIZER_UNLOCKED;
+    bool    _volumeQueued = false;
+    bool    _themeQueued  = false;
+    uint8_t _slotVolume   = 0;
+    char    _slotTheme[64] = {0};
+    QueueStats _stats;
+    uint32_t   _loggedDropped = 0;
 
     String  _pendingTheme;
     uint8_t _pendingVolume = 0;
@@ -107,6 +131,7 @@ private:
     bool     _ledState        = false;
 
     void transition(State next);
-    void handleEvent(const QueueItem& item);
+    void handleEvent(Event e);
     bool ensureQueue();
+    void enqueue(Event e);
 };
@@ -0,0 +1,138 @@
+#include "TraceLog.h"
+#include <Arduino.h>
+#include <esp_timer.h>
+#include "Config.h"
+
+namespace TraceLog {
+
+namespace {
+
+Record g_ring[TRACE_RING_RECORDS];
+size_t g_head = 0;   // next record to drain
+size_t g_count = 0;
+uint16_t g_seq = 0;
+uint32_t g_dropped = 0;
+portMUX_TYPE g_lock = portMUX_INITIALIZER_UNLOCKED;
+
+void push(Id id, uint8_t argc, int32_t a0, int32_t a1, int32_t a2, int32_t a3) {
+    uint32_t now = static_cast<uint32_t>(esp_timer_get_time());
+    portENTER_CRITICAL(&g_lock);
+    uint16_t seq = g_seq++;
+    if (g_count >= static_cast<size_t>(TRACE_RING_RECORDS)) {
+        g_dropped++;
+        portEXIT_CRITICAL(&g_lock);
+        return;
+    }
+    Record& r = g_ring[(g_head + g_count) % TRACE_RING_RECORDS];
+    r.tUs = now;
+    r.seq = seq;
+    r.id = static_cast<uint8_t>(id);
+    r.argc = argc;
+    r.args[0] = a0;
+    r.args[1] = a1;
+    r.args[2] = a2;
+    r.args[3] = a3;
+    g_count++;
+    portEXIT_CRITICAL(&g_lock);
+}
+
+uint8_t crc8(const uint8_t* data, size_t len) {
+    uint8_t crc = 0;
+    for (size_t i = 0; i < len; i++) {
+        crc ^= data[i];
+        for (int bit = 0; bit < 8; bit++) {
+            crc = (crc & 0x80) ? static_cast<uint8_t>((crc << 1) ^ 0x07)
+                               : static_cast<uint8_t>(crc << 1);
+        }
+    }
+    return crc;
+}
+
+void putLe(uint8_t* out, uint32_t value, size_t bytes) {
+    for (size_t i = 0; i < bytes; i++) {
+        out[i] = static_cast<uint8_t>(value >> (8 * i));
+    }
+}
+
+// Only the main loop removes records, so the front cannot change between
+// peek() and pop() even while other tasks append.
+bool peek(Record& out) {
+    portENTER_CRITICAL(&g_lock);
+    bool any = g_count > 0;
+    if (any) out = g_ring[g_head];
+    portEXIT_CRITICAL(&g_lock);
+    return any;
+}
+
+void pop() {
+    portENTER_CRITICAL(&g_lock);
+    g_head = (g_head + 1) % TRACE_RING_RECORDS;
+    g_count--;
+    portEXIT_CRITICAL(&g_lock);
+}
+
+}  // namespace
+
+void record(Id id) { push(id, 0, 0, 0, 0, 0); }
+void record(Id id, int32_t a0) { push(id, 1, a0, 0, 0, 0); }
+void record(Id id, int32_t a0, int32_t a1) { push(id, 2, a0, a1, 0, 0); }
+void record(Id id, int32_t a0, int32_t a1, int32_t a2) { push(id, 3, a0, a1, a2, 0); }
+void record(Id id, int32_t a0, int32_t a1, int32_t a2, int32_t a3) {
+    push(id, 4, a0, a1, a2, a3);
+}
+
+size_t encodeFrame(const Record& record, uint8_t* out) {
+    uint8_t argc = record.argc > MAX_ARGS ? MAX_ARGS : record.argc;
+    out[0] = 0xA5;
+    out[1] = 0x5A;
+    out[2] = record.id;
+    out[3] = argc;
+    putLe(out + 4, record.seq, 2);
+    putLe(out + 6, record.tUs, 4);
+    size_t n = 10;
+    for (uint8_t i = 0; i < argc; i++) {
+        putLe(out + n, static_cast<uint32_t>(record.args[i]), 4);
+        n += 4;
+    }
+    out[n] = crc8(out + 2, n - 2);
+    return n + 1;
+}
+
+size_t drain(size_t maxFrames) {
+    size_t written = 0;
+    Record r;
+    uint8_t frame[MAX_FRAME_BYTES];
+    while (written < maxFrames && peek(r)) {
+        size_t len = encodeFrame(r, frame);
+        if (Serial.availableForWrite() < static_cast<int>(len)) break;
+        Serial.write(frame, len);
+        pop();
+        written++;
+    }
+    return written;
+}
+
+void flush() {
+    Record r;
+    uint8_t frame[MAX_FRAME_BYTES];
+    while (peek(r)) {
+        Serial.write(frame, encodeFrame(r, frame));
+        pop();
+    }
+}
+
+size_t pending() {
+    portENTER_CRITICAL(&g_lock);
+    size_t count = g_count;
+    portEXIT_CRITICAL(&g_lock);
+    return count;
+}
+
+uint32_t droppedTotal() {
+    portENTER_CRITICAL(&g_lock);
+    uint32_t dropped = g_dropped;
+    portEXIT_CRITICAL(&g_lock);
+    return dropped;
+}
+
+}  // namespace TraceLog
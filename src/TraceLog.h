@@ -0,0 +1,87 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+
+// ---------------------------------------------------------------------------
+// TraceLog — binary event ring for hot-path logging
+//
+// record() copies an event id, a µs timestamp and up to four integer args
+// into a fixed RAM ring. It does not format anything and does not touch the
+// UART, so BT callbacks and playback code can call it while audio is running.
+// drain() runs on the main loop and writes queued records to serial as
+// compact frames, only while the UART TX buffer has room.
+//
+// Frame layout (little-endian):
+//
+//   A5 5A | id u8 | argc u8 | seq u16 | tUs u32 | args i32 x argc | crc8
+//
+// crc8 (poly 0x07) covers id through the last arg. seq counts every record()
+// call, dropped ones included, so a gap in seq is the number of events lost
+// to a full ring. Text lines printed with Serial.printf may sit between
+// frames. tools/trace_decode.py splits the two and turns each frame back into
+// the log line it replaces.
+// ---------------------------------------------------------------------------
+namespace TraceLog {
+
+// Wire ids: append only, never renumber (the decoder keys on them).
+enum class Id : uint8_t {
+    BtConnected = 1,     // freeHeap, largestBlock
+    BtDisconnected,
+    BtAudioState,        // BtAudio
+    BtSampleRate,        // Hz
+    Volume,              // pct, reason
+    VolumeCapped,        // requestedPct, effectivePct, capPct, reason
+    WavDecoderIdle,      // gapUs
+    WavUnderrun,         // underruns, maxReadUs
+    WavStats,            // ringFill, minFill, underruns, reads
+    WavStatsTiming,      // maxReadUs, lastGapUs, ringBytes
+    BtPrefetch,          // pct, previousPct, windowUnderflows, windowDrops
+    BtRx,                // rxBytes since the last one, bufferedBytes, underflows, drops
+};
+
+// Arg of Id::BtAudioState, independent of the IDF enum's numbering.
+enum class BtAudio : uint8_t {
+    Unknown,
+    Started,
+    Stopped,
+    RemoteSuspend,
+};
+
+// `reason` arg of Volume / VolumeCapped. Append only, like Id.
+enum class VolumeReason : uint8_t {
+    Request,
+    BedtimeState,
+    SongStart,
+    AnimalStart,
+};
+
+static constexpr uint8_t MAX_ARGS = 4;
+static constexpr size_t MAX_FRAME_BYTES = 11 + 4 * MAX_ARGS;
+
+struct Record {
+    uint32_t tUs;
+    uint16_t seq;
+    uint8_t id;
+    uint8_t argc;
+    int32_t args[MAX_ARGS];
+};
+
+// Safe from any task. Drops the record (and counts it) when the ring is full.
+void record(Id id);
+void record(Id id, int32_t a0);
+void record(Id id, int32_t a0, int32_t a1);
+void record(Id id, int32_t a0, int32_t a1, int32_t a2);
+void record(Id id, int32_t a0, int32_t a1, int32_t a2, int32_t a3);
+
+// Writes at most maxFrames frames without blocking. Returns frames written.
+size_t drain(size_t maxFrames);
+// Writes everything still queued, blocking on the UART. Before sleep/restart.
+void flush();
+
+size_t pending();
+uint32_t droppedTotal();
+
+size_t encodeFrame(const Record& record, uint8_t* out);
+
+}  // namespace TraceLog
@@ -1,39 +1,10 @@
 #include "WavPlayer.h"
-#include "ContentCatalog.h"
-
-namespace {
-
-String jsonEscape(const String& input) {
-    String out;
-    out.reserve(input.length() + 8);
-    static const char* hex = "0123456789ABCDEF";
-
-    for (size_t i = 0; i < input.length(); i++) {
-        unsigned char c = static_cast<unsigned char>(input[i]);
-        switch (c) {
-            case '"':  out += "\\\""; break;
-            case '\\': out += "\\\\"; break;
-            case '\b': out += "\\b";  break;
-            case '\f': out += "\\f";  break;
-            case '\n': out += "\\n";  break;
-            case '\r': out += "\\r";  break;
-            case '\t': out += "\\t";  break;
-            default:
-                if (c < 0x20) {
-                    out += "\\u00";
-                    out += hex[c >> 4];
-                    out += hex[c & 0x0F];
-                } else {
-                    out += static_cast<char>(c);
-                }
-                break;
-        }
-    }
-
-    return out;
-}
-
-}  // namespace
+#include <esp_heap_caps.h>
+#include <esp_system.h>
+#include "JsonWriter.h"
+#include "PerfStats.h"
+#include "PressTrace.h"
+#include "TraceLog.h"
 
 // ---------------------------------------------------------------------------
 WavPlayer::WavPlayer(VolumeStream& output) : _output(output) {}
@@ -48,7 +19,9 @@ bool WavPlayer::begin() {
     Serial.printf("[WavPlayer] SD OK (SPI %lu MHz)\n",
                   static_cast<unsigned long>(SD_SPI_FREQUENCY_HZ / 1000000UL));
     // Claim the decode pipeline up-front, before SD/WAV traffic fragments the
-    // heap (same rationale as reserving the BT audio queue early).
+    // heap (same rationale as reserving the BT audio queue early). The
+    // read-ahead ring and task follow on the first openFile(); BT streaming
+    // hands them back through releaseReadAhead().
     ensureDecoder();
     return true;
 }
@@ -67,15 +40,226 @@ bool WavPlayer::ensureDecoder() {
     return true;
 }
 
+// ---------------------------------------------------------------------------
+bool WavPlayer::ensureReadAhead() {
+    if (_readerTask != nullptr) {
+        return true;
+    }
+    if (_fileMutex == nullptr) {
+        _fileMutex = xSemaphoreCreateMutex();
+    }
+    if (_ring == nullptr) {
+        _ring = xRingbufferCreate(SD_READAHEAD_RING_BYTES, RINGBUF_TYPE_BYTEBUF);
+    }
+    if (_readBuf == nullptr) {
+        _readBuf = static_cast<uint8_t*>(heap_caps_malloc(SD_READAHEAD_READ_BYTES, MALLOC_CAP_8BIT));
+    }
+    if (_fileMutex == nullptr || _ring == nullptr || _readBuf == nullptr) {
+        Serial.printf("[WavPlayer] Read-ahead allocation failed; reading inline (free=%u largest=%u)\n",
+                      heap_caps_get_free_size(MALLOC_CAP_8BIT),
+                      heap_caps_get_largest_free_block(MALLOC_CAP_8BIT));
+        return false;
+    }
+    _readerExit = false;
+    BaseType_t result = xTaskCreatePinnedToCore(
+        readerTaskEntry, "WavReadAhead", SD_READAHEAD_TASK_STACK_BYTES, this,
+        SD_READAHEAD_TASK_PRIORITY, &_readerTask, SD_READAHEAD_TASK_CORE);
+    if (result != pdPASS) {
+        _readerTask = nullptr;
+        Serial.printf("[WavPlayer] Read-ahead task allocation failed; reading inline (free=%u largest=%u)\n",
+                      heap_caps_get_free_size(MALLOC_CAP_8BIT),
+                      heap_caps_get_largest_free_block(MALLOC_CAP_8BIT));
+        return false;
+    }
+    Serial.printf("[WavPlayer] Read-ahead ready: %uB ring on core %d\n",
+                  static_cast<unsigned>(SD_READAHEAD_RING_BYTES), SD_READAHEAD_TASK_CORE);
+    return true;
+}
+
+// ---------------------------------------------------------------------------
+// releaseReadAhead() — give the ring, read buffer and reader task back to the
+// heap while A2DP owns the audio path. The task deletes itself once it sees
+// _readerExit; the mutex stays (a few bytes) so teardown() keeps working.
+// ---------------------------------------------------------------------------
+void WavPlayer::releaseReadAhead() {
+    stop();
+    if (_readerTask != nullptr) {
+        _readerExit = true;
+        xTaskNotifyGive(_readerTask);
+        for (int i = 0; i < 50 && _readerTask != nullptr; i++) {
+            vTaskDelay(pdMS_TO_TICKS(2));
+        }
+        if (_readerTask != nullptr) {
+            Serial.println("[WavPlayer] Read-ahead task did not exit; keeping its ring");
+            return;
+        }
+    }
+    if (_ring == nullptr && _readBuf == nullptr) {
+        return;
+    }
+    if (_ring != nullptr) {
+        vRingbufferDelete(_ring);
+        _ring = nullptr;
+    }
+    heap_caps_free(_readBuf);
+    _readBuf = nullptr;
+    Serial.printf("[WavPlayer] Read-ahead released (free=%u largest=%u)\n",
+                  heap_caps_get_free_size(MALLOC_CAP_8BIT),
+                  heap_caps_get_largest_free_block(MALLOC_CAP_8BIT));
+}
+
+// ---------------------------------------------------------------------------
+void WavPlayer::readerTaskEntry(void* arg) {
+    static_cast<WavPlayer*>(arg)->readerTask();
+}
+
+// ---------------------------------------------------------------------------
+// readerTask() — keep the ring topped up from _sdFile. The file is only touched
+// while holding _fileMutex, so teardown() can close it safely; the ring only
+// ever gains bytes here, so free space checked under the mutex stays free.
+// At the end of the data chunk a prepared next file is swapped in and read from
+// its first PCM byte, which makes the two tracks one continuous PCM stream.
+// Once releaseReadAhead() sets _readerExit the task clears its handle as its
+// last write to the player and deletes itself.
+// ---------------------------------------------------------------------------
+void WavPlayer::readerTask() {
+    while (!_readerExit) {
+        xSemaphoreTake(_fileMutex, portMAX_DELAY);
+        if (!_readerActive || _readerEof) {
+            xSemaphoreGive(_fileMutex);
+            ulTaskNotifyTake(pdTRUE, portMAX_DELAY);  // woken by openFile()
+            continue;
+        }
+        if (xRingbufferGetCurFreeSize(_ring) < SD_READAHEAD_READ_BYTES) {
+            xSemaphoreGive(_fileMutex);
+            vTaskDelay(pdMS_TO_TICKS(2));  // ~350 bytes of playback; ring stays near full
+            continue;
+        }
+
+        if (_readPos >= _readEnd) {
+            if (_nextReady) {
+                _sdFile.close();
+                _sdFile = _nextFile;
+                _nextFile = File();
+                _nextReady = false;
+                _sdFile.seek(_nextDataStart);
+                _readPos = _nextDataStart;
+                _readEnd = _nextDataEnd;
+                _boundaryBytes = _queuedBytes;
+                _handovers++;
+            } else {
+                _readerEof = true;  // set after the last send; see loop()
+            }
+            xSemaphoreGive(_fileMutex);
+            continue;
+        }
+
+        size_t want = _readEnd - _readPos;
+        if (want > SD_READAHEAD_READ_BYTES) want = SD_READAHEAD_READ_BYTES;
+        uint32_t startUs = micros();
+        int n = _sdFile.read(_readBuf, want);
+        uint32_t elapsedUs = micros() - startUs;
+        _reads++;
+        if (elapsedUs > _maxReadUs) _maxReadUs = elapsedUs;
+        PerfStats::record(PerfStats::Metric::SdRead, elapsedUs);
+        if (n > 0) {
+            xRingbufferSend(_ring, _readBuf, static_cast<size_t>(n), 0);
+            _readPos += static_cast<uint32_t>(n);
+            _queuedBytes += static_cast<uint32_t>(n);
+        } else {
+            _readEnd = _readPos;  // short file or read error: end this track here
+        }
+        xSemaphoreGive(_fileMutex);
+    }
+    _readerTask = nullptr;
+    vTaskDelete(nullptr);
+}
+
+// ---------------------------------------------------------------------------
+size_t WavPlayer::ringFill() const {
+    if (_ring == nullptr) return 0;
+    UBaseType_t bytesWaiting = 0;
+    vRingbufferGetInfo(_ring, nullptr, nullptr, nullptr, nullptr, &bytesWaiting);
+    return static_cast<size_t>(bytesWaiting);
+}
+
+// ---------------------------------------------------------------------------
+void WavPlayer::drainRing() {
+    if (_ring == nullptr) return;
+    while (true) {
+        size_t itemSize = 0;
+        void* item = xRingbufferReceiveUpTo(_ring, &itemSize, 0, SD_READAHEAD_RING_BYTES);
+        if (item == nullptr || itemSize == 0) break;
+        vRingbufferReturnItem(_ring, item);
+    }
+}
+
+// ---------------------------------------------------------------------------
+void WavPlayer::traceStats() {
+    TraceLog::record(TraceLog::Id::WavStats,
+                     static_cast<int32_t>(ringFill()),
+                     static_cast<int32_t>(_minFill),
+                     static_cast<int32_t>(_underruns),
+                     static_cast<int32_t>(_reads));
+    TraceLog::record(TraceLog::Id::WavStatsTiming,
+                     static_cast<int32_t>(_maxReadUs),
+                     static_cast<int32_t>(_lastGapUs),
+                     static_cast<int32_t>(SD_READAHEAD_RING_BYTES));
+}
+
+// ---------------------------------------------------------------------------
+void WavPlayer::resetFileStats() {
+    _ringPrimed = false;
+    _ringStarved = false;
+    _underruns = 0;
+    _minFill = 0;
+    _reads = 0;
+    _maxReadUs = 0;
+}
+
+// ---------------------------------------------------------------------------
+void WavPlayer::setContinuous(bool continuous) {
+    if (_continuous == continuous) return;
+    _continuous = continuous;
+    if (!continuous) {
+        cancelPreparedNext();
+    }
+}
+
+// ---------------------------------------------------------------------------
+bool WavPlayer::takeTrackChanged() {
+    bool changed = _trackChanged;
+    _trackChanged = false;
+    return changed;
+}
+
+// ---------------------------------------------------------------------------
+// writeToDecoder() — every PCM byte goes through here so the first write after
+// a track transition can record how long the decoder sat idle.
+// ---------------------------------------------------------------------------
+void WavPlayer::writeToDecoder(const uint8_t* data, size_t len) {
+    uint32_t nowUs = micros();
+    if (_trackEndedUs != 0) {
+        _lastGapUs = nowUs - _lastWriteUs;
+        _trackEndedUs = 0;
+        TraceLog::record(TraceLog::Id::WavDecoderIdle, static_cast<int32_t>(_lastGapUs));
+    }
+    _encodedOut->write(data, len);
+    PressTrace::mark(PressTrace::Stage::FirstWrite);
+    _lastWriteUs = nowUs;
+}
+
 // ---------------------------------------------------------------------------
 void WavPlayer::startSong(const String& theme) {
     stop();
+    _trackEndedUs = 0;  // a fresh start, not a track-to-track transition
+    ContentCatalog::ensureThemeLoaded(theme);
 
     const ContentCatalog::CachedTheme* t = ContentCatalog::findTheme(theme);
     bool shuffle = t ? t->shuffle : false;
 
     buildSongList(theme, shuffle);
-    if (_songCount == 0) {
+    if (_songEntries.empty()) {
         Serial.printf("[WavPlayer] No playable songs in theme %s\n", theme.c_str());
         return;
     }
@@ -88,9 +272,9 @@ void WavPlayer::startSong(const String& theme) {
 
 // ---------------------------------------------------------------------------
 void WavPlayer::nextSong() {
-    if (_songCount == 0) return;
+    if (_songEntries.empty()) return;
     stop();
-    _songCursor = (_songCursor + 1) % _songCount;
+    _songCursor = static_cast<uint16_t>((_songCursor + 1) % _songEntries.size());
     _idle       = false;
     _animalMode = false;
     openCurrentSong();
@@ -99,8 +283,9 @@ void WavPlayer::nextSong() {
 // ---------------------------------------------------------------------------
 void WavPlayer::startRandomAnimal() {
     stop();
+    _trackEndedUs = 0;
     buildAnimalList();
-    if (_animalCount == 0) {
+    if (_animalEntries.empty()) {
         Serial.println("[WavPlayer] No animal sounds");
         return;
     }
@@ -112,14 +297,15 @@ void WavPlayer::startRandomAnimal() {
 
 // ---------------------------------------------------------------------------
 void WavPlayer::nextAnimal() {
-    if (_animalCount == 0) {
+    if (_animalEntries.empty()) {
         startRandomAnimal();
         return;
     }
     stop();
-    _animalCursor = (_animalCursor + 1) % _animalCount;
+    _animalCursor = static_cast<uint16_t>((_animalCursor + 1) % _animalEntries.size());
     if (_animalCursor == 0) {
-        shuffleOrder(_animalOrder, _animalCount);
+        // New pass: reseed so every pass through the animals is a fresh order.
+        _animalOrder = ShuffleOrder::make(_animalOrder.count, _animalShuffle, esp_random());
     }
     _idle       = false;
     _animalMode = true;
@@ -145,18 +331,21 @@ bool WavPlayer::sdAvailable() {
 void WavPlayer::refreshSongList(const String& theme) {
     if (_idle || _animalMode) return;  // only relevant while a song is playing
 
-    const String current = _currentPath;
+    const int current = _currentSongEntry;
     const ContentCatalog::CachedTheme* t = ContentCatalog::findTheme(theme);
     bool shuffle = t ? t->shuffle : false;
+    cancelPreparedNext();              // may be a song that was just disabled
     buildSongList(theme, shuffle);     // rebuilt from cache; excludes disabled songs
+    _currentSongEntry = current;
 
     // Anchor the cursor on the song still playing so "next" advances from here.
     // If it was the one just disabled it won't be found; the cursor stays at 0
     // and the current file simply finishes before a valid one is chosen.
     _songCursor = 0;
-    for (int i = 0; i < _songCount; i++) {
-        if (_songFiles[_songOrder[i]] == current) {
-            _songCursor = i;
+    for (size_t i = 0; i < _songEntries.size(); i++) {
+        uint16_t position = static_cast<uint16_t>(i);
+        if (_songEntries[ShuffleOrder::at(_songOrder, position)] == current) {
+            _songCursor = position;
             break;
         }
     }
@@ -166,24 +355,73 @@ void WavPlayer::refreshSongList(const String& theme) {
 // loop() — feed up to CHUNK_BYTES of WAV data per call; detect end-of-file
 // ---------------------------------------------------------------------------
 void WavPlayer::loop() {
-    if (_idle || !_encodedOut || !_sdFile) return;
-
-    if (_sdFile.available()) {
-        uint8_t buf[CHUNK_BYTES];
-        int n = _sdFile.read(buf, CHUNK_BYTES);
-        if (n > 0) {
-            _encodedOut->write(buf, n);
-        }
-    } else {
-        // File exhausted
-        if (_animalMode) {
-            stop();
-            // Caller (StateMachine) detects isIdle() → WAV_FINISHED event
+    if (_idle || !_encodedOut || !_fileOpen) return;
+
+    if (_readerTask == nullptr) {
+        // No read-ahead task: read inline as before.
+        if (_sdFile.available()) {
+            uint8_t buf[CHUNK_BYTES];
+            uint32_t startUs = micros();
+            int n = _sdFile.read(buf, CHUNK_BYTES);
+            PerfStats::record(PerfStats::Metric::SdRead, micros() - startUs);
+            if (n > 0) {
+                writeToDecoder(buf, n);
+            }
         } else {
-            // One button press should play exactly one song. Advancing to the
-            // next song is an explicit button action handled by nextSong().
+            _trackEndedUs = micros();
             stop();
         }
+        return;
+    }
+
+    // Near the end of a song in loop mode, line up the next one.
+    if (_continuous && !_animalMode && !_nextAttempted &&
+        _readEnd - _readPos <= GAPLESS_PREPARE_BEFORE_END_MS *
+            static_cast<uint32_t>(SAMPLE_RATE * CHANNELS * (BITS_PER_SAMPLE / 8) / 1000)) {
+        prepareNextSong();
+    }
+
+    // Sample EOF before draining: the reader sets it after its last send, so
+    // an empty ring seen after EOF really means the whole file was played.
+    const bool eof = _readerEof;
+    size_t fill = ringFill();
+    if (_ringPrimed && fill < _minFill) _minFill = fill;
+
+    size_t drained = 0;
+    while (drained < static_cast<size_t>(CHUNK_BYTES)) {
+        size_t n = 0;
+        auto* data = static_cast<uint8_t*>(
+            xRingbufferReceiveUpTo(_ring, &n, 0, CHUNK_BYTES - drained));
+        if (data == nullptr || n == 0) break;
+        writeToDecoder(data, n);
+        vRingbufferReturnItem(_ring, data);
+        drained += n;
+    }
+    _drainedBytes += drained;
+    // Wrap-safe "drained >= boundary": a long loop-mode chain never reopens.
+    if (_handoversSeen != _handovers &&
+        static_cast<int32_t>(_drainedBytes - _boundaryBytes) >= 0) {
+        finishHandover();
+    }
+
+    if (drained > 0) {
+        if (!_ringPrimed) {
+            _ringPrimed = true;
+            _minFill = fill;
+        }
+        _ringStarved = false;
+    } else if (eof) {
+        _trackEndedUs = micros();
+        // File exhausted. Animals: the caller (StateMachine) detects isIdle()
+        // → WAV_FINISHED. Songs: one button press plays exactly one song;
+        // advancing is an explicit button action handled by nextSong().
+        stop();
+    } else if (_ringPrimed && !_ringStarved) {
+        _ringStarved = true;
+        _underruns++;
+        TraceLog::record(TraceLog::Id::WavUnderrun,
+                         static_cast<int32_t>(_underruns),
+                         static_cast<int32_t>(_maxReadUs));
     }
 }
 
@@ -191,11 +429,16 @@ void WavPlayer::loop() {
 // Private: open an SD file and wire it through a fresh WAVDecoder
 // ---------------------------------------------------------------------------
 bool WavPlayer::openCurrentSong() {
-    for (int attempts = 0; attempts < _songCount; attempts++) {
-        if (openFile(_songFiles[_songOrder[_songCursor]])) {
+    const ContentCatalog::CachedTheme* t = ContentCatalog::findTheme(_songTheme);
+    const size_t count = _songEntries.size();
+    for (size_t attempts = 0; t != nullptr && attempts < count; attempts++) {
+        uint16_t entry = _songEntries[ShuffleOrder::at(_songOrder, _songCursor)];
+        if (entry < t->songCount &&
+            openFile(String(SONGS_ROOT) + "/" + _songTheme + "/" + t->songs()[entry].file())) {
+            _currentSongEntry = entry;
             return true;
         }
-        _songCursor = (_songCursor + 1) % _songCount;
+        _songCursor = static_cast<uint16_t>((_songCursor + 1) % count);
     }
 
     Serial.println("[WavPlayer] No playable song files");
@@ -205,13 +448,17 @@ bool WavPlayer::openCurrentSong() {
 
 // ---------------------------------------------------------------------------
 bool WavPlayer::openCurrentAnimal() {
-    for (int attempts = 0; attempts < _animalCount; attempts++) {
-        if (openFile(_animalFiles[_animalOrder[_animalCursor]])) {
+    const ContentCatalog::CachedTheme* t = ContentCatalog::findTheme(ANIMALS_THEME_ID);
+    const size_t count = _animalEntries.size();
+    for (size_t attempts = 0; t != nullptr && attempts < count; attempts++) {
+        uint16_t entry = _animalEntries[ShuffleOrder::at(_animalOrder, _animalCursor)];
+        if (entry < t->songCount &&
+            openFile(String(ANIMALS_PATH) + "/" + t->songs()[entry].file())) {
             return true;
         }
-        _animalCursor = (_animalCursor + 1) % _animalCount;
+        _animalCursor = static_cast<uint16_t>((_animalCursor + 1) % count);
         if (_animalCursor == 0) {
-            shuffleOrder(_animalOrder, _animalCount);
+            _animalOrder = ShuffleOrder::make(_animalOrder.count, _animalShuffle, esp_random());
         }
     }
 
@@ -221,37 +468,47 @@ bool WavPlayer::openCurrentAnimal() {
 }
 
 // ---------------------------------------------------------------------------
-bool WavPlayer::openFile(const String& path) {
-    teardown();  // ensure clean state
-
-    _sdFile = SD.open(path.c_str());
-    if (!_sdFile) {
-        _currentPath = "";
+// openValidated() — open `path` and check its header; on success the file is
+// positioned at 0 and `info` describes its data chunk.
+// ---------------------------------------------------------------------------
+bool WavPlayer::openValidated(const String& path, File& file, ContentCatalog::WavInfo& info) {
+    file = SD.open(path.c_str());
+    if (!file) {
         Serial.printf("[WavPlayer] Cannot open: %s\n", path.c_str());
         return false;
     }
 
-    ContentCatalog::WavInfo wavInfo = ContentCatalog::inspectWav(_sdFile);
-    if (wavInfo.sizeBytes < 44) {
+    info = ContentCatalog::inspectWav(file);
+    if (info.sizeBytes < 44) {
         Serial.printf("[WavPlayer] Skipping too-small WAV: %s (%u bytes)\n",
-                      path.c_str(), static_cast<unsigned>(_sdFile.size()));
-        _sdFile.close();
-        _currentPath = "";
+                      path.c_str(), static_cast<unsigned>(file.size()));
+        file.close();
         return false;
     }
-    if (!wavInfo.valid) {
+    if (!info.valid) {
         Serial.printf("[WavPlayer] Skipping invalid WAV: %s (%u bytes)\n",
-                      path.c_str(), static_cast<unsigned>(_sdFile.size()));
-        _sdFile.close();
-        _currentPath = "";
+                      path.c_str(), static_cast<unsigned>(file.size()));
+        file.close();
         return false;
     }
-    if (!wavInfo.supported) {
+    if (!info.supported) {
         Serial.printf("[WavPlayer] Skipping unsupported WAV: %s (format=%u rate=%lu channels=%u bits=%u)\n",
-                      path.c_str(), wavInfo.audioFormat,
-                      static_cast<unsigned long>(wavInfo.sampleRate),
-                      wavInfo.channels, wavInfo.bitsPerSample);
-        _sdFile.close();
+                      path.c_str(), info.audioFormat,
+                      static_cast<unsigned long>(info.sampleRate),
+                      info.channels, info.bitsPerSample);
+        file.close();
+        return false;
+    }
+    return true;
+}
+
+// ---------------------------------------------------------------------------
+bool WavPlayer::openFile(const String& path) {
+    PressTrace::mark(PressTrace::Stage::Lookup);
+    teardown();  // ensure clean state
+
+    ContentCatalog::WavInfo wavInfo;
+    if (!openValidated(path, _sdFile, wavInfo)) {
         _currentPath = "";
         return false;
     }
@@ -264,71 +521,175 @@ bool WavPlayer::openFile(const String& path) {
     // Reuse the persistent decoder; begin() resets per-file state (the library
     // requires begin() before each new WAV) so no reallocation is needed.
     _encodedOut->begin();
+    PressTrace::mark(PressTrace::Stage::Opened);
+
+    _fileOpen = true;
+    resetFileStats();
+    _nextAttempted = false;
+    if (ensureReadAhead()) {
+        // Hand the file to the read-ahead task (inspectWav() left it at 0).
+        // The ring is empty here (teardown() drained it), so both byte
+        // counters restart together.
+        xSemaphoreTake(_fileMutex, portMAX_DELAY);
+        _queuedBytes = 0;
+        _drainedBytes = 0;
+        _handoversSeen = _handovers;
+        _readPos = 0;
+        _readEnd = wavInfo.dataOffset + wavInfo.dataBytes;
+        _readerEof = false;
+        _readerActive = true;
+        xSemaphoreGive(_fileMutex);
+        xTaskNotifyGive(_readerTask);
+    }
 
     _currentPath = path;
     Serial.printf("[WavPlayer] Playing: %s\n", path.c_str());
     return true;
 }
 
+// ---------------------------------------------------------------------------
+// prepareNextSong() — open the song after the current one (skipping files that
+// no longer open or validate) and offer it to the reader for a gapless swap.
+// Runs on the main loop, one attempt per track.
+// ---------------------------------------------------------------------------
+void WavPlayer::prepareNextSong() {
+    _nextAttempted = true;
+    const ContentCatalog::CachedTheme* t = ContentCatalog::findTheme(_songTheme);
+    const size_t count = _songEntries.size();
+    if (t == nullptr || count == 0 || _readerTask == nullptr) return;
+
+    uint16_t cursor = _songCursor;
+    for (size_t attempts = 0; attempts < count; attempts++) {
+        cursor = static_cast<uint16_t>((cursor + 1) % count);
+        uint16_t entry = _songEntries[ShuffleOrder::at(_songOrder, cursor)];
+        if (entry >= t->songCount) continue;
+
+        String path = String(SONGS_ROOT) + "/" + _songTheme + "/" + t->songs()[entry].file();
+        File file;
+        ContentCatalog::WavInfo info;
+        if (!openValidated(path, file, info)) continue;
+
+        xSemaphoreTake(_fileMutex, portMAX_DELAY);
+        bool stillPlaying = _readerActive && !_readerEof;
+        if (stillPlaying) {
+            _nextFile = file;
+            _nextDataStart = info.dataOffset;
+            _nextDataEnd = info.dataOffset + info.dataBytes;
+            _nextReady = true;
+        }
+        xSemaphoreGive(_fileMutex);
+        if (!stillPlaying) {
+            file.close();  // the reader already hit the end; normal next-song path
+            return;
+        }
+        _nextPath = path;
+        _nextEntry = entry;
+        _nextCursor = cursor;
+        Serial.printf("[WavPlayer] Next prepared: %s\n", path.c_str());
+        return;
+    }
+}
+
+// ---------------------------------------------------------------------------
+void WavPlayer::cancelPreparedNext() {
+    if (_fileMutex != nullptr) {
+        xSemaphoreTake(_fileMutex, portMAX_DELAY);
+        if (_nextReady) {
+            _nextFile.close();
+            _nextFile = File();
+            _nextReady = false;
+        }
+        xSemaphoreGive(_fileMutex);
+    }
+    _nextAttempted = false;
+}
+
+// ---------------------------------------------------------------------------
+// finishHandover() — the decoder has consumed the last byte of the previous
+// song; from here on the output is the prepared one.
+// ---------------------------------------------------------------------------
+void WavPlayer::finishHandover() {
+    _handoversSeen = _handovers;
+    traceStats();
+    resetFileStats();
+    _lastGapUs = 0;  // one continuous PCM stream: no decoder idle at all
+    _currentPath = _nextPath;
+    _currentSongEntry = _nextEntry;
+    _songCursor = _nextCursor;
+    _nextAttempted = false;
+    _trackChanged = true;
+    Serial.printf("[WavPlayer] Gapless: %s\n", _currentPath.c_str());
+}
+
 // ---------------------------------------------------------------------------
 void WavPlayer::teardown() {
-    if (_sdFile)     { _sdFile.close(); }
+    if (_fileOpen && _ringPrimed) {
+        traceStats();
+    }
+    // Take the file back from the read-ahead task before closing it; any read
+    // in progress finishes first. Bytes left in the ring belong to this file.
+    if (_fileMutex != nullptr) {
+        xSemaphoreTake(_fileMutex, portMAX_DELAY);
+        _readerActive = false;
+        if (_sdFile) { _sdFile.close(); }
+        if (_nextReady) {
+            _nextFile.close();
+            _nextFile = File();
+            _nextReady = false;
+        }
+        xSemaphoreGive(_fileMutex);
+        drainRing();
+        _handoversSeen = _handovers;  // a swap the decoder never reached
+    } else if (_sdFile) {
+        _sdFile.close();
+    }
+    _fileOpen = false;
     // Reset the decoder for the next file but keep it allocated for reuse.
     // The pipeline is intentionally never freed (WavPlayer is a lifetime-long
     // singleton); end() returns it to an inactive, ready-to-begin() state.
     if (_encodedOut) { _encodedOut->end(); }
     _currentPath = "";
+    _currentSongEntry = -1;
 }
 
 // ---------------------------------------------------------------------------
-void WavPlayer::buildSongList(const String& theme, bool shuffle) {
-    _songCount = 0;
-    const ContentCatalog::CachedTheme* t = ContentCatalog::findTheme(theme);
-    if (t != nullptr) {
-        String base = String(SONGS_ROOT) + "/" + theme + "/";
-        for (const ContentCatalog::CachedSong& s : t->songs) {
-            if (_songCount >= MAX_SONGS) break;
-            if (s.supported && !s.disabled) {
-                _songFiles[_songCount++] = base + s.file;
-            }
+// static — catalog indices of the songs that would actually play, in catalog
+// (filename) order. Capped so the count still fits a uint16 rotation.
+void WavPlayer::collectPlayable(const ContentCatalog::CachedTheme* theme,
+                                std::vector<uint16_t>& entries) {
+    entries.clear();
+    if (theme == nullptr) return;
+    entries.reserve(theme->playableCount());
+    const ContentCatalog::SongRange songs = theme->songs();
+    const size_t total = songs.size();
+    for (size_t i = 0; i < total && i < UINT16_MAX; i++) {
+        const ContentCatalog::CachedSong& s = songs[i];
+        if (s.supported() && !s.disabled) {
+            entries.push_back(static_cast<uint16_t>(i));
         }
     }
-
-    for (int i = 0; i < _songCount; i++) _songOrder[i] = i;
-    if (shuffle) {
-        shuffleOrder(_songOrder, _songCount);
+    if (total > UINT16_MAX) {
+        Serial.printf("[WavPlayer] Theme %s has %u files; only the first %u are playable\n",
+                      theme->id(), static_cast<unsigned>(total),
+                      static_cast<unsigned>(UINT16_MAX));
     }
 }
 
 // ---------------------------------------------------------------------------
-void WavPlayer::buildAnimalList() {
-    _animalCount = 0;
-    const ContentCatalog::CachedTheme* t = ContentCatalog::findTheme(ANIMALS_THEME_ID);
-    bool shuffle = t ? t->shuffle : true;
-    if (t != nullptr) {
-        String base = String(ANIMALS_PATH) + "/";
-        for (const ContentCatalog::CachedSong& s : t->songs) {
-            if (_animalCount >= MAX_ANIMALS) break;
-            if (s.supported && !s.disabled) {
-                _animalFiles[_animalCount++] = base + s.file;
-            }
-        }
-    }
-
-    for (int i = 0; i < _animalCount; i++) _animalOrder[i] = i;
-    if (shuffle) {
-        shuffleOrder(_animalOrder, _animalCount);
-    }
+void WavPlayer::buildSongList(const String& theme, bool shuffle) {
+    _songTheme = theme;
+    collectPlayable(ContentCatalog::findTheme(theme), _songEntries);
+    _songOrder = ShuffleOrder::make(static_cast<uint16_t>(_songEntries.size()),
+                                    shuffle, esp_random());
 }
 
 // ---------------------------------------------------------------------------
-void WavPlayer::shuffleOrder(int* order, int count) {
-    for (int i = count - 1; i > 0; i--) {
-        int j = random(i + 1);
-        int tmp  = order[i];
-        order[i] = order[j];
-        order[j] = tmp;
-    }
+void WavPlayer::buildAnimalList() {
+    const ContentCatalog::CachedTheme* t = ContentCatalog::findTheme(ANIMALS_THEME_ID);
+    _animalShuffle = t ? t->shuffle : true;
+    collectPlayable(t, _animalEntries);
+    _animalOrder = ShuffleOrder::make(static_cast<uint16_t>(_animalEntries.size()),
+                                      _animalShuffle, esp_random());
 }
 
 // ---------------------------------------------------------------------------
@@ -350,8 +711,8 @@ int WavPlayer::listThemes(String* outIds, String* outNames, int maxThemes) {
                           maxThemes);
             break;
         }
-        outIds[count] = t.id;
-        outNames[count] = t.name;
+        outIds[count] = t.id();
+        outNames[count] = t.name();
         count++;
     }
     return count;
@@ -361,26 +722,36 @@ int WavPlayer::listThemes(String* outIds, String* outNames, int maxThemes) {
 // static
 String WavPlayer::buildThemesJson(const String* ids, const String* names,
                                   int count, size_t maxBytes) {
-    String json = "[";
+    char buffer[BLE_THEMES_MAX_BYTES + 1];
+    if (maxBytes > BLE_THEMES_MAX_BYTES) maxBytes = BLE_THEMES_MAX_BYTES;
+    JsonWriter out(buffer, maxBytes + 1);
     bool truncated = false;
 
+    out.raw("[");
     for (int i = 0; i < count; i++) {
-        String entry = "{\"id\":\"" + jsonEscape(ids[i]) +
-                       "\",\"name\":\"" + jsonEscape(names[i]) + "\"}";
-        size_t commaBytes = (json.length() > 1) ? 1 : 0;
-        size_t projected = json.length() + commaBytes + entry.length() + 1;
-        if (projected > maxBytes) {
+        size_t mark = out.mark();
+        if (i > 0) out.raw(",");
+        // Catalog themes carry their names pre-escaped; anything else is
+        // escaped here.
+        const ContentCatalog::CachedTheme* t = ContentCatalog::findTheme(ids[i]);
+        if (t != nullptr && names[i] == t->name()) {
+            out.raw("{\"id\":").escaped(t->idJson()).raw(",\"name\":").escaped(t->nameJson());
+        } else {
+            out.raw("{\"id\":").str(ids[i].c_str(), ids[i].length());
+            out.raw(",\"name\":").str(names[i].c_str(), names[i].length());
+        }
+        out.raw("}");
+        if (out.overflowed() || out.remaining() < 1) {  // keep room for "]"
+            out.rewind(mark);
             truncated = true;
             break;
         }
-        if (commaBytes) json += ",";
-        json += entry;
     }
+    out.raw("]");
 
-    json += "]";
     if (truncated) {
         Serial.printf("[WavPlayer] BLE theme list truncated to %u bytes\n",
-                      static_cast<unsigned>(json.length()));
+                      static_cast<unsigned>(out.length()));
     }
-    return json;
+    return String(out.c_str());
 }
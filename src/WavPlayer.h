@@ -3,15 +3,26 @@
 #include <SD.h>
 #include <SPI.h>
 #include <ArduinoJson.h>
+#include <vector>
+#include <freertos/FreeRTOS.h>
+#include <freertos/ringbuf.h>
+#include <freertos/semphr.h>
 #include "AudioTools.h"
 #include "Config.h"
+#include "ContentCatalog.h"
+#include "ShuffleOrder.h"
 
 // ---------------------------------------------------------------------------
 // WavPlayer — plays WAV files from SD card through a shared VolumeStream
 //
-// Design: we manage our own file list and open SD files directly.
-// A WAVDecoder is fed raw file bytes each loop(); decoded PCM flows into
-// the shared VolumeStream → I2SStream → MAX98357A.
+// Design: the rotation is a compact list of uint16 indices into the theme's
+// CachedTheme::songs, walked through a seeded ShuffleOrder; the SD path is
+// built only when a file is opened, so large themes cost two bytes per song.
+// A read-ahead task pinned to SD_READAHEAD_TASK_CORE keeps a byte ring filled
+// from the open file; loop() only drains the ring into the WAVDecoder, so a
+// slow SD operation on the main loop (FAT cluster walk, config write) no longer
+// stalls audio. Decoded PCM flows into the shared VolumeStream → I2SStream →
+// MAX98357A.
 //
 // Two modes:
 //   Song mode   — sequential (or shuffled) WAV files from a theme folder
@@ -50,6 +61,10 @@ public:
     // Stop immediately and free resources
     void stop();
 
+    // Stop and free the SD read-ahead ring, buffer and task (about 17 KB) for
+    // BT streaming; the next local file allocates them again.
+    void releaseReadAhead();
+
     // Best-effort runtime probe: true if the SD card is currently readable.
     // Used to distinguish "card removed" from "folder empty" after a failed
     // play. (Boot-time mount success does not stay valid if the card is pulled.)
@@ -71,6 +86,19 @@ public:
     // Update volume (0.0–1.0) on the shared VolumeStream
     void setVolume(float v) { _output.setVolume(v); }
 
+    // Continuous (loop-mode) song playback: while the current song is in its
+    // last GAPLESS_PREPARE_BEFORE_END_MS, open and validate the next song of the
+    // rotation and hand its PCM to the decoder right after the current song's
+    // last sample, without restarting the decoder. Off by default.
+    void setContinuous(bool continuous);
+
+    // True once after a gapless handover changed currentPath().
+    bool takeTrackChanged();
+
+    // Trace read-ahead ring fill, low-water mark, underruns, slowest SD read and
+    // decoder idle time between tracks for the current (or just finished) file.
+    void traceStats();
+
     // List playable song themes from the in-RAM catalog; fills sorted id/name arrays
     static int listThemes(String* outIds, String* outNames, int maxThemes);
 
@@ -80,8 +108,6 @@ public:
 
 private:
     static constexpr int CHUNK_BYTES = 2048;
-    static constexpr int MAX_SONGS   = 64;
-    static constexpr int MAX_ANIMALS = 32;
 
     VolumeStream&       _output;
     // Decode pipeline (WAVDecoder -> VolumeStream). Allocated once via
@@ -89,31 +115,95 @@ private:
     // begin()/end() rather than reallocating, to avoid heap fragmentation.
     WAVDecoder*         _wavDecoder = nullptr;
     EncodedAudioOutput* _encodedOut = nullptr;
-    File                _sdFile;
+    File                _sdFile;          // owned by the read-ahead task while open
+    bool                _fileOpen = false;
     String              _currentPath;
 
+    // Read-ahead: the task reads _sdFile into _ring under _fileMutex; loop()
+    // drains _ring. If the ring or task cannot be allocated, loop() falls back
+    // to reading the file directly.
+    RingbufHandle_t     _ring = nullptr;
+    SemaphoreHandle_t   _fileMutex = nullptr;
+    TaskHandle_t        _readerTask = nullptr;
+    volatile bool       _readerActive = false;
+    volatile bool       _readerEof = false;
+    volatile bool       _readerExit = false;
+    uint8_t*            _readBuf = nullptr;   // SD_READAHEAD_READ_BYTES, with the ring
+
+    // Read window of the open file: the reader stops at _readEnd (end of the
+    // data chunk, so trailing chunks never reach the decoder).
+    volatile uint32_t _readPos = 0;
+    volatile uint32_t _readEnd = 0;
+
+    // Gapless handover. Main prepares _nextFile; the reader swaps it in at
+    // _readEnd and records the ring byte count where the new track starts;
+    // main switches currentPath() once it has drained past that boundary.
+    bool              _continuous = false;
+    File              _nextFile;           // guarded by _fileMutex
+    volatile bool     _nextReady = false;
+    uint32_t          _nextDataStart = 0;
+    uint32_t          _nextDataEnd = 0;
+    bool              _nextAttempted = false;  // main-only: one try per track
+    String            _nextPath;
+    int               _nextEntry = -1;
+    uint16_t          _nextCursor = 0;
+    volatile uint32_t _queuedBytes = 0;    // total bytes the reader sent
+    uint32_t          _drainedBytes = 0;   // total bytes loop() drained
+    volatile uint32_t _boundaryBytes = 0;
+    volatile uint32_t _handovers = 0;
+    uint32_t          _handoversSeen = 0;
+    bool              _trackChanged = false;
+
+    // Decoder idle between the end of one track and the next one's first byte
+    uint32_t          _lastWriteUs = 0;
+    uint32_t          _trackEndedUs = 0;   // 0 when no transition is pending
+    uint32_t          _lastGapUs = 0;
+
+    // Per-file read-ahead stats
+    bool              _ringPrimed  = false;  // first data seen for this file
+    bool              _ringStarved = false;  // ring currently empty mid-file
+    uint32_t          _underruns   = 0;
+    size_t            _minFill     = 0;
+    volatile uint32_t _maxReadUs   = 0;
+    volatile uint32_t _reads       = 0;
+
     bool _idle       = true;
     bool _animalMode = false;
 
-    // Song list built on startSong()
-    String _songFiles[MAX_SONGS];
-    int    _songOrder[MAX_SONGS];  // permuted or identity
-    int    _songCount  = 0;
-    int    _songCursor = 0;        // index into _songOrder
+    // Song rotation built on startSong(): playable entries of _songTheme
+    String                _songTheme;
+    std::vector<uint16_t> _songEntries;   // indices into CachedTheme::songs
+    ShuffleOrder::Order   _songOrder;     // permuted or identity
+    uint16_t              _songCursor = 0;  // position in _songOrder
+    int                   _currentSongEntry = -1;
 
-    String _animalFiles[MAX_ANIMALS];
-    int    _animalOrder[MAX_ANIMALS];
-    int    _animalCount  = 0;
-    int    _animalCursor = 0;     // index into _animalOrder
+    std::vector<uint16_t> _animalEntries;
+    ShuffleOrder::Order   _animalOrder;
+    uint16_t              _animalCursor = 0;
+    bool                  _animalShuffle = true;
 
     void buildSongList(const String& theme, bool shuffle);
     void buildAnimalList();
-    void shuffleOrder(int* order, int count);
+    static void collectPlayable(const ContentCatalog::CachedTheme* theme,
+                                std::vector<uint16_t>& entries);
     bool openCurrentSong();
     bool openCurrentAnimal();
     bool openFile(const String& path);
+    bool openValidated(const String& path, File& file, ContentCatalog::WavInfo& info);
+    void prepareNextSong();
+    void cancelPreparedNext();
+    void finishHandover();
+    void resetFileStats();
+    void writeToDecoder(const uint8_t* data, size_t len);
     void teardown();
 
     // Allocate the decode pipeline exactly once; returns false on alloc failure.
     bool ensureDecoder();
+
+    // Allocate the read-ahead ring, buffer, mutex and task if not present.
+    bool ensureReadAhead();
+    static void readerTaskEntry(void* arg);
+    void readerTask();
+    size_t ringFill() const;
+    void drainRing();
 };
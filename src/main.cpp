@@ -5,6 +5,7 @@
 #include <esp_random.h>
 #include <esp_bt_device.h>
 #include <esp_gap_bt_api.h>
+#include <esp_ota_ops.h>
 #include <esp_sleep.h>
 #include <sys/time.h>
 #include <time.h>
@@ -20,7 +21,14 @@
 #include "NVSConfig.h"
 #include "ParentConfig.h"
 #include "ContentCatalog.h"
+#include "JsonWriter.h"
+#include "MemoryReport.h"
 #include "BedtimeMode.h"
+#include "BootTrace.h"
+#include "PerfStats.h"
+#include "PrefetchTuner.h"
+#include "PressTrace.h"
+#include "TraceLog.h"
 #include "PeripheralPower.h"
 #include "ButtonHandler.h"
 #include "WavPlayer.h"
@@ -42,7 +50,15 @@ StateMachine    sm;
 I2SStream       i2sOut;
 VolumeStream    volumeOut;
 WavPlayer       wavPlayer(volumeOut);
-BluetoothA2DPSink* btSink = nullptr;
+LowLatencyA2DPSinkQueued* btSink = nullptr;
+// Prefetch level of the A2DP ring, retuned from its underflow/drop counters.
+PrefetchTuner btPrefetch({BT_A2DP_PREFETCH_MIN_PCT, BT_A2DP_PREFETCH_MAX_PCT,
+                          BT_A2DP_PREFETCH_START_PCT, BT_A2DP_PREFETCH_STEP_PCT,
+                          BT_A2DP_PREFETCH_WINDOW_MS, BT_A2DP_PREFETCH_CALM_WINDOWS});
+bool btPrefetchLinked = false;
+bool btPrefetchStreaming = false;
+uint32_t btRxTraceAtMs = 0;
+uint32_t btRxTraceBytes = 0;
 
 // Track previous state to detect transitions in the main loop
 State prevState = State::IDLE;
@@ -54,6 +70,11 @@ String currentDeviceName = DEFAULT_BT_NAME;
 String themeIds[BLE_MAX_THEMES];
 String themeNames[BLE_MAX_THEMES];
 String bleThemesJson = "[]";
+// Every config response is written here, then copied into the characteristic.
+char configResponseBuf[BLE_CONFIG_RESPONSE_MAX_BYTES + 1];
+JsonWriter configResponse(configResponseBuf, sizeof(configResponseBuf));
+// Kept off the loop stack, which is one of the stacks it measures.
+MemoryReport::Snapshot memorySnapshot;
 int themeCount = 0;
 uint8_t currentVolumePct = DEFAULT_VOLUME_PCT;
 uint8_t currentEffectiveVolumePct = DEFAULT_VOLUME_PCT;
@@ -71,6 +92,8 @@ static const uint32_t BT_SETTLE_MS = 400;
 uint32_t btConnectedAtMs = 0;
 bool btSettleBlePublishPending = false;
 bool wokeFromVibration = false;
+bool bootTraceEmitted = false;
+uint32_t lastLoopStartUs = 0;
 bool realActivitySeenSinceWake = false;
 bool lastBleConnected = false;
 uint32_t lastActivityMs = 0;
@@ -83,6 +106,37 @@ bool lastBedtimeActive = false;
 String bedtimeThemeOverride;
 String lastInvalidBedtimeThemeLog;
 
+// Writable settings carried by setConfig/patchConfig. configVersion counts
+// changes since boot and is echoed in every config response.
+struct ConfigValues {
+    String   deviceName;
+    uint8_t  defaultVolumePct = DEFAULT_VOLUME_PCT;
+    String   defaultTheme;
+    bool     sleepEnabled = DEFAULT_SLEEP_ENABLED;
+    uint32_t sleepNormalIdleSec = 0;
+    uint32_t sleepVibrationWakeIdleSec = 0;
+    uint32_t sleepBleIdleSec = 0;
+    bool     bedtimeEnabled = DEFAULT_BEDTIME_ENABLED;
+    uint16_t bedtimeStartMinutes = DEFAULT_BEDTIME_START_MINUTES;
+    uint16_t bedtimeEndMinutes = DEFAULT_BEDTIME_END_MINUTES;
+    String   bedtimeTheme;
+    uint8_t  bedtimeVolumeCapPct = DEFAULT_BEDTIME_VOLUME_CAP_PCT;
+};
+uint32_t configVersion = 1;
+
+// Parts of a `batch` config edit received so far; applied together when the
+// part marked "commit" arrives.
+enum class BatchEditKind : uint8_t { Invalid, Song, ThemeEnabled, ThemeShuffle };
+struct BatchEdit {
+    BatchEditKind kind = BatchEditKind::Invalid;
+    String theme;
+    String file;
+    bool value = false;
+};
+std::vector<BatchEdit> pendingBatchEdits;
+uint32_t pendingBatchId = 0;
+int pendingBatchNextPart = 0;
+
 RTC_DATA_ATTR uint32_t rtcBedtimeClockMagic = 0;
 RTC_DATA_ATTR int16_t rtcBedtimeTzOffsetMin = 0;
 static constexpr uint32_t RTC_BEDTIME_CLOCK_MAGIC = 0xBED71AAB;
@@ -100,15 +154,20 @@ void printBluetoothAddress(const char* label);
 void scheduleBluetoothReopen(const char* reason);
 void reopenBluetoothForPairing(const char* reason);
 void pollBluetoothReopen();
+void pollA2dpPrefetch();
 void applyVolume(uint8_t pct);
-void applyEffectiveVolume(const char* reason);
+void applyEffectiveVolume(TraceLog::VolumeReason reason);
 uint8_t effectiveVolumePct();
 void handleStateEntry(State prev, State next);
 bool processStateMachineTransitions();
 bool handleBleControls();
 void handleBleConfigCommands();
 void handleBleConfigCommand(const String& commandJson);
-void handleBleCommand(uint8_t command);
+void handleBatchConfigCommand(uint32_t requestId, JsonDocument& doc);
+uint8_t validateBatchEdit(const BatchEdit& edit);
+void writeBatchEdits(JsonWriter& out, uint32_t requestId);
+void handleBleCommand(uint8_t command, uint32_t writtenAtUs);
+void beginPressTrace(PressTrace::Source source, const char* action, uint32_t pressUs);
 void publishBleValues();
 void sendNotice(const String& severity, const String& message);
 void notifyPlaybackFailure(bool animal);
@@ -126,16 +185,14 @@ bool bedtimeAutomaticActive();
 bool bedtimeRuntimeActive();
 void setBedtimeRuntimeActive(bool active, const char* reason);
 void clearExpiredBedtimeOverride();
-String bedtimeEffectiveSongTheme();
-String bedtimeOverrideName();
+const String& bedtimeEffectiveSongTheme();
 String bedtimeTimeString(uint16_t minuteOfDay);
-String bedtimeCurrentTimeString();
 uint16_t parseBedtimeTimeString(const char* value, uint16_t fallback);
 void markActivity(const char* reason);
 void markBleActivity(const char* reason);
 void pollBleConnectionState();
 uint32_t currentSleepTimeoutMs();
-uint32_t readSleepSeconds(JsonObjectConst sleep, const char* key, uint32_t fallbackMs);
+uint32_t readSleepSeconds(JsonVariantConst value, uint32_t fallbackSec);
 bool bleIdleAllowsSleep();
 bool stateAllowsIdleSleep(State state);
 bool canEnterIdleSleep();
@@ -147,9 +204,21 @@ void refreshThemeList();
 void applyActiveThemeFallback();
 void applyDeviceName(const String& deviceName);
 void applyPendingBtNameIfPossible();
-String buildConfigResponse(uint32_t requestId);
-String buildConfigOkResponse(uint32_t requestId, const String& op);
-String buildConfigErrorResponse(uint32_t requestId, const String& message);
+ConfigValues currentConfigValues();
+bool mergeConfigFields(JsonObjectConst fields, ConfigValues& next, bool strict, String& error);
+bool sameSdConfig(const ConfigValues& a, const ConfigValues& b);
+bool sameBedtimeConfig(const ConfigValues& a, const ConfigValues& b);
+bool commitConfigValues(const ConfigValues& current, const ConfigValues& next,
+                        bool force, bool bedtimeTouched);
+void writeConfigResponse(JsonWriter& out, uint32_t requestId);
+void writeTimeOfDay(JsonWriter& out, uint16_t minuteOfDay);
+void writeA2dpStats(JsonWriter& out, uint32_t requestId);
+void captureMemory();
+void printMemoryReport();
+void sendConfigResponse(uint32_t requestId);
+void replyConfig(uint32_t requestId);
+void replyConfigOk(uint32_t requestId, const char* op);
+void replyConfigError(uint32_t requestId, const char* message);
 bool isKnownTheme(const String& theme);
 String themeDisplayName(const String& theme);
 String fileNameOf(const String& path);
@@ -163,32 +232,33 @@ static void btConnectionStateChanged(esp_a2d_connection_state_t state,
     if (state == ESP_A2D_CONNECTION_STATE_CONNECTED) {
         btLinkConnected = true;
         btConnectedAtMs = millis();
-        Serial.printf("[BT] Connected (free=%u largest=%u)\n",
-                      ESP.getFreeHeap(), ESP.getMaxAllocHeap());
+        TraceLog::record(TraceLog::Id::BtConnected,
+                         ESP.getFreeHeap(), ESP.getMaxAllocHeap());
         sm.postEvent(Event::BT_CONNECTED);
     } else if (state == ESP_A2D_CONNECTION_STATE_DISCONNECTED) {
         btLinkConnected = false;
         btAudioActive = false;
-        Serial.println("[BT] Disconnected");
+        TraceLog::record(TraceLog::Id::BtDisconnected);
         sm.postEvent(Event::BT_DISCONNECTED);
     }
 }
 
-static const char* btAudioStateName(esp_a2d_audio_state_t state) {
+static TraceLog::BtAudio btAudioTraceState(esp_a2d_audio_state_t state) {
     switch (state) {
         case ESP_A2D_AUDIO_STATE_STARTED:
-            return "STARTED";
+            return TraceLog::BtAudio::Started;
         case ESP_A2D_AUDIO_STATE_STOPPED:
-            return "STOPPED";
+            return TraceLog::BtAudio::Stopped;
         case ESP_A2D_AUDIO_STATE_REMOTE_SUSPEND:
-            return "REMOTE_SUSPEND";
+            return TraceLog::BtAudio::RemoteSuspend;
         default:
-            return "UNKNOWN";
+            return TraceLog::BtAudio::Unknown;
     }
 }
 
 static void btAudioStateChanged(esp_a2d_audio_state_t state, void*) {
-    Serial.printf("[BT] Audio state: %s\n", btAudioStateName(state));
+    TraceLog::record(TraceLog::Id::BtAudioState,
+                     static_cast<int32_t>(btAudioTraceState(state)));
     if (state == ESP_A2D_AUDIO_STATE_STARTED) {
         if (!btAudioActive) {
             markActivity("BT audio started");
@@ -204,7 +274,7 @@ static void btAudioStateChanged(esp_a2d_audio_state_t state, void*) {
 }
 
 static void btSampleRateChanged(uint16_t rate) {
-    Serial.printf("[BT] A2DP sample rate: %u Hz\n", rate);
+    TraceLog::record(TraceLog::Id::BtSampleRate, rate);
 }
 
 // ---------------------------------------------------------------------------
@@ -218,8 +288,15 @@ void setup() {
 
     delay(500);
     Serial.println("\n=== SweetYaar Boot ===");
+    // Same digits as the panic handler's "ELF file SHA256" line, so logs can be
+    // matched to their firmware.elf (tools/log_archive.py, tools/crash_report.py).
+    char elfSha[17];
+    esp_ota_get_app_elf_sha256(elfSha, sizeof(elfSha));
+    Serial.printf("[Boot] build=%s\n", elfSha);
+    BootTrace::mark(BootTrace::Phase::Serial);
     setupWakeState();
     setupPeripheralPower();
+    BootTrace::mark(BootTrace::Phase::WakeState);
 
     // Status LED
     pinMode(PIN_LED, OUTPUT);
@@ -229,13 +306,16 @@ void setup() {
     nvs.begin();
     currentDeviceName = nvs.getBtName();
     Serial.printf("[Device] btName=%s\n", currentDeviceName.c_str());
+    BootTrace::mark(BootTrace::Phase::Nvs);
 
     // Buttons
     buttons.begin();
     sm.begin();
+    BootTrace::mark(BootTrace::Phase::Inputs);
 
     // I2S (must be set up before BT sink and WAV player)
     setupI2S();
+    BootTrace::mark(BootTrace::Phase::I2s);
 
     // Bluetooth A2DP sink. Reserve its audio queue before SD/WAV playback has
     // a chance to fragment heap; otherwise connection-time allocation can fail.
@@ -246,18 +326,25 @@ void setup() {
     // this, random() returns the same sequence every boot and "shuffle" picks
     // the identical order each power-on.
     randomSeed(esp_random());
+    BootTrace::mark(BootTrace::Phase::BtStack);
 
     // SD card + WAV player
     sdReady = wavPlayer.begin();
+    BootTrace::mark(BootTrace::Phase::SdMount);
     if (!sdReady) {
         Serial.println("[WARN] SD init failed; WAV playback unavailable");
     } else {
         parentConfig.load();
+        BootTrace::mark(BootTrace::Phase::Config);
         // Single SD pass: read the whole content catalog into RAM. Every later
         // theme/song lookup (playback, BLE theme list, settings scans) is served
-        // from memory; the card is re-read only on reboot.
-        ContentCatalog::buildCatalog();
+        // from memory; the card is re-read only on reboot. Only the themes the
+        // buttons start with are read here; loop() fills in the rest so boot
+        // time does not grow with the size of the card.
+        const String priorityThemes[] = {parentConfig.defaultTheme(), parentConfig.bedtimeTheme()};
+        ContentCatalog::beginCatalogBuild(priorityThemes, 2);
         refreshThemeList();
+        BootTrace::mark(BootTrace::Phase::Catalog);
     }
     activeTheme = parentConfig.defaultTheme();
     applyActiveThemeFallback();
@@ -268,19 +355,21 @@ void setup() {
     // BLE parent service — shares the controller already started by A2DP.
     if (ENABLE_BLE_PARENT_SERVICE) {
         bleService.begin(currentDeviceName);
-        bleService.updateConfigResponse(buildConfigResponse(0));
+        replyConfig(0);
         bleService.updateThemes(bleThemesJson);
         publishBleValues();
         pollBedtimeMode();
     } else {
         Serial.println("[BLE] Parent service disabled for A2DP audio test");
     }
+    BootTrace::mark(BootTrace::Phase::Ble);
 
     digitalWrite(PIN_LED, LOW);  // init done
     lastActivityMs = millis();
     lastBleActivityMs = millis();
     lastBleConnected = ENABLE_BLE_PARENT_SERVICE && bleService.isConnected();
 
+    BootTrace::mark(BootTrace::Phase::Ready);
     Serial.println("[Boot] Ready.");
 }
 
@@ -288,10 +377,16 @@ void setup() {
 // loop()
 // ---------------------------------------------------------------------------
 void loop() {
+    uint32_t loopStartUs = micros();
+    if (lastLoopStartUs != 0) {
+        PerfStats::record(PerfStats::Metric::Loop, loopStartUs - lastLoopStartUs);
+    }
+    lastLoopStartUs = loopStartUs;
+
     // Process asynchronous BT events before accepting local/BLE input.
     processStateMachineTransitions();
 
-    // 1. Poll buttons
+    // 1. Replay button edges queued by the GPIO interrupts
     buttons.update();
 
     // 2. Post button events to state machine.
@@ -306,6 +401,9 @@ void loop() {
             sm.postEvent(Event::BOTH_BUTTONS_PRESS);
         } else if (buttons.wasBtn1Pressed()) {
             markActivity("button 1");
+            beginPressTrace(PressTrace::Source::Button,
+                            cur == State::PLAYING_SONG ? "next_song" : "song",
+                            buttons.btn1PressEdgeUs());
             if (cur == State::PLAYING_SONG) {
                 playNextSong();  // advance track; stay in PLAYING_SONG
                 publishBleValues();
@@ -314,6 +412,9 @@ void loop() {
             }
         } else if (buttons.wasBtn2Pressed()) {
             markActivity("button 2");
+            beginPressTrace(PressTrace::Source::Button,
+                            cur == State::PLAYING_ANIMAL ? "next_animal" : "animal",
+                            buttons.btn2PressEdgeUs());
             if (cur == State::PLAYING_ANIMAL) {
                 playNextAnimal();  // advance animal; stay in PLAYING_ANIMAL
                 publishBleValues();
@@ -366,15 +467,56 @@ void loop() {
         lastBleStatusPublishMs = millis();
     }
 
-    // 7. Feed WAV data to I2S (must be called every loop when playing)
-    wavPlayer.loop();
+    // 7. Feed WAV data to I2S (must be called every loop when playing). In
+    //    loop mode the next song is handed over gaplessly inside the player,
+    //    unless a pending Bedtime/theme change must take effect at the boundary.
+    bool playingSong = sm.currentState() == State::PLAYING_SONG;
+    wavPlayer.setContinuous(playingSong && sm.loopMode() &&
+                            bedtimeEffectiveSongTheme() == currentPlaybackTheme);
+    if (wavPlayer.isIdle()) {
+        wavPlayer.loop();
+    } else {
+        uint32_t wavStartUs = micros();
+        wavPlayer.loop();
+        PerfStats::record(PerfStats::Metric::WavLoop, micros() - wavStartUs);
+    }
+    if (wavPlayer.takeTrackChanged()) {
+        publishBleValues();
+    }
+
+    // 8. Continue the background catalog build in short slices; while a WAV
+    //    is streaming, one file per pass so the decoder stays fed. App edits
+    //    are written back one file per pass once they stop arriving.
+    if (ContentCatalog::continueCatalogBuild(wavPlayer.isIdle() ? CATALOG_BUILD_SLICE_MS : 0)) {
+        refreshThemeList();
+        applyActiveThemeFallback();
+    }
+    if (sdReady) {
+        ContentCatalog::flushPendingWrites(false);
+    }
 
-    // 8. Re-open BT after a short disconnect cooldown.
+    // 9. Re-open BT after a short disconnect cooldown; retune A2DP prefetch.
     pollBluetoothReopen();
+    pollA2dpPrefetch();
     applyPendingBtNameIfPossible();
-    if (ENABLE_BLE_PARENT_SERVICE) bleService.pollAdvertising();
+    if (ENABLE_BLE_PARENT_SERVICE) {
+        bleService.pollAdvertising();
+        bleService.flushNotifies(btLinkConnected ? BLE_NOTIFY_MIN_INTERVAL_BT_MS
+                                                 : BLE_NOTIFY_MIN_INTERVAL_MS);
+    }
     pollIdleSleep();
 
+    // 10. Hand queued trace records to the UART while it has room.
+    TraceLog::drain(TRACE_DRAIN_FRAMES_PER_LOOP);
+    PressTrace::poll();
+
+    if (!bootTraceEmitted) {
+        bootTraceEmitted = true;
+        BootTrace::mark(BootTrace::Phase::FirstLoop);
+        BootTrace::emit(wokeFromVibration ? "deep_sleep" : "cold");
+        printMemoryReport();
+    }
+
     delay(wavPlayer.isIdle() ? 5 : 1);  // keep WAV streaming fed while still yielding
 }
 
@@ -622,7 +764,7 @@ void pollBedtimeMode() {
                   bedtimeAutomaticActive() ? 1 : 0,
                   BedtimeMode::overrideName(bedtimeOverride),
                   bedtimeTimeKnown() ? 1 : 0);
-    applyEffectiveVolume("bedtime state");
+    applyEffectiveVolume(TraceLog::VolumeReason::BedtimeState);
 
     // A runtime mode change takes effect immediately for mode reporting,
     // volume, and the theme selected for future songs. Keep the current WAV
@@ -633,8 +775,11 @@ void pollBedtimeMode() {
 
 // ---------------------------------------------------------------------------
 // bedtimeEffectiveSongTheme()
+//
+// Returns one of the theme globals rather than a copy: loop() compares it
+// with currentPlaybackTheme on every pass while a song plays.
 // ---------------------------------------------------------------------------
-String bedtimeEffectiveSongTheme() {
+const String& bedtimeEffectiveSongTheme() {
     if (!bedtimeRuntimeActive()) {
         return activeTheme;
     }
@@ -643,10 +788,9 @@ String bedtimeEffectiveSongTheme() {
         return bedtimeThemeOverride;
     }
 
-    String theme = parentConfig.bedtimeTheme();
-    theme.trim();
+    const String& theme = parentConfig.bedtimeTheme();  // trimmed when set
     if (!theme.isEmpty() && isKnownTheme(theme)) {
-        lastInvalidBedtimeThemeLog = "";
+        if (!lastInvalidBedtimeThemeLog.isEmpty()) lastInvalidBedtimeThemeLog = "";
         return theme;
     }
 
@@ -658,22 +802,10 @@ String bedtimeEffectiveSongTheme() {
     return activeTheme;
 }
 
-String bedtimeOverrideName() {
-    return String(BedtimeMode::overrideName(bedtimeOverride));
-}
-
 String bedtimeTimeString(uint16_t minuteOfDay) {
     return ContentCatalog::formatTimeOfDay(minuteOfDay);
 }
 
-String bedtimeCurrentTimeString() {
-    uint16_t minute = 0;
-    if (!bedtimeLocalMinute(minute)) {
-        return "";
-    }
-    return bedtimeTimeString(minute);
-}
-
 uint16_t parseBedtimeTimeString(const char* value, uint16_t fallback) {
     if (value == nullptr || value[0] == '\0') {
         return fallback;
@@ -701,11 +833,10 @@ uint32_t currentSleepTimeoutMs() {
 // ---------------------------------------------------------------------------
 // readSleepSeconds()
 // ---------------------------------------------------------------------------
-uint32_t readSleepSeconds(JsonObjectConst sleep, const char* key, uint32_t fallbackMs) {
-    long fallbackSeconds = static_cast<long>(fallbackMs / 1000UL);
-    long seconds = sleep[key] | fallbackSeconds;
+uint32_t readSleepSeconds(JsonVariantConst value, uint32_t fallbackSec) {
+    long seconds = value | static_cast<long>(fallbackSec);
     if (seconds < 1) {
-        return static_cast<uint32_t>(fallbackSeconds);
+        return fallbackSec;
     }
     if (seconds > 24L * 60L * 60L) {
         seconds = 24L * 60L * 60L;
@@ -802,6 +933,9 @@ void enterIdleDeepSleep() {
 
     digitalWrite(PIN_LED, LOW);
     wavPlayer.stop();
+    if (sdReady) {
+        ContentCatalog::flushPendingWrites(true);
+    }
     preparePinsForPeripheralPowerOff();
     holdPeripheralPowerOffForDeepSleep();
 
@@ -820,6 +954,7 @@ void enterIdleDeepSleep() {
         delay(50);
     }
 
+    TraceLog::flush();
     Serial.flush();
     esp_deep_sleep_start();
 }
@@ -879,7 +1014,7 @@ void setupBT(const String& deviceName) {
     sink->set_default_bt_mode(ENABLE_BLE_PARENT_SERVICE ? ESP_BT_MODE_BTDM
                                                         : ESP_BT_MODE_CLASSIC_BT);
     sink->set_i2s_ringbuffer_size(BT_A2DP_RINGBUFFER_BYTES);
-    sink->set_i2s_ringbuffer_prefetch_percent(65);
+    sink->set_i2s_ringbuffer_prefetch_percent(btPrefetch.levelPct());
     sink->set_i2s_write_size_upto(4096);
     sink->set_i2s_stack_size(BT_A2DP_I2S_TASK_STACK_BYTES);
     sink->set_on_connection_state_changed(btConnectionStateChanged);
@@ -956,6 +1091,13 @@ void pollBluetoothReopen() {
     uint32_t freeNow = ESP.getFreeHeap();
     const uint32_t SAFE_HEAP_FLOOR = 20000;
     if (freeNow < SAFE_HEAP_FLOOR) {
+        // Debounced config.json / metadata.json edits would be lost with RAM.
+        if (sdReady) {
+            ContentCatalog::flushPendingWrites(true);
+        }
+        TraceLog::flush();
+        if (ENABLE_BLE_PARENT_SERVICE) bleService.logNotifyStats();
+        printMemoryReport();
         Serial.printf("[BT] Heap critically low after BT session (free=%lu). Restarting cleanly.\n",
                       static_cast<unsigned long>(freeNow));
         delay(200);
@@ -965,6 +1107,55 @@ void pollBluetoothReopen() {
     reopenBluetoothForPairing("BT cooldown elapsed");
 }
 
+// ---------------------------------------------------------------------------
+// pollA2dpPrefetch()
+// ---------------------------------------------------------------------------
+void pollA2dpPrefetch() {
+    if (btSink == nullptr) {
+        return;
+    }
+
+    uint32_t now = millis();
+    bool linked = btLinkConnected;
+    if (linked && !btPrefetchLinked) {
+        // Every phone starts from the low-latency level and earns more.
+        btPrefetch.reset(now, btSink->underflowCount(), btSink->dropCount());
+        btSink->set_i2s_ringbuffer_prefetch_percent(btPrefetch.levelPct());
+    }
+    btPrefetchLinked = linked;
+
+    bool streaming = linked && btAudioActive && btSink->audioActive();
+    if (btPrefetchStreaming && !streaming) {
+        btSink->printStats("BT");
+    }
+    if (streaming && !btPrefetchStreaming) {
+        btRxTraceAtMs = now;
+        btRxTraceBytes = btSink->rxByteCount();
+    }
+    btPrefetchStreaming = streaming;
+
+    if (streaming && BT_A2DP_RX_TRACE_MS > 0 && now - btRxTraceAtMs >= BT_A2DP_RX_TRACE_MS) {
+        uint32_t rx = btSink->rxByteCount();
+        TraceLog::record(TraceLog::Id::BtRx, static_cast<int32_t>(rx - btRxTraceBytes),
+                         static_cast<int32_t>(btSink->bufferedBytes()),
+                         static_cast<int32_t>(btSink->underflowCount()),
+                         static_cast<int32_t>(btSink->dropCount()));
+        btRxTraceAtMs = now;
+        btRxTraceBytes = rx;
+    }
+
+    if (!BT_A2DP_ADAPTIVE_PREFETCH) {
+        return;
+    }
+    uint8_t previousPct = btPrefetch.levelPct();
+    if (btPrefetch.update(now, btSink->underflowCount(), btSink->dropCount(), streaming)) {
+        btSink->set_i2s_ringbuffer_prefetch_percent(btPrefetch.levelPct());
+        TraceLog::record(TraceLog::Id::BtPrefetch, btPrefetch.levelPct(), previousPct,
+                         static_cast<int32_t>(btPrefetch.lastWindowUnderflows()),
+                         static_cast<int32_t>(btPrefetch.lastWindowDrops()));
+    }
+}
+
 // ---------------------------------------------------------------------------
 // processStateMachineTransitions()
 // ---------------------------------------------------------------------------
@@ -1050,12 +1241,13 @@ bool handleBleControls() {
     }
 
     uint8_t command;
-    if (bleService.pollCommand(command)) {
+    uint32_t commandAtUs = 0;
+    if (bleService.pollCommand(command, &commandAtUs)) {
         writeSeen = true;
         if (btMode || sm.currentState() == State::KILLSWITCH) {
             Serial.printf("[BLE] Ignoring command %u while controls are disabled\n", command);
         } else {
-            handleBleCommand(command);
+            handleBleCommand(command, commandAtUs);
         }
     }
 
@@ -1076,7 +1268,9 @@ void handleBleConfigCommands() {
     String commandJson;
     if (bleService.pollConfigCommand(commandJson)) {
         markBleActivity("BLE config command");
+        uint32_t startUs = micros();
         handleBleConfigCommand(commandJson);
+        PerfStats::record(PerfStats::Metric::ConfigCommand, micros() - startUs);
     }
 }
 
@@ -1088,21 +1282,54 @@ void handleBleConfigCommand(const String& commandJson) {
     DeserializationError err = deserializeJson(doc, commandJson);
     uint32_t requestId = doc["id"] | 0;
     if (err) {
-        bleService.updateConfigResponse(buildConfigErrorResponse(requestId, "Invalid config command JSON"));
+        replyConfigError(requestId, "Invalid config command JSON");
         return;
     }
 
     const char* opValue = doc["op"] | "";
     String op = opValue;
     if (op == "getConfig") {
-        bleService.updateConfigResponse(buildConfigResponse(requestId));
+        replyConfig(requestId);
+        return;
+    }
+
+    if (op == "getPerf") {
+        int page = doc["page"] | 0;
+        configResponse.clear();
+        PerfStats::writePageJson(configResponse, requestId, page);
+        sendConfigResponse(requestId);
+        return;
+    }
+
+    if (op == "getA2dp") {
+        configResponse.clear();
+        writeA2dpStats(configResponse, requestId);
+        sendConfigResponse(requestId);
+        return;
+    }
+
+    if (op == "getMemory") {
+        int page = doc["page"] | 0;
+        captureMemory();
+        configResponse.clear();
+        MemoryReport::writePageJson(configResponse, requestId, page, memorySnapshot);
+        sendConfigResponse(requestId);
+        return;
+    }
+
+    if (op == "resetPerf") {
+        PerfStats::reset();
+        configResponse.clear();
+        PerfStats::writePageJson(configResponse, requestId, 0);
+        sendConfigResponse(requestId);
         return;
     }
 
     if (op == "scanThemes") {
         int page = doc["page"] | 0;
-        bleService.updateConfigResponse(
-            ContentCatalog::buildThemesPageJson(requestId, page, BLE_CONFIG_THEME_PAGE_SIZE));
+        configResponse.clear();
+        ContentCatalog::writeThemesPageJson(configResponse, requestId, page, BLE_CONFIG_THEME_PAGE_SIZE);
+        sendConfigResponse(requestId);
         return;
     }
 
@@ -1110,11 +1337,13 @@ void handleBleConfigCommand(const String& commandJson) {
         const char* theme = doc["theme"] | "";
         int page = doc["page"] | 0;
         if (theme == nullptr || theme[0] == '\0') {
-            bleService.updateConfigResponse(buildConfigErrorResponse(requestId, "Missing theme id"));
+            replyConfigError(requestId, "Missing theme id");
             return;
         }
-        bleService.updateConfigResponse(
-            ContentCatalog::buildSongsPageJson(requestId, String(theme), page, BLE_CONFIG_SONG_PAGE_SIZE));
+        configResponse.clear();
+        ContentCatalog::writeSongsPageJson(configResponse, requestId, String(theme), page,
+                                           BLE_CONFIG_SONG_PAGE_SIZE);
+        sendConfigResponse(requestId);
         return;
     }
 
@@ -1123,123 +1352,54 @@ void handleBleConfigCommand(const String& commandJson) {
         int tzOffsetValue = doc["tzOffsetMin"] | 0;
         if (epochValue < 946684800L ||
             tzOffsetValue < -14 * 60 || tzOffsetValue > 14 * 60) {
-            bleService.updateConfigResponse(
-                buildConfigErrorResponse(requestId, "Invalid time sync payload"));
+            replyConfigError(requestId, "Invalid time sync payload");
             return;
         }
         syncBedtimeClock(static_cast<time_t>(epochValue),
                          static_cast<int16_t>(tzOffsetValue));
         publishBleValues();
-        bleService.updateConfigResponse(buildConfigResponse(requestId));
+        replyConfig(requestId);
         return;
     }
 
     if (op == "setBedtimeMode") {
         if (!doc["active"].is<bool>()) {
-            bleService.updateConfigResponse(
-                buildConfigErrorResponse(requestId, "Missing bedtime active flag"));
+            replyConfigError(requestId, "Missing bedtime active flag");
             return;
         }
         setBedtimeRuntimeActive(doc["active"].as<bool>(), "BLE runtime toggle");
         publishBleValues();
-        bleService.updateConfigResponse(buildConfigResponse(requestId));
+        replyConfig(requestId);
         return;
     }
 
-    if (op == "setConfig") {
-        const char* deviceNameValue = doc["deviceName"] | currentDeviceName.c_str();
-        String nextName = deviceNameValue;
-        nextName.trim();
-        if (nextName.isEmpty()) nextName = DEFAULT_BT_NAME;
-        if (nextName.length() > 32) {
-            nextName = nextName.substring(0, 32);
-        }
-
-        uint8_t nextVolume = static_cast<uint8_t>(doc["defaultVolumePct"] | parentConfig.defaultVolumePct());
-        if (nextVolume > 100) nextVolume = 100;
-
-        String currentDefaultTheme = parentConfig.defaultTheme();
-        const char* defaultThemeValue = doc["defaultTheme"] | currentDefaultTheme.c_str();
-        String nextDefaultTheme = defaultThemeValue;
-        nextDefaultTheme.trim();
-        if (nextDefaultTheme.isEmpty()) nextDefaultTheme = DEFAULT_THEME;
-
-        bool nextSleepEnabled = parentConfig.sleepEnabled();
-        uint32_t nextSleepNormalIdleSec = parentConfig.sleepNormalIdleMs() / 1000UL;
-        uint32_t nextSleepVibrationWakeIdleSec = parentConfig.sleepVibrationWakeIdleMs() / 1000UL;
-        uint32_t nextSleepBleIdleSec = parentConfig.sleepBleIdleMs() / 1000UL;
-        if (doc["sleep"].is<JsonObject>()) {
-            JsonObject sleep = doc["sleep"].as<JsonObject>();
-            nextSleepEnabled = sleep["enabled"] | nextSleepEnabled;
-            nextSleepNormalIdleSec = readSleepSeconds(
-                sleep, "normalIdleSec", parentConfig.sleepNormalIdleMs());
-            nextSleepVibrationWakeIdleSec = readSleepSeconds(
-                sleep, "vibrationWakeIdleSec", parentConfig.sleepVibrationWakeIdleMs());
-            nextSleepBleIdleSec = readSleepSeconds(
-                sleep, "bleIdleSec", parentConfig.sleepBleIdleMs());
-        }
-
-        bool bedtimeConfigTouched = false;
-        bool nextBedtimeEnabled = parentConfig.bedtimeEnabled();
-        uint16_t nextBedtimeStartMinutes = parentConfig.bedtimeStartMinutes();
-        uint16_t nextBedtimeEndMinutes = parentConfig.bedtimeEndMinutes();
-        String nextBedtimeTheme = parentConfig.bedtimeTheme();
-        uint8_t nextBedtimeVolumeCapPct = parentConfig.bedtimeVolumeCapPct();
-        if (doc["bedtime"].is<JsonObject>()) {
-            bedtimeConfigTouched = true;
-            JsonObject bedtime = doc["bedtime"].as<JsonObject>();
-            nextBedtimeEnabled = bedtime["enabled"] | nextBedtimeEnabled;
-            nextBedtimeStartMinutes = parseBedtimeTimeString(
-                bedtime["startTime"] | "",
-                nextBedtimeStartMinutes);
-            nextBedtimeEndMinutes = parseBedtimeTimeString(
-                bedtime["endTime"] | "",
-                nextBedtimeEndMinutes);
-            const char* themeValue = bedtime["theme"] | nextBedtimeTheme.c_str();
-            nextBedtimeTheme = themeValue;
-            nextBedtimeTheme.trim();
-            if (nextBedtimeTheme.isEmpty()) {
-                nextBedtimeTheme = DEFAULT_BEDTIME_THEME;
-            }
-            int cap = bedtime["volumeCapPct"] | nextBedtimeVolumeCapPct;
-            if (cap < 0) cap = 0;
-            if (cap > 100) cap = 100;
-            nextBedtimeVolumeCapPct = static_cast<uint8_t>(cap);
+    if (op == "setConfig" || op == "patchConfig") {
+        // setConfig: fields at the top level, always saved. patchConfig: a
+        // JSON merge patch under "patch"; only changed values are saved and
+        // an unchanged device name does not touch Classic BT.
+        bool patch = op == "patchConfig";
+        if (patch && !doc["patch"].is<JsonObjectConst>()) {
+            replyConfigError(requestId, "Missing config patch");
+            return;
         }
-
-        nvs.setBtName(nextName);
-        currentDeviceName = nextName;
-        if (sdReady) {
-            ContentCatalog::updateSdConfig(
-                nextVolume, nextDefaultTheme, nextSleepEnabled,
-                nextSleepNormalIdleSec, nextSleepVibrationWakeIdleSec,
-                nextSleepBleIdleSec,
-                nextBedtimeEnabled, nextBedtimeStartMinutes,
-                nextBedtimeEndMinutes, nextBedtimeTheme,
-                nextBedtimeVolumeCapPct);
-            parentConfig.load();
-            refreshThemeList();
-            activeTheme = parentConfig.defaultTheme();
-            applyActiveThemeFallback();
-            lastInvalidBedtimeThemeLog = "";
-            bedtimeThemeOverride = "";
-            if (bedtimeConfigTouched) {
-                bedtimeOverride = BedtimeMode::Override::None;
-                bedtimeOverrideUntilUtc = 0;
-            }
+        ConfigValues current = currentConfigValues();
+        ConfigValues next = current;
+        String error;
+        JsonObjectConst fields = patch ? doc["patch"].as<JsonObjectConst>() : doc.as<JsonObjectConst>();
+        if (!mergeConfigFields(fields, next, patch, error)) {
+            replyConfigError(requestId, error.c_str());
+            return;
         }
-        applyVolume(nextVolume);
-        pollBedtimeMode();
-        applyDeviceName(nextName);
-        publishBleValues();
-        bleService.updateConfigResponse(buildConfigResponse(requestId));
+        bool bedtimeTouched = patch ? !sameBedtimeConfig(current, next) : doc["bedtime"].is<JsonObject>();
+        commitConfigValues(current, next, !patch, bedtimeTouched);
+        replyConfig(requestId);
         return;
     }
 
     if (op == "setTheme") {
         const char* themeValue = doc["theme"] | "";
         if (themeValue == nullptr || themeValue[0] == '\0') {
-            bleService.updateConfigResponse(buildConfigErrorResponse(requestId, "Missing theme id"));
+            replyConfigError(requestId, "Missing theme id");
             return;
         }
         String theme = themeValue;
@@ -1249,7 +1409,7 @@ void handleBleConfigCommand(const String& commandJson) {
         if (doc["shuffle"].is<bool>()) {
             ContentCatalog::setThemeShuffle(theme, doc["shuffle"].as<bool>());
         }
-        parentConfig.load();
+        parentConfig.apply(ContentCatalog::configDocument());
         refreshThemeList();
         applyActiveThemeFallback();
         lastInvalidBedtimeThemeLog = "";
@@ -1260,7 +1420,7 @@ void handleBleConfigCommand(const String& commandJson) {
             wavPlayer.refreshSongList(currentPlaybackTheme);
         }
         publishBleValues();
-        bleService.updateConfigResponse(buildConfigOkResponse(requestId, op));
+        replyConfigOk(requestId, op.c_str());
         return;
     }
 
@@ -1270,7 +1430,7 @@ void handleBleConfigCommand(const String& commandJson) {
         if (themeValue == nullptr || themeValue[0] == '\0' ||
             fileValue == nullptr || fileValue[0] == '\0' ||
             !doc["enabled"].is<bool>()) {
-            bleService.updateConfigResponse(buildConfigErrorResponse(requestId, "Missing song update fields"));
+            replyConfigError(requestId, "Missing song update fields");
             return;
         }
         ContentCatalog::setSongDisabled(String(themeValue), String(fileValue), !doc["enabled"].as<bool>());
@@ -1285,20 +1445,163 @@ void handleBleConfigCommand(const String& commandJson) {
             }
         }
         publishBleValues();
-        bleService.updateConfigResponse(buildConfigOkResponse(requestId, op));
+        replyConfigOk(requestId, op.c_str());
+        return;
+    }
+
+    if (op == "batch") {
+        handleBatchConfigCommand(requestId, doc);
         return;
     }
 
-    bleService.updateConfigResponse(buildConfigErrorResponse(requestId, "Unknown config command"));
+    replyConfigError(requestId, "Unknown config command");
+}
+
+// ---------------------------------------------------------------------------
+// handleBatchConfigCommand()
+//
+// {"op":"batch","batch":<id of part 0>,"part":n,"items":[...],"commit":true}
+// Items are compact arrays; an empty theme means the previous item's theme:
+//   ["s",  theme, file, 0|1]   song enabled
+//   ["te", theme, 0|1]         theme enabled
+//   ["ts", theme, 0|1]         theme shuffle
+// Parts arrive in order through the command queue. Earlier parts are staged
+// and answered with the staged count; the commit part validates every item
+// and applies all of them or none, with one SD flush.
+// ---------------------------------------------------------------------------
+void handleBatchConfigCommand(uint32_t requestId, JsonDocument& doc) {
+    uint32_t batchId = doc["batch"] | requestId;
+    int part = doc["part"] | 0;
+    if (part == 0) {
+        pendingBatchEdits.clear();
+        pendingBatchId = batchId;
+        pendingBatchNextPart = 0;
+    }
+    if (batchId != pendingBatchId || part != pendingBatchNextPart) {
+        pendingBatchEdits.clear();
+        pendingBatchNextPart = 0;
+        replyConfigError(requestId, "Batch part out of sequence");
+        return;
+    }
+    if (!doc["items"].is<JsonArrayConst>()) {
+        pendingBatchEdits.clear();
+        pendingBatchNextPart = 0;
+        replyConfigError(requestId, "Missing batch items");
+        return;
+    }
+
+    String lastTheme = pendingBatchEdits.empty() ? String() : pendingBatchEdits.back().theme;
+    for (JsonVariantConst item : doc["items"].as<JsonArrayConst>()) {
+        if (pendingBatchEdits.size() >= static_cast<size_t>(BLE_CONFIG_BATCH_MAX_ITEMS)) {
+            pendingBatchEdits.clear();
+            pendingBatchNextPart = 0;
+            replyConfigError(requestId, "Batch too large");
+            return;
+        }
+        BatchEdit edit;
+        const char* kind = item[0] | "";
+        const char* theme = item[1] | "";
+        edit.theme = (theme && theme[0] != '\0') ? String(theme) : lastTheme;
+        lastTheme = edit.theme;
+        if (strcmp(kind, "s") == 0 && item[2].is<const char*>() && item[3].is<int>()) {
+            edit.kind = BatchEditKind::Song;
+            edit.file = item[2].as<const char*>();
+            edit.value = item[3].as<int>() != 0;
+        } else if ((strcmp(kind, "te") == 0 || strcmp(kind, "ts") == 0) && item[2].is<int>()) {
+            edit.kind = kind[1] == 'e' ? BatchEditKind::ThemeEnabled : BatchEditKind::ThemeShuffle;
+            edit.value = item[2].as<int>() != 0;
+        }
+        pendingBatchEdits.push_back(edit);
+    }
+    pendingBatchNextPart++;
+
+    if (!(doc["commit"] | false)) {
+        configResponse.clear();
+        configResponse.raw("{\"id\":").num(requestId);
+        configResponse.raw(",\"ok\":true,\"op\":\"batch\",\"staged\":").num(pendingBatchEdits.size());
+        configResponse.raw("}");
+        sendConfigResponse(requestId);
+        return;
+    }
+    configResponse.clear();
+    writeBatchEdits(configResponse, requestId);
+    sendConfigResponse(requestId);
+    pendingBatchEdits.clear();
+    pendingBatchNextPart = 0;
+}
+
+// Result codes in the batch reply: 0 ok, 1 unknown theme, 2 unknown song,
+// 3 malformed item.
+uint8_t validateBatchEdit(const BatchEdit& edit) {
+    if (edit.kind == BatchEditKind::Invalid || edit.theme.isEmpty()) return 3;
+    if (ContentCatalog::findTheme(edit.theme) == nullptr) return 1;
+    if (edit.kind == BatchEditKind::Song &&
+        ContentCatalog::findSong(edit.theme, edit.file) == nullptr) {
+        return 2;
+    }
+    return 0;
+}
+
+void writeBatchEdits(JsonWriter& out, uint32_t requestId) {
+    uint8_t codes[BLE_CONFIG_BATCH_MAX_ITEMS];
+    bool valid = true;
+    for (size_t i = 0; i < pendingBatchEdits.size(); i++) {
+        codes[i] = validateBatchEdit(pendingBatchEdits[i]);
+        if (codes[i] != 0) valid = false;
+    }
+
+    if (valid) {
+        bool playingThemeTouched = false;
+        for (const BatchEdit& edit : pendingBatchEdits) {
+            switch (edit.kind) {
+                case BatchEditKind::Song:
+                    ContentCatalog::setSongDisabled(edit.theme, edit.file, !edit.value);
+                    break;
+                case BatchEditKind::ThemeEnabled:
+                    ContentCatalog::setThemeDisabled(edit.theme, !edit.value);
+                    break;
+                case BatchEditKind::ThemeShuffle:
+                    ContentCatalog::setThemeShuffle(edit.theme, edit.value);
+                    break;
+                case BatchEditKind::Invalid:
+                    break;
+            }
+            if (edit.theme == currentPlaybackTheme) playingThemeTouched = true;
+        }
+        // The batch is the coalesced unit: write every touched file now.
+        ContentCatalog::flushPendingWrites(true);
+        parentConfig.apply(ContentCatalog::configDocument());
+        refreshThemeList();
+        applyActiveThemeFallback();
+        lastInvalidBedtimeThemeLog = "";
+        if (sm.currentState() == State::PLAYING_SONG && playingThemeTouched) {
+            wavPlayer.refreshSongList(currentPlaybackTheme);
+        }
+        publishBleValues();
+    }
+    Serial.printf("[BLE] Batch of %u edits %s\n",
+                  static_cast<unsigned>(pendingBatchEdits.size()),
+                  valid ? "applied" : "rejected");
+
+    out.raw("{\"id\":").num(requestId);
+    out.raw(",\"ok\":true,\"op\":\"batch\",\"applied\":").boolean(valid);
+    out.raw(",\"results\":[");
+    for (size_t i = 0; i < pendingBatchEdits.size(); i++) {
+        if (i > 0) out.raw(",");
+        out.num(codes[i]);
+    }
+    out.raw("]}");
 }
 
 // ---------------------------------------------------------------------------
 // handleBleCommand()
 // ---------------------------------------------------------------------------
-void handleBleCommand(uint8_t command) {
+void handleBleCommand(uint8_t command, uint32_t writtenAtUs) {
     State state = sm.currentState();
     switch (command) {
         case 1:  // Song button
+            beginPressTrace(PressTrace::Source::Ble,
+                            state == State::PLAYING_SONG ? "next_song" : "song", writtenAtUs);
             if (state == State::PLAYING_SONG) {
                 playNextSong();
                 publishBleValues();
@@ -1308,6 +1611,8 @@ void handleBleCommand(uint8_t command) {
             break;
 
         case 2:  // Animal button
+            beginPressTrace(PressTrace::Source::Ble,
+                            state == State::PLAYING_ANIMAL ? "next_animal" : "animal", writtenAtUs);
             if (state == State::PLAYING_ANIMAL) {
                 playNextAnimal();
                 publishBleValues();
@@ -1338,6 +1643,15 @@ void handleBleCommand(uint8_t command) {
     }
 }
 
+// ---------------------------------------------------------------------------
+// beginPressTrace() — start timing a song/animal press up to its first audio.
+// The button edge is 0 if the contact was already closed at boot.
+// ---------------------------------------------------------------------------
+void beginPressTrace(PressTrace::Source source, const char* action, uint32_t pressUs) {
+    uint32_t nowUs = micros();
+    PressTrace::begin(source, action, pressUs != 0 ? pressUs : nowUs, nowUs);
+}
+
 // ---------------------------------------------------------------------------
 // publishBleValues()
 // ---------------------------------------------------------------------------
@@ -1381,6 +1695,7 @@ void sendNotice(const String& severity, const String& message) {
 // the settings song list, so there is no per-file runtime notice.
 // ---------------------------------------------------------------------------
 void notifyPlaybackFailure(bool animal) {
+    PressTrace::cancel();
     // sdReady is only the boot-time mount result; re-probe so a card pulled at
     // runtime is reported as the persistent error rather than an empty-folder
     // warning.
@@ -1409,7 +1724,7 @@ void playSong() {
 }
 
 void playNextSong() {
-    String selectedTheme = bedtimeEffectiveSongTheme();
+    const String& selectedTheme = bedtimeEffectiveSongTheme();
     if (selectedTheme != currentPlaybackTheme) {
         // Mode/theme changes are intentionally deferred while a song plays.
         // A deliberate song-button press is the point where the new selection
@@ -1491,7 +1806,10 @@ void refreshThemeList() {
 // applyActiveThemeFallback()
 // ---------------------------------------------------------------------------
 void applyActiveThemeFallback() {
-    if (themeCount > 0 && !isKnownTheme(activeTheme)) {
+    // While the catalog is still loading, a theme that exists on the card but
+    // has not been read yet is not "unavailable".
+    bool pending = !ContentCatalog::catalogReady() && ContentCatalog::findTheme(activeTheme) != nullptr;
+    if (themeCount > 0 && !isKnownTheme(activeTheme) && !pending) {
         Serial.printf("[Theme] Theme \"%s\" is unavailable; using \"%s\"\n",
                       activeTheme.c_str(), themeIds[0].c_str());
         activeTheme = themeIds[0];
@@ -1518,6 +1836,210 @@ void applyDeviceName(const String& deviceName) {
     }
 }
 
+// ---------------------------------------------------------------------------
+// currentConfigValues() / mergeConfigFields()
+// ---------------------------------------------------------------------------
+ConfigValues currentConfigValues() {
+    ConfigValues v;
+    v.deviceName = currentDeviceName;
+    v.defaultVolumePct = parentConfig.defaultVolumePct();
+    v.defaultTheme = parentConfig.defaultTheme();
+    v.sleepEnabled = parentConfig.sleepEnabled();
+    v.sleepNormalIdleSec = parentConfig.sleepNormalIdleMs() / 1000UL;
+    v.sleepVibrationWakeIdleSec = parentConfig.sleepVibrationWakeIdleMs() / 1000UL;
+    v.sleepBleIdleSec = parentConfig.sleepBleIdleMs() / 1000UL;
+    v.bedtimeEnabled = parentConfig.bedtimeEnabled();
+    v.bedtimeStartMinutes = parentConfig.bedtimeStartMinutes();
+    v.bedtimeEndMinutes = parentConfig.bedtimeEndMinutes();
+    v.bedtimeTheme = parentConfig.bedtimeTheme();
+    v.bedtimeVolumeCapPct = parentConfig.bedtimeVolumeCapPct();
+    return v;
+}
+
+static uint8_t readPercentValue(JsonVariantConst value, uint8_t fallback) {
+    int pct = value | static_cast<int>(fallback);
+    if (pct < 0) pct = 0;
+    if (pct > 100) pct = 100;
+    return static_cast<uint8_t>(pct);
+}
+
+static String readNameValue(JsonVariantConst value, const String& fallback, const char* emptyDefault) {
+    String text = value | fallback.c_str();
+    text.trim();
+    if (text.isEmpty()) text = emptyDefault;
+    return text;
+}
+
+static bool mergeSleepFields(JsonObjectConst sleep, ConfigValues& next, bool strict, String& error) {
+    for (JsonPairConst kv : sleep) {
+        const char* key = kv.key().c_str();
+        JsonVariantConst value = kv.value();
+        bool reset = value.isNull();
+        if (strcmp(key, "enabled") == 0) {
+            next.sleepEnabled = reset ? DEFAULT_SLEEP_ENABLED : (value | next.sleepEnabled);
+        } else if (strcmp(key, "normalIdleSec") == 0) {
+            next.sleepNormalIdleSec = reset ? SLEEP_NORMAL_IDLE_MS / 1000UL
+                                            : readSleepSeconds(value, next.sleepNormalIdleSec);
+        } else if (strcmp(key, "vibrationWakeIdleSec") == 0) {
+            next.sleepVibrationWakeIdleSec = reset ? SLEEP_VIB_WAKE_IDLE_MS / 1000UL
+                                                   : readSleepSeconds(value, next.sleepVibrationWakeIdleSec);
+        } else if (strcmp(key, "bleIdleSec") == 0) {
+            next.sleepBleIdleSec = reset ? SLEEP_BLE_IDLE_MS / 1000UL
+                                         : readSleepSeconds(value, next.sleepBleIdleSec);
+        } else if (strict) {
+            error = String("Unknown config field: sleep.") + key;
+            return false;
+        }
+    }
+    return true;
+}
+
+static bool mergeBedtimeFields(JsonObjectConst bedtime, ConfigValues& next, bool strict, String& error) {
+    for (JsonPairConst kv : bedtime) {
+        const char* key = kv.key().c_str();
+        JsonVariantConst value = kv.value();
+        bool reset = value.isNull();
+        if (strcmp(key, "enabled") == 0) {
+            next.bedtimeEnabled = reset ? DEFAULT_BEDTIME_ENABLED : (value | next.bedtimeEnabled);
+        } else if (strcmp(key, "startTime") == 0) {
+            next.bedtimeStartMinutes = reset ? DEFAULT_BEDTIME_START_MINUTES
+                : parseBedtimeTimeString(value | "", next.bedtimeStartMinutes);
+        } else if (strcmp(key, "endTime") == 0) {
+            next.bedtimeEndMinutes = reset ? DEFAULT_BEDTIME_END_MINUTES
+                : parseBedtimeTimeString(value | "", next.bedtimeEndMinutes);
+        } else if (strcmp(key, "theme") == 0) {
+            next.bedtimeTheme = reset ? String(DEFAULT_BEDTIME_THEME)
+                : readNameValue(value, next.bedtimeTheme, DEFAULT_BEDTIME_THEME);
+        } else if (strcmp(key, "volumeCapPct") == 0) {
+            next.bedtimeVolumeCapPct = reset ? DEFAULT_BEDTIME_VOLUME_CAP_PCT
+                : readPercentValue(value, next.bedtimeVolumeCapPct);
+        } else if (strict) {
+            error = String("Unknown config field: bedtime.") + key;
+            return false;
+        }
+    }
+    return true;
+}
+
+// Merge config fields into `next`, JSON-merge-patch style: absent fields keep
+// their value and null restores the firmware default. With `strict`, an
+// unknown field fails the whole merge (setConfig ignores "id"/"op").
+bool mergeConfigFields(JsonObjectConst fields, ConfigValues& next, bool strict, String& error) {
+    for (JsonPairConst kv : fields) {
+        const char* key = kv.key().c_str();
+        JsonVariantConst value = kv.value();
+        bool reset = value.isNull();
+        if (strcmp(key, "deviceName") == 0) {
+            next.deviceName = reset ? String(DEFAULT_BT_NAME)
+                : readNameValue(value, next.deviceName, DEFAULT_BT_NAME);
+            if (next.deviceName.length() > 32) {
+                next.deviceName = next.deviceName.substring(0, 32);
+            }
+        } else if (strcmp(key, "defaultVolumePct") == 0) {
+            next.defaultVolumePct = reset ? DEFAULT_VOLUME_PCT
+                : readPercentValue(value, next.defaultVolumePct);
+        } else if (strcmp(key, "defaultTheme") == 0) {
+            next.defaultTheme = reset ? String(DEFAULT_THEME)
+                : readNameValue(value, next.defaultTheme, DEFAULT_THEME);
+        } else if (strcmp(key, "sleep") == 0) {
+            if (reset) {
+                next.sleepEnabled = DEFAULT_SLEEP_ENABLED;
+                next.sleepNormalIdleSec = SLEEP_NORMAL_IDLE_MS / 1000UL;
+                next.sleepVibrationWakeIdleSec = SLEEP_VIB_WAKE_IDLE_MS / 1000UL;
+                next.sleepBleIdleSec = SLEEP_BLE_IDLE_MS / 1000UL;
+            } else if (value.is<JsonObjectConst>() &&
+                       !mergeSleepFields(value.as<JsonObjectConst>(), next, strict, error)) {
+                return false;
+            }
+        } else if (strcmp(key, "bedtime") == 0) {
+            if (reset) {
+                next.bedtimeEnabled = DEFAULT_BEDTIME_ENABLED;
+                next.bedtimeStartMinutes = DEFAULT_BEDTIME_START_MINUTES;
+                next.bedtimeEndMinutes = DEFAULT_BEDTIME_END_MINUTES;
+                next.bedtimeTheme = DEFAULT_BEDTIME_THEME;
+                next.bedtimeVolumeCapPct = DEFAULT_BEDTIME_VOLUME_CAP_PCT;
+            } else if (value.is<JsonObjectConst>() &&
+                       !mergeBedtimeFields(value.as<JsonObjectConst>(), next, strict, error)) {
+                return false;
+            }
+        } else if (strict) {
+            error = String("Unknown config field: ") + key;
+            return false;
+        }
+    }
+    return true;
+}
+
+bool sameBedtimeConfig(const ConfigValues& a, const ConfigValues& b) {
+    return a.bedtimeEnabled == b.bedtimeEnabled &&
+           a.bedtimeStartMinutes == b.bedtimeStartMinutes &&
+           a.bedtimeEndMinutes == b.bedtimeEndMinutes &&
+           a.bedtimeTheme == b.bedtimeTheme &&
+           a.bedtimeVolumeCapPct == b.bedtimeVolumeCapPct;
+}
+
+// Everything stored in config.json (the device name lives in NVS).
+bool sameSdConfig(const ConfigValues& a, const ConfigValues& b) {
+    return a.defaultVolumePct == b.defaultVolumePct &&
+           a.defaultTheme == b.defaultTheme &&
+           a.sleepEnabled == b.sleepEnabled &&
+           a.sleepNormalIdleSec == b.sleepNormalIdleSec &&
+           a.sleepVibrationWakeIdleSec == b.sleepVibrationWakeIdleSec &&
+           a.sleepBleIdleSec == b.sleepBleIdleSec &&
+           sameBedtimeConfig(a, b);
+}
+
+// ---------------------------------------------------------------------------
+// commitConfigValues()
+//
+// Store and apply `next`. With `force` (setConfig) every part is rewritten;
+// otherwise the NVS name / Classic BT rename and the config.json update each
+// happen only if their values changed. Returns true if anything changed.
+// ---------------------------------------------------------------------------
+bool commitConfigValues(const ConfigValues& current, const ConfigValues& next,
+                        bool force, bool bedtimeTouched) {
+    bool nameChanged = next.deviceName != current.deviceName;
+    bool sdChanged = !sameSdConfig(current, next);
+    if (nameChanged || sdChanged) {
+        configVersion++;
+    } else if (!force) {
+        return false;
+    }
+
+    if (force || nameChanged) {
+        nvs.setBtName(next.deviceName);
+        currentDeviceName = next.deviceName;
+    }
+    if ((force || sdChanged) && sdReady) {
+        ContentCatalog::updateSdConfig(
+            next.defaultVolumePct, next.defaultTheme, next.sleepEnabled,
+            next.sleepNormalIdleSec, next.sleepVibrationWakeIdleSec,
+            next.sleepBleIdleSec,
+            next.bedtimeEnabled, next.bedtimeStartMinutes,
+            next.bedtimeEndMinutes, next.bedtimeTheme,
+            next.bedtimeVolumeCapPct);
+        parentConfig.apply(ContentCatalog::configDocument());
+        refreshThemeList();
+        activeTheme = parentConfig.defaultTheme();
+        applyActiveThemeFallback();
+        lastInvalidBedtimeThemeLog = "";
+        bedtimeThemeOverride = "";
+        if (bedtimeTouched) {
+            bedtimeOverride = BedtimeMode::Override::None;
+            bedtimeOverrideUntilUtc = 0;
+        }
+    }
+    if (force || sdChanged) {
+        applyVolume(next.defaultVolumePct);
+    }
+    pollBedtimeMode();
+    if (force || nameChanged) {
+        applyDeviceName(next.deviceName);
+    }
+    publishBleValues();
+    return nameChanged || sdChanged;
+}
+
 // ---------------------------------------------------------------------------
 // applyPendingBtNameIfPossible()
 // ---------------------------------------------------------------------------
@@ -1534,81 +2056,141 @@ void applyPendingBtNameIfPossible() {
 }
 
 // ---------------------------------------------------------------------------
-// buildConfigResponse()
-// ---------------------------------------------------------------------------
-String buildConfigResponse(uint32_t requestId) {
-    String json = "{\"id\":";
-    json += requestId;
-    json += ",\"ok\":true,\"op\":\"getConfig\",\"deviceName\":\"";
-    json += ContentCatalog::jsonEscape(currentDeviceName);
-    json += "\",\"defaultVolumePct\":";
-    json += parentConfig.defaultVolumePct();
-    json += ",\"defaultTheme\":\"";
-    json += ContentCatalog::jsonEscape(parentConfig.defaultTheme());
-    json += "\",\"activeTheme\":\"";
-    json += ContentCatalog::jsonEscape(activeTheme);
-    json += "\",\"loop\":";
-    json += sm.loopMode() ? "true" : "false";
-    json += ",\"sdReady\":";
-    json += sdReady ? "true" : "false";
-    json += ",\"sleep\":{\"enabled\":";
-    json += parentConfig.sleepEnabled() ? "true" : "false";
-    json += ",\"normalIdleSec\":";
-    json += parentConfig.sleepNormalIdleMs() / 1000UL;
-    json += ",\"vibrationWakeIdleSec\":";
-    json += parentConfig.sleepVibrationWakeIdleMs() / 1000UL;
-    json += ",\"bleIdleSec\":";
-    json += parentConfig.sleepBleIdleMs() / 1000UL;
-    json += "}";
-    json += ",\"bedtime\":{\"enabled\":";
-    json += parentConfig.bedtimeEnabled() ? "true" : "false";
-    json += ",\"startTime\":\"";
-    json += bedtimeTimeString(parentConfig.bedtimeStartMinutes());
-    json += "\",\"endTime\":\"";
-    json += bedtimeTimeString(parentConfig.bedtimeEndMinutes());
-    json += "\",\"theme\":\"";
-    json += ContentCatalog::jsonEscape(parentConfig.bedtimeTheme());
-    json += "\",\"volumeCapPct\":";
-    json += parentConfig.bedtimeVolumeCapPct();
-    json += ",\"timeKnown\":";
-    json += bedtimeTimeKnown() ? "true" : "false";
-    json += ",\"currentTime\":\"";
-    json += bedtimeCurrentTimeString();
-    json += "\",\"currentSecondOfDay\":";
-    json += bedtimeTimeKnown()
-        ? static_cast<int32_t>(bedtimeLocalSecondOfDay())
-        : -1;
-    json += ",\"active\":";
-    json += bedtimeRuntimeActive() ? "true" : "false";
-    json += ",\"autoActive\":";
-    json += bedtimeAutomaticActive() ? "true" : "false";
-    json += ",\"override\":\"";
-    json += bedtimeOverrideName();
-    json += "\",\"effectiveVolumePct\":";
-    json += effectiveVolumePct();
-    json += ",\"effectiveTheme\":\"";
-    json += ContentCatalog::jsonEscape(bedtimeEffectiveSongTheme());
-    json += "\"}";
-    json += "}";
-    return json;
+// writeConfigResponse()
+// ---------------------------------------------------------------------------
+void writeConfigResponse(JsonWriter& out, uint32_t requestId) {
+    out.raw("{\"id\":").num(requestId);
+    out.raw(",\"ok\":true,\"op\":\"getConfig\",\"deviceName\":")
+        .str(currentDeviceName.c_str(), currentDeviceName.length());
+    out.raw(",\"defaultVolumePct\":").num(parentConfig.defaultVolumePct());
+    out.raw(",\"defaultTheme\":")
+        .str(parentConfig.defaultTheme().c_str(), parentConfig.defaultTheme().length());
+    out.raw(",\"activeTheme\":").str(activeTheme.c_str(), activeTheme.length());
+    out.raw(",\"loop\":").boolean(sm.loopMode());
+    out.raw(",\"sdReady\":").boolean(sdReady);
+    out.raw(",\"configVersion\":").num(configVersion);
+    out.raw(",\"sleep\":{\"enabled\":").boolean(parentConfig.sleepEnabled());
+    out.raw(",\"normalIdleSec\":").num(parentConfig.sleepNormalIdleMs() / 1000UL);
+    out.raw(",\"vibrationWakeIdleSec\":").num(parentConfig.sleepVibrationWakeIdleMs() / 1000UL);
+    out.raw(",\"bleIdleSec\":").num(parentConfig.sleepBleIdleMs() / 1000UL);
+    out.raw("}");
+    out.raw(",\"bedtime\":{\"enabled\":").boolean(parentConfig.bedtimeEnabled());
+    out.raw(",\"startTime\":");
+    writeTimeOfDay(out, parentConfig.bedtimeStartMinutes());
+    out.raw(",\"endTime\":");
+    writeTimeOfDay(out, parentConfig.bedtimeEndMinutes());
+    out.raw(",\"theme\":")
+        .str(parentConfig.bedtimeTheme().c_str(), parentConfig.bedtimeTheme().length());
+    out.raw(",\"volumeCapPct\":").num(parentConfig.bedtimeVolumeCapPct());
+    out.raw(",\"timeKnown\":").boolean(bedtimeTimeKnown());
+    out.raw(",\"currentTime\":");
+    uint16_t minute = 0;
+    if (bedtimeLocalMinute(minute)) {
+        writeTimeOfDay(out, minute);
+    } else {
+        out.raw("\"\"");
+    }
+    out.raw(",\"currentSecondOfDay\":")
+        .num(bedtimeTimeKnown() ? static_cast<int32_t>(bedtimeLocalSecondOfDay()) : -1);
+    out.raw(",\"active\":").boolean(bedtimeRuntimeActive());
+    out.raw(",\"autoActive\":").boolean(bedtimeAutomaticActive());
+    out.raw(",\"override\":").str(BedtimeMode::overrideName(bedtimeOverride));
+    out.raw(",\"effectiveVolumePct\":").num(effectiveVolumePct());
+    const String& effectiveTheme = bedtimeEffectiveSongTheme();
+    out.raw(",\"effectiveTheme\":").str(effectiveTheme.c_str(), effectiveTheme.length());
+    out.raw("}}");
 }
 
-String buildConfigOkResponse(uint32_t requestId, const String& op) {
-    String json = "{\"id\":";
-    json += requestId;
-    json += ",\"ok\":true,\"op\":\"";
-    json += ContentCatalog::jsonEscape(op);
-    json += "\"}";
-    return json;
+void writeTimeOfDay(JsonWriter& out, uint16_t minuteOfDay) {
+    char text[6];
+    ContentCatalog::formatTimeOfDay(minuteOfDay, text, sizeof(text));
+    out.str(text);
 }
 
-String buildConfigErrorResponse(uint32_t requestId, const String& message) {
-    String json = "{\"id\":";
-    json += requestId;
-    json += ",\"ok\":false,\"error\":\"";
-    json += ContentCatalog::jsonEscape(message);
-    json += "\"}";
-    return json;
+// ---------------------------------------------------------------------------
+// writeA2dpStats() — `getA2dp`: the chosen prefetch level and the counters
+// it was chosen from.
+// ---------------------------------------------------------------------------
+void writeA2dpStats(JsonWriter& out, uint32_t requestId) {
+    const PrefetchTuner::Settings& range = btPrefetch.settings();
+    int ringBytes = btSink != nullptr ? btSink->ringBytes() : 0;
+    int prefetchPct = btSink != nullptr ? btSink->prefetchPercent() : btPrefetch.levelPct();
+
+    out.raw("{\"id\":").num(requestId);
+    out.raw(",\"ok\":true,\"op\":\"getA2dp\",\"adaptive\":").boolean(BT_A2DP_ADAPTIVE_PREFETCH);
+    out.raw(",\"connected\":").boolean(btLinkConnected);
+    out.raw(",\"streaming\":").boolean(btPrefetchStreaming);
+    out.raw(",\"prefetchPct\":").num(prefetchPct);
+    out.raw(",\"prefetchBytes\":").num(ringBytes * prefetchPct / 100);
+    out.raw(",\"minPct\":").num(static_cast<unsigned>(range.minPct));
+    out.raw(",\"maxPct\":").num(static_cast<unsigned>(range.maxPct));
+    out.raw(",\"ringBytes\":").num(ringBytes);
+    out.raw(",\"bufferedBytes\":").num(btSink != nullptr ? btSink->bufferedBytes() : 0U);
+    out.raw(",\"underflows\":").num(btSink != nullptr ? btSink->underflowCount() : 0U);
+    out.raw(",\"drops\":").num(btSink != nullptr ? btSink->dropCount() : 0U);
+    out.raw(",\"rxBytes\":").num(btSink != nullptr ? btSink->rxByteCount() : 0U);
+    out.raw(",\"txBytes\":").num(btSink != nullptr ? btSink->txByteCount() : 0U);
+    out.raw(",\"windowUnderflows\":").num(btPrefetch.lastWindowUnderflows());
+    out.raw(",\"windowDrops\":").num(btPrefetch.lastWindowDrops());
+    out.raw(",\"raises\":").num(btPrefetch.raises());
+    out.raw(",\"lowers\":").num(btPrefetch.lowers());
+    out.raw("}");
+}
+
+// ---------------------------------------------------------------------------
+// captureMemory() — refresh memorySnapshot: task stacks, heaps and the
+// catalog's blocks.
+// ---------------------------------------------------------------------------
+void captureMemory() {
+    MemoryReport::capture(memorySnapshot);
+    ContentCatalog::Footprint catalog = ContentCatalog::footprint();
+    MemoryReport::addBlock(memorySnapshot, "themes", catalog.themes);
+    MemoryReport::addBlock(memorySnapshot, "songs", catalog.songs);
+    MemoryReport::addBlock(memorySnapshot, "names", catalog.names);
+    MemoryReport::addBlock(memorySnapshot, "index", catalog.index);
+    MemoryReport::addBlock(memorySnapshot, "pages", catalog.pages);
+}
+
+// ---------------------------------------------------------------------------
+// printMemoryReport() — `[Mem]` lines for tools/memory_report.py, and the
+// state machine's event queue counters.
+// ---------------------------------------------------------------------------
+void printMemoryReport() {
+    captureMemory();
+    MemoryReport::print(memorySnapshot, "catalog");
+    sm.printQueueStats();
+}
+
+// ---------------------------------------------------------------------------
+// sendConfigResponse() — publish configResponse. A response that did not fit
+// the characteristic is replaced by an error rather than sent cut short.
+// ---------------------------------------------------------------------------
+void sendConfigResponse(uint32_t requestId) {
+    if (configResponse.overflowed()) {
+        Serial.printf("[BLE] Config response over %u bytes; sending an error instead\n",
+                      static_cast<unsigned>(configResponse.capacity()));
+        configResponse.clear();
+        configResponse.raw("{\"id\":").num(requestId).raw(",\"ok\":false,\"error\":\"Response too large\"}");
+    }
+    bleService.updateConfigResponse(configResponse.c_str(), configResponse.length());
+}
+
+void replyConfig(uint32_t requestId) {
+    configResponse.clear();
+    writeConfigResponse(configResponse, requestId);
+    sendConfigResponse(requestId);
+}
+
+void replyConfigOk(uint32_t requestId, const char* op) {
+    configResponse.clear();
+    configResponse.raw("{\"id\":").num(requestId).raw(",\"ok\":true,\"op\":").str(op).raw("}");
+    sendConfigResponse(requestId);
+}
+
+void replyConfigError(uint32_t requestId, const char* message) {
+    configResponse.clear();
+    configResponse.raw("{\"id\":").num(requestId).raw(",\"ok\":false,\"error\":").str(message).raw("}");
+    sendConfigResponse(requestId);
 }
 
 // ---------------------------------------------------------------------------
@@ -1664,7 +2246,7 @@ String formatRemaining(uint32_t remainingMs) {
 void applyVolume(uint8_t pct) {
     if (pct > 100) pct = 100;
     currentVolumePct = pct;
-    applyEffectiveVolume("volume request");
+    applyEffectiveVolume(TraceLog::VolumeReason::Request);
 }
 
 uint8_t effectiveVolumePct() {
@@ -1678,16 +2260,16 @@ uint8_t effectiveVolumePct() {
     return currentVolumePct;
 }
 
-void applyEffectiveVolume(const char* reason) {
+void applyEffectiveVolume(TraceLog::VolumeReason reason) {
     uint8_t pct = effectiveVolumePct();
     currentEffectiveVolumePct = pct;
-    float v = pct / 100.0f;
-    volumeOut.setVolume(v);
+    volumeOut.setVolume(pct / 100.0f);
+    int32_t reasonCode = static_cast<int32_t>(reason);
     if (pct == currentVolumePct) {
-        Serial.printf("[Vol] %u%% (%.2f, %s)\n", pct, v, reason);
+        TraceLog::record(TraceLog::Id::Volume, pct, reasonCode);
     } else {
-        Serial.printf("[Vol] requested=%u%% effective=%u%% bedtimeCap=%u%% (%.2f, %s)\n",
-                      currentVolumePct, pct, parentConfig.bedtimeVolumeCapPct(), v, reason);
+        TraceLog::record(TraceLog::Id::VolumeCapped, currentVolumePct, pct,
+                         parentConfig.bedtimeVolumeCapPct(), reasonCode);
     }
 }
 
@@ -1696,6 +2278,9 @@ void applyEffectiveVolume(const char* reason) {
 // ---------------------------------------------------------------------------
 void handleStateEntry(State prev, State next) {
     markActivity("state change");
+    if (next == State::PLAYING_SONG || next == State::PLAYING_ANIMAL) {
+        PressTrace::mark(PressTrace::Stage::Dispatched);
+    }
 
     // Stop WAV on any exit from PLAYING states
     bool exitedWav = (prev == State::PLAYING_SONG || prev == State::PLAYING_ANIMAL) &&
@@ -1709,6 +2294,8 @@ void handleStateEntry(State prev, State next) {
         case State::IDLE:
             if (prev == State::BT_STREAMING) {
                 scheduleBluetoothReopen("BT disconnected");
+                // The BT tasks' high-water marks are at their deepest now.
+                printMemoryReport();
             }
             setAmpMuted(true);
             break;
@@ -1717,21 +2304,22 @@ void handleStateEntry(State prev, State next) {
             // Fresh song start (prev != PLAYING_SONG); "next song" is handled
             // directly in loop() via wavPlayer.nextSong() when btn1 is pressed.
             currentPlaybackTheme = bedtimeEffectiveSongTheme();
-            applyEffectiveVolume("song start");
+            applyEffectiveVolume(TraceLog::VolumeReason::SongStart);
             setAmpMuted(false);
             playSong();
             break;
         }
 
         case State::PLAYING_ANIMAL:
-            applyEffectiveVolume("animal start");
+            applyEffectiveVolume(TraceLog::VolumeReason::AnimalStart);
             setAmpMuted(false);
             playAnimal();
             break;
 
         case State::BT_STREAMING:
             // WAV already stopped above; release mute so A2DP audio flows through
-            wavPlayer.stop();  // ensure WAV is stopped
+            // Stop WAV and hand its read-ahead memory to the BT stack.
+            wavPlayer.releaseReadAhead();
             setAmpMuted(false);
             break;
 
@@ -0,0 +1,186 @@
+#include <algorithm>
+#include <cassert>
+#include <cstdint>
+#include <iostream>
+#include <string>
+#include <vector>
+
+#include "Arduino.h"
+#include "ButtonHandler.h"
+#include "esp_timer.h"
+
+uint32_t g_fakeMillis = 0;
+
+namespace {
+
+constexpr uint32_t MS = 1000;
+
+struct Edge {
+    uint32_t atUs;
+    uint8_t button;
+    bool pressed;
+};
+
+// A press with contact bounce: closes, opens, closes again, then releases.
+void addPress(std::vector<Edge>& edges, uint8_t button, uint32_t atUs, uint32_t holdUs) {
+    edges.push_back({atUs, button, true});
+    edges.push_back({atUs + 700, button, false});
+    edges.push_back({atUs + 1500, button, true});
+    edges.push_back({atUs + holdUs, button, false});
+}
+
+std::string consume(ButtonHandler& buttons) {
+    std::string events;
+    if (buttons.wasBothPressed()) events += "B";
+    if (buttons.wasBtn1Pressed()) events += "1";
+    if (buttons.wasBtn2Pressed()) events += "2";
+    return events;
+}
+
+ButtonHandler startAt(uint32_t atUs) {
+    g_fakeTimerUs = atUs;
+    ButtonHandler buttons;
+    buttons.begin();
+    return buttons;
+}
+
+// Feeds the edges as the ISRs would and polls every pollUs, like a loop
+// whose passes take that long. Returns the events in the order consumed.
+std::string run(const std::vector<Edge>& edges, uint32_t pollUs, uint32_t endUs) {
+    ButtonHandler buttons = startAt(0);
+    std::string events;
+    size_t next = 0;
+    for (uint32_t now = pollUs; now <= endUs; now += pollUs) {
+        while (next < edges.size() && edges[next].atUs <= now) {
+            assert(ButtonHandler::pushEdge(edges[next].button, edges[next].pressed, edges[next].atUs));
+            next++;
+        }
+        g_fakeTimerUs = now;
+        buttons.update();
+        events += consume(buttons);
+    }
+    return events;
+}
+
+void testBouncyPressIsOneEvent() {
+    ButtonHandler buttons = startAt(1000);
+    ButtonHandler::pushEdge(0, true, 10 * MS);
+    ButtonHandler::pushEdge(0, false, 10 * MS + 500);
+    ButtonHandler::pushEdge(0, true, 11 * MS);
+
+    g_fakeTimerUs = 60 * MS;  // 49 ms after the last bounce: not stable yet
+    buttons.update();
+    assert(consume(buttons).empty());
+
+    g_fakeTimerUs = 161 * MS;  // stable at 61 ms, both-press window over at 161 ms
+    buttons.update();
+    assert(consume(buttons).empty());
+    g_fakeTimerUs = 161 * MS + 1;
+    buttons.update();
+    assert(consume(buttons) == "1");
+    assert(buttons.btn1PressEdgeUs() == 10 * MS);
+
+    // A 2 ms glitch on button 2 is not a press.
+    ButtonHandler::pushEdge(1, true, 200 * MS);
+    ButtonHandler::pushEdge(1, false, 202 * MS);
+    g_fakeTimerUs = 900 * MS;
+    buttons.update();
+    assert(consume(buttons).empty());
+}
+
+void testPressInsideOneSlowLoopPass() {
+    // Pressed and released while the loop was busy for 400 ms.
+    ButtonHandler buttons = startAt(0);
+    ButtonHandler::pushEdge(1, true, 5 * MS);
+    ButtonHandler::pushEdge(1, false, 90 * MS);
+    g_fakeTimerUs = 400 * MS;
+    buttons.update();
+    assert(consume(buttons) == "2");
+    assert(buttons.btn2PressEdgeUs() == 5 * MS);
+}
+
+void testBothPressUsesEdgeTimes() {
+    ButtonHandler buttons = startAt(0);
+    ButtonHandler::pushEdge(0, true, 10 * MS);
+    ButtonHandler::pushEdge(1, true, 90 * MS);  // 80 ms later: simultaneous
+    g_fakeTimerUs = 500 * MS;
+    buttons.update();
+    assert(consume(buttons) == "B");
+    assert(buttons.isBothHeld());
+    assert(buttons.bothHeldDurationMs() == 500 - 140);
+    ButtonHandler::pushEdge(0, false, 600 * MS);
+    ButtonHandler::pushEdge(1, false, 600 * MS);
+    g_fakeTimerUs = 700 * MS;
+    buttons.update();
+    assert(!buttons.isBothHeld());
+    assert(buttons.bothHeldDurationMs() == 0);
+
+    // Same loop pass, but 250 ms apart: two separate presses.
+    ButtonHandler::pushEdge(0, true, 1000 * MS);
+    ButtonHandler::pushEdge(1, true, 1250 * MS);
+    g_fakeTimerUs = 1600 * MS;
+    buttons.update();
+    assert(consume(buttons) == "12");
+}
+
+void testEventsIndependentOfLoopPeriod() {
+    std::vector<Edge> edges;
+    uint32_t seed = 12345;
+    uint32_t at = 20 * MS;
+    std::string expected;
+    for (int i = 0; i < 40; i++) {
+        seed = seed * 1103515245u + 12345u;
+        int kind = (seed >> 16) % 3;
+        uint32_t hold = 60 * MS + ((seed >> 8) % 200) * MS;
+        if (kind == 2) {
+            addPress(edges, 0, at, hold);
+            addPress(edges, 1, at + 30 * MS, hold);
+            expected += "B";
+        } else {
+            addPress(edges, static_cast<uint8_t>(kind), at, hold);
+            expected += kind == 0 ? "1" : "2";
+        }
+        at += hold + 400 * MS;
+    }
+
+    // The ISRs queue edges in time order.
+    std::stable_sort(edges.begin(), edges.end(),
+                     [](const Edge& a, const Edge& b) { return a.atUs < b.atUs; });
+
+    uint32_t endUs = at + 500 * MS;
+    assert(run(edges, 1 * MS, endUs) == expected);
+    assert(run(edges, 17 * MS, endUs) == expected);
+    assert(run(edges, 95 * MS, endUs) == expected);  // a config JSON build every pass
+}
+
+void testFullQueueResyncsFromPins() {
+    ButtonHandler buttons = startAt(0);
+    uint32_t droppedBefore = ButtonHandler::droppedEdges();
+    int accepted = 0;
+    for (int i = 0; i < 40; i++) {
+        accepted += ButtonHandler::pushEdge(0, i % 2 == 0, 1 * MS + i * 100) ? 1 : 0;
+    }
+    assert(accepted == static_cast<int>(BUTTON_EDGE_QUEUE_DEPTH));
+    assert(ButtonHandler::droppedEdges() - droppedBefore == 40 - BUTTON_EDGE_QUEUE_DEPTH);
+
+    // The last queued edge was a release, but the pin is still held.
+    g_fakePinLow[PIN_BTN1] = true;
+    g_fakeTimerUs = 10 * MS;
+    buttons.update();
+    g_fakeTimerUs = 200 * MS;
+    buttons.update();
+    assert(consume(buttons) == "1");
+    g_fakePinLow[PIN_BTN1] = false;
+}
+
+}  // namespace
+
+int main() {
+    testBouncyPressIsOneEvent();
+    testPressInsideOneSlowLoopPass();
+    testBothPressUsesEdgeTimes();
+    testEventsIndependentOfLoopPeriod();
+    testFullQueueResyncsFromPins();
+    std::cout << "button-handler native test passed\n";
+    return 0;
+}
@@ -0,0 +1,240 @@
+#include <cassert>
+#include <chrono>
+#include <cstdint>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <iostream>
+#include <new>
+#include <string>
+
+#include "Arduino.h"
+#include "ContentCatalog.h"
+#include "JsonWriter.h"
+#include "SD.h"
+
+uint32_t g_fakeMillis = 0;
+
+// Every heap allocation in the process, so the benchmark can report
+// allocations per page.
+static size_t g_allocations = 0;
+
+void* operator new(std::size_t size) {
+    g_allocations++;
+    if (void* p = std::malloc(size ? size : 1)) return p;
+    throw std::bad_alloc();
+}
+
+void operator delete(void* p) noexcept { std::free(p); }
+void operator delete(void* p, std::size_t) noexcept { std::free(p); }
+
+namespace {
+
+constexpr uint32_t WAV_DATA_BYTES = 17640;  // 100 ms of 44.1 kHz 16-bit stereo
+
+void put16(std::string& out, uint16_t value) {
+    out += static_cast<char>(value & 0xFF);
+    out += static_cast<char>(value >> 8);
+}
+
+void put32(std::string& out, uint32_t value) {
+    put16(out, static_cast<uint16_t>(value & 0xFFFF));
+    put16(out, static_cast<uint16_t>(value >> 16));
+}
+
+// A canonical 44-byte-header PCM WAV file.
+std::string wavFile(uint32_t sampleRate) {
+    std::string out = "RIFF";
+    put32(out, 36 + WAV_DATA_BYTES);
+    out += "WAVEfmt ";
+    put32(out, 16);
+    put16(out, 1);  // PCM
+    put16(out, 2);
+    put32(out, sampleRate);
+    put32(out, sampleRate * 4);
+    put16(out, 4);
+    put16(out, 16);
+    out += "data";
+    put32(out, WAV_DATA_BYTES);
+    out.append(WAV_DATA_BYTES, '\0');
+    return out;
+}
+
+void loadCatalog() {
+    ContentCatalog::beginCatalogBuild(nullptr, 0);
+    while (!ContentCatalog::catalogReady()) {
+        ContentCatalog::continueCatalogBuild(0);
+    }
+}
+
+std::string text(const JsonWriter& out) {
+    assert(std::strlen(out.c_str()) == out.length());
+    return std::string(out.c_str(), out.length());
+}
+
+// One theme of 40 songs: one disabled through metadata.json, one at the wrong
+// sample rate, so both row variants appear on the first and last page.
+void makeLullabiesCard() {
+    SD.clear();
+    SD.addFile("/animals/cat.wav", wavFile(SAMPLE_RATE));
+    SD.addFile("/songs/lullabies/metadata.json",
+               "{\"schemaVersion\":2,\"name\":\"Lullabies for bedtime\",\"shuffle\":true,"
+               "\"disabledSongs\":[\"brahms - lullaby.wav\"]}");
+    SD.addFile("/songs/lullabies/brahms - lullaby.wav", wavFile(SAMPLE_RATE));
+    SD.addFile("/songs/lullabies/twinkle twinkle little star.wav", wavFile(22050));
+    char name[48];
+    for (int i = 1; i <= 38; i++) {
+        snprintf(name, sizeof(name), "/songs/lullabies/track %02d.wav", i);
+        SD.addFile(name, wavFile(SAMPLE_RATE));
+    }
+}
+
+const char FIRST_PAGE[] =
+    "{\"id\":42,\"ok\":true,\"op\":\"scanSongs\",\"theme\":\"lullabies\","
+    "\"name\":\"Lullabies for bedtime\",\"themeEnabled\":true,\"disabledByUser\":false,"
+    "\"shuffle\":true,\"errors\":1,\"page\":0,\"songs\":["
+    "{\"file\":\"brahms - lullaby.wav\",\"enabled\":false,\"ok\":true,"
+    "\"sizeBytes\":17684,\"durationMs\":100},"
+    "{\"file\":\"track 01.wav\",\"enabled\":true,\"ok\":true,"
+    "\"sizeBytes\":17684,\"durationMs\":100}],\"hasMore\":true}";
+
+const char LAST_PAGE[] =
+    "{\"id\":7,\"ok\":true,\"op\":\"scanSongs\",\"theme\":\"lullabies\","
+    "\"name\":\"Lullabies for bedtime\",\"themeEnabled\":true,\"disabledByUser\":false,"
+    "\"shuffle\":true,\"errors\":1,\"page\":19,\"songs\":["
+    "{\"file\":\"track 38.wav\",\"enabled\":true,\"ok\":true,"
+    "\"sizeBytes\":17684,\"durationMs\":100},"
+    "{\"file\":\"twinkle twinkle little star.wav\",\"enabled\":true,\"ok\":false,"
+    "\"sizeBytes\":17684,\"durationMs\":0,\"error\":\"Invalid sample rate: 22050 Hz\"}],"
+    "\"hasMore\":false}";
+
+// Themes and songs whose strcmp order differs from a case-insensitive or
+// alphabetical one: upper case sorts before lower case, and Hebrew (UTF-8 lead
+// byte 0xD7) after all ASCII. Lookups must find exact names only.
+void testMixedCaseAndHebrewLookups() {
+    SD.clear();
+    SD.addFile("/animals/cat.wav", wavFile(SAMPLE_RATE));
+    SD.addFile("/songs/bedtime/Zebra.wav", wavFile(SAMPLE_RATE));
+    SD.addFile("/songs/bedtime/apple.wav", wavFile(SAMPLE_RATE));
+    SD.addFile("/songs/bedtime/\xD7\x91.wav", wavFile(SAMPLE_RATE));  // bet
+    SD.addFile("/songs/bedtime/\xD7\x90.wav", wavFile(SAMPLE_RATE));  // alef
+    SD.addFile("/songs/Morning/Good Morning.wav", wavFile(SAMPLE_RATE));
+    SD.addFile("/songs/Zoo/lion.wav", wavFile(SAMPLE_RATE));
+    SD.addFile("/songs/abc/ABC.wav", wavFile(SAMPLE_RATE));
+    const std::string hebrewTheme = "\xD7\xA9\xD7\x99\xD7\xA8\xD7\x99 \xD7\xA2\xD7\xA8\xD7\xA9";
+    const std::string hebrewSong = "\xD7\x9C\xD7\x99\xD7\x9C\xD7\x94 \xD7\x98\xD7\x95\xD7\x91.wav";
+    SD.addFile("/songs/" + hebrewTheme + "/" + hebrewSong, wavFile(SAMPLE_RATE));
+    loadCatalog();
+
+    const char* const themeOrder[] = {"Morning", "Zoo", "abc", "bedtime", hebrewTheme.c_str(),
+                                      ANIMALS_THEME_ID};
+    assert(ContentCatalog::themeCount() == 6);
+    for (int i = 0; i < 6; i++) {
+        assert(strcmp(ContentCatalog::themeAt(i).id(), themeOrder[i]) == 0);
+        const ContentCatalog::CachedTheme* theme = ContentCatalog::findTheme(themeOrder[i]);
+        assert(theme == &ContentCatalog::themeAt(i));
+    }
+    for (const char* missing : {"morning", "ZOO", "Abc", "Bedtime", "", "zzz", "\xD7\xA9"}) {
+        assert(ContentCatalog::findTheme(missing) == nullptr);
+    }
+
+    const ContentCatalog::CachedTheme* bedtime = ContentCatalog::findTheme("bedtime");
+    const char* const songOrder[] = {"Zebra.wav", "apple.wav", "\xD7\x90.wav", "\xD7\x91.wav"};
+    assert(bedtime->songs().size() == 4);
+    for (int i = 0; i < 4; i++) {
+        assert(strcmp(bedtime->songs()[i].file(), songOrder[i]) == 0);
+        assert(ContentCatalog::findSong("bedtime", songOrder[i]) == &bedtime->songs()[i]);
+    }
+    assert(ContentCatalog::findSong("bedtime", "zebra.wav") == nullptr);
+    assert(ContentCatalog::findSong("bedtime", "Apple.wav") == nullptr);
+    assert(ContentCatalog::findSong("bedtime", "\xD7\x92.wav") == nullptr);
+
+    const ContentCatalog::CachedSong* song = ContentCatalog::findSong(hebrewTheme.c_str(), hebrewSong.c_str());
+    assert(song != nullptr && strcmp(song->file(), hebrewSong.c_str()) == 0);
+    assert(ContentCatalog::findSong("Morning", "Good Morning.wav") != nullptr);
+    assert(ContentCatalog::findSong("Morning", "good morning.wav") == nullptr);
+    assert(ContentCatalog::findSong("morning", "Good Morning.wav") == nullptr);
+    assert(ContentCatalog::findSong("abc", "ABC.wav") != nullptr);
+    assert(ContentCatalog::findSong("abc", "abc.wav") == nullptr);
+    assert(ContentCatalog::findSong(ANIMALS_THEME_ID, "cat.wav") != nullptr);
+}
+
+// The real scanSongs page writer on a catalog read from the fake card, timed
+// both when it renders the page and when it answers from the page cache.
+void benchmarkSongsPages() {
+    makeLullabiesCard();
+    loadCatalog();
+
+    const String themeId = "lullabies";
+    const ContentCatalog::CachedTheme* theme = ContentCatalog::findTheme(themeId);
+    assert(theme != nullptr && theme->songs().size() == 40);
+    const int pageSize = BLE_CONFIG_SONG_PAGE_SIZE;
+    const int pages = static_cast<int>(theme->songs().size() + pageSize - 1) / pageSize;
+    assert(pages > CONFIG_PAGE_CACHE_ENTRIES);
+
+    static char buf[BLE_CONFIG_RESPONSE_MAX_BYTES + 1];
+    JsonWriter out(buf, sizeof(buf));
+    ContentCatalog::writeSongsPageJson(out, 42, themeId, 0, pageSize);
+    assert(text(out) == FIRST_PAGE);
+    out.clear();
+    ContentCatalog::writeSongsPageJson(out, 7, themeId, pages - 1, pageSize);
+    assert(text(out) == LAST_PAGE);
+
+    size_t largest = 0;
+    for (int page = 0; page < pages; page++) {
+        out.clear();
+        ContentCatalog::writeSongsPageJson(out, 4294967295UL, themeId, page, pageSize);
+        assert(!out.overflowed());
+        if (out.length() > largest) largest = out.length();
+    }
+    assert(largest <= BLE_CONFIG_RESPONSE_MAX_BYTES);
+
+    // Walking more pages than the cache holds misses on every call, so each
+    // one is rendered from the catalog. One pass per cache slot first, so
+    // every slot's body buffer has grown to the pages it will hold.
+    for (int i = 0; i < pages * CONFIG_PAGE_CACHE_ENTRIES; i++) {
+        out.clear();
+        ContentCatalog::writeSongsPageJson(out, static_cast<uint32_t>(i), themeId, i % pages, pageSize);
+    }
+
+    constexpr int PAGES = 20000;
+    using Clock = std::chrono::steady_clock;
+    size_t checksum = 0;
+
+    size_t allocsBefore = g_allocations;
+    Clock::time_point start = Clock::now();
+    for (int i = 0; i < PAGES; i++) {
+        out.clear();
+        ContentCatalog::writeSongsPageJson(out, static_cast<uint32_t>(i), themeId, i % pages, pageSize);
+        checksum += out.length();
+    }
+    double renderNs = std::chrono::duration<double, std::nano>(Clock::now() - start).count() / PAGES;
+    size_t renderAllocs = g_allocations - allocsBefore;
+
+    allocsBefore = g_allocations;
+    start = Clock::now();
+    for (int i = 0; i < PAGES; i++) {
+        out.clear();
+        ContentCatalog::writeSongsPageJson(out, static_cast<uint32_t>(i), themeId, 0, pageSize);
+        checksum += out.length();
+    }
+    double cachedNs = std::chrono::duration<double, std::nano>(Clock::now() - start).count() / PAGES;
+    size_t cachedAllocs = g_allocations - allocsBefore;
+
+    std::printf("scanSongs page (%d songs, largest %u bytes): rendered %.0f ns, %.2f allocs/page; "
+                "cached %.0f ns, %.2f allocs/page (checksum %zu)\n",
+                static_cast<int>(theme->songs().size()), static_cast<unsigned>(largest), renderNs,
+                static_cast<double>(renderAllocs) / PAGES, cachedNs,
+                static_cast<double>(cachedAllocs) / PAGES, checksum);
+    assert(renderAllocs == 0);
+    assert(cachedAllocs == 0);
+}
+
+}  // namespace
+
+int main() {
+    testMixedCaseAndHebrewLookups();
+    benchmarkSongsPages();
+    std::cout << "content-catalog native test passed\n";
+    return 0;
+}
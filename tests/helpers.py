@@ -22,6 +22,14 @@ def find_platformio(root: pathlib.Path = ROOT) -> pathlib.Path | None:
     return pathlib.Path(found) if found else None
 
 
+def find_arduinojson(root: pathlib.Path = ROOT) -> pathlib.Path | None:
+    """ArduinoJson's include directory as fetched by PlatformIO, if present."""
+    for candidate in sorted((root / ".pio" / "libdeps").glob("*/ArduinoJson/src")):
+        if (candidate / "ArduinoJson.h").exists():
+            return candidate
+    return None
+
+
 def serial_ports() -> list[str]:
     patterns = [
         "/dev/cu.usbserial*",
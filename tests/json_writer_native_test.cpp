@@ -0,0 +1,95 @@
+#include <cassert>
+#include <climits>
+#include <cstdint>
+#include <cstring>
+#include <iostream>
+#include <string>
+
+#include "Arduino.h"
+#include "JsonWriter.h"
+
+uint32_t g_fakeMillis = 0;
+
+namespace {
+
+std::string text(const JsonWriter& out) {
+    assert(std::strlen(out.c_str()) == out.length());
+    return std::string(out.c_str(), out.length());
+}
+
+void testValues() {
+    char buf[128];
+    JsonWriter out(buf, sizeof(buf));
+    out.raw("[").num(0).raw(",").num(-7).raw(",").num(4294967295UL).raw(",").num(LLONG_MIN);
+    out.raw(",").boolean(true).raw(",").boolean(false).raw("]");
+    assert(text(out) == "[0,-7,4294967295,-9223372036854775808,true,false]");
+    assert(!out.overflowed());
+}
+
+void testEscaping() {
+    char buf[128];
+    JsonWriter out(buf, sizeof(buf));
+    const char name[] = "a\"b\\c\n\x01/é";
+    out.str(name);
+    assert(text(out) == "\"a\\\"b\\\\c\\n\\u0001/é\"");
+    assert(JsonWriter::escapedLength(name, strlen(name)) + 2 == out.length());
+    assert(JsonWriter::needsEscape(name, strlen(name)));
+    assert(!JsonWriter::needsEscape("Lullabies 2", 11));
+
+    out.clear();
+    out.escaped("already \\\"escaped\\\"");
+    assert(text(out) == "\"already \\\"escaped\\\"\"");
+}
+
+void testExactFitAndOverflow() {
+    char buf[8];  // 7 chars + NUL
+    JsonWriter out(buf, sizeof(buf));
+    out.raw("abc").str("de");  // "abc" + "\"de\"" = 7, exactly full
+    assert(!out.overflowed());
+    assert(out.remaining() == 0);
+    assert(text(out) == "abc\"de\"");
+
+    out.clear();
+    out.raw("abc").str("def");  // needs 8: nothing of it is written
+    assert(out.overflowed());
+    assert(text(out) == "abc");
+    out.raw("x");  // sticky until rewind/clear
+    assert(text(out) == "abc");
+
+    out.clear();
+    out.num(1234567).num(8);  // the second number no longer fits
+    assert(out.overflowed());
+    assert(text(out) == "1234567");
+}
+
+void testRewindDropsPartialRow() {
+    char buf[26];  // room for two rows and the closing bracket
+    JsonWriter out(buf, sizeof(buf));
+    out.raw("[");
+    const char* rows[] = {"one", "two", "three", "four"};
+    int written = 0;
+    for (const char* row : rows) {
+        size_t mark = out.mark();
+        if (written > 0) out.raw(",");
+        out.raw("{\"n\":").str(row).raw("}");
+        if (out.overflowed() || out.remaining() < 1) {
+            out.rewind(mark);
+            break;
+        }
+        written++;
+    }
+    out.raw("]");
+    assert(!out.overflowed());
+    assert(text(out) == "[{\"n\":\"one\"},{\"n\":\"two\"}]");
+}
+
+}  // namespace
+
+int main() {
+    testValues();
+    testEscaping();
+    testExactFitAndOverflow();
+    testRewindDropsPartialRow();
+    std::cout << "json-writer native test passed\n";
+    return 0;
+}
@@ -0,0 +1,156 @@
+#include <cassert>
+#include <cstdint>
+#include <cstring>
+#include <iostream>
+#include <string>
+
+#include <esp_heap_caps.h>
+#include <freertos/task.h>
+
+#include "Config.h"
+#include "MemoryReport.h"
+
+uint32_t g_fakeMillis = 0;
+
+namespace {
+
+bool contains(const std::string& text, const char* part) {
+    return text.find(part) != std::string::npos;
+}
+
+void setUpDevice() {
+    g_fakeHeaps[0] = {MALLOC_CAP_8BIT, 61234, 31744, 18020};
+    g_fakeHeaps[1] = {MALLOC_CAP_INTERNAL, 90112, 31744, 40960};
+    g_fakeHeaps[2] = {MALLOC_CAP_DMA, 60000, 30000, 17000};
+    g_fakeHeaps[3] = {MALLOC_CAP_32BIT, 120000, 65536, 80000};
+    g_fakeTasks.clear();
+    // Out of table order, and one task the table does not know.
+    g_fakeTasks.push_back({"BTU_TASK", 1900});
+    g_fakeTasks.push_back({"loopTask", 5100});
+    g_fakeTasks.push_back({"IDLE", 600});
+    g_fakeTasks.push_back({"WavReadAhead", 1224});
+}
+
+void testCaptureReadsTableTasksAndHeaps() {
+    setUpDevice();
+    MemoryReport::Snapshot snap;
+    snap.blockCount = 3;  // cleared by capture()
+    MemoryReport::capture(snap);
+
+    assert(snap.heaps[0].freeBytes == 61234);
+    assert(snap.heaps[0].largestBlock == 31744);
+    assert(snap.heaps[0].minFreeBytes == 18020);
+    assert(std::strcmp(snap.heaps[3].name, "32bit") == 0);
+
+    // Table order, tasks that are not running (BT off) left out.
+    assert(snap.taskCount == 3);
+    assert(std::strcmp(snap.tasks[0].name, "loopTask") == 0);
+    assert(snap.tasks[0].stackBytes == 8192);
+    assert(snap.tasks[0].minFreeBytes == 5100);
+    assert(std::strcmp(snap.tasks[1].name, "WavReadAhead") == 0);
+    assert(snap.tasks[1].stackBytes == SD_READAHEAD_TASK_STACK_BYTES);
+    assert(std::strcmp(snap.tasks[2].name, "BTU_TASK") == 0);
+    assert(snap.blockCount == 0);
+}
+
+void testBlocksAreBounded() {
+    MemoryReport::Snapshot snap;
+    MemoryReport::capture(snap);
+    for (int i = 0; i < MemoryReport::MAX_BLOCKS; i++) {
+        assert(MemoryReport::addBlock(snap, "b", 100));
+    }
+    assert(!MemoryReport::addBlock(snap, "over", 100));
+    assert(MemoryReport::blockTotal(snap) == 100u * MemoryReport::MAX_BLOCKS);
+}
+
+void testPrintWritesOneLinePerHeapAndTask() {
+    setUpDevice();
+    MemoryReport::Snapshot snap;
+    MemoryReport::capture(snap);
+    MemoryReport::addBlock(snap, "themes", 640);
+    MemoryReport::addBlock(snap, "names", 4096);
+
+    Serial.lines.clear();
+    MemoryReport::print(snap, "catalog");
+    assert(Serial.lines.size() == 4 + 3 + 1);
+    assert(Serial.lines[0] == "[Mem] v=1 heap=8bit free=61234 largest=31744 min=18020");
+    assert(Serial.lines[4] == "[Mem] v=1 task=loopTask stack=8192 free=5100");
+    assert(Serial.lines[7] == "[Mem] v=1 catalog themes=640 names=4096 total=4736");
+
+    // No blocks, no block line.
+    MemoryReport::capture(snap);
+    Serial.lines.clear();
+    MemoryReport::print(snap, "catalog");
+    assert(Serial.lines.size() == 7);
+}
+
+void testPagesFitTheConfigResponse() {
+    // Every table task running: the largest report the device can produce.
+    g_fakeTasks.clear();
+    const char* names[] = {"loopTask", "BtI2STask", "WavReadAhead", "BtAppTask", "BTC_TASK",
+                           "BTU_TASK", "btController", "esp_timer", "ipc0", "ipc1"};
+    for (const char* name : names) g_fakeTasks.push_back({name, 123456});
+    MemoryReport::Snapshot snap;
+    MemoryReport::capture(snap);
+    for (int i = 0; i < MemoryReport::MAX_BLOCKS; i++) {
+        MemoryReport::addBlock(snap, "themes", 1234567);
+    }
+    for (StubHeap& heap : g_fakeHeaps) {
+        heap.freeBytes = heap.largestBlock = heap.minFreeBytes = 4294967295u;
+    }
+    assert(snap.taskCount == 10);
+    assert(MemoryReport::pageCount(snap) == 4);
+
+    char buf[BLE_CONFIG_RESPONSE_MAX_BYTES + 1];
+    JsonWriter out(buf, sizeof(buf));
+    for (int page = 0; page < MemoryReport::pageCount(snap); page++) {
+        out.clear();
+        MemoryReport::writePageJson(out, 4294967295u, page, snap);
+        assert(!out.overflowed());
+        const std::string text = out.c_str();
+        assert(contains(text, "\"op\":\"getMemory\""));
+        assert(contains(text, page < 3 ? "\"hasMore\":true" : "\"hasMore\":false"));
+    }
+
+    setUpDevice();
+    MemoryReport::capture(snap);
+    out.clear();
+    MemoryReport::writePageJson(out, 7, 0, snap);
+    std::string text = out.c_str();
+    assert(contains(text, "\"heaps\":[{\"name\":\"8bit\",\"free\":61234,\"largest\":31744,\"min\":18020}"));
+    assert(!contains(text, "blocks") && !contains(text, "tasks"));
+
+    MemoryReport::addBlock(snap, "names", 4096);
+    MemoryReport::addBlock(snap, "pages", 900);
+    out.clear();
+    MemoryReport::writePageJson(out, 7, 1, snap);
+    text = out.c_str();
+    assert(contains(text, "\"blocks\":[{\"name\":\"names\",\"bytes\":4096},"));
+    assert(contains(text, "\"blockTotal\":4996}"));
+
+    // The last page holds the tail of the table.
+    g_fakeTasks.clear();
+    for (const char* name : names) g_fakeTasks.push_back({name, 123456});
+    MemoryReport::capture(snap);
+    out.clear();
+    MemoryReport::writePageJson(out, 7, 3, snap);
+    text = out.c_str();
+    assert(contains(text, "\"tasks\":[{\"name\":\"btController\""));
+    assert(contains(text, "{\"name\":\"ipc1\",\"stack\":0,\"free\":123456}]}"));
+
+    // Out-of-range pages clamp, like getPerf.
+    out.clear();
+    MemoryReport::writePageJson(out, 7, 99, snap);
+    assert(contains(out.c_str(), "\"page\":3"));
+}
+
+}  // namespace
+
+int main() {
+    testCaptureReadsTableTasksAndHeaps();
+    testBlocksAreBounded();
+    testPrintWritesOneLinePerHeapAndTask();
+    testPagesFitTheConfigResponse();
+    std::cout << "memory-report native test passed\n";
+    return 0;
+}
@@ -0,0 +1,143 @@
+#include <algorithm>
+#include <cassert>
+#include <chrono>
+#include <cstdint>
+#include <cstdio>
+#include <cstring>
+#include <iostream>
+#include <string>
+#include <vector>
+
+#include "NameIndex.h"
+
+namespace {
+
+constexpr int THEMES = 64;
+constexpr int SONGS_PER_THEME = 128;
+
+struct Catalog {
+    std::vector<std::string> themes;               // sorted ids
+    std::vector<std::vector<std::string>> songs;   // per theme, sorted names
+};
+
+bool byStrcmp(const std::string& a, const std::string& b) {
+    return strcmp(a.c_str(), b.c_str()) < 0;
+}
+
+// Folder and file names shaped like a real card: shared prefixes, so strcmp
+// has to look past the first few bytes.
+Catalog makeCatalog() {
+    Catalog catalog;
+    char name[64];
+    for (int t = 0; t < THEMES; t++) {
+        snprintf(name, sizeof(name), "theme-%02d-%s", (t * 37) % THEMES, t % 2 ? "songs" : "lullabies");
+        catalog.themes.push_back(name);
+        std::vector<std::string> files;
+        for (int s = 0; s < SONGS_PER_THEME; s++) {
+            snprintf(name, sizeof(name), "%03d - track %d of the album.wav", (s * 53) % SONGS_PER_THEME, s);
+            files.push_back(name);
+        }
+        std::sort(files.begin(), files.end(), byStrcmp);
+        catalog.songs.push_back(files);
+    }
+    std::sort(catalog.themes.begin(), catalog.themes.end(), byStrcmp);
+    return catalog;
+}
+
+int linearFind(const std::vector<std::string>& names, const char* name, size_t& compares) {
+    for (size_t i = 0; i < names.size(); i++) {
+        compares++;
+        if (strcmp(names[i].c_str(), name) == 0) return static_cast<int>(i);
+    }
+    return -1;
+}
+
+int indexedFind(const std::vector<std::string>& names, const char* name, size_t& compares) {
+    return NameIndex::find(name, names.size(), [&](size_t i) {
+        compares++;
+        return names[i].c_str();
+    });
+}
+
+void testFindsEveryNameAndRejectsOthers() {
+    std::vector<std::string> names = {"a", "ab", "abc", "b", "ba", "z"};
+    size_t compares = 0;
+    for (size_t i = 0; i < names.size(); i++) {
+        assert(indexedFind(names, names[i].c_str(), compares) == static_cast<int>(i));
+    }
+    for (const char* missing : {"", "0", "aa", "abcd", "bb", "zz"}) {
+        assert(indexedFind(names, missing, compares) == -1);
+    }
+    std::vector<std::string> empty;
+    assert(indexedFind(empty, "a", compares) == -1);
+}
+
+// Every theme id and every song of every theme, looked up both ways.
+void benchmarkCatalogLookups() {
+    Catalog catalog = makeCatalog();
+    using Clock = std::chrono::steady_clock;
+
+    size_t linearCompares = 0;
+    size_t indexedCompares = 0;
+    size_t maxThemeCompares = 0;
+    size_t maxSongCompares = 0;
+    size_t lookups = 0;
+
+    Clock::time_point start = Clock::now();
+    for (int round = 0; round < 4; round++) {
+        for (int t = 0; t < THEMES; t++) {
+            const std::string& id = catalog.themes[t];
+            int theme = linearFind(catalog.themes, id.c_str(), linearCompares);
+            for (const std::string& file : catalog.songs[theme]) {
+                linearFind(catalog.songs[theme], file.c_str(), linearCompares);
+            }
+        }
+    }
+    double linearNs = std::chrono::duration<double, std::nano>(Clock::now() - start).count();
+
+    start = Clock::now();
+    for (int round = 0; round < 4; round++) {
+        for (int t = 0; t < THEMES; t++) {
+            const std::string& id = catalog.themes[t];
+            size_t compares = 0;
+            int theme = indexedFind(catalog.themes, id.c_str(), compares);
+            assert(theme == t);
+            maxThemeCompares = std::max(maxThemeCompares, compares);
+            indexedCompares += compares;
+            lookups++;
+            for (size_t s = 0; s < catalog.songs[theme].size(); s++) {
+                compares = 0;
+                int song = indexedFind(catalog.songs[theme], catalog.songs[theme][s].c_str(), compares);
+                assert(song == static_cast<int>(s));
+                maxSongCompares = std::max(maxSongCompares, compares);
+                indexedCompares += compares;
+                lookups++;
+            }
+        }
+    }
+    double indexedNs = std::chrono::duration<double, std::nano>(Clock::now() - start).count();
+
+    size_t compares = 0;
+    assert(indexedFind(catalog.themes, "theme-99-missing", compares) == -1);
+    assert(indexedFind(catalog.songs[0], "999 - not on the card.wav", compares) == -1);
+
+    std::printf("%d themes x %d songs, %zu lookups: linear %.1f strcmp/lookup %.0f ns/lookup; "
+                "NameIndex %.1f strcmp/lookup (max %zu theme, %zu song) %.0f ns/lookup\n",
+                THEMES, SONGS_PER_THEME, lookups,
+                static_cast<double>(linearCompares) / lookups, linearNs / lookups,
+                static_cast<double>(indexedCompares) / lookups, maxThemeCompares, maxSongCompares,
+                indexedNs / lookups);
+
+    // ceil(log2(n)) + 1 comparisons at most.
+    assert(maxThemeCompares <= 7);
+    assert(maxSongCompares <= 8);
+}
+
+}  // namespace
+
+int main() {
+    testFindsEveryNameAndRejectsOthers();
+    benchmarkCatalogLookups();
+    std::cout << "name-index native test passed\n";
+    return 0;
+}
@@ -4,8 +4,12 @@
 #include <cstdint>
 #include <cstdio>
 #include <cstdlib>
+#include <cstring>
 #include <string>
+#include <type_traits>
+#include <vector>
 
+#include "esp_timer.h"
 #include "freertos/queue.h"
 
 class String {
@@ -18,10 +22,51 @@ public:
     String(unsigned int value) : _value(std::to_string(value)) {}
     String(long value) : _value(std::to_string(value)) {}
     String(unsigned long value) : _value(std::to_string(value)) {}
+    String(float value, int decimals) {
+        char buf[32];
+        std::snprintf(buf, sizeof(buf), "%.*f", decimals, static_cast<double>(value));
+        _value = buf;
+    }
+
+    // Assigning keeps the buffer, as Arduino's String does.
+    String& operator=(const char* value) {
+        _value.assign(value ? value : "");
+        return *this;
+    }
 
     const char* c_str() const { return _value.c_str(); }
     std::size_t length() const { return _value.length(); }
     bool isEmpty() const { return _value.empty(); }
+    bool reserve(std::size_t size) {
+        _value.reserve(size);
+        return true;
+    }
+    bool concat(const char* text) {
+        _value += text ? text : "";
+        return true;
+    }
+    bool concat(const char* text, std::size_t len) {
+        _value.append(text, len);
+        return true;
+    }
+
+    bool startsWith(const char* prefix) const { return _value.rfind(prefix, 0) == 0; }
+    bool endsWith(const char* suffix) const {
+        std::size_t len = std::strlen(suffix);
+        return _value.size() >= len && _value.compare(_value.size() - len, len, suffix) == 0;
+    }
+    int lastIndexOf(char c) const {
+        std::size_t pos = _value.rfind(c);
+        return pos == std::string::npos ? -1 : static_cast<int>(pos);
+    }
+    String substring(std::size_t from) const {
+        return from >= _value.size() ? String() : String(_value.substr(from));
+    }
+    void toLowerCase() {
+        for (char& c : _value) {
+            if (c >= 'A' && c <= 'Z') c = static_cast<char>(c - 'A' + 'a');
+        }
+    }
 
     long toInt() const {
         char* end = nullptr;
@@ -29,6 +74,20 @@ public:
         return end == _value.c_str() ? 0 : parsed;
     }
 
+    String& operator+=(const char* other) {
+        _value += other ? other : "";
+        return *this;
+    }
+    String& operator+=(const String& other) {
+        _value += other._value;
+        return *this;
+    }
+    template <typename T, typename = std::enable_if_t<std::is_arithmetic_v<T>>>
+    String& operator+=(T value) {
+        _value += std::to_string(value);
+        return *this;
+    }
+
     bool operator==(const String& other) const { return _value == other._value; }
     bool operator!=(const String& other) const { return !(*this == other); }
     bool operator==(const char* other) const { return _value == (other ? other : ""); }
@@ -42,11 +101,43 @@ inline bool operator==(const char* left, const String& right) {
     return right == left;
 }
 
+// Arduino returns this from `+`; ArduinoJson names it in its String adapter.
+class StringSumHelper : public String {
+public:
+    StringSumHelper(const String& value) : String(value) {}
+};
+
+inline StringSumHelper operator+(const String& left, const String& right) {
+    String sum = left;
+    sum += right;
+    return sum;
+}
+
+inline StringSumHelper operator+(const String& left, const char* right) {
+    String sum = left;
+    sum += right;
+    return sum;
+}
+
 struct SerialClass {
     template <typename... Args>
     void printf(const char*, Args...) {}
 
-    void println(const char*) {}
+    // Lines are kept so tests can check formatted reports.
+    void println(const char* line) { lines.emplace_back(line); }
+
+    // Binary writes are captured so tests can inspect them; txRoom plays the
+    // part of the UART TX buffer space.
+    int availableForWrite() { return txRoom; }
+    std::size_t write(const uint8_t* data, std::size_t len) {
+        written.append(reinterpret_cast<const char*>(data), len);
+        txRoom -= static_cast<int>(len);
+        return len;
+    }
+
+    std::string written;
+    std::vector<std::string> lines;
+    int txRoom = 128;
 };
 
 inline SerialClass Serial;
@@ -57,7 +148,23 @@ inline uint32_t millis() {
     return g_fakeMillis;
 }
 
+// micros() shares the esp_timer clock, as on the ESP32.
+inline uint32_t micros() {
+    return static_cast<uint32_t>(esp_timer_get_time());
+}
+
 static constexpr int HIGH = 1;
 static constexpr int LOW = 0;
+static constexpr int INPUT_PULLUP = 5;
+static constexpr int CHANGE = 3;
+#define IRAM_ATTR
+
+// Pins a test has pulled LOW; every other pin reads HIGH (pull-up idle).
+inline bool g_fakePinLow[40] = {};
+inline void (*g_fakeIsr[40])() = {};
 
 inline void digitalWrite(int, int) {}
+inline int digitalRead(int pin) { return g_fakePinLow[pin] ? LOW : HIGH; }
+inline void pinMode(int, int) {}
+inline int digitalPinToInterrupt(int pin) { return pin; }
+inline void attachInterrupt(int pin, void (*isr)(), int) { g_fakeIsr[pin] = isr; }
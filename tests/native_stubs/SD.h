@@ -0,0 +1,154 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <cstring>
+#include <map>
+#include <memory>
+#include <set>
+#include <string>
+#include <vector>
+
+#define FILE_READ "r"
+#define FILE_WRITE "w"
+
+// In-memory card: file contents and directories by absolute path, filled by
+// tests through SD.addFile() / SD.addDir().
+struct FakeSdCard {
+    std::map<std::string, std::string> files;
+    std::set<std::string> dirs;
+};
+
+inline FakeSdCard g_fakeSd;
+
+inline std::string fakeSdParent(const std::string& path) {
+    std::size_t slash = path.rfind('/');
+    return slash == 0 || slash == std::string::npos ? "/" : path.substr(0, slash);
+}
+
+class File {
+public:
+    File() = default;
+
+    explicit operator bool() const { return _handle != nullptr; }
+
+    // Basename, like the ESP32 core's fs::File::name().
+    const char* name() const {
+        if (!_handle) return "";
+        std::size_t slash = _handle->path.rfind('/');
+        return _handle->path.c_str() + (slash == std::string::npos ? 0 : slash + 1);
+    }
+    bool isDirectory() const { return _handle && _handle->directory; }
+
+    std::size_t size() const { return _handle && !_handle->directory ? data().size() : 0; }
+    std::size_t position() const { return _handle ? _handle->pos : 0; }
+    int available() const { return static_cast<int>(size() - position()); }
+    bool seek(uint32_t pos) {
+        if (!_handle || pos > size()) return false;
+        _handle->pos = pos;
+        return true;
+    }
+
+    int read() {
+        uint8_t c = 0;
+        return read(&c, 1) == 1 ? c : -1;
+    }
+    std::size_t read(uint8_t* out, std::size_t len) {
+        if (!_handle || _handle->directory) return 0;
+        const std::string& bytes = data();
+        std::size_t n = _handle->pos >= bytes.size() ? 0 : bytes.size() - _handle->pos;
+        if (n > len) n = len;
+        std::memcpy(out, bytes.data() + _handle->pos, n);
+        _handle->pos += n;
+        return n;
+    }
+    std::size_t readBytes(char* out, std::size_t len) {
+        return read(reinterpret_cast<uint8_t*>(out), len);
+    }
+
+    std::size_t write(uint8_t c) { return write(&c, 1); }
+    std::size_t write(const uint8_t* bytes, std::size_t len) {
+        if (!_handle || !_handle->writable) return 0;
+        g_fakeSd.files[_handle->path].append(reinterpret_cast<const char*>(bytes), len);
+        return len;
+    }
+
+    File openNextFile() {
+        if (!_handle || !_handle->directory || _handle->next >= _handle->entries.size()) {
+            return File();
+        }
+        return open(_handle->entries[_handle->next++], FILE_READ);
+    }
+
+    void close() { _handle.reset(); }
+
+    static File open(const std::string& path, const char* mode) {
+        File f;
+        const bool write = std::strcmp(mode, FILE_WRITE) == 0;
+        if (write) {
+            if (!g_fakeSd.dirs.count(fakeSdParent(path))) return f;
+            g_fakeSd.files[path].clear();
+        } else if (!g_fakeSd.files.count(path) && !g_fakeSd.dirs.count(path)) {
+            return f;
+        }
+        f._handle = std::make_shared<Handle>();
+        f._handle->path = path;
+        f._handle->writable = write;
+        f._handle->directory = !write && g_fakeSd.dirs.count(path) > 0;
+        if (f._handle->directory) {
+            for (const std::string& dir : g_fakeSd.dirs) {
+                if (dir != path && fakeSdParent(dir) == path) f._handle->entries.push_back(dir);
+            }
+            for (const auto& file : g_fakeSd.files) {
+                if (fakeSdParent(file.first) == path) f._handle->entries.push_back(file.first);
+            }
+        }
+        return f;
+    }
+
+private:
+    // Shared by copies, like the ESP32 core's File.
+    struct Handle {
+        std::string path;
+        bool directory = false;
+        bool writable = false;
+        std::size_t pos = 0;
+        std::vector<std::string> entries;  // a directory's children, as listed on open
+        std::size_t next = 0;
+    };
+
+    const std::string& data() const { return g_fakeSd.files[_handle->path]; }
+
+    std::shared_ptr<Handle> _handle;
+};
+
+struct SDClass {
+    File open(const char* path, const char* mode = FILE_READ) { return File::open(path, mode); }
+    bool exists(const char* path) { return g_fakeSd.files.count(path) || g_fakeSd.dirs.count(path); }
+    bool remove(const char* path) { return g_fakeSd.files.erase(path) > 0; }
+    bool rename(const char* from, const char* to) {
+        auto it = g_fakeSd.files.find(from);
+        if (it == g_fakeSd.files.end()) return false;
+        g_fakeSd.files[to] = it->second;
+        g_fakeSd.files.erase(from);
+        return true;
+    }
+
+    // Test setup: directories are created along the way.
+    void addDir(const std::string& path) {
+        for (std::string dir = path; dir != "/"; dir = fakeSdParent(dir)) {
+            g_fakeSd.dirs.insert(dir);
+        }
+        g_fakeSd.dirs.insert("/");
+    }
+    void addFile(const std::string& path, const std::string& bytes) {
+        addDir(fakeSdParent(path));
+        g_fakeSd.files[path] = bytes;
+    }
+    void clear() {
+        g_fakeSd.files.clear();
+        g_fakeSd.dirs.clear();
+    }
+};
+
+inline SDClass SD;
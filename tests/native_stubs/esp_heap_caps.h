@@ -0,0 +1,46 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+
+#define MALLOC_CAP_32BIT    (1 << 1)
+#define MALLOC_CAP_8BIT     (1 << 2)
+#define MALLOC_CAP_DMA      (1 << 3)
+#define MALLOC_CAP_INTERNAL (1 << 11)
+
+// Free / largest block / lowest free per capability, set by tests.
+struct StubHeap {
+    uint32_t caps;
+    std::size_t freeBytes;
+    std::size_t largestBlock;
+    std::size_t minFreeBytes;
+};
+
+inline StubHeap g_fakeHeaps[] = {
+    {MALLOC_CAP_8BIT, 0, 0, 0},
+    {MALLOC_CAP_INTERNAL, 0, 0, 0},
+    {MALLOC_CAP_DMA, 0, 0, 0},
+    {MALLOC_CAP_32BIT, 0, 0, 0},
+};
+
+inline StubHeap* stubHeapFor(uint32_t caps) {
+    for (StubHeap& heap : g_fakeHeaps) {
+        if (heap.caps == caps) return &heap;
+    }
+    return nullptr;
+}
+
+inline std::size_t heap_caps_get_free_size(uint32_t caps) {
+    StubHeap* heap = stubHeapFor(caps);
+    return heap ? heap->freeBytes : 0;
+}
+
+inline std::size_t heap_caps_get_largest_free_block(uint32_t caps) {
+    StubHeap* heap = stubHeapFor(caps);
+    return heap ? heap->largestBlock : 0;
+}
+
+inline std::size_t heap_caps_get_minimum_free_size(uint32_t caps) {
+    StubHeap* heap = stubHeapFor(caps);
+    return heap ? heap->minFreeBytes : 0;
+}
@@ -0,0 +1,9 @@
+#pragma once
+
+#include <cstdint>
+
+inline int64_t g_fakeTimerUs = 0;
+
+inline int64_t esp_timer_get_time() {
+    return g_fakeTimerUs;
+}
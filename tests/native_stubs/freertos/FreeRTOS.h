@@ -2,3 +2,9 @@
 
 static constexpr int pdTRUE = 1;
 static constexpr int pdFALSE = 0;
+
+struct portMUX_TYPE {};
+#define portMUX_INITIALIZER_UNLOCKED {}
+
+inline void portENTER_CRITICAL(portMUX_TYPE*) {}
+inline void portEXIT_CRITICAL(portMUX_TYPE*) {}
@@ -0,0 +1,29 @@
+#pragma once
+
+#include <deque>
+#include <string>
+
+#include "FreeRTOS.h"
+
+using UBaseType_t = unsigned int;
+
+// A running task as xTaskGetHandle() finds it; tests add and remove them.
+struct StubTask {
+    std::string name;
+    UBaseType_t stackHighWaterMark;  // bytes, as on the ESP32
+};
+
+using TaskHandle_t = StubTask*;
+
+inline std::deque<StubTask> g_fakeTasks;
+
+inline TaskHandle_t xTaskGetHandle(const char* name) {
+    for (StubTask& task : g_fakeTasks) {
+        if (task.name == name) return &task;
+    }
+    return nullptr;
+}
+
+inline UBaseType_t uxTaskGetStackHighWaterMark(TaskHandle_t task) {
+    return task ? task->stackHighWaterMark : 0;
+}
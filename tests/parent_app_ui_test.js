@@ -394,6 +394,8 @@ function makeBleHarness(options = {}) {
     nature: [{ file: "rain.wav", enabled: true, ok: true, sizeBytes: 1200, durationMs: 1100 }]
   };
 
+  let batchItems = [];
+  let batchId = 0;
   function configResponse(payload) {
     if (payload.op === "syncTime") {
       if (options.rejectSyncTime) {
@@ -407,6 +409,21 @@ function makeBleHarness(options = {}) {
     if (payload.op === "getConfig") {
       return { id: payload.id, ok: true, op: "getConfig", sdReady: true, ...config };
     }
+    if (payload.op === "patchConfig") {
+      if (options.legacyConfig) {
+        return { id: payload.id, ok: false, error: "Unknown config command" };
+      }
+      const before = JSON.stringify(config);
+      const patch = payload.patch || {};
+      for (const key of ["deviceName", "defaultVolumePct", "defaultTheme"]) {
+        if (Object.prototype.hasOwnProperty.call(patch, key)) config[key] = patch[key];
+      }
+      if (Object.prototype.hasOwnProperty.call(patch, "defaultTheme")) config.activeTheme = patch.defaultTheme;
+      if (patch.sleep) config.sleep = { ...config.sleep, ...patch.sleep };
+      if (patch.bedtime) config.bedtime = { ...config.bedtime, ...patch.bedtime };
+      if (JSON.stringify(config) !== before) config.configVersion = (config.configVersion || 1) + 1;
+      return { id: payload.id, ok: true, op: "getConfig", sdReady: true, ...config };
+    }
     if (payload.op === "setConfig") {
       if (Object.prototype.hasOwnProperty.call(payload, "deviceName")) config.deviceName = payload.deviceName;
       if (Object.prototype.hasOwnProperty.call(payload, "defaultVolumePct")) config.defaultVolumePct = payload.defaultVolumePct;
@@ -427,14 +444,16 @@ function makeBleHarness(options = {}) {
       config.bedtime.effectiveTheme = config.bedtime.active ? config.bedtime.theme : config.activeTheme;
       return { id: payload.id, ok: true, op: "getConfig", sdReady: true, ...config };
     }
+    const catalog = options.catalogLoading?.() ? { catalogReady: false } : {};
     if (payload.op === "scanThemes") {
-      return { id: payload.id, ok: true, op: "scanThemes", page: payload.page || 0, hasMore: false, themes };
+      return { id: payload.id, ok: true, op: "scanThemes", ...catalog, page: payload.page || 0, hasMore: false, themes };
     }
     if (payload.op === "scanSongs") {
       return {
         id: payload.id,
         ok: true,
         op: "scanSongs",
+        ...catalog,
         theme: payload.theme,
         name: themes.find((theme) => theme.id === payload.theme)?.name || payload.theme,
         page: payload.page || 0,
@@ -445,6 +464,27 @@ function makeBleHarness(options = {}) {
     if (payload.op === "setTheme" || payload.op === "setSong") {
       return { id: payload.id, ok: true, op: payload.op };
     }
+    if (payload.op === "batch") {
+      if (options.legacyEdits) {
+        return { id: payload.id, ok: false, error: "Unknown config command" };
+      }
+      if (payload.part === 0) {
+        batchItems = [];
+        batchId = payload.batch;
+      }
+      if (payload.batch !== batchId || payload.id !== batchId + payload.part) {
+        return { id: payload.id, ok: false, error: "Batch part out of sequence" };
+      }
+      batchItems.push(...payload.items);
+      if (batchItems.length > 128) {
+        return { id: payload.id, ok: false, error: "Batch too large" };
+      }
+      if (!payload.commit) {
+        return { id: payload.id, ok: true, op: "batch", staged: batchItems.length };
+      }
+      const results = batchItems.map((item) => (options.batchResult ? options.batchResult(item) : 0));
+      return { id: payload.id, ok: true, op: "batch", applied: results.every((code) => code === 0), results };
+    }
     return { id: payload.id, ok: false, error: "unknown op" };
   }
 
@@ -501,12 +541,24 @@ function makeBleHarness(options = {}) {
       chars.command.value = value;
     }
   };
+  let configInFlight = 0;
+  let maxConfigInFlight = 0;
   chars.configCommand.write = (value) => {
     const payload = JSON.parse(textFromValue(value));
     writes.config.push(payload);
     response = configResponse(payload);
-    chars.configResponse.value = JSON.stringify(response);
-    setTimeout(() => chars.configResponse.emit(chars.configResponse.value), 0);
+    const text = JSON.stringify(response);
+    chars.configResponse.value = text;
+    configInFlight += 1;
+    maxConfigInFlight = Math.max(maxConfigInFlight, configInFlight);
+    // Like the firmware, each notification carries its own response, cut at
+    // the notification size when the payload is longer.
+    const notified = options.notifyLimit ? text.slice(0, options.notifyLimit) : text;
+    setTimeout(() => {
+      configInFlight -= 1;
+      chars.configResponse.emit(notified);
+      chars.configResponse.value = text;
+    }, 0);
   };
   chars.volume.write = (value) => {
     writes.volume.push(value[0]);
@@ -588,6 +640,7 @@ function makeBleHarness(options = {}) {
     reads,
     notifications,
     get maxConcurrentReads() { return maxConcurrentReads; },
+    get maxConfigInFlight() { return maxConfigInFlight; },
     get requestCount() { return requestCount; }
   };
 }
@@ -989,6 +1042,29 @@ const tests = [
     assert.strictEqual(scansAfterReopen, scansAfterFirstOpen, "reopening settings must not re-scan");
     assert(els.settingsSongList.children.length >= 1, "cached songs should still render");
   `],
+  ["partial catalog scans are shown but re-scanned on reopen", String.raw`
+    let loading = true;
+    const ble = await connectWithFakeBle({ catalogLoading: () => loading });
+    await els.openSettingsButton.click();
+    await waitForSettingsLoaded();
+    assert.strictEqual(state.settings.catalogPartial, true);
+    assert.strictEqual(state.settings.sessionScanned, false);
+    assert.match(state.settings.message, /Still reading the SD card/);
+    assert(els.settingsSongList.children.length >= 1, "partial songs should still render");
+    const scansAfterFirstOpen = payloadsWithoutIds(ble.writes.config)
+      .filter((p) => p.op === "scanThemes").length;
+
+    loading = false;
+    await els.settingsBackButton.click();
+    await els.openSettingsButton.click();
+    await waitForSettingsLoaded();
+    const scansAfterReopen = payloadsWithoutIds(ble.writes.config)
+      .filter((p) => p.op === "scanThemes").length;
+    assert(scansAfterReopen > scansAfterFirstOpen, "a partial scan must be repeated");
+    assert.strictEqual(state.settings.catalogPartial, false);
+    assert.strictEqual(state.settings.sessionScanned, true);
+    assert.strictEqual(state.settings.message, "");
+  `],
   ["returning to remote refreshes the device clock", String.raw`
     const ble = await connectWithFakeBle();
     assert.strictEqual(els.deviceWatch.textContent, "Toy clock 21:05");
@@ -1021,24 +1097,165 @@ const tests = [
     state.settings.pendingSongChanges = { nature: { "rain.wav": false } };
     await els.settingsSaveButton.click();
     const payloads = payloadsWithoutIds(ble.writes.config);
+    assert(!payloads.some((payload) => payload.op === "setConfig"));
+    const patches = payloads.filter((payload) => payload.op === "patchConfig");
+    assert.strictEqual(patches.length, 1);
+    const patch = patches[0].patch;
+    assert.strictEqual(patch.deviceName, "SweetYaar Night");
+    assert.strictEqual(patch.defaultVolumePct, 42);
+    assert.strictEqual(patch.defaultTheme, "nature");
+    assert.strictEqual(JSON.stringify(patch.sleep),
+      JSON.stringify({ enabled: false, normalIdleSec: 901, vibrationWakeIdleSec: 181, bleIdleSec: 301 }));
+    assert.strictEqual(JSON.stringify(patch.bedtime),
+      JSON.stringify({ startTime: "15:00", endTime: "13:00", theme: "nature", volumeCapPct: 33 }));
+    assert.strictEqual(ble.config.configVersion, 2);
+    const batches = payloads.filter((payload) => payload.op === "batch");
+    assert.strictEqual(batches.length, 1);
+    assert.strictEqual(batches[0].part, 0);
+    assert.strictEqual(batches[0].commit, true);
+    assert.strictEqual(JSON.stringify(batches[0].items),
+      JSON.stringify([["te", "nature", 0], ["ts", "", 1], ["s", "", "rain.wav", 0]]));
+    assert(!payloads.some((payload) => payload.op === "setTheme" || payload.op === "setSong"));
+    assert.strictEqual(state.settings.dirty, false);
+    assert.strictEqual(state.settings.message, "Settings saved.");
+    assert.strictEqual(els.settingsSaveButton.disabled, true);
+  `],
+  ["settings save falls back to setConfig on firmware without patchConfig", String.raw`
+    const ble = await connectWithFakeBle({ legacyConfig: true });
+    await els.openSettingsButton.click();
+    await waitForSettingsLoaded();
+    await els.settingsDeviceName.input("SweetYaar Night");
+    await els.settingsVolumeRange.input("42");
+    await els.settingsNormalIdleSec.input("901");
+    await els.settingsSaveButton.click();
+    const payloads = payloadsWithoutIds(ble.writes.config);
+    assert(payloads.some((payload) => payload.op === "patchConfig"));
     assert(payloads.some((payload) => payload.op === "setConfig" && payload.deviceName === "SweetYaar Night"));
     assert(payloads.some((payload) => payload.op === "setConfig" && payload.defaultVolumePct === 42));
-    assert(payloads.some((payload) => payload.op === "setConfig" && payload.defaultTheme === "nature"));
-    assert(payloads.some((payload) => payload.op === "setConfig" && payload.sleep &&
-      payload.sleep.enabled === false &&
-      payload.sleep.normalIdleSec === 901 &&
-      payload.sleep.vibrationWakeIdleSec === 181 &&
-      payload.sleep.bleIdleSec === 301));
-    assert(payloads.some((payload) => payload.op === "setConfig" && payload.bedtime &&
-      payload.bedtime.startTime === "15:00" &&
-      payload.bedtime.endTime === "13:00" &&
-      payload.bedtime.theme === "nature" &&
-      payload.bedtime.volumeCapPct === 33));
-    assert(payloads.some((payload) => payload.op === "setTheme" && payload.theme === "nature" && payload.enabled === false && payload.shuffle === true));
-    assert(payloads.some((payload) => payload.op === "setSong" && payload.theme === "nature" && payload.file === "rain.wav" && payload.enabled === false));
+    assert(payloads.some((payload) => payload.op === "setConfig" && payload.sleep && payload.sleep.normalIdleSec === 901));
     assert.strictEqual(state.settings.dirty, false);
     assert.strictEqual(state.settings.message, "Settings saved.");
-    assert.strictEqual(els.settingsSaveButton.disabled, true);
+  `],
+  ["settings save falls back to one op per toggle on firmware without batch", String.raw`
+    const ble = await connectWithFakeBle({ legacyEdits: true });
+    await els.openSettingsButton.click();
+    await waitForSettingsLoaded();
+    state.settings.dirty = true;
+    state.settings.pendingThemeChanges = { nature: { shuffle: false }, lullabies: { shuffle: true } };
+    state.settings.pendingSongChanges = {
+      lullabies: { "a.wav": false, "b.wav": false, "c.wav": true, "d.wav": false }
+    };
+    await els.settingsSaveButton.click();
+    const edits = payloadsWithoutIds(ble.writes.config)
+      .filter((payload) => payload.op === "setTheme" || payload.op === "setSong");
+    assert.strictEqual(edits.length, 6);
+    assert(ble.maxConfigInFlight > 1, "edit ops should overlap");
+    assert(ble.maxConfigInFlight <= CONFIG_MAX_IN_FLIGHT);
+    assert.strictEqual(state.configPending.size, 0);
+    assert.strictEqual(state.configInFlight, 0);
+    assert.strictEqual(state.settings.message, "Settings saved.");
+  `],
+  ["many song toggles are sent as one batch split into command-sized parts", String.raw`
+    const ble = await connectWithFakeBle();
+    await els.openSettingsButton.click();
+    await waitForSettingsLoaded();
+    state.settings.dirty = true;
+    const toggles = {};
+    for (let i = 0; i < 40; i++) {
+      toggles["lullaby-track-" + String(i).padStart(2, "0") + ".wav"] = i < 5;
+    }
+    state.settings.pendingSongChanges = { lullabies: toggles };
+    await els.settingsSaveButton.click();
+    const parts = ble.writes.config.filter((payload) => payload.op === "batch");
+    assert(parts.length > 1, "40 toggles should not fit one command slot");
+    for (const [index, part] of parts.entries()) {
+      assert(textEncoder.encode(JSON.stringify(part)).length <= 383, "part " + index + " exceeds the command slot");
+      assert.strictEqual(part.part, index);
+      assert.strictEqual(part.batch, parts[0].batch);
+      assert.strictEqual(part.items[0][1], "lullabies", "each part names its theme");
+      assert.strictEqual(!!part.commit, index === parts.length - 1);
+    }
+    const items = parts.flatMap((part) => part.items);
+    assert.strictEqual(items.length, 40);
+    assert.strictEqual(items.filter((item) => item[3] === 1).length, 5);
+    assert(!ble.writes.config.some((payload) => payload.op === "setSong"));
+    assert.strictEqual(state.settings.message, "Settings saved.");
+  `],
+  ["more toggles than one batch holds are sent as several batches", String.raw`
+    const ble = await connectWithFakeBle();
+    await els.openSettingsButton.click();
+    await waitForSettingsLoaded();
+    state.settings.dirty = true;
+    const toggles = {};
+    for (let i = 0; i < 300; i++) {
+      toggles["t" + String(i).padStart(3, "0") + ".wav"] = i % 3 === 0;
+    }
+    state.settings.pendingSongChanges = { lullabies: toggles };
+    await els.settingsSaveButton.click();
+    const parts = ble.writes.config.filter((payload) => payload.op === "batch");
+    const batches = new Map();
+    for (const part of parts) {
+      batches.set(part.batch, [...(batches.get(part.batch) || []), part]);
+    }
+    assert.strictEqual(batches.size, 3, "300 toggles need three batches of at most 128");
+    for (const [id, batchParts] of batches) {
+      assert.strictEqual(batchParts[0].id, id, "a batch id is the request id of its part 0");
+      assert(batchParts.flatMap((part) => part.items).length <= 128);
+      assert.strictEqual(batchParts.filter((part) => part.commit).length, 1);
+    }
+    assert.strictEqual(parts.flatMap((part) => part.items).length, 300);
+    assert(!ble.writes.config.some((payload) => payload.op === "setSong"));
+    assert.strictEqual(state.settings.dirty, false);
+    assert.strictEqual(state.settings.message, "Settings saved.");
+  `],
+  ["Hebrew song names are split by UTF-8 bytes, not characters", String.raw`
+    const ble = await connectWithFakeBle();
+    await els.openSettingsButton.click();
+    await waitForSettingsLoaded();
+    state.settings.dirty = true;
+    const toggles = {};
+    for (let i = 0; i < 12; i++) {
+      toggles["שיר-ערש-לילה-טוב-" + String(i).padStart(2, "0") + ".wav"] = i % 2 === 0;
+    }
+    state.settings.pendingSongChanges = { lullabies: toggles };
+    await els.settingsSaveButton.click();
+    const parts = ble.writes.config.filter((payload) => payload.op === "batch");
+    assert(parts.length > 1, "Hebrew names take two bytes per letter");
+    for (const [index, part] of parts.entries()) {
+      assert(textEncoder.encode(JSON.stringify(part)).length <= 383, "part " + index + " exceeds the command slot");
+    }
+    assert.strictEqual(parts.flatMap((part) => part.items).length, 12);
+    assert.strictEqual(state.settings.message, "Settings saved.");
+  `],
+  ["a name too long for one command is reported instead of sent", String.raw`
+    const ble = await connectWithFakeBle();
+    await els.openSettingsButton.click();
+    await waitForSettingsLoaded();
+    state.settings.dirty = true;
+    state.settings.pendingSongChanges = { lullabies: { ["ש".repeat(200) + ".wav"]: false } };
+    await els.settingsSaveButton.click();
+    assert(!ble.writes.config.some((payload) => payload.op === "batch"));
+    assert.strictEqual(state.settings.dirty, true);
+    assert.strictEqual(state.settings.message, "A theme or file name is too long to save from the app.");
+  `],
+  ["rejected batch keeps the settings unsaved and explains why", String.raw`
+    const ble = await connectWithFakeBle({ batchResult: (item) => (item[2] === "gone.wav" ? 2 : 0) });
+    await els.openSettingsButton.click();
+    await waitForSettingsLoaded();
+    state.settings.dirty = true;
+    state.settings.pendingSongChanges = { lullabies: { "moon.wav": false, "gone.wav": false } };
+    await els.settingsSaveButton.click();
+    assert.strictEqual(state.settings.dirty, true);
+    assert.strictEqual(state.settings.message, "A song no longer exists on the SD card.");
+  `],
+  ["truncated config notification is completed by reading the response back", String.raw`
+    const ble = await connectWithFakeBle({ notifyLimit: 24 });
+    await els.openSettingsButton.click();
+    await waitForSettingsLoaded();
+    assert.strictEqual(state.settings.message, "");
+    assert.strictEqual(els.settingsDeviceName.value, "SweetYaar");
+    assert(ble.reads.filter((name) => name === "configResponse").length >= 3,
+      "each truncated response should be read back once");
   `],
 ];
 
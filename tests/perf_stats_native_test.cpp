@@ -0,0 +1,83 @@
+#include <cassert>
+#include <cstdint>
+#include <iostream>
+#include <string>
+
+#include "Arduino.h"
+#include "BootTrace.h"
+#include "PerfStats.h"
+#include "JsonWriter.h"
+#include "esp_timer.h"
+
+uint32_t g_fakeMillis = 0;
+
+namespace {
+
+std::string perfPage(uint32_t requestId, int page) {
+    static char buffer[512];
+    JsonWriter out(buffer, sizeof(buffer));
+    PerfStats::writePageJson(out, requestId, page);
+    assert(!out.overflowed());
+    return std::string(out.c_str(), out.length());
+}
+
+bool contains(const std::string& json, const std::string& part) {
+    return json.find(part) != std::string::npos;
+}
+
+void testBucketBounds() {
+    assert(PerfStats::bucketUpperUs(0) == 100);
+    assert(PerfStats::bucketUpperUs(PerfStats::BUCKET_COUNT - 2) == 100000);
+    assert(PerfStats::bucketUpperUs(PerfStats::BUCKET_COUNT - 1) == 0);
+    assert(PerfStats::bucketUpperUs(PerfStats::BUCKET_COUNT) == 0);
+}
+
+void testHistogramPage() {
+    g_fakeMillis = 1000;
+    PerfStats::reset();
+    PerfStats::record(PerfStats::Metric::WavLoop, 0);
+    PerfStats::record(PerfStats::Metric::WavLoop, 99);
+    PerfStats::record(PerfStats::Metric::WavLoop, 100);    // bounds are exclusive
+    PerfStats::record(PerfStats::Metric::WavLoop, 1500);
+    PerfStats::record(PerfStats::Metric::WavLoop, 250000);  // open-ended bucket
+    PerfStats::record(PerfStats::Metric::SdRead, 4000);
+    g_fakeMillis = 61000;
+
+    std::string wav = perfPage(7, 1);
+    assert(contains(wav, "{\"id\":7,\"ok\":true,\"op\":\"getPerf\",\"page\":1,\"hasMore\":true"));
+    assert(contains(wav, "\"sinceMs\":60000,\"metric\":\"wav\""));
+    assert(contains(wav, "\"n\":5,\"maxUs\":250000,\"meanUs\":50339"));
+    assert(contains(wav, "\"bucketsUs\":[100,250,500,1000,2000,5000,10000,20000,50000,100000]"));
+    assert(contains(wav, "\"h\":[2,1,0,0,1,0,0,0,0,0,1]}"));
+
+    std::string loop = perfPage(8, 0);
+    assert(contains(loop, "\"metric\":\"loop\",\"n\":0,\"maxUs\":0,\"meanUs\":0"));
+
+    PerfStats::reset();
+    std::string cleared = perfPage(9, 3);
+    assert(contains(cleared, "\"sinceMs\":0,\"metric\":\"sd\",\"n\":0"));
+}
+
+void testBootPageIsLast() {
+    g_fakeTimerUs = 500000;
+    BootTrace::mark(BootTrace::Phase::Serial);
+    g_fakeTimerUs = 520000;
+    BootTrace::mark(BootTrace::Phase::SdMount);
+
+    int bootPage = static_cast<int>(PerfStats::Metric::Count);
+    std::string boot = perfPage(10, bootPage);
+    assert(contains(boot, "\"page\":4,\"hasMore\":false"));
+    assert(contains(boot, "\"metric\":\"boot\",\"phasesUs\":{\"serial\":500000,\"sd\":20000},\"totalUs\":520000}"));
+    // Out-of-range pages clamp to the last one.
+    assert(contains(perfPage(11, 99), "\"metric\":\"boot\""));
+}
+
+}  // namespace
+
+int main() {
+    testBucketBounds();
+    testHistogramPage();
+    testBootPageIsLast();
+    std::cout << "perf-stats native test passed\n";
+    return 0;
+}
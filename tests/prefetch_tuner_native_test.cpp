@@ -0,0 +1,255 @@
+#include <cassert>
+#include <cstdint>
+#include <cstdio>
+#include <iostream>
+
+#include "Config.h"
+#include "PrefetchTuner.h"
+
+uint32_t g_fakeMillis = 0;
+
+namespace {
+
+const PrefetchTuner::Settings SETTINGS = {25, 80, 35, 10, 10000, 6};
+
+// Streams for one window with the given new counts; returns update()'s result.
+bool streamWindow(PrefetchTuner& tuner, uint32_t& now, uint32_t& underflows, uint32_t& drops,
+                  uint32_t newUnderflows, uint32_t newDrops) {
+    bool changed = false;
+    for (int i = 0; i < 100; i++) {
+        now += 100;
+        if (i == 50) {
+            underflows += newUnderflows;
+            drops += newDrops;
+        }
+        changed |= tuner.update(now, underflows, drops, true);
+    }
+    return changed;
+}
+
+void testUnderflowsRaiseUpToMax() {
+    PrefetchTuner tuner(SETTINGS);
+    uint32_t now = 0, underflows = 0, drops = 0;
+    tuner.reset(now, underflows, drops);
+    assert(tuner.levelPct() == 35);
+
+    assert(streamWindow(tuner, now, underflows, drops, 1, 0));
+    assert(tuner.levelPct() == 45);
+    assert(tuner.lastWindowUnderflows() == 1);
+    for (int i = 0; i < 10; i++) streamWindow(tuner, now, underflows, drops, 3, 0);
+    assert(tuner.levelPct() == 80);
+    assert(tuner.raises() == 5);  // 35 -> 45 -> 55 -> 65 -> 75 -> 80
+}
+
+void testQuietMinuteLowersOneStep() {
+    PrefetchTuner tuner(SETTINGS);
+    uint32_t now = 0, underflows = 0, drops = 0;
+    tuner.reset(now, underflows, drops);
+    streamWindow(tuner, now, underflows, drops, 2, 0);
+    streamWindow(tuner, now, underflows, drops, 2, 0);
+    assert(tuner.levelPct() == 55);
+
+    for (int i = 0; i < 5; i++) assert(!streamWindow(tuner, now, underflows, drops, 0, 0));
+    assert(tuner.levelPct() == 55);
+    assert(streamWindow(tuner, now, underflows, drops, 0, 0));
+    assert(tuner.levelPct() == 45);
+
+    // Floors at minPct, and a partial step lands exactly on it.
+    for (int i = 0; i < 60; i++) streamWindow(tuner, now, underflows, drops, 0, 0);
+    assert(tuner.levelPct() == 25);
+    assert(tuner.lowers() == 3);
+}
+
+void testPrematureStepDownBacksOff() {
+    PrefetchTuner tuner(SETTINGS);
+    uint32_t now = 0, underflows = 0, drops = 0;
+    tuner.reset(now, underflows, drops);
+    streamWindow(tuner, now, underflows, drops, 1, 0);
+    for (int i = 0; i < 6; i++) streamWindow(tuner, now, underflows, drops, 0, 0);
+    assert(tuner.levelPct() == 35);
+
+    // Stuttering again right after the step down: twelve quiet windows now.
+    streamWindow(tuner, now, underflows, drops, 1, 0);
+    assert(tuner.levelPct() == 45);
+    for (int i = 0; i < 11; i++) assert(!streamWindow(tuner, now, underflows, drops, 0, 0));
+    assert(streamWindow(tuner, now, underflows, drops, 0, 0));
+    assert(tuner.levelPct() == 35);
+
+    // A new phone starts from one quiet minute again.
+    tuner.reset(now, underflows, drops);
+    streamWindow(tuner, now, underflows, drops, 1, 0);
+    for (int i = 0; i < 6; i++) streamWindow(tuner, now, underflows, drops, 0, 0);
+    assert(tuner.levelPct() == 35);
+}
+
+void testDropsLowerAndUnderflowsWin() {
+    PrefetchTuner tuner(SETTINGS);
+    uint32_t now = 0, underflows = 0, drops = 0;
+    tuner.reset(now, underflows, drops);
+    streamWindow(tuner, now, underflows, drops, 1, 0);
+    assert(tuner.levelPct() == 45);
+    assert(streamWindow(tuner, now, underflows, drops, 0, 4));
+    assert(tuner.levelPct() == 35);
+    assert(streamWindow(tuner, now, underflows, drops, 1, 4));
+    assert(tuner.levelPct() == 45);
+}
+
+void testOnlyStreamingTimeAndCountsMatter() {
+    PrefetchTuner tuner(SETTINGS);
+    uint32_t now = 0;
+    tuner.reset(now, 7, 3);  // counters from an earlier connection are ignored
+
+    // Paused for a minute; the underflow seen as the stream stopped is not
+    // counted and the pause does not close a window.
+    now += 60000;
+    assert(!tuner.update(now, 8, 3, false));
+    now += 9000;
+    assert(!tuner.update(now, 8, 3, true));
+    assert(tuner.windowUnderflows() == 0);
+    now += 1000;
+    assert(!tuner.update(now, 8, 3, true));  // one quiet window, not six
+    assert(tuner.levelPct() == 35);
+    assert(tuner.lastWindowUnderflows() == 0);
+
+    // Counters wrapping past 2^32 still give the right delta.
+    tuner.reset(now, 0xFFFFFFFFu, 0);
+    now += 10000;
+    assert(tuner.update(now, 1, 0, true));
+    assert(tuner.lastWindowUnderflows() == 2);
+}
+
+void testResetStartsOverForTheNextPhone() {
+    PrefetchTuner tuner(SETTINGS);
+    uint32_t now = 0, underflows = 0, drops = 0;
+    tuner.reset(now, underflows, drops);
+    for (int i = 0; i < 3; i++) streamWindow(tuner, now, underflows, drops, 1, 0);
+    assert(tuner.levelPct() == 65);
+    tuner.reset(now, underflows, drops);
+    assert(tuner.levelPct() == 35);
+    assert(tuner.windowUnderflows() == 0 && tuner.lastWindowUnderflows() == 0);
+}
+
+// ---------------------------------------------------------------------------
+// Ring simulation: a phone delivers 2048-byte packets of 44.1 kHz stereo PCM
+// (~11.6 ms each) into the firmware's ring, I2S drains 176.4 B/ms once the
+// prefetch level is reached, and an empty ring goes back to prefetching. The
+// tuner runs with the firmware's own settings.
+// ---------------------------------------------------------------------------
+const PrefetchTuner::Settings FIRMWARE_SETTINGS = {
+    BT_A2DP_PREFETCH_MIN_PCT, BT_A2DP_PREFETCH_MAX_PCT, BT_A2DP_PREFETCH_START_PCT,
+    BT_A2DP_PREFETCH_STEP_PCT, BT_A2DP_PREFETCH_WINDOW_MS, BT_A2DP_PREFETCH_CALM_WINDOWS};
+constexpr double RING_BYTES = BT_A2DP_RINGBUFFER_BYTES;
+constexpr double PACKET_BYTES = 2048;
+constexpr double DRAIN_BYTES_PER_MS = 176.4;
+constexpr uint32_t SIM_MS = 10 * 60 * 1000;
+
+struct Phone {
+    const char* name;
+    uint32_t stallEveryMs;  // 0: never stalls
+    uint32_t stallMs;
+    uint32_t slowPpm;  // phone clock behind the DAC clock
+};
+
+struct SimResult {
+    uint32_t underflows = 0;
+    uint32_t drops = 0;
+    double meanPrefetchMs = 0;
+    int finalPct = 0;
+};
+
+SimResult simulate(const Phone& phone, bool adaptive, uint8_t fixedPct) {
+    PrefetchTuner tuner(FIRMWARE_SETTINGS);
+    tuner.reset(0, 0, 0);
+    SimResult result;
+    double fill = 0;
+    bool prefetching = true;
+    double nextPacketMs = 0;
+    uint32_t stallUntilMs = 0;
+    double pctSum = 0;
+    uint32_t seed = 12345;
+
+    for (uint32_t ms = 0; ms < SIM_MS; ms++) {
+        int pct = adaptive ? tuner.levelPct() : fixedPct;
+        if (phone.stallEveryMs && ms % phone.stallEveryMs == phone.stallEveryMs / 2) {
+            seed = seed * 1103515245u + 12345u;
+            stallUntilMs = ms + phone.stallMs / 2 + (seed >> 16) % (phone.stallMs / 2 + 1);
+        }
+        // A stalled phone sends the backlog in one burst once it resumes.
+        while (ms >= stallUntilMs && nextPacketMs <= ms) {
+            if (prefetching && fill >= RING_BYTES * pct / 100) prefetching = false;
+            if (fill + PACKET_BYTES > RING_BYTES) {
+                result.drops++;
+            } else {
+                fill += PACKET_BYTES;
+            }
+            nextPacketMs += PACKET_BYTES / DRAIN_BYTES_PER_MS * (1.0 + phone.slowPpm / 1e6);
+        }
+        if (prefetching && fill >= RING_BYTES * pct / 100) prefetching = false;
+        if (!prefetching) {
+            fill -= DRAIN_BYTES_PER_MS;
+            if (fill <= 0) {
+                fill = 0;
+                prefetching = true;
+                result.underflows++;
+            }
+        }
+        pctSum += pct;
+        if (ms % 100 == 0) tuner.update(ms, result.underflows, result.drops, true);
+    }
+    result.finalPct = adaptive ? tuner.levelPct() : fixedPct;
+    result.meanPrefetchMs = pctSum / SIM_MS / 100.0 * RING_BYTES / DRAIN_BYTES_PER_MS;
+    return result;
+}
+
+// The 8 KB ring holds ~46 ms, so the jittery phone's stalls (10-20 ms plus
+// the packet it was about to send) are ones a deeper prefetch can cover.
+void benchmarkPhones() {
+    const Phone phones[] = {
+        {"steady", 0, 0, 20},
+        {"jittery", 3000, 20, 300},
+    };
+    SimResult steadyAdaptive, jitteryAdaptive, jitteryFloor, jitteryOld;
+    for (const Phone& phone : phones) {
+        SimResult fixedOld = simulate(phone, false, 65);
+        SimResult fixedFloor = simulate(phone, false, FIRMWARE_SETTINGS.minPct);
+        SimResult adaptive = simulate(phone, true, 0);
+        std::printf("%-7s fixed 65%%: %4u underflows %3u drops %.0f ms | fixed %u%%: %4u underflows %3u drops "
+                    "%.0f ms | adaptive: %4u underflows %3u drops mean %.0f ms, ends at %d%%\n",
+                    phone.name, fixedOld.underflows, fixedOld.drops, fixedOld.meanPrefetchMs,
+                    static_cast<unsigned>(FIRMWARE_SETTINGS.minPct), fixedFloor.underflows, fixedFloor.drops,
+                    fixedFloor.meanPrefetchMs, adaptive.underflows, adaptive.drops,
+                    adaptive.meanPrefetchMs, adaptive.finalPct);
+        if (phone.stallEveryMs == 0) {
+            steadyAdaptive = adaptive;
+        } else {
+            jitteryAdaptive = adaptive;
+            jitteryFloor = fixedFloor;
+            jitteryOld = fixedOld;
+        }
+    }
+
+    // A steady phone never pays for the jittery one: no stutter, and less
+    // latency than the old fixed 65%.
+    assert(steadyAdaptive.underflows == 0);
+    assert(steadyAdaptive.meanPrefetchMs < 0.65 * RING_BYTES / DRAIN_BYTES_PER_MS);
+    // A jittery phone earns a deeper prefetch: it stutters less than it would
+    // at the steady phone's level, and no more than at the old fixed 65%.
+    std::fflush(stdout);
+    assert(jitteryAdaptive.finalPct > FIRMWARE_SETTINGS.startPct);
+    assert(jitteryAdaptive.underflows < jitteryFloor.underflows);
+    assert(jitteryAdaptive.underflows <= jitteryOld.underflows);
+}
+
+}  // namespace
+
+int main() {
+    testUnderflowsRaiseUpToMax();
+    testQuietMinuteLowersOneStep();
+    testPrematureStepDownBacksOff();
+    testDropsLowerAndUnderflowsWin();
+    testOnlyStreamingTimeAndCountsMatter();
+    testResetStartsOverForTheNextPhone();
+    benchmarkPhones();
+    std::cout << "prefetch-tuner native test passed\n";
+    return 0;
+}
@@ -0,0 +1,99 @@
+#include <cassert>
+#include <cstdint>
+#include <iostream>
+#include <string>
+
+#include "Arduino.h"
+#include "PressTrace.h"
+#include "esp_timer.h"
+
+uint32_t g_fakeMillis = 0;
+
+namespace {
+
+using PressTrace::Source;
+using PressTrace::Stage;
+
+void markAt(Stage stage, int64_t us) {
+    g_fakeTimerUs = us;
+    PressTrace::mark(stage);
+}
+
+void testButtonPressLine() {
+    Serial.written.clear();
+    Serial.txRoom = 256;
+    PressTrace::begin(Source::Button, "song", 1000, 51000);
+    markAt(Stage::Dispatched, 51200);
+    markAt(Stage::Dispatched, 52000);  // only the first mark counts
+    markAt(Stage::Lookup, 52100);
+    markAt(Stage::Opened, 60000);
+    PressTrace::poll();
+    assert(Serial.written.empty());  // no sound yet
+
+    markAt(Stage::FirstWrite, 62500);
+    markAt(Stage::Opened, 70000);  // finished records ignore later marks
+    PressTrace::poll();
+    assert(Serial.written ==
+           "[PressTrace] v=1 src=button ev=song debounce=50000 dispatch=200 lookup=900 "
+           "open=7900 first_write=2500 total=61500\n");
+
+    Serial.written.clear();
+    PressTrace::poll();  // printed once
+    assert(Serial.written.empty());
+}
+
+void testSkippedStagesAndFullUart() {
+    Serial.written.clear();
+    Serial.txRoom = 10;
+    PressTrace::begin(Source::Ble, "next_song", 100000, 100300);
+    markAt(Stage::Lookup, 101000);
+    markAt(Stage::Opened, 106000);
+    markAt(Stage::FirstWrite, 108000);
+    PressTrace::poll();
+    assert(Serial.written.empty());  // waits for room instead of blocking
+
+    Serial.txRoom = 256;
+    PressTrace::poll();
+    assert(Serial.written ==
+           "[PressTrace] v=1 src=ble ev=next_song debounce=300 lookup=700 open=5000 "
+           "first_write=2000 total=8000\n");
+}
+
+void testCancelAndAbandon() {
+    Serial.written.clear();
+    Serial.txRoom = 256;
+    char line[160];
+
+    PressTrace::begin(Source::Button, "animal", 200000, 250000);
+    markAt(Stage::Dispatched, 250100);
+    PressTrace::cancel();  // playback failed
+    markAt(Stage::FirstWrite, 260000);
+    PressTrace::poll();
+    assert(Serial.written.empty());
+    assert(PressTrace::format(line, sizeof(line)) == 0);
+
+    PressTrace::begin(Source::Button, "animal", 300000, 350000);
+    g_fakeTimerUs = 300000 + 3000001;
+    PressTrace::poll();  // never reached audio
+    markAt(Stage::FirstWrite, g_fakeTimerUs + 10);
+    PressTrace::poll();
+    assert(Serial.written.empty());
+
+    // Mark without begin() does nothing; a short buffer formats nothing.
+    markAt(Stage::FirstWrite, 4000000);
+    assert(PressTrace::format(line, sizeof(line)) == 0);
+    PressTrace::begin(Source::Ble, "song", 0, 10);
+    markAt(Stage::FirstWrite, 20);
+    assert(PressTrace::format(line, 16) == 0);
+    assert(PressTrace::format(line, sizeof(line)) > 0);
+}
+
+}  // namespace
+
+int main() {
+    testButtonPressLine();
+    testSkippedStagesAndFullUart();
+    testCancelAndAbandon();
+    std::cout << "press-trace native test passed\n";
+    return 0;
+}
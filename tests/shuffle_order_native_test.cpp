@@ -0,0 +1,74 @@
+#include <cassert>
+#include <cstdint>
+#include <iostream>
+#include <vector>
+
+#include "ShuffleOrder.h"
+
+namespace {
+
+bool isPermutation(const ShuffleOrder::Order& order) {
+    std::vector<bool> seen(order.count, false);
+    for (uint16_t position = 0; position < order.count; position++) {
+        uint16_t entry = ShuffleOrder::at(order, position);
+        if (entry >= order.count || seen[entry]) {
+            return false;
+        }
+        seen[entry] = true;
+    }
+    return true;
+}
+
+void testUnshuffledIsIdentity() {
+    ShuffleOrder::Order order = ShuffleOrder::make(37, false, 1234);
+    for (uint16_t position = 0; position < 37; position++) {
+        assert(ShuffleOrder::at(order, position) == position);
+    }
+    assert(ShuffleOrder::at(order, 37) == 0);
+}
+
+void testEmptyAndSingle() {
+    ShuffleOrder::Order empty = ShuffleOrder::make(0, true, 7);
+    assert(ShuffleOrder::at(empty, 0) == 0);
+
+    ShuffleOrder::Order single = ShuffleOrder::make(1, true, 7);
+    assert(!single.shuffled);
+    assert(ShuffleOrder::at(single, 0) == 0);
+}
+
+void testShuffledIsBijectionForEveryCount() {
+    for (uint32_t count = 1; count <= 300; count++) {
+        for (uint32_t seed = 0; seed < 4; seed++) {
+            ShuffleOrder::Order order =
+                ShuffleOrder::make(static_cast<uint16_t>(count), true, seed * 2654435761U);
+            assert(isPermutation(order));
+        }
+    }
+    for (uint16_t count : {1000, 4096, 5000, 65534}) {
+        assert(isPermutation(ShuffleOrder::make(count, true, 0xC0FFEEU)));
+    }
+}
+
+void testSeedsGiveDifferentOrders() {
+    ShuffleOrder::Order a = ShuffleOrder::make(64, true, 1);
+    ShuffleOrder::Order b = ShuffleOrder::make(64, true, 2);
+    int samePositions = 0;
+    int fixedPoints = 0;
+    for (uint16_t position = 0; position < 64; position++) {
+        if (ShuffleOrder::at(a, position) == ShuffleOrder::at(b, position)) samePositions++;
+        if (ShuffleOrder::at(a, position) == position) fixedPoints++;
+    }
+    assert(samePositions < 16);
+    assert(fixedPoints < 16);
+}
+
+}  // namespace
+
+int main() {
+    testUnshuffledIsIdentity();
+    testEmptyAndSingle();
+    testShuffledIsBijectionForEveryCount();
+    testSeedsGiveDifferentOrders();
+    std::cout << "shuffle-order native test passed\n";
+    return 0;
+}
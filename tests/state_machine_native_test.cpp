@@ -1,4 +1,5 @@
 #include <cassert>
+#include <chrono>
 #include <cstdint>
 #include <iostream>
 
@@ -125,6 +126,80 @@ void testSongLoopModeRules() {
     assert(!sm.loopMode());
 }
 
+void testVolumeAndThemeStormsCoalesce() {
+    StateMachine sm;
+    sm.begin();
+
+    // A slider drag between two loop passes. Without coalescing the 16-slot
+    // queue would fill with stale volumes and drop the button press.
+    for (int i = 0; i <= 1000; i++) {
+        sm.postStringEvent(Event::VOLUME_CHANGED, String(i % 101));
+        if (i % 100 == 0) {
+            sm.postStringEvent(Event::THEME_CHANGED, String(i < 1000 ? "nature" : "bedtime"));
+        }
+    }
+    sm.postEvent(Event::BUTTON1_PRESS);
+    assert(sm.process());
+    expectState(sm, State::PLAYING_SONG);
+    assert(sm.pendingVolume() == 1000 % 101);
+    assert(sm.pendingTheme() == String("bedtime"));
+
+    StateMachine::QueueStats stats = sm.queueStats();
+    assert(stats.posted == 1001 + 11 + 1);
+    assert(stats.merged == 1000 + 10);
+    assert(stats.dropped == 0);
+
+    // Once handled, the next post queues a fresh event.
+    sm.postStringEvent(Event::VOLUME_CHANGED, String("64"));
+    sm.process();
+    assert(sm.pendingVolume() == 64);
+    assert(sm.queueStats().merged == 1010);
+
+    // Other events still drop when the queue is full.
+    for (int i = 0; i < 20; i++) {
+        sm.postEvent(Event::WAV_FINISHED);
+    }
+    assert(sm.queueStats().dropped == 4);
+    Serial.lines.clear();
+    sm.process();
+    stats = sm.queueStats();
+    const std::string queueLine = "[SM] Queue posted=" + std::to_string(stats.posted) +
+                                  " merged=1010 dropped=4";
+    assert(Serial.lines.size() == 1 && Serial.lines[0] == queueLine);
+}
+
+void testStormThroughput() {
+    StateMachine sm;
+    sm.begin();
+
+    constexpr int POSTS = 200000;
+    constexpr int POSTS_PER_PASS = 50;  // a busy loop pass during a drag
+    auto start = std::chrono::steady_clock::now();
+    for (int i = 0; i < POSTS; i++) {
+        if (i % 37 == 0) {
+            sm.postStringEvent(Event::THEME_CHANGED, String(i % 2 ? "nature" : "animals"));
+        } else {
+            sm.postStringEvent(Event::VOLUME_CHANGED, String(i % 101));
+        }
+        if (i % POSTS_PER_PASS == POSTS_PER_PASS - 1) {
+            sm.process();
+        }
+    }
+    sm.process();
+    double elapsedMs = std::chrono::duration<double, std::milli>(
+        std::chrono::steady_clock::now() - start).count();
+
+    StateMachine::QueueStats stats = sm.queueStats();
+    uint32_t handled = stats.posted - stats.merged - stats.dropped;
+    assert(stats.posted == POSTS);
+    assert(stats.dropped == 0);
+    // At most one volume and one theme event per pass reach handleEvent().
+    assert(handled <= 2 * (POSTS / POSTS_PER_PASS + 1));
+    assert(sm.pendingVolume() == (POSTS - 1) % 101);
+    std::cout << "volume/theme storm: " << POSTS << " posts, " << handled << " handled, "
+              << static_cast<int>(POSTS / (elapsedMs > 0 ? elapsedMs : 1)) << " posts/ms\n";
+}
+
 }  // namespace
 
 int main() {
@@ -134,6 +209,8 @@ int main() {
     testKillswitchCancel();
     testBlePayloadEventsDoNotForceTransitions();
     testSongLoopModeRules();
+    testVolumeAndThemeStormsCoalesce();
+    testStormThroughput();
     std::cout << "state-machine native test passed\n";
     return 0;
 }
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import sys
+
 import pytest
 
 from helpers import find_platformio, run_checked
@@ -14,3 +16,11 @@ def test_sweetyaar_firmware_build(repo_root) -> None:
     result = run_checked([pio, "run"], cwd=repo_root)
     assert "sweetyaar" in result.stdout
     assert "SUCCESS" in result.stdout
+
+    # The linker map feeds tools/firmware_size.py.
+    build_dir = repo_root / ".pio" / "build" / "sweetyaar"
+    assert (build_dir / "firmware.map").is_file()
+    size = run_checked([sys.executable, repo_root / "tools" / "firmware_size.py", build_dir, "--top", "0"],
+                       cwd=repo_root)
+    assert "src/main.cpp" in size.stdout
+    assert "ESP32-A2DP" in size.stdout
@@ -0,0 +1,535 @@
+"""Offline checks for the host-side log analysis tools in tools/."""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import pathlib
+import shutil
+import struct
+import subprocess
+import sys
+from types import ModuleType
+
+import pytest
+
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+SAMPLE_MAP = ROOT / "tests" / "data" / "firmware_sample.map"
+
+
+def load_tool(name: str) -> ModuleType:
+    spec = importlib.util.spec_from_file_location(name, ROOT / "tools" / f"{name}.py")
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_trace_report_aggregates_and_compares(tmp_path: pathlib.Path, capsys) -> None:
+    report = load_tool("trace_report")
+    new_log = tmp_path / "new.log"
+    new_log.write_text(
+        "[Boot] SweetYaar starting\n"
+        "12:00:01.100 [BootTrace] v=1 wake=cold serial=500000 sd=40000 ble=90000 total=630000\n"
+        "[BootTrace] v=1 wake=cold serial=500000 sd=60000 ble=110000 total=670000\n"
+        "[BootTrace] v=1 wake=deep_sleep serial=480000 ble=80000 total=560000\n"
+        "[BootTrace] v=2 wake=cold serial=1\n"
+        "[BootTrace] v=1 wake=cold serial=garbage\n"
+    )
+    old_log = tmp_path / "old.log"
+    old_log.write_text("[BootTrace] v=1 wake=cold serial=500000 sd=100000 ble=90000 total=690000\n")
+
+    boots = report.parse_logs([new_log], "BootTrace")
+    assert [boot.group for boot in boots] == ["wake=cold", "wake=cold", "wake=deep_sleep"]
+    assert list(boots[0].phases) == ["serial", "sd", "ble", "total"]
+
+    cold = report.summarize([boot for boot in boots if boot.labels["wake"] == "cold"])
+    assert cold["sd"]["n"] == 2
+    assert cold["sd"]["p50"] == 50000
+    assert cold["sd"]["min"] == 40000 and cold["sd"]["max"] == 60000
+    assert report.percentile([10, 20, 30, 40, 50], 90) == 46
+
+    assert report.main([str(new_log), "--baseline", str(old_log), "--where", "wake=cold"]) == 0
+    out = capsys.readouterr().out
+    assert "wake=cold: 2 record(s)" in out
+    assert "deep_sleep" not in out
+    sd_row = next(line for line in out.splitlines() if line.split()[:1] == ["sd"] and "%" in line)
+    assert sd_row.split() == ["sd", "100.0", "50.0", "-50.0", "-50%"]
+
+
+def test_trace_report_groups_press_traces(tmp_path: pathlib.Path, capsys) -> None:
+    report = load_tool("trace_report")
+    log = tmp_path / "press.log"
+    log.write_text(
+        "[BootTrace] v=1 wake=cold serial=500000 total=500000\n"
+        "[PressTrace] v=1 src=button ev=song debounce=50000 dispatch=200 lookup=1000 open=7000 first_write=2000 total=60200\n"
+        "[PressTrace] v=1 src=button ev=song debounce=54000 dispatch=400 lookup=1200 open=9000 first_write=2400 total=67000\n"
+        "[PressTrace] v=1 src=ble ev=next_song lookup=900 open=6000 first_write=2100 total=9000\n"
+        "[PressTrace] v=1 src=ble ev=song dispatch=-5 total=1\n"
+    )
+
+    presses = report.parse_logs([log], "PressTrace")
+    assert [press.group for press in presses] == ["src=button ev=song", "src=button ev=song", "src=ble ev=next_song"]
+    groups = report.group_traces(presses, ["src=button"])
+    assert list(groups) == ["src=button ev=song"]
+    song = report.summarize(groups["src=button ev=song"])
+    assert song["debounce"]["p50"] == 52000
+    assert song["open"]["max"] == 9000
+
+    assert report.main(["--tag", "PressTrace", str(log)]) == 0
+    out = capsys.readouterr().out
+    assert "src=ble ev=next_song: 1 record(s)" in out
+    assert "src=button ev=song: 2 record(s)" in out
+    assert "BootTrace" not in out and "serial" not in out
+
+
+def test_memory_report_recommends_stacks_and_compares(tmp_path: pathlib.Path, capsys) -> None:
+    report = load_tool("memory_report")
+    new_log = tmp_path / "new.log"
+    new_log.write_text(
+        "[BootTrace] v=1 wake=cold serial=500000 total=500000\n"
+        "[Mem] v=1 heap=8bit free=61234 largest=31744 min=40000\n"
+        "[Mem] v=1 task=loopTask stack=8192 free=5100\n"
+        "[Mem] v=1 task=BtI2STask stack=2048 free=1900\n"
+        "[Mem] v=1 task=btController stack=0 free=1200\n"
+        "[Mem] v=1 catalog themes=640 names=4096 total=4736\n"
+        "12:00:09.500 [Mem] v=1 heap=8bit free=30000 largest=12000 min=18020\n"
+        "[Mem] v=1 task=BtI2STask stack=2048 free=300\n"
+        "[Mem] v=1 task=loopTask stack=8192 fr\n"
+        "[Mem] v=1 catalog themes=640 names=6144 total=6784\n"
+    )
+    old_log = tmp_path / "old.log"
+    old_log.write_text(
+        "[Mem] v=1 heap=8bit free=50000 largest=10000 min=15000\n"
+        "[Mem] v=1 task=loopTask stack=8192 free=4100\n"
+    )
+
+    log = report.parse_logs([new_log])
+    assert list(log.tasks) == ["loopTask", "BtI2STask", "btController"]
+    assert log.tasks["BtI2STask"].min_free == 300 and log.tasks["BtI2STask"].samples == 2
+    assert log.tasks["loopTask"].used == 3092
+    assert log.tasks["btController"].used is None
+    heap = log.heaps["8bit"]
+    assert (heap.free, heap.min_free, heap.min_largest) == (30000, 18020, 12000)
+    assert log.blocks["catalog"] == {"themes": 640, "names": 6144, "total": 6784}
+
+    # Used plus max(25%, 512 B), rounded up to 256 B.
+    assert report.recommend_stack(3092, 25, 512) == 4096
+    assert report.recommend_stack(1748, 25, 512) == 2304
+    assert report.recommend_stack(100, 25, 512) == 768
+
+    assert report.main([str(new_log), "--baseline", str(old_log)]) == 0
+    out = capsys.readouterr().out
+    current, _, compared = out.partition("vs baseline")
+    rows = {line.split()[0]: line.split() for line in current.splitlines() if line.startswith("  ")}
+    assert rows["loopTask"][1:] == ["1", "8192", "3092", "5100", "4096", "-4096"]
+    assert rows["BtI2STask"][-3:] == ["2304", "+256", "LOW"]
+    assert rows["btController"][1:] == ["1", "-", "-", "1200", "-", "-"]
+    assert "frees 3840 B of heap" in current
+    assert "catalog: themes=640 names=6144 total=6784" in current
+    rows = {line.split()[0]: line.split() for line in compared.splitlines() if line.startswith("  ")}
+    assert rows["loopTask"][1:] == ["4092", "3092", "-1000"]
+    assert rows["BtI2STask"][1:] == ["-", "1748", "-"]
+    assert rows["8bit"][1:] == ["15000", "18020", "+3020"]
+
+
+def test_trace_decode_splits_text_and_frames() -> None:
+    trace = load_tool("trace_decode")
+    frame = trace.encode_frame
+    corrupt = bytearray(frame(2, 7, 0, []))
+    corrupt[-1] ^= 0xFF
+    stream = (
+        b"[BT] A2DP sink started as \"SweetYaar\"\n"
+        + frame(1, 5, 1000, [61232, 31744])
+        + frame(5, 6, 2000, [75, 0])
+        + bytes(corrupt)
+        + b"\n"
+        + frame(8, 9, 3000, [2, 7100])  # seq 7 and 8 never arrived
+        + b"[SM] IDLE -> PLAYING_SONG\r\n"
+        + frame(2, 0, 10, [])  # device rebooted: seq starts over, no drop
+    )
+    decoder = trace.TraceDecoder()
+    lines: list[str] = []
+    for i in range(0, len(stream), 3):  # serial reads arrive in arbitrary chunks
+        lines += decoder.feed(stream[i:i + 3])
+    lines += decoder.flush()
+
+    assert lines[:3] == [
+        "[BT] A2DP sink started as \"SweetYaar\"",
+        "[BT] Connected (free=61232 largest=31744)",
+        "[Vol] 75% (0.75, volume request)",
+    ]
+    assert lines[3].startswith("\ufffdZ")  # a frame failing its CRC is passed through as text
+    assert lines[4:] == [
+        "[Trace] 2 event(s) dropped (ring full)",
+        "[WavPlayer] Read-ahead underrun #2 (maxReadUs=7100)",
+        "[SM] IDLE -> PLAYING_SONG",
+        "[BT] Disconnected",
+    ]
+    assert decoder.frames == 4
+    assert decoder.dropped == 2
+
+    assert trace.TraceDecoder(timestamps=True).feed(
+        frame(11, 0, 1500000, [45, 35, 2, 0]) + frame(12, 1, 1550000, [8820, 4096, 2, 0])) == [
+        "  1.500000 [BT] Prefetch 35% -> 45% (window underflows=2 drops=0)",
+        "  1.550000 [BT] Rx rx=+8820B rb=4096B underflows=2 drops=0",
+    ]
+
+
+def elf32(sections: list[tuple[str, int, int]]) -> bytes:
+    """Minimal little-endian ELF32 with (name, flags, size) section headers."""
+    names = b"\0" + b"".join(name.encode() + b"\0" for name, _, _ in sections) + b".shstrtab\0"
+    shoff = 52 + len(names)
+    headers = [struct.pack("<10I", *[0] * 10)]
+    offset = 1
+    for name, flags, size in sections:
+        headers.append(struct.pack("<10I", offset, 1, flags, 0, 0, size, 0, 0, 4, 0))
+        offset += len(name) + 1
+    headers.append(struct.pack("<10I", offset, 3, 0, 0, 52, len(names), 0, 0, 1, 0))
+    ident = b"\x7fELF\x01\x01\x01" + b"\0" * 9
+    header = ident + struct.pack("<HHIIIIIHHHHHH", 2, 94, 1, 0, 0, shoff, 0, 52, 0, 0, 40,
+                                 len(headers), len(headers) - 1)
+    return header + names + b"".join(headers)
+
+
+def test_firmware_size_attributes_sample_map(tmp_path: pathlib.Path, capsys) -> None:
+    size = load_tool("firmware_size")
+    report = size.read_map(SAMPLE_MAP)
+    parts = report.components
+
+    # Our sources, PlatformIO-built libraries, and ArduinoJson templates pulled
+    # out of the objects that instantiate them.
+    assert parts["src/main.cpp"].bss == 0x201 + 0x100
+    assert parts["src/main.cpp"].flash == 0x1a4c + 0x2e4 + 0x6b8 + 0x1e70
+    assert parts["src/TraceLog.cpp"].ram == 0x804
+    assert parts["src/ButtonHandler.cpp"].iram == 0x18 + 0x9c
+    assert parts["ArduinoJson"].flash == 0x40 + 0x1840 + 0x1b8
+    assert parts["ESP32-A2DP"].data == 4 and parts["ESP32-A2DP"].bss == 0x10
+    assert parts["arduino-audio-tools"].flash == 0x12c0
+    assert parts["BLE"].bss == 0x1c
+    assert parts["arduino-core"].iram == 0x1a0
+    assert parts["esp-idf/libbt"].bss == 0x4c + 0x2a8c + 0x1c  # COMMON included
+    assert parts["esp-idf/libbtdm_app"].ram == 0x640 + 0x8a20
+    assert parts["toolchain/libc"].bss == 0x408
+    assert parts["(padding)"].bss == 3
+    # Discarded sections are not counted.
+    assert "src/WavPlayer.cpp" in parts and parts["src/WavPlayer.cpp"].ram == 0
+
+    # Every byte of every loaded output section is attributed.
+    for name, (_addr, section_size) in report.sections.items():
+        assert report.attributed[name] == section_size, name
+    total = report.total()
+    assert total.bss == report.sections[".dram0.bss"][1] + report.sections[".noinit"][1]
+    assert report.regions["dram0_0_seg"].length == 0x2c200
+
+    by_symbol = size.read_map(SAMPLE_MAP, by="symbol").components
+    assert by_symbol["configResponseBuf [main.cpp.o]"].bss == 0x201
+    assert by_symbol["btdm_env [arch_main.o]"].bss == 0x8a20
+    by_object = size.read_map(SAMPLE_MAP, by="object").components
+    assert by_object["ESP32-A2DP/BluetoothA2DPSinkQueued.cpp.o"].flash == 0x3e0
+
+    # The ELF's section headers show bytes the map did not place.
+    elf = tmp_path / "firmware.elf"
+    elf.write_bytes(elf32([(".dram0.bss", 3, 0xc520 + 8), (".flash.text", 6, 0x12872),
+                           (".debug_info", 0, 0x5000)]))
+    assert size.read_elf_sections(elf.read_bytes()) == {".dram0.bss": 0xc528, ".flash.text": 0x12872}
+    with pytest.raises(ValueError):
+        size.read_elf_sections(b"\x7fELF\x02\x01")
+
+    # A build whose trace ring doubled and whose catalog lost a buffer.
+    new_map = tmp_path / "firmware.map"
+    new_map.write_text(SAMPLE_MAP.read_text()
+                       .replace("      0x800 .pio/build/sweetyaar/src/TraceLog.cpp.o",
+                                "     0x1000 .pio/build/sweetyaar/src/TraceLog.cpp.o")
+                       .replace("       0x60 .pio/build/sweetyaar/src/ContentCatalog.cpp.o",
+                                "       0x20 .pio/build/sweetyaar/src/ContentCatalog.cpp.o"))
+    csv_path = tmp_path / "size.csv"
+    assert size.main([str(tmp_path), "--baseline", str(SAMPLE_MAP), "--csv", str(csv_path)]) == 0
+    out = capsys.readouterr().out
+    assert "Static RAM 54832 B (data 2376 + bss 52456)" in out
+    assert "dram0_0_seg" in out and "B left for the heap" in out
+    elf_rows = {line.split()[0]: line.split()[1:] for line in out.splitlines() if line.startswith("  .")}
+    assert elf_rows[".dram0.bss"] == [str(0xc528), str(0xc520 + 0x800 - 0x40), str(8 - 0x800 + 0x40)]
+    diff = {line.split()[0]: line.split()[1:] for line in out.partition("vs baseline")[2].splitlines()
+            if line.startswith("  ")}
+    assert diff["src/TraceLog.cpp"] == ["4100", "+2048", "0", "+0", "0", "+0"]
+    assert diff["src/ContentCatalog.cpp"][:2] == ["32", "-64"]
+    assert diff["total"][:2] == ["54832", "+1984"]
+    assert "src/main.cpp" not in diff
+    rows = csv_path.read_text().splitlines()
+    assert rows[0] == "component,data,bss,iram,flash,rtc,ram"
+    assert rows[1].startswith("esp-idf/libbtdm_app,1600,35360,")
+
+    assert size.main([str(tmp_path / "missing")]) == 1
+    assert "run `pio run` first" in capsys.readouterr().out
+
+
+def test_bt_stress_reports_notify_counters(capsys) -> None:
+    load_tool("trace_decode")  # imported by bt_stress_test as sibling modules
+    load_tool("log_archive")
+    stress = load_tool("bt_stress_test")
+    mon = stress.SerialMonitor("/dev/null")
+    mon._lines = [
+        (1.0, "[BLE] Notifies sent=3 suppressed=1"),
+        (5.0, "[BLE] Client connected"),
+        (6.0, "[BLE] Notifies sent=40 suppressed=25"),
+        (7.0, "[BT] Heap critically low after BT session (free=18000). Restarting cleanly."),
+    ]
+    assert mon.notify_stats_since(2.0) == (40, 25)
+    assert mon.notify_stats_since(6.5) is None
+
+    results = [
+        stress.IterResult(1, "ble-first", stress.Outcome.GRACEFUL_RESTART,
+                          notifies_sent=40, notifies_suppressed=25),
+        stress.IterResult(2, "ble-first", stress.Outcome.CLEAN,
+                          notifies_sent=20, notifies_suppressed=15),
+        stress.IterResult(3, "ble-first", stress.Outcome.BLE_CONNECT_FAILED),
+    ]
+    stress.print_summary(results, use_color=False)
+    out = capsys.readouterr().out
+    assert "BLE notifies:        sent=60  suppressed=40  (40% of updates)  over 2 iteration(s)" in out
+
+
+def test_crash_report_symbolizes_and_groups(tmp_path: pathlib.Path, capsys) -> None:
+    if not shutil.which("gcc") or not shutil.which("addr2line") or not shutil.which("nm"):
+        pytest.skip("gcc, nm and addr2line are needed to build and symbolize a host ELF")
+    archive = load_tool("log_archive")  # imported by crash_report as a sibling module
+    crash = load_tool("crash_report")
+    source = tmp_path / "crashy.c"
+    source.write_text(
+        "int leaf(int x) { return x * 3; }\n"
+        "int middle(int x) { return leaf(x) + 1; }\n"
+        "int other(int x) { return x - 1; }\n"
+        "int main(void) { return middle(2) + other(1); }\n"
+    )
+    elf_path = tmp_path / "firmware.elf"
+    subprocess.run(["gcc", "-g", "-O0", "-Wl,--build-id", "-o", str(elf_path), str(source)], check=True)
+    nm = subprocess.run(["nm", str(elf_path)], capture_output=True, text=True, check=True).stdout
+    addr = {name: int(value, 16) for value, kind, name in
+            (line.split() for line in nm.splitlines() if len(line.split()) == 3)}
+    elf = crash.read_elf(elf_path)
+    readelf = subprocess.run(["readelf", "-n", str(elf_path)], capture_output=True, text=True).stdout
+    if "Build ID" in readelf:
+        assert elf.build_id in readelf
+    sha = elf.sha256[:16]
+
+    def backtrace(*names: str, corrupted: bool = False) -> str:
+        frames = " ".join(f"0x{addr[name]:08x}:0x3ffb1f20" for name in names)
+        return f"Backtrace: {frames}{' |<-CORRUPTED' if corrupted else ''}\n"
+
+    logs = []
+    for index in range(3):
+        log = tmp_path / f"stress-{index}.log"
+        log.write_text(
+            "=== SweetYaar Boot ===\n"
+            "[BT] Connected\n"
+            "assert failed: host_recv_pkt_cb hci_hal_h4.c:297 (ret == pdTRUE)\n"
+            + backtrace("leaf", "middle", "main")
+            + f"ELF file SHA256: {sha}\n"
+            "Rebooting...\n"
+            "=== SweetYaar Boot ===\n"
+            "Guru Meditation Error: Core  1 panic'ed (LoadProhibited). Exception was unhandled.\n"
+            + backtrace("other", "main", corrupted=index == 2)
+            + f"ELF file SHA256: {sha}\n"
+            "Rebooting...\n"
+        )
+        logs.append(log)
+    other_build = tmp_path / "old.log"
+    other_build.write_text(
+        "ESP_ERROR_CHECK failed: esp_err_t 0x101 (ESP_ERR_NO_MEM) at 0x4008a2b4\n"
+        "abort() was called at PC 0x4008a2b7 on core 0\n"
+        "Backtrace: 0x4008a2b4:0x3ffb1f20 0x400d5f10:0x3ffb1f40\n"
+        "ELF file SHA256: 0123456789abcdef\n"
+    )
+
+    crashes = crash.parse_logs(logs + [other_build])
+    assert [c.reason for c in crashes[:2]] == ["assert host_recv_pkt_cb hci_hal_h4.c:297", "LoadProhibited"]
+    assert crashes[-1].reason == "ESP_ERROR_CHECK ESP_ERR_NO_MEM"
+    assert crashes[-1].pcs == [0x4008A2B4, 0x400D5F10]
+    assert crashes[5].corrupted and not crashes[1].corrupted
+
+    # A stress capture whose panic was rotated into a gzipped part, with the
+    # timestamps RotatingLog writers add; the ROM reset line ends a crash.
+    rotated = tmp_path / "rotated" / "stress.log"
+    with archive.RotatingLog(rotated, max_bytes=150) as out:
+        out.write("2026-10-19T10:00:00.000 assert failed: host_recv_pkt_cb hci_hal_h4.c:297 (ret == pdTRUE)")
+        out.write("2026-10-19T10:00:00.001 " + backtrace("leaf", "middle").strip())
+        out.write("2026-10-19T10:00:01.000 Guru Meditation Error: Core  0 panic'ed (StoreProhibited).")
+        out.write("2026-10-19T10:00:01.500 rst:0x1 (POWERON_RESET),boot:0x13 (SPI_FAST_FLASH_BOOT)")
+        out.write("2026-10-19T10:00:02.000 " + backtrace("other").strip())
+    rotated_crashes = crash.parse_logs([rotated, rotated.with_name("stress.001.log.gz")])
+    assert [(pathlib.Path(c.log).name, c.line) for c in rotated_crashes] == [
+        ("stress.001.log.gz", 1), ("stress.002.log.gz", 1)]
+    assert rotated_crashes[0].pcs == [addr["leaf"], addr["middle"]]
+    assert rotated_crashes[1].reason == "StoreProhibited" and rotated_crashes[1].pcs == []
+
+    unhashed = tmp_path / "unhashed.log"  # a build without the embedded ELF hash
+    unhashed.write_text(
+        "assert failed: host_recv_pkt_cb hci_hal_h4.c:297 (ret == pdTRUE)\n"
+        + backtrace("leaf", "middle", "main")
+        + "ELF file SHA256: 0000000000000000\n"
+    )
+    assert crash.parse_logs([unhashed])[0].elf_sha == ""
+
+    calls = tmp_path / "calls.txt"
+    wrapper = tmp_path / "addr2line"
+    wrapper.write_text(f'#!/bin/sh\necho "$@" >> {calls}\nexec addr2line "$@"\n')
+    wrapper.chmod(0o755)
+    json_path = tmp_path / "crashes.json"
+    argv = [*map(str, logs + [other_build, unhashed]), "--elf", str(elf_path), "--addr2line", str(wrapper),
+            "--cache-dir", str(tmp_path / "cache"), "--frames", "2", "--json", str(json_path)]
+    assert crash.main(argv) == 0
+    out = capsys.readouterr().out
+    assert "8 crash(es) in 5 log(s), 3 signature(s); 4 address(es) symbolized, 0 from the cache, " \
+           "1 addr2line call(s)" in out
+    assert "1 crash(es) have no matching --elf" in out
+    assert "    4x  assert host_recv_pkt_cb hci_hal_h4.c:297\n          leaf at " in out
+    assert "        < middle at " in out and "crashy.c:2" in out
+    assert "(some backtraces are corrupted)" in out
+    assert "0x4008a2b4" in out  # unknown build stays raw
+    assert len(calls.read_text().splitlines()) == 1
+    signatures = json.loads(json_path.read_text())
+    assert [s["count"] for s in signatures] == [4, 3, 1]
+    assert signatures[0]["functions"] == ["leaf", "middle"]
+    assert signatures[1]["functions"] == ["other", "main"]
+    assert set(signatures[0]["builds"]) == {sha[:8], "?"}
+    assert (tmp_path / "cache" / f"{elf.build_id}.json").exists()
+
+    assert crash.main(argv) == 0
+    assert "4 address(es) symbolized, 4 from the cache, 0 addr2line call(s)" in capsys.readouterr().out
+    assert len(calls.read_text().splitlines()) == 1
+
+
+def test_log_archive_rotates_indexes_and_searches(tmp_path: pathlib.Path, capsys) -> None:
+    archive = load_tool("log_archive")
+    logs = tmp_path / "logs"
+    old = logs / "bt-smoke-20261001-101500.log"
+    with archive.RotatingLog(old, max_bytes=200, flush_seconds=3600) as out:
+        out.write("2026-10-01T10:15:00.000 === SweetYaar Boot ===")
+        out.write("2026-10-01T10:15:00.100 [Boot] build=1111111111111111")
+        for second in range(1, 8):
+            out.write(f"2026-10-01T10:15:{second:02d}.000 [BT] Audio state: STARTED free={40000 - second}")
+        assert old.read_text() == ""  # buffered until the flush interval
+    parts = archive.segments(old)
+    assert [p.name for p in parts[:2]] == ["bt-smoke-20261001-101500.001.log.gz",
+                                           "bt-smoke-20261001-101500.002.log.gz"]
+    assert parts[-1] == old
+    lines = list(archive.read_lines(old))
+    assert len(lines) == 9 and lines[1].endswith("build=1111111111111111\n")
+
+    new = logs / "bt-smoke-20261008-090000.log"
+    new.write_text(
+        "2026-10-08T09:00:00.000 [Boot] build=2222222222222222\n"
+        "2026-10-08T09:00:05.000 assert failed: host_recv_pkt_cb hci_hal_h4.c:297 (ret == pdTRUE)\n"
+        "2026-10-08T09:00:05.010 abort() was called at PC 0x4008a2b7 on core 0\n"
+    )
+    stress = logs / "stress.log"
+    stress.write_text("[BT] Connected\nassert failed: host_recv_pkt_cb hci_hal_h4.c:297\n")
+    db = tmp_path / "index.sqlite"
+
+    stats = archive.ingest(db, [logs])
+    assert (stats.files, stats.lines, stats.skipped) == (len(parts) + 2, 14, 0)
+    assert archive.ingest(db, [logs]).skipped == len(parts) + 2
+
+    assert archive.main(["--db", str(db), "search", "host_recv_pkt_cb", "--runs"]) == 0
+    out = capsys.readouterr().out
+    assert "2 line(s) in 2 of 3 run(s)" in out
+    assert "First seen in bt-smoke-20261008-090000 (2026-10-08T09:00:05.000)" in out
+    assert "2222222222222222" in out
+
+    assert archive.main(["--db", str(db), "search", "STARTED", "--build", "1111", "--limit", "2"]) == 0
+    out = capsys.readouterr().out.splitlines()
+    assert out[0].startswith("2 line(s) (limit reached);")
+    assert out[1].startswith("  bt-smoke-20261001-101500.001:3  2026-10-01T10:15:01.000  1111111111111111  [BT] Audio")
+
+    assert archive.main(["--db", str(db), "search", "abort()"]) == 0  # not FTS5 syntax: a phrase
+    assert "bt-smoke-20261008-090000:3" in capsys.readouterr().out
+    assert archive.main(["--db", str(db), "search", "STARTED", "--build", "2222"]) == 1
+
+    stress.write_text(stress.read_text() + "[BT] Connected\n")
+    stats = archive.ingest(db, [logs])
+    assert (stats.files, stats.lines) == (1, 3)
+    assert archive.main(["--db", str(db), "search", "Connected", "--runs"]) == 0
+    assert "2 line(s) in 1 of 3 run(s)" in capsys.readouterr().out
+
+    assert archive.main(["--db", str(db), "runs", "--since", "2026-10-05"]) == 0
+    runs = capsys.readouterr().out
+    assert "bt-smoke-20261008-090000" in runs and "bt-smoke-20261001-101500" not in runs
+
+    assert archive.main(["--db", str(tmp_path / "missing.sqlite"), "search", "x"]) == 1
+    assert "run `ingest` first" in capsys.readouterr().out
+
+
+def test_a2dp_ring_sim_replays_logs_and_sweeps(tmp_path: pathlib.Path, capsys) -> None:
+    sim = load_tool("a2dp_ring_sim")
+
+    # trace_decode.py --timestamps output: deltas every 50 ms, with a stall.
+    log = [
+        "  0.000000 [BT] Rx rx=+8820B rb=0B underflows=0 drops=0",
+        "  0.050000 [BT] Rx rx=+8820B rb=4096B underflows=0 drops=0",
+        "[SM] some text line without a timestamp",
+        "  0.100000 [BT] Rx rx=+0B rb=0B underflows=0 drops=0",
+        "  0.150000 [BT] Rx rx=+17640B rb=2048B underflows=1 drops=0",
+    ]
+    arrivals = sim.arrivals_from_log(log, 2048)
+    # The first delta has no interval start, so it is skipped.
+    assert sum(size for _, size in arrivals) == 8820 + 17640
+    assert all(0.0 < t <= 150.0 for t, _ in arrivals)
+    assert not [t for t, _ in arrivals if 50.0 < t <= 100.0]  # the stalled interval stays empty
+    # Cumulative rx= from `pio device monitor -f time` Stats lines; a reboot restarts the count.
+    stats = [
+        "10:00:00.000 > [BT] Stats rb=0/12288B prefetch=35% rx=1000B tx=0B underflows=0 drops=0 mode=0 active=1",
+        "10:00:00.100 > [BT] Stats rb=0/12288B prefetch=35% rx=18640B tx=0B underflows=0 drops=0 mode=1 active=1",
+        "10:00:00.200 > [BT] Stats rb=0/12288B prefetch=35% rx=500B tx=0B underflows=0 drops=0 mode=1 active=1",
+    ]
+    assert sum(size for _, size in sim.arrivals_from_log(stats, 2048)) == 17640
+
+    steady = sim.synthetic_arrivals("steady", 10.0, 2048, sim.DEFAULT_RATE_BYTES_PER_MS,
+                                    1.0, 0.0, 0.0, 0.0, seed=3)
+    jittery = sim.synthetic_arrivals("jittery", 10.0, 2048, sim.DEFAULT_RATE_BYTES_PER_MS,
+                                     1.0, 2000.0, 40.0, 0.0, seed=3)
+    ample = sim.Config(12288, 50, 2048)
+    result = sim.simulate(steady, ample)
+    assert (result.underflows, result.drops, result.gaps) == (0, 0, 0)
+    assert 25.0 < result.mean_delay_ms < 40.0  # about the 6 KB prefetch at 176.4 B/ms
+
+    shallow = sim.simulate(jittery, sim.Config(12288, 10, 2048))
+    deep = sim.simulate(jittery, sim.Config(12288, 70, 2048))
+    assert shallow.gaps > 0 and shallow.underflows == 0  # each gap shorter than the 20 ms receive timeout
+    assert sim.simulate(jittery, sim.Config(12288, 10, 2048), i2s_ticks_ms=2.0).underflows > 0
+    assert deep.gaps == 0 and deep.mean_delay_ms > shallow.mean_delay_ms
+    tiny = sim.simulate(jittery, sim.Config(4096, 50, 2048))
+    assert tiny.drops > 0
+    # A level the ring can never reach before a send fails: silent throughout.
+    stuck = sim.simulate(steady, sim.Config(5000, 90, 2048))
+    assert stuck.gaps == 1 and stuck.gap_ms == steady[-1][0] - steady[0][0]
+
+    configs = sim.build_configs(sim.parse_range("4096:12288:4096"), sim.parse_range("10,50,90"),
+                                sim.parse_range("1024,4096"))
+    assert len(configs) == 18
+    assert sim.rank(sim.simulate_python(jittery, configs, sim.DEFAULT_RATE_BYTES_PER_MS, 20.0))[0].gaps == 0
+
+    out_csv = tmp_path / "sweep.csv"
+    assert sim.main(["--model", "jittery", "--duration-s", "5", "--ring", "8192,12288",
+                     "--prefetch", "30:70:20", "--write-size", "2048", "--engine", "python",
+                     "--top", "3", "--csv", str(out_csv)]) == 0
+    out = capsys.readouterr().out
+    assert "6 configurations" in out
+    assert len(out_csv.read_text().splitlines()) == 7
+
+
+def test_a2dp_ring_sim_numpy_engine_matches_python() -> None:
+    pytest.importorskip("numpy")
+    sim = load_tool("a2dp_ring_sim")
+    arrivals = sim.synthetic_arrivals("jittery", 20.0, 2048, sim.DEFAULT_RATE_BYTES_PER_MS,
+                                      3.0, 1500.0, 60.0, 300.0, seed=7)
+    configs = sim.build_configs([4096, 5000, 8192, 12288], [10, 35, 65, 90], [512, 4096])
+    expected = sim.simulate_python(arrivals, configs, sim.DEFAULT_RATE_BYTES_PER_MS, 20.0)
+    actual = sim.simulate_numpy(arrivals, configs, sim.DEFAULT_RATE_BYTES_PER_MS, 20.0)
+    for want, got in zip(expected, actual):
+        assert (got.underflows, got.drops, got.gaps) == (want.underflows, want.drops, want.gaps)
+        assert got.gap_ms == pytest.approx(want.gap_ms)
+        assert got.mean_delay_ms == pytest.approx(want.mean_delay_ms)
+        assert got.max_delay_ms == pytest.approx(want.max_delay_ms)
@@ -2,10 +2,11 @@ from __future__ import annotations
 
 import pathlib
 import shutil
+import sys
 
 import pytest
 
-from helpers import run_checked
+from helpers import find_arduinojson, run_checked
 
 
 def test_state_machine_native_transitions(repo_root: pathlib.Path, tmp_path: pathlib.Path) -> None:
@@ -52,3 +53,273 @@ def test_bedtime_mode_native_rules(repo_root: pathlib.Path, tmp_path: pathlib.Pa
     ])
     result = run_checked([exe])
     assert "bedtime-mode native test passed" in result.stdout
+
+
+def test_shuffle_order_native_permutation(repo_root: pathlib.Path, tmp_path: pathlib.Path) -> None:
+    compiler = shutil.which("c++") or shutil.which("g++") or shutil.which("clang++")
+    if not compiler:
+        pytest.skip("No C++ compiler found for native shuffle-order regression test.")
+
+    exe = tmp_path / "shuffle_order_native_test"
+    run_checked([
+        compiler,
+        "-std=c++17",
+        "-Wall",
+        "-Wextra",
+        "-I",
+        repo_root / "src",
+        repo_root / "src" / "ShuffleOrder.cpp",
+        repo_root / "tests" / "shuffle_order_native_test.cpp",
+        "-o",
+        exe,
+    ])
+    result = run_checked([exe])
+    assert "shuffle-order native test passed" in result.stdout
+
+
+def test_trace_log_native_frames(repo_root: pathlib.Path, tmp_path: pathlib.Path) -> None:
+    compiler = shutil.which("c++") or shutil.which("g++") or shutil.which("clang++")
+    if not compiler:
+        pytest.skip("No C++ compiler found for native trace-log regression test.")
+
+    exe = tmp_path / "trace_log_native_test"
+    run_checked([
+        compiler,
+        "-std=c++17",
+        "-Wall",
+        "-Wextra",
+        "-I",
+        repo_root / "tests" / "native_stubs",
+        "-I",
+        repo_root / "src",
+        repo_root / "src" / "TraceLog.cpp",
+        repo_root / "tests" / "trace_log_native_test.cpp",
+        "-o",
+        exe,
+    ])
+    result = run_checked([exe])
+    assert "trace-log native test passed" in result.stdout
+
+    # The firmware's frames must decode back to the lines they replaced.
+    sys.path.insert(0, str(repo_root / "tools"))
+    try:
+        from trace_decode import TraceDecoder
+    finally:
+        sys.path.pop(0)
+    capture = next(line for line in result.stdout.splitlines() if line.startswith("capture="))
+    decoder = TraceDecoder()
+    lines = decoder.feed(bytes.fromhex(capture.removeprefix("capture="))) + decoder.flush()
+    assert lines == [
+        "[Boot] Ready.",
+        "[BT] Connected (free=61232 largest=31744)",
+        "[BT] Audio state: STARTED",
+        "[Vol] requested=80% effective=45% bedtimeCap=45% (0.45, song start)",
+        "[WavPlayer] Gapless: /songs/a/b.wav",
+        "[WavPlayer] Stats ring=8192/12288B low=2048B underruns=1 reads=312 maxReadUs=5300 gapUs=0",
+    ]
+    assert decoder.dropped == 0
+
+
+def test_perf_stats_native_histograms(repo_root: pathlib.Path, tmp_path: pathlib.Path) -> None:
+    compiler = shutil.which("c++") or shutil.which("g++") or shutil.which("clang++")
+    if not compiler:
+        pytest.skip("No C++ compiler found for native perf-stats regression test.")
+
+    exe = tmp_path / "perf_stats_native_test"
+    run_checked([
+        compiler,
+        "-std=c++17",
+        "-Wall",
+        "-Wextra",
+        "-I",
+        repo_root / "tests" / "native_stubs",
+        "-I",
+        repo_root / "src",
+        repo_root / "src" / "PerfStats.cpp",
+        repo_root / "src" / "BootTrace.cpp",
+        repo_root / "src" / "JsonWriter.cpp",
+        repo_root / "tests" / "perf_stats_native_test.cpp",
+        "-o",
+        exe,
+    ])
+    result = run_checked([exe])
+    assert "perf-stats native test passed" in result.stdout
+
+
+def test_press_trace_native_stages(repo_root: pathlib.Path, tmp_path: pathlib.Path) -> None:
+    compiler = shutil.which("c++") or shutil.which("g++") or shutil.which("clang++")
+    if not compiler:
+        pytest.skip("No C++ compiler found for native press-trace regression test.")
+
+    exe = tmp_path / "press_trace_native_test"
+    run_checked([
+        compiler,
+        "-std=c++17",
+        "-Wall",
+        "-Wextra",
+        "-I",
+        repo_root / "tests" / "native_stubs",
+        "-I",
+        repo_root / "src",
+        repo_root / "src" / "PressTrace.cpp",
+        repo_root / "tests" / "press_trace_native_test.cpp",
+        "-o",
+        exe,
+    ])
+    result = run_checked([exe])
+    assert "press-trace native test passed" in result.stdout
+
+
+def test_button_handler_native_edges(repo_root: pathlib.Path, tmp_path: pathlib.Path) -> None:
+    compiler = shutil.which("c++") or shutil.which("g++") or shutil.which("clang++")
+    if not compiler:
+        pytest.skip("No C++ compiler found for native button-handler regression test.")
+
+    exe = tmp_path / "button_handler_native_test"
+    run_checked([
+        compiler,
+        "-std=c++17",
+        "-Wall",
+        "-Wextra",
+        "-I",
+        repo_root / "tests" / "native_stubs",
+        "-I",
+        repo_root / "src",
+        repo_root / "src" / "ButtonHandler.cpp",
+        repo_root / "tests" / "button_handler_native_test.cpp",
+        "-o",
+        exe,
+    ])
+    result = run_checked([exe])
+    assert "button-handler native test passed" in result.stdout
+
+
+def test_json_writer_native_output(repo_root: pathlib.Path, tmp_path: pathlib.Path) -> None:
+    compiler = shutil.which("c++") or shutil.which("g++") or shutil.which("clang++")
+    if not compiler:
+        pytest.skip("No C++ compiler found for native JSON writer test.")
+
+    exe = tmp_path / "json_writer_native_test"
+    run_checked([
+        compiler,
+        "-std=c++17",
+        "-O2",
+        "-Wall",
+        "-Wextra",
+        "-I",
+        repo_root / "tests" / "native_stubs",
+        "-I",
+        repo_root / "src",
+        repo_root / "src" / "JsonWriter.cpp",
+        repo_root / "tests" / "json_writer_native_test.cpp",
+        "-o",
+        exe,
+    ])
+    result = run_checked([exe])
+    assert "json-writer native test passed" in result.stdout
+
+
+def test_content_catalog_native_benchmark(repo_root: pathlib.Path, tmp_path: pathlib.Path) -> None:
+    compiler = shutil.which("c++") or shutil.which("g++") or shutil.which("clang++")
+    if not compiler:
+        pytest.skip("No C++ compiler found for native content-catalog test.")
+    arduinojson = find_arduinojson(repo_root)
+    if arduinojson is None:
+        pytest.skip("ArduinoJson not found; expected .pio/libdeps/*/ArduinoJson from `pio run -e sweetyaar`.")
+
+    exe = tmp_path / "content_catalog_native_test"
+    run_checked([
+        compiler,
+        "-std=c++17",
+        "-O2",
+        "-Wall",
+        "-Wextra",
+        "-DARDUINOJSON_ENABLE_ARDUINO_STRING=1",
+        "-I",
+        repo_root / "tests" / "native_stubs",
+        "-I",
+        arduinojson,
+        "-I",
+        repo_root / "src",
+        repo_root / "src" / "ContentCatalog.cpp",
+        repo_root / "src" / "JsonWriter.cpp",
+        repo_root / "tests" / "content_catalog_native_test.cpp",
+        "-o",
+        exe,
+    ])
+    result = run_checked([exe])
+    assert "content-catalog native test passed" in result.stdout
+
+
+def test_name_index_native_benchmark(repo_root: pathlib.Path, tmp_path: pathlib.Path) -> None:
+    compiler = shutil.which("c++") or shutil.which("g++") or shutil.which("clang++")
+    if not compiler:
+        pytest.skip("No C++ compiler found for native name-index test.")
+
+    exe = tmp_path / "name_index_native_test"
+    run_checked([
+        compiler,
+        "-std=c++17",
+        "-O2",
+        "-Wall",
+        "-Wextra",
+        "-I",
+        repo_root / "tests" / "native_stubs",
+        "-I",
+        repo_root / "src",
+        repo_root / "tests" / "name_index_native_test.cpp",
+        "-o",
+        exe,
+    ])
+    result = run_checked([exe])
+    assert "name-index native test passed" in result.stdout
+
+
+def test_prefetch_tuner_native_simulation(repo_root: pathlib.Path, tmp_path: pathlib.Path) -> None:
+    compiler = shutil.which("c++") or shutil.which("g++") or shutil.which("clang++")
+    if not compiler:
+        pytest.skip("No C++ compiler found for native prefetch-tuner test.")
+
+    exe = tmp_path / "prefetch_tuner_native_test"
+    run_checked([
+        compiler,
+        "-std=c++17",
+        "-O2",
+        "-Wall",
+        "-Wextra",
+        "-I",
+        repo_root / "tests" / "native_stubs",
+        "-I",
+        repo_root / "src",
+        repo_root / "src" / "PrefetchTuner.cpp",
+        repo_root / "tests" / "prefetch_tuner_native_test.cpp",
+        "-o",
+        exe,
+    ])
+    result = run_checked([exe])
+    assert "prefetch-tuner native test passed" in result.stdout
+
+
+def test_memory_report_native_pages(repo_root: pathlib.Path, tmp_path: pathlib.Path) -> None:
+    compiler = shutil.which("c++") or shutil.which("g++") or shutil.which("clang++")
+    if not compiler:
+        pytest.skip("No C++ compiler found for native memory-report test.")
+
+    exe = tmp_path / "memory_report_native_test"
+    run_checked([
+        compiler,
+        "-std=c++17",
+        "-Wall",
+        "-Wextra",
+        "-I",
+        repo_root / "tests" / "native_stubs",
+        "-I",
+        repo_root / "src",
+        repo_root / "src" / "MemoryReport.cpp",
+        repo_root / "src" / "JsonWriter.cpp",
+        repo_root / "tests" / "memory_report_native_test.cpp",
+        "-o",
+        exe,
+    ])
+    result = run_checked([exe])
+    assert "memory-report native test passed" in result.stdout
@@ -0,0 +1,121 @@
+#include <cassert>
+#include <cstdint>
+#include <cstdio>
+#include <iostream>
+#include <string>
+
+#include "Arduino.h"
+#include "Config.h"
+#include "TraceLog.h"
+#include "esp_timer.h"
+
+uint32_t g_fakeMillis = 0;
+
+namespace {
+
+uint16_t seqOf(const std::string& bytes, size_t frameStart) {
+    return static_cast<uint16_t>(static_cast<uint8_t>(bytes[frameStart + 4]) |
+                                 (static_cast<uint8_t>(bytes[frameStart + 5]) << 8));
+}
+
+void testFrameLayout() {
+    TraceLog::Record r{};
+    r.tUs = 0x01020304;
+    r.seq = 0x0A0B;
+    r.id = static_cast<uint8_t>(TraceLog::Id::WavUnderrun);
+    r.argc = 2;
+    r.args[0] = 3;
+    r.args[1] = -1;
+    uint8_t frame[TraceLog::MAX_FRAME_BYTES];
+    size_t len = TraceLog::encodeFrame(r, frame);
+    assert(len == 19);
+    const uint8_t expectedHead[] = {0xA5, 0x5A, 8, 2, 0x0B, 0x0A, 0x04, 0x03, 0x02, 0x01,
+                                    3, 0, 0, 0, 0xFF, 0xFF, 0xFF, 0xFF};
+    for (size_t i = 0; i < sizeof(expectedHead); i++) {
+        assert(frame[i] == expectedHead[i]);
+    }
+}
+
+void testDrainWaitsForUartRoom() {
+    Serial.written.clear();
+    Serial.txRoom = 10;  // smaller than any frame
+    TraceLog::record(TraceLog::Id::BtDisconnected);
+    assert(TraceLog::drain(4) == 0);
+    assert(TraceLog::pending() == 1);
+    assert(Serial.written.empty());
+
+    Serial.txRoom = 128;
+    assert(TraceLog::drain(4) == 1);
+    assert(TraceLog::pending() == 0);
+    assert(Serial.written.size() == 11);
+}
+
+void testDrainIsBoundedPerCall() {
+    Serial.written.clear();
+    Serial.txRoom = 1 << 20;
+    for (int i = 0; i < 10; i++) TraceLog::record(TraceLog::Id::BtSampleRate, 44100);
+    assert(TraceLog::drain(TRACE_DRAIN_FRAMES_PER_LOOP) == static_cast<size_t>(TRACE_DRAIN_FRAMES_PER_LOOP));
+    assert(TraceLog::pending() == static_cast<size_t>(10 - TRACE_DRAIN_FRAMES_PER_LOOP));
+    TraceLog::flush();
+    assert(TraceLog::pending() == 0);
+    assert(Serial.written.size() == 10 * 15);
+}
+
+void testFullRingDropsNewestAndLeavesSeqGap() {
+    Serial.written.clear();
+    Serial.txRoom = 1 << 20;
+    uint32_t droppedBefore = TraceLog::droppedTotal();
+    for (int i = 0; i < TRACE_RING_RECORDS + 3; i++) {
+        TraceLog::record(TraceLog::Id::WavDecoderIdle, i);
+    }
+    assert(TraceLog::pending() == static_cast<size_t>(TRACE_RING_RECORDS));
+    assert(TraceLog::droppedTotal() == droppedBefore + 3);
+    TraceLog::flush();
+    TraceLog::record(TraceLog::Id::BtDisconnected);
+    TraceLog::flush();
+
+    const size_t idleFrame = 15;
+    size_t lastIdle = (TRACE_RING_RECORDS - 1) * idleFrame;
+    size_t after = TRACE_RING_RECORDS * idleFrame;
+    assert(Serial.written.size() == after + 11);
+    assert(static_cast<uint16_t>(seqOf(Serial.written, after) - seqOf(Serial.written, lastIdle)) == 4);
+}
+
+// Emits a short capture mixing text and frames for the Python decoder check.
+void printSampleCapture() {
+    Serial.written.clear();
+    Serial.txRoom = 1 << 20;
+    g_fakeTimerUs = 2500000;
+    TraceLog::record(TraceLog::Id::BtConnected, 61232, 31744);
+    TraceLog::record(TraceLog::Id::BtAudioState, static_cast<int32_t>(TraceLog::BtAudio::Started));
+    TraceLog::record(TraceLog::Id::VolumeCapped, 80, 45, 45,
+                     static_cast<int32_t>(TraceLog::VolumeReason::SongStart));
+    TraceLog::flush();
+    std::string capture = "[Boot] Ready.\r\n" + Serial.written;
+    Serial.written.clear();
+    g_fakeTimerUs = 9000000;
+    TraceLog::record(TraceLog::Id::WavStats, 8192, 2048, 1, 312);
+    TraceLog::record(TraceLog::Id::WavStatsTiming, 5300, 0, static_cast<int32_t>(SD_READAHEAD_RING_BYTES));
+    TraceLog::flush();
+    capture += "[WavPlayer] Gapless: /songs/a/b.wav\r\n" + Serial.written;
+
+    std::cout << "capture=";
+    for (unsigned char c : capture) {
+        char hex[3];
+        std::snprintf(hex, sizeof(hex), "%02x", c);
+        std::cout << hex;
+    }
+    std::cout << "\n";
+}
+
+}  // namespace
+
+int main() {
+    testFrameLayout();
+    testDrainWaitsForUartRoom();
+    testDrainIsBoundedPerCall();
+    testFullRingDropsNewestAndLeavesSeqGap();
+    printSampleCapture();
+    std::cout << "trace-log native test passed\n";
+    return 0;
+}
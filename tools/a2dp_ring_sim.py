@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+a2dp_ring_sim.py — size the A2DP ring offline instead of flash-listen-repeat.
+
+Replays packet arrivals through a model of the firmware's Bluetooth audio
+path and reports, for every combination of ring size, prefetch level and
+I2S write size in a sweep, how often playback would stutter and how much
+delay the ring adds:
+
+  write_audio()        a packet goes into the ring, or is dropped if it does
+                       not fit; after a failed send packets keep being dropped
+                       until the ring is back down to the prefetch level.
+  prefetch             the I2S task waits until the ring reaches the prefetch
+                       level, at stream start and again after an underflow.
+  i2s_task_handler()   takes up to --write-size bytes at a time from the ring
+                       and plays them at the DAC rate. If the ring stays empty
+                       for --i2s-ticks-ms the firmware counts an underflow and
+                       goes back to prefetching.
+
+Arrivals come from a serial log or a synthetic jitter model:
+
+  - `trace_decode.py --timestamps` output with `[BT] Rx rx=+NB` lines, which
+    the firmware records every BT_A2DP_RX_TRACE_MS while streaming, or any
+    log whose `[BT] Stats ... rx=NB` lines start with a timestamp
+    (seconds, or HH:MM:SS.mmm as printed by `pio device monitor -f time`).
+    The bytes received in each interval are spread evenly over it, so
+    jitter shorter than the log interval is smoothed out.
+  - `t_ms,bytes` CSV, one packet per line.
+  - --model steady|jittery: packets at the stream rate with Gaussian jitter,
+    optional periodic stalls whose backlog arrives in one burst, and a
+    phone clock running --slow-ppm behind the DAC.
+
+Reported per configuration: firmware underflows, dropped packets, audible
+gaps and their total length, and the mean and peak delay of the audio
+buffered in the ring. With numpy installed all configurations are stepped
+together as arrays, so a sweep of thousands runs in seconds; without it the
+same model runs one configuration at a time.
+
+Example
+-------
+  python tools/a2dp_ring_sim.py --model jittery --stall-ms 40
+  python tools/a2dp_ring_sim.py --log capture.txt --ring 8192:32768:4096 --prefetch 20:80:10
+  python tools/a2dp_ring_sim.py --model steady --csv sweep.csv --top 0
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import math
+import pathlib
+import random
+import re
+import sys
+import time
+from dataclasses import dataclass
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; the pure-Python engine is used instead
+    np = None
+
+# 44.1 kHz, 16-bit stereo: what the DAC takes out of the ring per ms.
+DEFAULT_RATE_BYTES_PER_MS = 44100 * 2 * 2 / 1000.0
+DEFAULT_PACKET_BYTES = 2048
+DEFAULT_I2S_TICKS_MS = 20.0
+
+PREFETCHING, PROCESSING, DROPPING = 0, 1, 2
+
+TIME_RE = re.compile(r"^\s*(?:(?P<hms>\d{1,2}:\d{2}:\d{2}(?:\.\d+)?)|(?P<sec>\d+(?:\.\d+)?))\s")
+RX_RE = re.compile(r"\[BT\] (?:Rx|Stats)\b.*?\brx=(?P<delta>\+)?(?P<bytes>\d+)B")
+
+
+@dataclass(frozen=True)
+class Config:
+    ring_bytes: int
+    prefetch_pct: int
+    write_size: int
+
+    @property
+    def prefetch_bytes(self) -> float:
+        return self.ring_bytes * self.prefetch_pct / 100.0
+
+
+@dataclass
+class Result:
+    config: Config
+    underflows: int = 0
+    drops: int = 0
+    gaps: int = 0
+    gap_ms: float = 0.0
+    mean_delay_ms: float = 0.0
+    max_delay_ms: float = 0.0
+
+
+# ---------------------------------------------------------------------------
+# Arrival traces
+# ---------------------------------------------------------------------------
+def parse_timestamp(line: str) -> float | None:
+    """Leading timestamp of a log line in ms, or None."""
+    match = TIME_RE.match(line)
+    if not match:
+        return None
+    if match.group("sec"):
+        return float(match.group("sec")) * 1000.0
+    hours, minutes, seconds = match.group("hms").split(":")
+    return ((int(hours) * 60 + int(minutes)) * 60 + float(seconds)) * 1000.0
+
+
+def arrivals_from_log(lines: list[str], packet_bytes: int) -> list[tuple[float, int]]:
+    """Packets spread evenly over each interval between timestamped rx= lines."""
+    arrivals: list[tuple[float, int]] = []
+    last_t: float | None = None
+    last_rx: int | None = None
+    for line in lines:
+        match = RX_RE.search(line)
+        t = parse_timestamp(line)
+        if not match or t is None:
+            continue
+        value = int(match.group("bytes"))
+        if match.group("delta"):
+            delta = value
+        elif last_rx is None or value < last_rx:
+            delta = None  # first cumulative reading, or the device rebooted
+        else:
+            delta = value - last_rx
+        if not match.group("delta"):
+            last_rx = value
+        if delta and last_t is not None and t > last_t:
+            count = max(1, round(delta / packet_bytes))
+            step = (t - last_t) / count
+            size = delta // count
+            for i in range(count):
+                arrivals.append((last_t + step * (i + 1), size + (delta % count if i == count - 1 else 0)))
+        last_t = t
+    return arrivals
+
+
+def arrivals_from_csv(lines: list[str]) -> list[tuple[float, int]]:
+    arrivals = []
+    for row in csv.reader(lines):
+        if not row or row[0].strip().startswith("#"):
+            continue
+        try:
+            arrivals.append((float(row[0]), int(row[1])))
+        except (ValueError, IndexError):
+            continue  # header or a garbled line
+    arrivals.sort()
+    return arrivals
+
+
+def synthetic_arrivals(model: str, duration_s: float, packet_bytes: int, rate: float,
+                       jitter_ms: float, stall_every_ms: float, stall_ms: float,
+                       slow_ppm: float, seed: int) -> list[tuple[float, int]]:
+    """Packets at the stream rate; the jittery model adds stalls with a burst."""
+    rng = random.Random(seed)
+    period = packet_bytes / rate * (1.0 + slow_ppm / 1e6)
+    end = duration_s * 1000.0
+    arrivals = []
+    stall_until = -1.0
+    next_stall = stall_every_ms if model == "jittery" and stall_every_ms > 0 else math.inf
+    i = 0
+    while True:
+        due = i * period
+        if due >= end:
+            break
+        if due >= next_stall:
+            stall_until = due + rng.uniform(stall_ms / 2, stall_ms)
+            next_stall += stall_every_ms * rng.uniform(0.5, 1.5)
+        t = max(due + abs(rng.gauss(0.0, jitter_ms)), stall_until)
+        arrivals.append((t, packet_bytes))
+        i += 1
+    arrivals.sort()
+    return arrivals
+
+
+# ---------------------------------------------------------------------------
+# Pure-Python engine: one configuration at a time
+# ---------------------------------------------------------------------------
+def simulate(arrivals: list[tuple[float, int]], config: Config,
+             rate: float = DEFAULT_RATE_BYTES_PER_MS,
+             i2s_ticks_ms: float = DEFAULT_I2S_TICKS_MS) -> Result:
+    result = Result(config)
+    threshold = config.prefetch_bytes
+    fill = 0.0   # bytes in the ring
+    held = 0.0   # bytes the I2S task has taken but not yet played
+    mode = PREFETCHING
+    draining = False  # the I2S task is past its prefetch wait
+    started = False
+    area = 0.0
+    peak = 0.0
+    last_t = arrivals[0][0] if arrivals else 0.0
+
+    for t, size in arrivals:
+        dt = t - last_t
+        last_t = t
+        buffered = fill + held
+        if draining:
+            need = rate * dt
+            if buffered >= need:
+                area += (buffered - need / 2) * dt
+                short = need - held
+                if short <= 0:
+                    held -= need
+                else:
+                    pulled = min(math.ceil(short / config.write_size) * config.write_size, fill)
+                    fill -= pulled
+                    held += pulled - need
+            else:
+                dry_ms = buffered / rate
+                area += buffered / 2 * dry_ms
+                result.gaps += 1
+                result.gap_ms += dt - dry_ms
+                fill = held = 0.0
+                if dt - dry_ms > i2s_ticks_ms and mode != PREFETCHING:
+                    result.underflows += 1
+                    mode = PREFETCHING
+                    draining = False
+        else:
+            area += buffered * dt
+            if started:
+                result.gap_ms += dt
+
+        if mode == DROPPING:
+            result.drops += 1
+            if fill <= threshold:
+                mode = PROCESSING
+            continue
+        if fill + size > config.ring_bytes:
+            result.drops += 1
+            mode = DROPPING
+        else:
+            fill += size
+            peak = max(peak, fill + held)
+        if mode == PREFETCHING and fill >= threshold:
+            mode = PROCESSING
+            draining = True
+            started = True
+
+    span = arrivals[-1][0] - arrivals[0][0] if arrivals else 0.0
+    if not started:  # the ring never reached the prefetch level: silence throughout
+        result.gaps = 1
+        result.gap_ms = span
+    result.mean_delay_ms = area / span / rate if span > 0 else 0.0
+    result.max_delay_ms = peak / rate
+    return result
+
+
+def simulate_python(arrivals: list[tuple[float, int]], configs: list[Config],
+                    rate: float, i2s_ticks_ms: float) -> list[Result]:
+    return [simulate(arrivals, config, rate, i2s_ticks_ms) for config in configs]
+
+
+# ---------------------------------------------------------------------------
+# numpy engine: every configuration stepped together, one packet at a time
+# ---------------------------------------------------------------------------
+def simulate_numpy(arrivals: list[tuple[float, int]], configs: list[Config],
+                   rate: float, i2s_ticks_ms: float) -> list[Result]:
+    n = len(configs)
+    ring = np.array([c.ring_bytes for c in configs], dtype=float)
+    threshold = np.array([c.prefetch_bytes for c in configs], dtype=float)
+    write_size = np.array([c.write_size for c in configs], dtype=float)
+    fill = np.zeros(n)
+    held = np.zeros(n)
+    mode = np.full(n, PREFETCHING)
+    draining = np.zeros(n, dtype=bool)
+    started = np.zeros(n, dtype=bool)
+    area = np.zeros(n)
+    peak = np.zeros(n)
+    underflows = np.zeros(n, dtype=np.int64)
+    drops = np.zeros(n, dtype=np.int64)
+    gaps = np.zeros(n, dtype=np.int64)
+    gap_ms = np.zeros(n)
+    last_t = arrivals[0][0] if arrivals else 0.0
+
+    for t, size in arrivals:
+        dt = t - last_t
+        last_t = t
+        buffered = fill + held
+        need = rate * dt
+
+        enough = draining & (buffered >= need)
+        dry = draining & ~enough
+        waiting = ~draining
+
+        short = need - held
+        pulled = np.minimum(np.ceil(np.maximum(short, 0.0) / write_size) * write_size, fill)
+        area += np.where(enough, (buffered - need / 2) * dt, 0.0)
+        fill = np.where(enough, fill - pulled, fill)
+        held = np.where(enough, held + pulled - need, held)
+
+        dry_ms = buffered / rate
+        area += np.where(dry, buffered / 2 * dry_ms, 0.0)
+        gaps += dry
+        gap_ms += np.where(dry, dt - dry_ms, 0.0)
+        fill = np.where(dry, 0.0, fill)
+        held = np.where(dry, 0.0, held)
+        underflow = dry & (dt - dry_ms > i2s_ticks_ms) & (mode != PREFETCHING)
+        underflows += underflow
+        mode = np.where(underflow, PREFETCHING, mode)
+        draining &= ~underflow
+
+        area += np.where(waiting, buffered * dt, 0.0)
+        gap_ms += np.where(waiting & started, dt, 0.0)
+
+        dropping = mode == DROPPING
+        drops += dropping
+        mode = np.where(dropping & (fill <= threshold), PROCESSING, mode)
+        overflow = ~dropping & (fill + size > ring)
+        drops += overflow
+        mode = np.where(overflow, DROPPING, mode)
+        accepted = ~dropping & ~overflow
+        fill = np.where(accepted, fill + size, fill)
+        peak = np.where(accepted, np.maximum(peak, fill + held), peak)
+        start = accepted & (mode == PREFETCHING) & (fill >= threshold)
+        mode = np.where(start, PROCESSING, mode)
+        draining |= start
+        started |= start
+
+    span = arrivals[-1][0] - arrivals[0][0] if arrivals else 0.0
+    gaps = np.where(started, gaps, 1)
+    gap_ms = np.where(started, gap_ms, span)
+    results = []
+    for i, config in enumerate(configs):
+        results.append(Result(
+            config,
+            underflows=int(underflows[i]),
+            drops=int(drops[i]),
+            gaps=int(gaps[i]),
+            gap_ms=float(gap_ms[i]),
+            mean_delay_ms=float(area[i] / span / rate) if span > 0 else 0.0,
+            max_delay_ms=float(peak[i] / rate),
+        ))
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Sweep and report
+# ---------------------------------------------------------------------------
+def parse_range(text: str) -> list[int]:
+    """"8192", "4096,8192" or "start:stop:step" (stop included)."""
+    values: list[int] = []
+    for part in text.split(","):
+        if ":" in part:
+            start, stop, step = (int(v) for v in part.split(":"))
+            if step <= 0:
+                raise ValueError(f"step must be positive: {part}")
+            values.extend(range(start, stop + 1, step))
+        elif part.strip():
+            values.append(int(part))
+    return values
+
+
+def build_configs(rings: list[int], prefetches: list[int], write_sizes: list[int]) -> list[Config]:
+    return [Config(ring, pct, size)
+            for ring, pct, size in itertools.product(rings, prefetches, write_sizes)
+            if 0 < pct <= 100 and ring > 0 and size > 0]
+
+
+def rank(results: list[Result]) -> list[Result]:
+    """Fewest gaps, then the least silence and drops, then the least delay and RAM."""
+    return sorted(results, key=lambda r: (r.gaps, round(r.gap_ms), r.drops, round(r.mean_delay_ms, 1),
+                                          r.config.ring_bytes))
+
+
+def format_table(results: list[Result]) -> list[str]:
+    lines = [f"  {'ring':>7}{'prefetch':>10}{'write':>7}{'underflows':>12}{'drops':>7}"
+             f"{'gaps':>6}{'gap ms':>9}{'mean ms':>9}{'max ms':>8}"]
+    for r in results:
+        c = r.config
+        lines.append(f"  {c.ring_bytes:>7}{c.prefetch_pct:>9}%{c.write_size:>7}{r.underflows:>12}{r.drops:>7}"
+                     f"{r.gaps:>6}{r.gap_ms:>9.1f}{r.mean_delay_ms:>9.1f}{r.max_delay_ms:>8.1f}")
+    return lines
+
+
+def write_csv(path: pathlib.Path, results: list[Result]) -> None:
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["ring_bytes", "prefetch_pct", "write_size", "underflows", "drops",
+                         "gaps", "gap_ms", "mean_delay_ms", "max_delay_ms"])
+        for r in results:
+            c = r.config
+            writer.writerow([c.ring_bytes, c.prefetch_pct, c.write_size, r.underflows, r.drops,
+                             r.gaps, f"{r.gap_ms:.1f}", f"{r.mean_delay_ms:.2f}", f"{r.max_delay_ms:.2f}"])
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Simulate the A2DP ring for a sweep of sizes and levels")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--log", type=pathlib.Path, help="Serial log with timestamped rx= lines")
+    source.add_argument("--trace", type=pathlib.Path, help="CSV of t_ms,bytes packet arrivals")
+    source.add_argument("--model", choices=("steady", "jittery"), default="jittery",
+                        help="Synthetic arrivals when no log or trace is given (default: jittery)")
+    parser.add_argument("--duration-s", type=float, default=60.0, help="Synthetic trace length")
+    parser.add_argument("--packet-bytes", type=int, default=DEFAULT_PACKET_BYTES)
+    parser.add_argument("--jitter-ms", type=float, default=3.0, help="Gaussian arrival jitter (sigma)")
+    parser.add_argument("--stall-every-ms", type=float, default=3000.0, help="Mean time between stalls")
+    parser.add_argument("--stall-ms", type=float, default=40.0, help="Longest stall")
+    parser.add_argument("--slow-ppm", type=float, default=100.0, help="Phone clock behind the DAC")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--ring", default="4096:32768:2048", help="Ring sizes in bytes")
+    parser.add_argument("--prefetch", default="10:90:5", help="Prefetch levels in percent")
+    parser.add_argument("--write-size", default="512,1024,2048,4096", help="i2s_write_size_upto values")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE_BYTES_PER_MS, help="DAC bytes per ms")
+    parser.add_argument("--i2s-ticks-ms", type=float, default=DEFAULT_I2S_TICKS_MS,
+                        help="How long the I2S task waits on an empty ring before an underflow")
+    parser.add_argument("--engine", choices=("auto", "numpy", "python"), default="auto")
+    parser.add_argument("--top", type=int, default=15, help="Rows to print (0: none)")
+    parser.add_argument("--csv", type=pathlib.Path, help="Write every configuration's result here")
+    args = parser.parse_args(argv)
+
+    if args.log:
+        arrivals = arrivals_from_log(args.log.read_text(encoding="utf-8", errors="replace").splitlines(),
+                                     args.packet_bytes)
+        source_name = str(args.log)
+    elif args.trace:
+        arrivals = arrivals_from_csv(args.trace.read_text(encoding="utf-8").splitlines())
+        source_name = str(args.trace)
+    else:
+        arrivals = synthetic_arrivals(args.model, args.duration_s, args.packet_bytes, args.rate,
+                                      args.jitter_ms, args.stall_every_ms, args.stall_ms,
+                                      args.slow_ppm, args.seed)
+        source_name = f"{args.model} model"
+    if len(arrivals) < 2:
+        print(f"No packet arrivals found in {source_name}.", file=sys.stderr)
+        return 1
+
+    try:
+        configs = build_configs(parse_range(args.ring), parse_range(args.prefetch),
+                                parse_range(args.write_size))
+    except ValueError as exc:
+        parser.error(str(exc))
+    if not configs:
+        parser.error("the sweep is empty")
+
+    engine = args.engine
+    if engine == "auto":
+        engine = "numpy" if np is not None else "python"
+    if engine == "numpy" and np is None:
+        parser.error("--engine numpy needs numpy installed")
+
+    started = time.perf_counter()
+    run = simulate_numpy if engine == "numpy" else simulate_python
+    results = run(arrivals, configs, args.rate, args.i2s_ticks_ms)
+    elapsed = time.perf_counter() - started
+
+    span_s = (arrivals[-1][0] - arrivals[0][0]) / 1000.0
+    print(f"{source_name}: {len(arrivals)} packets over {span_s:.1f}s; "
+          f"{len(configs)} configurations in {elapsed:.2f}s ({engine})")
+    if args.top:
+        for line in format_table(rank(results)[:args.top]):
+            print(line)
+    if args.csv:
+        write_csv(args.csv, results)
+        print(f"Wrote {len(results)} rows to {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -157,8 +157,10 @@ async def run_config_api_suite(
         await request("setBedtimeMode", active=False)
 
     themes: list[dict[str, Any]] = []
+    catalog_ready = True
     for page in range(40):
         response = await request("scanThemes", page=page)
+        catalog_ready = response.get("catalogReady", True) is not False
         page_themes = response.get("themes", [])
         if not isinstance(page_themes, list):
             raise RuntimeError("scanThemes returned non-list themes")
@@ -169,6 +171,8 @@ async def run_config_api_suite(
         raise RuntimeError("scanThemes did not finish within 40 pages")
 
     print(f"\nThemes discovered: {len(themes)}")
+    if not catalog_ready:
+        print("  (firmware is still reading the SD card; results are partial)")
     for item in themes:
         print(
             f"  {item.get('id')} enabled={item.get('enabled')} "
@@ -364,6 +368,7 @@ async def run_config_round_trip_suite(
         assert_config_matches("setConfig response", updated, probe_config)
         verified = await request("getConfig")
         assert_config_matches("post-write getConfig", verified, probe_config)
+        await run_patch_config_checks(request, verified, original_config)
     finally:
         restored = await request("setConfig", **original_config)
         assert_config_matches("restore response", restored, original_config)
@@ -374,6 +379,150 @@ async def run_config_round_trip_suite(
     return 0
 
 
+async def run_patch_config_checks(
+    request: Any,
+    current: dict[str, Any],
+    original_config: dict[str, Any],
+) -> None:
+    # A one-field patch must change only that field and bump configVersion;
+    # resending it must be a no-op that leaves the version alone.
+    expected = writable_config_from_response(current)
+    version = int(current.get("configVersion") or 0)
+
+    volume = original_config["defaultVolumePct"]
+    expected["defaultVolumePct"] = volume
+    patched = await request("patchConfig", patch={"defaultVolumePct": volume})
+    assert_config_matches("patchConfig response", patched, expected)
+    patched_version = int(patched.get("configVersion") or 0)
+    if patched_version <= version:
+        raise RuntimeError(f"patchConfig did not bump configVersion ({version} -> {patched_version})")
+
+    repeated = await request("patchConfig", patch={"defaultVolumePct": volume})
+    assert_config_matches("repeated patchConfig response", repeated, expected)
+    if int(repeated.get("configVersion") or 0) != patched_version:
+        raise RuntimeError("unchanged patchConfig bumped configVersion")
+
+    cap = original_config["bedtime"]["volumeCapPct"]
+    expected["bedtime"]["volumeCapPct"] = cap
+    nested = await request("patchConfig", patch={"bedtime": {"volumeCapPct": cap}})
+    assert_config_matches("nested patchConfig response", nested, expected)
+    verified = await request("getConfig")
+    assert_config_matches("post-patch getConfig", verified, expected)
+    print("patchConfig changed only the patched fields and skipped the no-op write.")
+
+
+def bucket_label(upper_us: int | None) -> str:
+    if upper_us is None:
+        return "more"
+    return f"<{upper_us / 1000:g}ms" if upper_us >= 1000 else f"<{upper_us}us"
+
+
+def histogram_percentile(bounds: list[int], counts: list[int], pct: float) -> str:
+    """Upper bound of the bucket holding the pct-th sample."""
+    total = sum(counts)
+    if total == 0:
+        return "-"
+    target = total * pct / 100.0
+    seen = 0
+    for i, count in enumerate(counts):
+        seen += count
+        if seen >= target:
+            return bucket_label(bounds[i] if i < len(bounds) else None)
+    return bucket_label(None)
+
+
+def render_perf(pages: list[dict[str, Any]]) -> list[str]:
+    lines = []
+    for page in pages:
+        if page.get("metric") == "boot":
+            phases = page.get("phasesUs") or {}
+            parts = " ".join(f"{name}={us / 1000:.1f}" for name, us in phases.items())
+            lines.append(f"boot (ms): {parts} total={page.get('totalUs', 0) / 1000:.1f}")
+            continue
+        bounds = list(page.get("bucketsUs") or [])
+        counts = list(page.get("h") or [])
+        lines.append(
+            f"{page['metric']}: n={page['n']} mean={page['meanUs']}us max={page['maxUs']}us "
+            f"p50 {histogram_percentile(bounds, counts, 50)} p99 {histogram_percentile(bounds, counts, 99)} "
+            f"(last {page['sinceMs'] / 1000:.0f}s)"
+        )
+        peak = max(counts) if counts else 0
+        for i, count in enumerate(counts):
+            if count == 0:
+                continue
+            bar = "#" * max(1, round(40 * count / peak))
+            lines.append(f"  {bucket_label(bounds[i] if i < len(bounds) else None):>8} {count:>9} {bar}")
+    return lines
+
+
+def render_a2dp(stats: dict[str, Any]) -> str:
+    mode = "adaptive" if stats.get("adaptive") else "fixed"
+    link = "streaming" if stats.get("streaming") else "connected" if stats.get("connected") else "not connected"
+    return (
+        f"a2dp ({link}): prefetch {stats['prefetchPct']}% = {stats['prefetchBytes']}B of {stats['ringBytes']}B "
+        f"({mode} {stats['minPct']}-{stats['maxPct']}%, raised {stats['raises']}x lowered {stats['lowers']}x) "
+        f"underflows={stats['underflows']} drops={stats['drops']} "
+        f"last window underflows={stats['windowUnderflows']} drops={stats['windowDrops']}"
+    )
+
+
+def render_memory(pages: list[dict[str, Any]]) -> list[str]:
+    """getMemory pages as the firmware's [Mem] serial lines, for tools/memory_report.py."""
+    lines = []
+    for page in pages:
+        for heap in page.get("heaps") or []:
+            lines.append(f"[Mem] v=1 heap={heap['name']} free={heap['free']} "
+                         f"largest={heap['largest']} min={heap['min']}")
+        if "blocks" in page:
+            parts = " ".join(f"{block['name']}={block['bytes']}" for block in page["blocks"])
+            lines.append(f"[Mem] v=1 catalog {parts} total={page['blockTotal']}")
+        for task in page.get("tasks") or []:
+            lines.append(f"[Mem] v=1 task={task['name']} stack={task['stack']} free={task['free']}")
+    return lines
+
+
+async def run_memory_report(
+    client: BleakClient,
+    command_uuid: str,
+    response_uuid: str,
+    timeout: float,
+) -> None:
+    pages = []
+    page = 0
+    while True:
+        response = await config_request(
+            client, {"id": 200 + page, "op": "getMemory", "page": page},
+            command_uuid, response_uuid, timeout)
+        pages.append(response)
+        if not response.get("hasMore"):
+            break
+        page += 1
+    print("\n".join(render_memory(pages)))
+
+
+async def run_perf_report(
+    client: BleakClient,
+    command_uuid: str,
+    response_uuid: str,
+    timeout: float,
+    reset: bool,
+) -> None:
+    pages = []
+    page = 0
+    while True:
+        response = await config_request(
+            client, {"id": 100 + page, "op": "getPerf", "page": page},
+            command_uuid, response_uuid, timeout)
+        pages.append(response)
+        if not response.get("hasMore"):
+            break
+        page += 1
+    print("\n".join(render_perf(pages)))
+    if reset:
+        await config_request(client, {"id": 99, "op": "resetPerf"}, command_uuid, response_uuid, timeout)
+        print("Perf histograms reset.")
+
+
 async def run_bedtime_activation_test(
     client: BleakClient,
     command_uuid: str,
@@ -485,6 +634,8 @@ async def main() -> int:
     parser.add_argument("--config-api-test", action="store_true", help="Run app-style config API checks")
     parser.add_argument("--config-round-trip-test", action="store_true",
                         help="Write, verify, and restore all config fields through BLE")
+    parser.add_argument("--patch", metavar="JSON",
+                        help="Send a patchConfig merge patch, e.g. '{\"defaultVolumePct\":40}'")
     parser.add_argument("--control-smoke-test", action="store_true",
                         help="Read/write basic BLE control characteristics without starting playback")
     parser.add_argument("--reconnect-test", action="store_true",
@@ -493,9 +644,20 @@ async def main() -> int:
                         help="Hold the BLE connection open for N extra seconds after tests complete (useful as a background process for concurrent tests)")
     parser.add_argument("--theme", help="Theme id to use for scanSongs in --config-api-test")
     parser.add_argument("--legacy", action="store_true", help="Force legacy command/themes transport")
+    parser.add_argument("--perf", action="store_true",
+                        help="Fetch and print the firmware latency histograms and boot phases (getPerf)")
+    parser.add_argument("--perf-reset", action="store_true",
+                        help="Clear the latency histograms (after printing them with --perf)")
+    parser.add_argument("--a2dp", action="store_true",
+                        help="Fetch and print the adaptive A2DP prefetch level and its counters (getA2dp)")
+    parser.add_argument("--memory", action="store_true",
+                        help="Fetch task stack high-water marks and heap headroom (getMemory) as [Mem] lines")
     parser.add_argument("--bedtime-activation-test", action="store_true",
                         help="Verify bedtime activates/deactivates by syncing time inside/outside the configured window")
     args = parser.parse_args()
+    patch = json.loads(args.patch) if args.patch else None
+    if patch is not None and not isinstance(patch, dict):
+        parser.error("--patch must be a JSON object")
 
     service_uuid = args.service.lower()
 
@@ -543,7 +705,7 @@ async def main() -> int:
         transport = "direct config characteristics" if use_direct else "legacy command/themes fallback"
         print(f"Config transport: {transport}")
 
-        if args.config_get or args.config_api_test or args.config_round_trip_test or args.control_smoke_test or args.bedtime_activation_test:
+        if args.config_get or args.config_api_test or args.config_round_trip_test or args.control_smoke_test or args.bedtime_activation_test or patch is not None or args.perf or args.perf_reset or args.a2dp or args.memory:
             try:
                 if args.control_smoke_test:
                     await run_ble_control_smoke(client)
@@ -555,12 +717,32 @@ async def main() -> int:
                 if args.config_api_test:
                     await run_config_api_suite(
                         client, command_uuid, response_uuid, args.timeout, args.theme, start_id=10)
+                if patch is not None:
+                    patched = await config_request(
+                        client, {"id": 2, "op": "patchConfig", "patch": patch},
+                        command_uuid, response_uuid, args.timeout)
+                    print(f"patchConfig applied; configVersion "
+                          f"{response.get('configVersion')} -> {patched.get('configVersion')}")
+                    print(json.dumps(writable_config_from_response(patched), indent=2, sort_keys=True))
                 if args.config_round_trip_test:
                     await run_config_round_trip_suite(
                         client, command_uuid, response_uuid, args.timeout)
                 if args.bedtime_activation_test:
                     await run_bedtime_activation_test(
                         client, command_uuid, response_uuid, args.timeout)
+                if args.perf:
+                    await run_perf_report(
+                        client, command_uuid, response_uuid, args.timeout, args.perf_reset)
+                elif args.perf_reset:
+                    await config_request(
+                        client, {"id": 99, "op": "resetPerf"}, command_uuid, response_uuid, args.timeout)
+                    print("Perf histograms reset.")
+                if args.a2dp:
+                    stats = await config_request(
+                        client, {"id": 98, "op": "getA2dp"}, command_uuid, response_uuid, args.timeout)
+                    print(render_a2dp(stats))
+                if args.memory:
+                    await run_memory_report(client, command_uuid, response_uuid, args.timeout)
             except Exception as exc:
                 print(f"Config probe failed: {type(exc).__name__}: {exc}")
                 return 3
@@ -29,6 +29,7 @@ Example
   python tools/bt_stress_test.py --iterations 20 --sequence ble-first
   python tools/bt_stress_test.py --iterations 10 --sequence both \\
       --bt-address 40-22-d8-3d-8a-22 --device-name SweetYaar
+  python tools/bt_stress_test.py --iterations 50 --log logs/stress.log
 """
 
 from __future__ import annotations
@@ -46,6 +47,9 @@ from dataclasses import dataclass, field
 from enum import Enum
 from typing import Optional
 
+from log_archive import RotatingLog, timestamp
+from trace_decode import TraceDecoder
+
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 BLE_PROBE = ROOT / "tools" / "ble_gatt_probe.py"
 
@@ -60,6 +64,7 @@ _RE_BT_DISC      = re.compile(r"\[BT\] Disconnected")
 _RE_GRACEFUL     = re.compile(r"Restarting cleanly")
 _RE_HEAP         = re.compile(r"free=(\d+)")
 _RE_AUDIO_STARTED = re.compile(r"\[BT\] Audio state: STARTED")
+_RE_NOTIFY_STATS = re.compile(r"\[BLE\] Notifies sent=(\d+) suppressed=(\d+)")
 
 
 # ---------------------------------------------------------------------------
@@ -100,6 +105,8 @@ class IterResult:
     crash_detail: str = ""
     reboot_seen: bool = False  # reboot detected during/after outcome
     audio_streamed: bool = False  # audio was routed and played during BT hold
+    notifies_sent: Optional[int] = None        # BLE status notifies this boot
+    notifies_suppressed: Optional[int] = None  # ...skipped as duplicate/superseded
 
 
 # ---------------------------------------------------------------------------
@@ -148,16 +155,28 @@ class SerialMonitor:
         self._ser.dtr = False
 
     def _loop(self) -> None:
+        decoder = TraceDecoder()
         while not self._stop.is_set():
             try:
-                raw = self._ser.readline()
+                raw = self._ser.read(self._ser.in_waiting or 1)
             except Exception:
                 break
             if not raw:
                 continue
-            line = raw.decode("utf-8", errors="replace").rstrip()
+            now = time.monotonic()
             with self._lock:
-                self._lines.append((time.monotonic(), line))
+                for line in decoder.feed(raw):
+                    self._lines.append((now, line.rstrip()))
+
+    def save(self, path: pathlib.Path) -> None:
+        """Write every line read so far, timestamped, for tools/crash_report.py
+        and tools/log_archive.py."""
+        with self._lock:
+            lines = list(self._lines)
+        wall_offset = time.time() - time.monotonic()
+        with RotatingLog(path) as out:
+            for ts, line in lines:
+                out.write(f"{timestamp(ts + wall_offset)} {line}")
 
     def since(self, ts: float) -> list[tuple[float, str]]:
         with self._lock:
@@ -203,6 +222,19 @@ class SerialMonitor:
                 vals.append(int(m.group(1)))
         return min(vals) if vals else None
 
+    def notify_stats_since(self, ts: float) -> Optional[tuple[int, int]]:
+        """Last (sent, suppressed) notify counters printed after ts.
+
+        The firmware prints running totals since boot on each BLE disconnect
+        and before a low-heap restart, so the last line covers the boot.
+        """
+        stats = None
+        for _, line in self.since(ts):
+            m = _RE_NOTIFY_STATS.search(line)
+            if m:
+                stats = (int(m.group(1)), int(m.group(2)))
+        return stats
+
     def heap_at_first_match(self, pattern: re.Pattern, ts: float) -> Optional[int]:
         """Return the free= value on the first line matching pattern after ts."""
         for _, line in self.since(ts):
@@ -702,6 +734,7 @@ def print_summary(results: list[IterResult], use_color: bool) -> None:
     ble_conn     = sum(1 for r in results if r.ble_connected)
     audio_str_ct = sum(1 for r in results if r.audio_streamed)
 
+    notify_runs = [r for r in results if r.notifies_sent is not None]
     heap_at_bt = [r.heap_at_bt_connect for r in results if r.heap_at_bt_connect]
     min_heaps  = [r.min_heap for r in results if r.min_heap]
 
@@ -732,6 +765,13 @@ def print_summary(results: list[IterResult], use_color: bool) -> None:
     if min_heaps:
         print(f"  Min heap seen:       avg={sum(min_heaps)//len(min_heaps):,}  "
               f"min={min(min_heaps):,}  max={max(min_heaps):,} bytes")
+    if notify_runs:
+        sent = sum(r.notifies_sent or 0 for r in notify_runs)
+        suppressed = sum(r.notifies_suppressed or 0 for r in notify_runs)
+        requested = sent + suppressed
+        print(f"  BLE notifies:        sent={sent:,}  suppressed={suppressed:,}"
+              f"  ({100 * suppressed // requested if requested else 0}% of updates)"
+              f"  over {len(notify_runs)} iteration(s)")
     print(f"  Avg iteration time:  {sum(r.duration_s for r in results)/total:.1f}s")
     print(f"{'='*60}\n")
 
@@ -790,7 +830,12 @@ def main() -> int:
                         help="Disable ANSI colour output")
     parser.add_argument("--quiet", "-q", action="store_true",
                         help="Suppress per-step progress (show only result lines)")
+    parser.add_argument("--log", type=pathlib.Path,
+                        help="Save the serial output to this .log file (for tools/crash_report.py "
+                             "and tools/log_archive.py)")
     args = parser.parse_args()
+    if args.log and args.log.suffix != ".log":
+        parser.error("--log must name a .log file")
 
     use_color  = not args.no_color and sys.stdout.isatty()
     verbose    = not args.quiet
@@ -835,6 +880,7 @@ def main() -> int:
             else:
                 seq = args.sequence
 
+            iter_start = time.monotonic()
             print_iter_header(i, args.iterations, seq, use_color)
             if verbose:
                 print()  # newline so step progress appears below header
@@ -846,6 +892,9 @@ def main() -> int:
                 res = run_bt_first(i, mon, args.bt_address, args.device_name,
                                    args.bt_hold_seconds, verbose, play_audio)
 
+            notify_stats = mon.notify_stats_since(iter_start)
+            if notify_stats:
+                res.notifies_sent, res.notifies_suppressed = notify_stats
             results.append(res)
 
             if not verbose:
@@ -882,12 +931,16 @@ def main() -> int:
         print("\n[interrupted]")
     finally:
         mon.stop()
+        if args.log:
+            mon.save(args.log)
 
     print_summary(results, use_color)
     crash_count = sum(
         1 for r in results
         if r.outcome in (Outcome.CRASH_AT_BT_CONNECT, Outcome.CRASH_OTHER)
     )
+    if crash_count and args.log:
+        print(f"Backtraces: python tools/crash_report.py {args.log}")
     return 1 if crash_count > 0 else 0
 
 
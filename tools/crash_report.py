@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+crash_report.py — symbolized crash signatures from SweetYaar serial logs.
+
+Finds every panic in any number of serial logs (a Guru Meditation, an abort,
+a failed assert, ESP_ERROR_CHECK or a task stack overflow) together with the
+backtrace the panic handler prints. A `.log` capture is read together with the
+`.NNN.log.gz` parts tools/log_archive.py rotated out of it:
+
+  assert failed: host_recv_pkt_cb hci_hal_h4.c:297 (...)
+  Backtrace: 0x40083b6d:0x3ffd2b40 0x4008c5a9:0x3ffd2b60 ... |<-CORRUPTED
+  ELF file SHA256: 8b6ad8b1f4c2e7a0
+
+and turns the addresses into functions and source lines with addr2line run
+against the firmware.elf the crash came from. The `ELF file SHA256` line picks
+that ELF out of the --elf files. With a single --elf, that ELF is also used for
+crashes without the line, and for crashes showing the all-zero hash of a build
+that does not embed it. Each ELF is symbolized with one addr2line call for all
+of its addresses, and the results are cached by the ELF's build id (its SHA256
+when it has no GNU build-id note), so later runs over the same build start no
+addr2line at all.
+
+Crashes are then grouped by reason and their top --frames functions, skipping
+the panic handler's own frames, so a few hundred stress-run crashes fold into
+a handful of signatures with counts, the builds they were seen on, and the
+first log line of each.
+
+Example
+-------
+  python tools/crash_report.py logs/stress-*.log
+  python tools/crash_report.py logs/*.log --elf builds/*/firmware.elf --frames 5
+  python tools/crash_report.py logs/*.log --list --json crashes.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import pathlib
+import re
+import shutil
+import struct
+import subprocess
+import sys
+from dataclasses import dataclass, field
+
+from log_archive import SEGMENT_RE, open_text, segments
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+DEFAULT_ELF = ROOT / ".pio" / "build" / "sweetyaar" / "firmware.elf"
+ADDR2LINE = "xtensa-esp32-elf-addr2line"
+PIO_TOOLCHAINS = pathlib.Path.home() / ".platformio" / "packages"
+
+REASON_PATTERNS = [
+    (re.compile(r"Guru Meditation Error: Core\s+\d+ panic'ed \(([^)]+)\)"), "{0}"),
+    (re.compile(r"assert failed: (\S+) (\S+:\d+)"), "assert {0} {1}"),
+    (re.compile(r'assertion "[^"]*" failed: file "(?:[^"]*/)?([^"/]+)", line (\d+)'), "assert {0}:{1}"),
+    (re.compile(r"ESP_ERROR_CHECK failed: esp_err_t 0x[0-9a-fA-F]+ \((\w+)\)"), "ESP_ERROR_CHECK {0}"),
+    (re.compile(r"A stack overflow in task (\S+) has been detected"), "stack overflow in {0}"),
+    (re.compile(r"abort\(\) was called at PC"), "abort()"),
+]
+DEBUG_REASON_RE = re.compile(r"Debug exception reason: (.*\S)")
+BACKTRACE_RE = re.compile(r"Backtrace:\s*((?:0x[0-9a-fA-F]+:0x[0-9a-fA-F]+\s*)+)(\|<-CORRUPTED)?")
+ELF_SHA_RE = re.compile(r"ELF file SHA256:\s*([0-9a-fA-F]+)")
+REBOOT_RE = re.compile(r"Rebooting\.\.\.|=== SweetYaar Boot ===|\brst:0x")
+ADDR_LINE_RE = re.compile(r"^(0x[0-9a-fA-F]+): (.*)$")
+
+# Frames of the panic path itself: the same in every crash, so they would make
+# every signature alike.
+PANIC_FRAMES = {
+    "panic_abort", "esp_system_abort", "abort", "__assert_func", "__assert",
+    "esp_panic_handler", "panic_handler", "xt_unhandled_exception", "invoke_abort",
+    "_esp_error_check_failed", "esp_vApplicationTickHook", "vApplicationStackOverflowHook",
+    "vTaskSwitchContext", "_frxt_dispatch", "_xt_lowint1", "_xt_panic",
+    "panicHandler", "xt_highint4", "_xt_user_exc", "esp_backtrace_print",
+}
+
+
+@dataclass
+class Crash:
+    log: str
+    line: int
+    reason: str
+    elf_sha: str = ""
+    pcs: list[int] = field(default_factory=list)
+    corrupted: bool = False
+
+
+@dataclass
+class Frame:
+    function: str
+    location: str = ""  # file:line, "" when unknown
+
+    def __str__(self) -> str:
+        return f"{self.function} at {self.location}" if self.location else self.function
+
+
+@dataclass
+class Elf:
+    path: pathlib.Path
+    sha256: str
+    build_id: str
+
+
+@dataclass
+class Signature:
+    key: tuple[str, ...]
+    crashes: list[Crash] = field(default_factory=list)
+    frames: list[Frame] = field(default_factory=list)  # of the first crash
+    builds: set[str] = field(default_factory=set)
+
+
+# ---------------------------------------------------------------------------
+# Logs
+# ---------------------------------------------------------------------------
+
+def crash_reason(line: str) -> str | None:
+    for pattern, template in REASON_PATTERNS:
+        match = pattern.search(line)
+        if match:
+            return template.format(*match.groups())
+    return None
+
+
+def capture_lines(path: pathlib.Path):
+    """(file, line number, text) over a capture and its rotated .log.gz parts."""
+    for part in segments(path) if path.name.endswith(".log") else [path]:
+        with open_text(part) as f:
+            for number, line in enumerate(f, start=1):
+                yield str(part), number, line
+
+
+def parse_log(lines) -> list[Crash]:
+    """Crashes in (file, line number, text) lines, each with the first
+    backtrace printed after it. A crash may continue into the next file."""
+    crashes: list[Crash] = []
+    current: Crash | None = None
+    for log, number, line in lines:
+        reason = crash_reason(line)
+        if reason is not None:
+            # An abort() after an assert or ESP_ERROR_CHECK is the same crash.
+            if current is None or current.pcs:
+                current = Crash(log, number, reason)
+                crashes.append(current)
+            continue
+        if current is None:
+            continue
+        if REBOOT_RE.search(line):
+            current = None
+            continue
+        debug = DEBUG_REASON_RE.search(line)
+        if debug and not current.pcs:
+            current.reason += f": {debug.group(1)}"
+            continue
+        backtrace = BACKTRACE_RE.search(line)
+        if backtrace and not current.pcs:
+            current.pcs = [int(pair.split(":")[0], 16) for pair in backtrace.group(1).split()]
+            current.corrupted = backtrace.group(2) is not None
+            continue
+        sha = ELF_SHA_RE.search(line)
+        if sha and sha.group(1).strip("0"):  # all zeros: built without the hash
+            current.elf_sha = sha.group(1).lower()
+    return crashes
+
+
+def parse_logs(paths: list[pathlib.Path]) -> list[Crash]:
+    # A rotated part is read with its capture when both are given.
+    captures = {str(path) for path in paths if path.name.endswith(".log")}
+    crashes = []
+    for path in paths:
+        match = SEGMENT_RE.match(path.name)
+        if match and match.group("segment") and str(path.with_name(match.group("run") + ".log")) in captures:
+            continue
+        crashes.extend(parse_log(capture_lines(path)))
+    return crashes
+
+
+# ---------------------------------------------------------------------------
+# ELF files
+# ---------------------------------------------------------------------------
+
+def gnu_build_id(data: bytes) -> str | None:
+    """Hex of the NT_GNU_BUILD_ID note of a little-endian ELF32 or ELF64 file."""
+    if data[:4] != b"\x7fELF" or data[5] != 1:
+        return None
+    if data[4] == 1:
+        shoff, = struct.unpack_from("<I", data, 0x20)
+        shentsize, shnum = struct.unpack_from("<HH", data, 0x2E)
+        header = "<IIIIII"
+    elif data[4] == 2:
+        shoff, = struct.unpack_from("<Q", data, 0x28)
+        shentsize, shnum = struct.unpack_from("<HH", data, 0x3A)
+        header = "<IIQQQQ"
+    else:
+        return None
+    for index in range(shnum):
+        _, sh_type, _, _, offset, size = struct.unpack_from(header, data, shoff + index * shentsize)
+        if sh_type != 7:  # SHT_NOTE
+            continue
+        end = offset + size
+        while offset + 12 <= end:
+            namesz, descsz, note_type = struct.unpack_from("<III", data, offset)
+            name_start = offset + 12
+            desc_start = name_start + (namesz + 3) // 4 * 4
+            if note_type == 3 and data[name_start:name_start + namesz] == b"GNU\0":
+                return data[desc_start:desc_start + descsz].hex()
+            offset = desc_start + (descsz + 3) // 4 * 4
+    return None
+
+
+def read_elf(path: pathlib.Path) -> Elf:
+    data = path.read_bytes()
+    sha256 = hashlib.sha256(data).hexdigest()
+    return Elf(path, sha256, gnu_build_id(data) or sha256)
+
+
+def match_elf(crash: Crash, elfs: list[Elf]) -> Elf | None:
+    if crash.elf_sha:
+        for elf in elfs:
+            if elf.sha256.startswith(crash.elf_sha):
+                return elf
+        return None
+    return elfs[0] if len(elfs) == 1 else None
+
+
+# ---------------------------------------------------------------------------
+# addr2line and the cache
+# ---------------------------------------------------------------------------
+
+def find_addr2line(explicit: str | None) -> str | None:
+    if explicit:
+        return shutil.which(explicit) or (explicit if os.path.exists(explicit) else None)
+    found = shutil.which(ADDR2LINE)
+    if found:
+        return found
+    candidates = sorted(glob.glob(str(PIO_TOOLCHAINS / "toolchain-xtensa-esp32*" / "bin" / ADDR2LINE)))
+    return candidates[-1] if candidates else None
+
+
+def parse_addr2line(output: str) -> dict[str, list[str]]:
+    """`addr2line -pfiaC` output as address -> frames, innermost inline first."""
+    symbols: dict[str, list[str]] = {}
+    frames: list[str] | None = None
+    for line in output.splitlines():
+        match = ADDR_LINE_RE.match(line)
+        if match:
+            frames = symbols.setdefault(f"0x{int(match.group(1), 16):08x}", [])
+            frames.append(match.group(2).strip())
+        elif frames is not None and line.strip().startswith("(inlined by)"):
+            frames.append(line.strip()[len("(inlined by)"):].strip())
+    return symbols
+
+
+def run_addr2line(tool: str, elf: pathlib.Path, addresses: list[str]) -> dict[str, list[str]]:
+    result = subprocess.run([tool, "-pfiaC", "-e", str(elf), *addresses],
+                            capture_output=True, text=True, check=True)
+    return parse_addr2line(result.stdout)
+
+
+class SymbolCache:
+    """Per-build-id JSON files of address -> frames."""
+
+    def __init__(self, directory: pathlib.Path) -> None:
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.calls = 0
+
+    def path(self, elf: Elf) -> pathlib.Path:
+        return self.directory / f"{elf.build_id}.json"
+
+    def symbolize(self, elf: Elf, addresses: set[str], tool: str | None) -> dict[str, list[str]]:
+        path = self.path(elf)
+        try:
+            cached = json.loads(path.read_text())["addresses"]
+        except (OSError, ValueError, KeyError):
+            cached = {}
+        missing = sorted(address for address in addresses if address not in cached)
+        self.hits += len(addresses) - len(missing)
+        if missing and tool:
+            self.misses += len(missing)
+            self.calls += 1
+            found = run_addr2line(tool, elf.path, missing)
+            for address in missing:
+                cached[address] = found.get(address, [])
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps({"elf": str(elf.path), "sha256": elf.sha256,
+                                        "addresses": cached}, indent=1, sort_keys=True))
+        return cached
+
+
+def default_cache_dir() -> pathlib.Path:
+    base = os.environ.get("XDG_CACHE_HOME") or pathlib.Path.home() / ".cache"
+    return pathlib.Path(base) / "sweetyaar" / "addr2line"
+
+
+# ---------------------------------------------------------------------------
+# Signatures
+# ---------------------------------------------------------------------------
+
+def to_frame(text: str) -> Frame:
+    function, _, location = text.partition(" at ")
+    if location.startswith("??"):
+        location = ""
+    else:
+        location = "/".join(pathlib.PurePosixPath(location).parts[-2:])
+    return Frame(function.strip(), location)
+
+
+def crash_frames(crash: Crash, symbols: dict[str, list[str]] | None) -> list[Frame]:
+    frames = []
+    for pc in crash.pcs:
+        address = f"0x{pc:08x}"
+        texts = (symbols or {}).get(address) or []
+        named = [to_frame(text) for text in texts if not text.startswith("??")]
+        frames.extend(named or [Frame(address)])
+    return frames
+
+
+def signature_key(crash: Crash, frames: list[Frame], depth: int) -> tuple[str, ...]:
+    functions = [frame.function for frame in frames if frame.function not in PANIC_FRAMES]
+    return (crash.reason, *functions[:depth])
+
+
+def group(crashes: list[Crash], elfs: list[Elf], cache: SymbolCache, tool: str | None,
+          depth: int) -> list[Signature]:
+    by_elf: dict[str, tuple[Elf, list[Crash]]] = {}
+    for crash in crashes:
+        elf = match_elf(crash, elfs)
+        if elf:
+            by_elf.setdefault(elf.build_id, (elf, []))[1].append(crash)
+
+    symbols_of: dict[int, dict[str, list[str]]] = {}
+    for elf, elf_crashes in by_elf.values():
+        addresses = {f"0x{pc:08x}" for crash in elf_crashes for pc in crash.pcs}
+        symbols = cache.symbolize(elf, addresses, tool)
+        for crash in elf_crashes:
+            symbols_of[id(crash)] = symbols
+
+    signatures: dict[tuple[str, ...], Signature] = {}
+    for crash in crashes:
+        frames = crash_frames(crash, symbols_of.get(id(crash)))
+        key = signature_key(crash, frames, depth)
+        signature = signatures.get(key)
+        if signature is None:
+            signature = signatures[key] = Signature(key, frames=frames)
+        signature.crashes.append(crash)
+        signature.builds.add(crash.elf_sha[:8] or "?")
+    return sorted(signatures.values(), key=lambda s: -len(s.crashes))
+
+
+def format_signatures(signatures: list[Signature], depth: int) -> list[str]:
+    lines = []
+    for signature in signatures:
+        first = signature.crashes[0]
+        lines.append(f"\n{len(signature.crashes):>5}x  {signature.key[0]}")
+        shown = [frame for frame in signature.frames if frame.function not in PANIC_FRAMES][:depth]
+        for index, frame in enumerate(shown):
+            lines.append(f"        {'  ' if index == 0 else '< '}{frame}")
+        if not signature.frames:
+            lines.append("        (no backtrace)")
+        elif any(crash.corrupted for crash in signature.crashes):
+            lines.append("        (some backtraces are corrupted)")
+        lines.append(f"        first: {first.log}:{first.line}  builds: "
+                     + " ".join(sorted(signature.builds)))
+    return lines
+
+
+def signatures_json(signatures: list[Signature]) -> list[dict]:
+    return [{
+        "count": len(signature.crashes),
+        "reason": signature.key[0],
+        "functions": list(signature.key[1:]),
+        "frames": [str(frame) for frame in signature.frames],
+        "builds": sorted(signature.builds),
+        "crashes": [f"{crash.log}:{crash.line}" for crash in signature.crashes],
+    } for signature in signatures]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Symbolized crash signatures from serial logs")
+    parser.add_argument("logs", nargs="+", type=pathlib.Path, help="Serial logs to scan for crashes")
+    parser.add_argument("--elf", nargs="+", type=pathlib.Path, default=[],
+                        help=f"firmware.elf files of the builds in the logs (default {DEFAULT_ELF.relative_to(ROOT)})")
+    parser.add_argument("--frames", type=int, default=3,
+                        help="Top frames that make up a signature (default 3)")
+    parser.add_argument("--addr2line", help=f"addr2line to use (default {ADDR2LINE} from PATH or PlatformIO)")
+    parser.add_argument("--cache-dir", type=pathlib.Path, default=None,
+                        help="Symbol cache directory (default ~/.cache/sweetyaar/addr2line)")
+    parser.add_argument("--list", action="store_true", help="Also list every crash and its signature")
+    parser.add_argument("--json", type=pathlib.Path, help="Write the signatures to this JSON file")
+    args = parser.parse_args(argv)
+
+    crashes = parse_logs(args.logs)
+    if not crashes:
+        print("No crashes found.")
+        return 0
+
+    elf_paths = args.elf or ([DEFAULT_ELF] if DEFAULT_ELF.exists() else [])
+    elfs = [read_elf(path) for path in elf_paths]
+    tool = find_addr2line(args.addr2line)
+    if elfs and not tool:
+        print(f"{ADDR2LINE} not found; pass --addr2line. Showing cached symbols and raw addresses.")
+    unmatched = sum(1 for crash in crashes if crash.pcs and not match_elf(crash, elfs))
+    if unmatched:
+        print(f"{unmatched} crash(es) have no matching --elf; their frames stay as addresses.")
+
+    cache = SymbolCache(args.cache_dir or default_cache_dir())
+    signatures = group(crashes, elfs, cache, tool, args.frames)
+    logs = len({crash.log for crash in crashes})
+    print(f"{len(crashes)} crash(es) in {logs} log(s), {len(signatures)} signature(s); "
+          f"{cache.hits + cache.misses} address(es) symbolized, {cache.hits} from the cache, "
+          f"{cache.calls} addr2line call(s)")
+    print("\n".join(format_signatures(signatures, args.frames)))
+
+    if args.list:
+        print("\nCrashes")
+        numbers = {id(signature): index for index, signature in enumerate(signatures, start=1)}
+        for signature in signatures:
+            for crash in signature.crashes:
+                print(f"  #{numbers[id(signature)]:<3} {crash.log}:{crash.line}  {crash.reason}")
+    if args.json:
+        args.json.write_text(json.dumps(signatures_json(signatures), indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+firmware_size.py — static RAM and flash per source file and library.
+
+Reads the GNU linker map that `pio run` writes next to the firmware
+(platformio.ini passes -Wl,-Map) and attributes every input section to the
+component it came from:
+
+  src/<file>.cpp        our own sources
+  ESP32-A2DP, BLE, ...  libraries PlatformIO builds (lib_deps and the
+                        Arduino core's bundled libraries; arduino-core is the
+                        core itself)
+  ArduinoJson           header-only, so its template code is compiled into our
+                        objects; found by its namespace in the section name
+  esp-idf/<lib>         prebuilt ESP-IDF archives (libbt is Bluedroid,
+                        libbtdm_app the BT controller)
+  toolchain/<lib>       libc, libstdc++ and libgcc
+  (padding)             alignment fill between sections
+
+Columns are .dram0.data (data), .dram0.bss plus .noinit (bss), .iram0.*
+(iram) and .flash.* (flash). Static RAM is data + bss: every byte of it is a
+byte the heap, and so the BT stack, never gets. When firmware.elf is next to
+the map (or given with --elf), its section headers are checked against what
+the map attributed.
+
+With --baseline it compares two builds component by component, so the cost
+of a feature is the diff of the builds with and without it.
+
+Example
+-------
+  pio run && python tools/firmware_size.py
+  python tools/firmware_size.py --by symbol --sort ram --top 20
+  cp .pio/build/sweetyaar/firmware.map builds/before.map
+  pio run && python tools/firmware_size.py --baseline builds/before.map
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import pathlib
+import re
+import struct
+import sys
+from dataclasses import dataclass, field
+
+DEFAULT_BUILD_DIR = pathlib.Path(".pio/build/sweetyaar")
+
+# Output section -> column. Sections not listed (debug info, /DISCARD/) are
+# not loaded into memory and are ignored.
+SECTION_KINDS = {
+    ".dram0.data": "data",
+    ".dram0.bss": "bss",
+    ".noinit": "bss",
+    ".iram0.vectors": "iram",
+    ".iram0.text": "iram",
+    ".iram0.data": "iram",
+    ".iram0.bss": "iram",
+    ".flash.appdesc": "flash",
+    ".flash.rodata": "flash",
+    ".flash.text": "flash",
+    ".rtc.text": "rtc",
+    ".rtc.data": "rtc",
+    ".rtc.bss": "rtc",
+    ".rtc_noinit": "rtc",
+    ".rtc.force_fast": "rtc",
+    ".rtc.force_slow": "rtc",
+}
+KINDS = ("data", "bss", "iram", "flash", "rtc")
+SORT_KEYS = ("ram", "iram", "flash")
+
+# PlatformIO library names that differ from what people call them.
+LIBRARY_NAMES = {
+    "audio-tools": "arduino-audio-tools",
+    "FrameworkArduino": "arduino-core",
+}
+ARDUINOJSON_MARK = "ArduinoJson"
+PADDING = "(padding)"
+
+# Output sections start in column 0; input sections are indented by one
+# space. A name too long for its column puts the numbers on the next line.
+OUTPUT_RE = re.compile(r"^(?P<name>\.\S+)(?:\s+0x(?P<addr>[0-9a-fA-F]+)\s+0x(?P<size>[0-9a-fA-F]+))?")
+INPUT_RE = re.compile(r"^ (?P<name>[^\s*]\S*|\*fill\*)\s+0x[0-9a-fA-F]+\s+0x(?P<size>[0-9a-fA-F]+)"
+                      r"(?:\s+(?P<file>\S.*?))?\s*$")
+NAME_ONLY_RE = re.compile(r"^ (?P<name>[^\s*]\S*)\s*$")
+NUMBERS_RE = re.compile(r"^\s+0x(?P<addr>[0-9a-fA-F]+)\s+0x(?P<size>[0-9a-fA-F]+)(?:\s+(?P<file>\S.*?))?\s*$")
+SYMBOL_PREFIX_RE = re.compile(r"^\.(?:literal|text|data|rodata|bss|sbss|sdata)\.")
+REGION_RE = re.compile(r"^(?P<name>\S+)\s+0x(?P<origin>[0-9a-fA-F]+)\s+0x(?P<length>[0-9a-fA-F]+)")
+ARCHIVE_RE = re.compile(r"(?:^|/)(?P<archive>lib[^/]+)\.a\((?P<member>[^)]+)\)$")
+PIO_OBJECT_RE = re.compile(r"(?:^|/)\.pio/build/[^/]+/(?P<rel>.+?)\.o(?:bj)?$")
+PIO_LIB_DIR_RE = re.compile(r"^lib[0-9a-fA-F]+/(?P<lib>[^/]+)/")
+
+
+@dataclass
+class Usage:
+    data: int = 0
+    bss: int = 0
+    iram: int = 0
+    flash: int = 0
+    rtc: int = 0
+
+    @property
+    def ram(self) -> int:
+        return self.data + self.bss
+
+    def add(self, kind: str, size: int) -> None:
+        setattr(self, kind, getattr(self, kind) + size)
+
+    def sort_value(self, key: str) -> int:
+        return getattr(self, key)
+
+
+@dataclass
+class Region:
+    origin: int
+    length: int
+
+
+@dataclass
+class MapReport:
+    components: dict[str, Usage] = field(default_factory=dict)
+    sections: dict[str, tuple[int, int]] = field(default_factory=dict)  # output section -> (addr, size)
+    attributed: dict[str, int] = field(default_factory=dict)  # output section -> bytes placed
+    regions: dict[str, Region] = field(default_factory=dict)
+
+    def total(self) -> Usage:
+        return sum_usage(self.components.values())
+
+
+def sum_usage(usages) -> Usage:
+    total = Usage()
+    for usage in usages:
+        for kind in KINDS:
+            total.add(kind, getattr(usage, kind))
+    return total
+
+
+def library_name(archive: str) -> str:
+    name = archive[3:] if archive.startswith("lib") else archive
+    return LIBRARY_NAMES.get(name, name)
+
+
+def component_of(path: str | None, section: str, by: str = "component") -> str:
+    """Where one input section came from, at the granularity `by` asks for."""
+    if path is None:
+        return PADDING
+    path = path.replace("\\", "/")
+    if by == "symbol":
+        # -ffunction-sections / -fdata-sections: one section per symbol.
+        archive = ARCHIVE_RE.search(path)
+        source = archive["member"] if archive else path.rsplit("/", 1)[-1]
+        return f"{SYMBOL_PREFIX_RE.sub('', section)} [{source}]"
+    in_pio_build = "/.pio/build/" in f"/{path}"
+    archive = ARCHIVE_RE.search(path)
+    if by == "object":
+        if archive:
+            return f"{library_name(archive['archive'])}/{archive['member']}"
+        obj = PIO_OBJECT_RE.search(path)
+        return obj["rel"] if obj else path.rsplit("/", 1)[-1]
+
+    if ARDUINOJSON_MARK in section:
+        return "ArduinoJson"
+    if archive:
+        if in_pio_build:
+            return library_name(archive["archive"])
+        if "/toolchain-" in path:
+            return f"toolchain/{archive['archive']}"
+        return f"esp-idf/{archive['archive']}"
+    obj = PIO_OBJECT_RE.search(path)
+    if obj:
+        rel = obj["rel"]
+        if rel.startswith("src/"):
+            return rel
+        lib = PIO_LIB_DIR_RE.match(rel)
+        if lib:
+            return LIBRARY_NAMES.get(lib["lib"], lib["lib"])
+        return LIBRARY_NAMES.get(rel.split("/", 1)[0], rel.split("/", 1)[0])
+    return path.rsplit("/", 1)[-1] or path
+
+
+def parse_map(lines: list[str] | str, by: str = "component") -> MapReport:
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    report = MapReport()
+    in_regions = False
+    in_memory_map = False
+    output: str | None = None
+    pending_name: str | None = None
+    pending_output: str | None = None
+
+    for raw in lines:
+        line = raw.rstrip("\n")
+        if line.startswith("Memory Configuration"):
+            in_regions = True
+            continue
+        if line.startswith("Linker script and memory map"):
+            in_regions = False
+            in_memory_map = True
+            continue
+        if in_regions:
+            match = REGION_RE.match(line)
+            if match and match["name"] not in ("Name", "*default*"):
+                report.regions[match["name"]] = Region(int(match["origin"], 16), int(match["length"], 16))
+            continue
+        if not in_memory_map:
+            continue  # archive list, common symbols, discarded sections
+
+        if pending_output is not None:
+            match = NUMBERS_RE.match(line)
+            if match:
+                report.sections[pending_output] = (int(match["addr"], 16), int(match["size"], 16))
+            pending_output = None
+            continue
+        if line and not line[0].isspace():
+            match = OUTPUT_RE.match(line)
+            output = match["name"] if match and match["name"] in SECTION_KINDS else None
+            if output and match["size"] is not None:
+                report.sections[output] = (int(match["addr"], 16), int(match["size"], 16))
+            elif output:
+                pending_output = output
+            pending_name = None
+            continue
+        if output is None:
+            continue
+
+        if pending_name is not None:
+            name, pending_name = pending_name, None
+            match = NUMBERS_RE.match(line)
+            if not match or not match["file"]:
+                continue
+            size, path = int(match["size"], 16), match["file"]
+        else:
+            name_only = NAME_ONLY_RE.match(line)
+            if name_only:
+                pending_name = name_only["name"]
+                continue
+            match = INPUT_RE.match(line)
+            if not match:
+                continue  # symbol assignment or input pattern
+            name, size = match["name"], int(match["size"], 16)
+            path = None if name == "*fill*" else match["file"]
+            if path is None and name != "*fill*":
+                continue
+        if size == 0:
+            continue
+        component = component_of(path, name, by)
+        report.components.setdefault(component, Usage()).add(SECTION_KINDS[output], size)
+        report.attributed[output] = report.attributed.get(output, 0) + size
+    return report
+
+
+def read_map(path: pathlib.Path, by: str = "component") -> MapReport:
+    with path.open(encoding="utf-8", errors="replace") as f:
+        return parse_map(f.read(), by)
+
+
+def read_elf_sections(data: bytes) -> dict[str, int]:
+    """Sizes of the allocated sections of a 32-bit little-endian ELF."""
+    if data[:4] != b"\x7fELF" or data[4] != 1 or data[5] != 1:
+        raise ValueError("not a 32-bit little-endian ELF file")
+    shoff, = struct.unpack_from("<I", data, 0x20)
+    shentsize, shnum, shstrndx = struct.unpack_from("<HHH", data, 0x2E)
+    headers = [struct.unpack_from("<IIIIII", data, shoff + i * shentsize) for i in range(shnum)]
+    strtab_offset, strtab_size = headers[shstrndx][4], headers[shstrndx][5]
+    strtab = data[strtab_offset:strtab_offset + strtab_size]
+    sizes = {}
+    for name_offset, _type, flags, _addr, _offset, size in headers:
+        if not flags & 0x2:  # SHF_ALLOC
+            continue
+        name = strtab[name_offset:strtab.index(b"\0", name_offset)].decode("ascii", "replace")
+        sizes[name] = size
+    return sizes
+
+
+def resolve_map(path: pathlib.Path) -> pathlib.Path:
+    return path / "firmware.map" if path.is_dir() else path
+
+
+def sorted_components(report: MapReport, sort: str) -> list[tuple[str, Usage]]:
+    return sorted(report.components.items(),
+                  key=lambda item: (-item[1].sort_value(sort), -item[1].flash, item[0]))
+
+
+def name_width(names) -> int:
+    return min(max([len("component"), *(len(name) for name in names)]) + 2, 72)
+
+
+def format_totals(report: MapReport) -> list[str]:
+    total = report.total()
+    lines = [f"Static RAM {total.ram} B (data {total.data} + bss {total.bss}), "
+             f"IRAM {total.iram} B, flash {total.flash} B, RTC {total.rtc} B"]
+    for name, region in report.regions.items():
+        used = sum(size for addr, size in report.sections.values()
+                   if region.origin <= addr < region.origin + region.length)
+        if not used:
+            continue
+        line = f"  {name:<14}{used:>9} of {region.length:>9} B used ({used / region.length * 100:.1f}%)"
+        if name.startswith("dram0"):
+            line += f", {region.length - used} B left for the heap"
+        lines.append(line)
+    return lines
+
+
+def format_table(report: MapReport, sort: str, top: int) -> list[str]:
+    rows = sorted_components(report, sort)
+    shown = rows[:top] if top else rows
+    width = name_width(name for name, _ in shown)
+    lines = [f"  {'component':<{width}}{'data':>8}{'bss':>8}{'ram':>8}{'iram':>8}{'flash':>9}"]
+    for name, usage in shown:
+        lines.append(f"  {name[:width - 2]:<{width}}{usage.data:>8}{usage.bss:>8}{usage.ram:>8}"
+                     f"{usage.iram:>8}{usage.flash:>9}")
+    if len(shown) < len(rows):
+        rest = sum_usage(usage for _, usage in rows[len(shown):])
+        label = f"({len(rows) - len(shown)} more)"
+        lines.append(f"  {label:<{width}}{rest.data:>8}{rest.bss:>8}{rest.ram:>8}{rest.iram:>8}{rest.flash:>9}")
+    return lines
+
+
+def format_elf_check(report: MapReport, elf_sizes: dict[str, int]) -> list[str]:
+    lines = [f"  {'section':<18}{'elf':>9}{'map':>9}{'unattributed':>14}"]
+    for name in SECTION_KINDS:
+        if name not in elf_sizes:
+            continue
+        attributed = report.attributed.get(name, 0)
+        lines.append(f"  {name:<18}{elf_sizes[name]:>9}{attributed:>9}{elf_sizes[name] - attributed:>14}")
+    return lines
+
+
+def format_diff(baseline: MapReport, candidate: MapReport, sort: str, top: int) -> list[str]:
+    names = set(baseline.components) | set(candidate.components)
+    rows = []
+    for name in names:
+        base = baseline.components.get(name, Usage())
+        new = candidate.components.get(name, Usage())
+        delta = Usage(**{kind: getattr(new, kind) - getattr(base, kind) for kind in KINDS})
+        if any(getattr(delta, kind) for kind in KINDS):
+            rows.append((name, base, new, delta))
+    rows.sort(key=lambda row: (-abs(row[3].sort_value(sort)), -abs(row[3].flash), row[0]))
+    shown = rows[:top] if top else rows
+    width = name_width(row[0] for row in shown)
+    lines = [f"  {'component':<{width}}{'ram':>8}{'Δram':>8}{'iram':>8}{'Δiram':>8}{'flash':>9}{'Δflash':>9}"]
+    for name, _base, new, delta in shown:
+        lines.append(f"  {name[:width - 2]:<{width}}{new.ram:>8}{delta.ram:>+8}{new.iram:>8}{delta.iram:>+8}"
+                     f"{new.flash:>9}{delta.flash:>+9}")
+    base_total, new_total = baseline.total(), candidate.total()
+    lines.append(f"  {'total':<{width}}{new_total.ram:>8}{new_total.ram - base_total.ram:>+8}"
+                 f"{new_total.iram:>8}{new_total.iram - base_total.iram:>+8}"
+                 f"{new_total.flash:>9}{new_total.flash - base_total.flash:>+9}")
+    if not rows:
+        lines.insert(1, "  (no component changed)")
+    return lines
+
+
+def write_csv(path: pathlib.Path, report: MapReport, sort: str) -> None:
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["component", *KINDS, "ram"])
+        for name, usage in sorted_components(report, sort):
+            writer.writerow([name, *(getattr(usage, kind) for kind in KINDS), usage.ram])
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Static RAM and flash per source file and library from the linker map")
+    parser.add_argument("map", nargs="?", type=pathlib.Path, default=DEFAULT_BUILD_DIR,
+                        help="firmware.map, or the PlatformIO build directory holding it (default: %(default)s)")
+    parser.add_argument("--elf", type=pathlib.Path,
+                        help="firmware.elf to check section sizes against (default: next to the map)")
+    parser.add_argument("--baseline", type=pathlib.Path,
+                        help="Map (or build directory) of an earlier build to compare against")
+    parser.add_argument("--by", choices=("component", "object", "symbol"), default="component",
+                        help="Attribute to components (default), object files, or input sections")
+    parser.add_argument("--sort", choices=SORT_KEYS, default="ram", help="Column to sort by (default ram)")
+    parser.add_argument("--top", type=int, default=30, help="Rows to show, 0 for all (default 30)")
+    parser.add_argument("--csv", type=pathlib.Path, help="Also write every row to this CSV file")
+    args = parser.parse_args(argv)
+
+    map_path = resolve_map(args.map)
+    if not map_path.is_file():
+        print(f"No linker map at {map_path}; run `pio run` first.")
+        return 1
+    report = read_map(map_path, args.by)
+    if not report.components:
+        print(f"No loaded sections found in {map_path}.")
+        return 1
+
+    print(f"{map_path}")
+    print("\n".join(format_totals(report)))
+    elf_path = args.elf or map_path.with_suffix(".elf")
+    if elf_path.is_file():
+        print(f"\nELF check ({elf_path.name})")
+        print("\n".join(format_elf_check(report, read_elf_sections(elf_path.read_bytes()))))
+    elif args.elf:
+        print(f"No ELF at {elf_path}.")
+        return 1
+
+    if args.baseline:
+        baseline_path = resolve_map(args.baseline)
+        if not baseline_path.is_file():
+            print(f"No linker map at {baseline_path}.")
+            return 1
+        print(f"\nvs baseline {baseline_path} (bytes)")
+        print("\n".join(format_diff(read_map(baseline_path, args.by), report, args.sort, args.top)))
+    else:
+        print("\nBy " + args.by + " (bytes)")
+        print("\n".join(format_table(report, args.sort, args.top)))
+    if args.csv:
+        write_csv(args.csv, report, args.sort)
+        print(f"\nWrote {len(report.components)} rows to {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+log_archive.py — rotating serial capture and a searchable index of old runs.
+
+The smoke and stress tools write their serial captures through RotatingLog:
+lines are buffered and flushed about once a second instead of after every
+line, and when the file passes --max-bytes it is gzipped into a numbered
+segment next to it and a fresh file is started:
+
+  bt-smoke-20261019-101500.001.log.gz   oldest
+  bt-smoke-20261019-101500.002.log.gz
+  bt-smoke-20261019-101500.log          newest, still plain text
+
+`ingest` loads captures, plain or gzipped, into a SQLite FTS5 index: one row
+per line with its run (the file name without segment and suffix), segment,
+line number, timestamp and firmware build. The build comes from the
+`[Boot] build=` line the firmware prints at every boot (the first 16 hex
+digits of the ELF SHA256, as in the panic handler's `ELF file SHA256` line).
+Ingest is incremental: files whose size and modification time have not
+changed are skipped, so it can run after every capture.
+
+`search` runs a full-text query over every run in milliseconds. Words match
+whole tokens (`_` is part of a word, so `host_recv_pkt_cb` is one token), and
+FTS5 syntax works: `"BT Connected"`, `assert AND hci_hal_h4`, `prefetch*`. A
+query FTS5 cannot parse, such as `abort()`, is searched as a phrase. `--runs`
+counts hits per run instead of listing lines, oldest run first, which answers
+"when did this start appearing". `runs` lists what is indexed.
+
+Example
+-------
+  python tools/log_archive.py ingest tools/bt_smoke_logs logs
+  python tools/log_archive.py search host_recv_pkt_cb --runs
+  python tools/log_archive.py search '"Heap critically low"' --build 8b6ad8b1 --limit 20
+  python tools/log_archive.py runs --since 2026-10-01
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import datetime as dt
+import gzip
+import pathlib
+import re
+import shutil
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+LOG_DIR = ROOT / "tools" / "bt_smoke_logs"
+DEFAULT_DB = LOG_DIR / "index.sqlite"
+MAX_BYTES = 4 * 1024 * 1024
+FLUSH_SECONDS = 1.0
+CURRENT_SEGMENT = 1_000_000  # sorts the plain .log after its gzipped segments
+
+SEGMENT_RE = re.compile(r"^(?P<run>.+?)(?:\.(?P<segment>\d{3}))?\.log(?:\.gz)?$")
+TS_RE = re.compile(r"^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?) ?")
+NAME_TS_RE = re.compile(r"(\d{8})-(\d{6})")
+BUILD_RE = re.compile(r"\[Boot\] build=([0-9a-fA-F]{8,})|ELF file SHA256:\s*([0-9a-fA-F]{8,})")
+BUILD_DIGITS = 16
+
+
+# ---------------------------------------------------------------------------
+# Capture
+# ---------------------------------------------------------------------------
+
+def timestamp(when: float | None = None) -> str:
+    moment = dt.datetime.now() if when is None else dt.datetime.fromtimestamp(when)
+    return moment.isoformat(timespec="milliseconds")
+
+
+def segment_path(path: pathlib.Path, index: int) -> pathlib.Path:
+    return path.with_name(f"{path.name[:-len('.log')]}.{index:03d}.log.gz")
+
+
+def segments(path: pathlib.Path) -> list[pathlib.Path]:
+    """The gzipped segments of a capture, oldest first, then the capture itself."""
+    run = path.name[:-len(".log")]
+    parts = sorted(path.parent.glob(f"{glob_escape(run)}.[0-9][0-9][0-9].log.gz"))
+    return parts + ([path] if path.exists() else [])
+
+
+def glob_escape(text: str) -> str:
+    return re.sub(r"([*?[])", r"[\1]", text)
+
+
+def open_text(path: pathlib.Path):
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return path.open(encoding="utf-8", errors="replace")
+
+
+def read_lines(path: pathlib.Path):
+    """Every line of a capture across its rotated segments."""
+    for part in segments(path):
+        with open_text(part) as f:
+            yield from f
+
+
+class RotatingLog:
+    """Buffered capture file that is gzipped into a segment every max_bytes."""
+
+    def __init__(self, path: pathlib.Path, max_bytes: int = MAX_BYTES,
+                 flush_seconds: float = FLUSH_SECONDS) -> None:
+        if not path.name.endswith(".log"):
+            raise ValueError(f"capture file must end in .log: {path}")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.flush_seconds = flush_seconds
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._next_segment = len(segments(path)) - path.exists()
+        self._file = path.open("a", encoding="utf-8")
+        self._size = self._file.tell()
+        self._flushed_at = time.monotonic()
+
+    def write(self, line: str) -> None:
+        self._file.write(line + "\n")
+        self._size += len(line) + 1
+        if self._size >= self.max_bytes:
+            self.rotate()
+        else:
+            self.maybe_flush()
+
+    def maybe_flush(self) -> None:
+        now = time.monotonic()
+        if now - self._flushed_at >= self.flush_seconds:
+            self._file.flush()
+            self._flushed_at = now
+
+    def rotate(self) -> None:
+        self._file.close()
+        self._next_segment += 1
+        with self.path.open("rb") as src, gzip.open(segment_path(self.path, self._next_segment), "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        self._file = self.path.open("w", encoding="utf-8")
+        self._size = 0
+        self._flushed_at = time.monotonic()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> RotatingLog:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    run INTEGER NOT NULL REFERENCES runs(id),
+    segment INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    started TEXT NOT NULL,
+    builds TEXT NOT NULL,
+    lines INTEGER NOT NULL,
+    first_row INTEGER,
+    last_row INTEGER
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS log_lines USING fts5(
+    text, file UNINDEXED, lineno UNINDEXED, ts UNINDEXED, build UNINDEXED,
+    tokenize = "unicode61 tokenchars '_'"
+);
+CREATE VIEW IF NOT EXISTS run_info AS
+    SELECT runs.id, runs.name, MIN(files.started) AS started, SUM(files.lines) AS lines
+    FROM runs JOIN files ON files.run = runs.id GROUP BY runs.id;
+"""
+
+
+@dataclass
+class IngestStats:
+    files: int = 0
+    skipped: int = 0
+    lines: int = 0
+
+
+def connect(db: pathlib.Path) -> sqlite3.Connection:
+    db.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def find_logs(paths: list[pathlib.Path]) -> list[pathlib.Path]:
+    found = []
+    for path in paths:
+        if path.is_dir():
+            found.extend(p for p in path.rglob("*") if p.is_file() and SEGMENT_RE.match(p.name))
+        elif path.is_file():
+            found.append(path)
+    return sorted(set(found))
+
+
+def run_start(name: str, path: pathlib.Path) -> str:
+    match = NAME_TS_RE.search(name)
+    if match:
+        with contextlib.suppress(ValueError):
+            return dt.datetime.strptime("".join(match.groups()), "%Y%m%d%H%M%S").isoformat(timespec="milliseconds")
+    return timestamp(path.stat().st_mtime)
+
+
+def ingest_file(conn: sqlite3.Connection, path: pathlib.Path) -> int | None:
+    """Indexes one capture file; None when it is already indexed as it is."""
+    match = SEGMENT_RE.match(path.name)
+    run_name = match.group("run") if match else path.stem
+    segment = int(match.group("segment")) if match and match.group("segment") else CURRENT_SEGMENT
+    stat = path.stat()
+    resolved = str(path.resolve())
+    row = conn.execute("SELECT id, size, mtime, first_row, last_row FROM files WHERE path = ?",
+                       (resolved,)).fetchone()
+    if row and row[1] == stat.st_size and row[2] == stat.st_mtime:
+        return None
+    if row:
+        if row[3] is not None:
+            conn.execute("DELETE FROM log_lines WHERE rowid BETWEEN ? AND ?", (row[3], row[4]))
+        conn.execute("DELETE FROM files WHERE id = ?", (row[0],))
+
+    conn.execute("INSERT OR IGNORE INTO runs (name) VALUES (?)", (run_name,))
+    run_id = conn.execute("SELECT id FROM runs WHERE name = ?", (run_name,)).fetchone()[0]
+    cur = conn.execute(
+        "INSERT INTO files (path, run, segment, size, mtime, started, builds, lines) "
+        "VALUES (?, ?, ?, ?, ?, '', '', 0)", (resolved, run_id, segment, stat.st_size, stat.st_mtime))
+    file_id = cur.lastrowid
+
+    # A file starts with the build its run was on, if an earlier segment said.
+    previous = conn.execute("SELECT builds FROM files WHERE run = ? AND segment < ? AND builds != '' "
+                            "ORDER BY segment DESC LIMIT 1", (run_id, segment)).fetchone()
+    build = previous[0].split()[-1] if previous else ""
+    builds: list[str] = []
+    started = ""
+    rows = []
+    with open_text(path) as f:
+        for lineno, line in enumerate(f, start=1):
+            line = line.rstrip("\r\n")
+            ts_match = TS_RE.match(line)
+            ts = ts_match.group(1) if ts_match else ""
+            text = line[ts_match.end():] if ts_match else line
+            started = started or ts
+            found = BUILD_RE.search(text)
+            if found:
+                build = (found.group(1) or found.group(2)).lower()[:BUILD_DIGITS]
+                if build not in builds:
+                    builds.append(build)
+            rows.append((text, file_id, lineno, ts, build))
+    if rows:
+        first = conn.execute("SELECT COALESCE(MAX(rowid), 0) + 1 FROM log_lines").fetchone()[0]
+        conn.executemany("INSERT INTO log_lines (text, file, lineno, ts, build) VALUES (?, ?, ?, ?, ?)", rows)
+        conn.execute("UPDATE files SET first_row = ?, last_row = ? WHERE id = ?",
+                     (first, first + len(rows) - 1, file_id))
+    conn.execute("UPDATE files SET started = ?, builds = ?, lines = ? WHERE id = ?",
+                 (started or run_start(run_name, path), " ".join(builds), len(rows), file_id))
+    return len(rows)
+
+
+def ingest(db: pathlib.Path, paths: list[pathlib.Path]) -> IngestStats:
+    stats = IngestStats()
+    conn = connect(db)
+    with conn:
+        for path in find_logs(paths):
+            if path.resolve() == db.resolve():
+                continue
+            count = ingest_file(conn, path)
+            if count is None:
+                stats.skipped += 1
+            else:
+                stats.files += 1
+                stats.lines += count
+    conn.close()
+    return stats
+
+
+def phrase(query: str) -> str:
+    return '"' + query.replace('"', '""') + '"'
+
+
+def run_filters(args: argparse.Namespace) -> tuple[str, list]:
+    clauses, params = [], []
+    if args.since:
+        clauses.append("run_info.started >= ?")
+        params.append(args.since)
+    if args.until:
+        clauses.append("run_info.started < ?")
+        params.append(args.until)
+    if getattr(args, "build", None):
+        clauses.append("log_lines.build LIKE ?")
+        params.append(args.build.lower() + "%")
+    return "".join(f" AND {clause}" for clause in clauses), params
+
+
+def search(conn: sqlite3.Connection, query: str, args: argparse.Namespace) -> list[tuple]:
+    where, params = run_filters(args)
+    if args.runs:
+        sql = ("SELECT run_info.name, run_info.started, COUNT(*), MIN(log_lines.ts), "
+               "GROUP_CONCAT(DISTINCT log_lines.build) "
+               "FROM log_lines JOIN files ON files.id = log_lines.file JOIN run_info ON run_info.id = files.run "
+               f"WHERE log_lines MATCH ?{where} GROUP BY run_info.id ORDER BY run_info.started, run_info.name")
+        tail: list = []
+    else:
+        sql = ("SELECT run_info.name, files.segment, log_lines.lineno, log_lines.ts, log_lines.build, log_lines.text "
+               "FROM log_lines JOIN files ON files.id = log_lines.file JOIN run_info ON run_info.id = files.run "
+               f"WHERE log_lines MATCH ?{where} "
+               "ORDER BY run_info.started, run_info.name, files.segment, log_lines.lineno LIMIT ?")
+        tail = [args.limit]
+    try:
+        return conn.execute(sql, [query, *params, *tail]).fetchall()
+    except sqlite3.OperationalError:
+        return conn.execute(sql, [phrase(query), *params, *tail]).fetchall()
+
+
+def location(run: str, segment: int, lineno: int) -> str:
+    return f"{run}:{lineno}" if segment == CURRENT_SEGMENT else f"{run}.{segment:03d}:{lineno}"
+
+
+def format_hits(rows: list[tuple]) -> list[str]:
+    return [f"  {location(run, segment, lineno)}  {ts or '-':<23}  {build or '-':<16}  {text}"
+            for run, segment, lineno, ts, build, text in rows]
+
+
+def format_run_hits(rows: list[tuple]) -> list[str]:
+    lines = [f"  {'run':<32}{'started':<25}{'hits':>6}  builds"]
+    for name, started, hits, first_ts, builds in rows:
+        lines.append(f"  {name:<32}{started:<25}{hits:>6}  {builds or '-'}")
+    return lines
+
+
+def list_runs(conn: sqlite3.Connection, args: argparse.Namespace) -> list[str]:
+    where, params = run_filters(args)
+    rows = conn.execute(
+        "SELECT run_info.name, run_info.started, run_info.lines, COUNT(files.id), "
+        "GROUP_CONCAT(NULLIF(files.builds, ''), ' ') "
+        "FROM run_info JOIN files ON files.run = run_info.id "
+        f"WHERE 1{where} GROUP BY run_info.id ORDER BY run_info.started, run_info.name", params).fetchall()
+    lines = [f"  {'run':<32}{'started':<25}{'lines':>8}{'files':>6}  builds"]
+    for name, started, count, files, builds in rows:
+        unique = " ".join(dict.fromkeys((builds or "").split())) or "-"
+        lines.append(f"  {name:<32}{started:<25}{count:>8}{files:>6}  {unique}")
+    return lines
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Index and search archived serial logs")
+    parser.add_argument("--db", type=pathlib.Path, default=DEFAULT_DB,
+                        help=f"Index file (default {DEFAULT_DB.relative_to(ROOT)})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_cmd = commands.add_parser("ingest", help="Add new or changed captures to the index")
+    ingest_cmd.add_argument("paths", nargs="*", type=pathlib.Path, default=[LOG_DIR],
+                            help=f"Capture files or directories (default {LOG_DIR.relative_to(ROOT)})")
+
+    search_cmd = commands.add_parser("search", help="Full-text search over every indexed run")
+    search_cmd.add_argument("query", help="FTS5 query; searched as a phrase if FTS5 cannot parse it")
+    search_cmd.add_argument("--runs", action="store_true", help="Count hits per run instead of listing lines")
+    search_cmd.add_argument("--build", help="Only lines logged by builds starting with this ELF SHA256 prefix")
+    search_cmd.add_argument("--limit", type=int, default=50, help="Most lines to list (default 50)")
+
+    runs_cmd = commands.add_parser("runs", help="List the indexed runs")
+    for sub in (search_cmd, runs_cmd):
+        sub.add_argument("--since", help="Only runs started at or after this ISO date/time")
+        sub.add_argument("--until", help="Only runs started before this ISO date/time")
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        started = time.perf_counter()
+        stats = ingest(args.db, args.paths)
+        print(f"Indexed {stats.lines} line(s) from {stats.files} file(s), {stats.skipped} unchanged; "
+              f"{(time.perf_counter() - started) * 1000:.0f} ms")
+        return 0
+
+    if not args.db.exists():
+        print(f"No index at {args.db}; run `ingest` first.")
+        return 1
+    conn = connect(args.db)
+    if args.command == "runs":
+        print("\n".join(list_runs(conn, args)))
+        return 0
+
+    started = time.perf_counter()
+    rows = search(conn, args.query, args)
+    elapsed = (time.perf_counter() - started) * 1000
+    if args.runs:
+        hits = sum(row[2] for row in rows)
+        total = conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        print(f"{hits} line(s) in {len(rows)} of {total} run(s); {elapsed:.0f} ms")
+        if rows:
+            print(f"First seen in {rows[0][0]} ({rows[0][3] or rows[0][1]})")
+            print("\n".join(format_run_hits(rows)))
+    else:
+        more = " (limit reached)" if len(rows) == args.limit else ""
+        print(f"{len(rows)} line(s){more}; {elapsed:.0f} ms")
+        if rows:
+            print("\n".join(format_hits(rows)))
+    return 0 if rows else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,6 +14,9 @@ import time
 
 import re
 
+from log_archive import DEFAULT_DB, RotatingLog, ingest, read_lines
+from trace_decode import TraceDecoder
+
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 LOG_DIR = ROOT / "tools" / "bt_smoke_logs"
 MIN_FREE_HEAP_BYTES = 12_000
@@ -91,18 +94,18 @@ def start_serial_capture(port, baud, log_path, stop_event):
 
     def worker():
         try:
-            with serial.Serial(port, baud, timeout=0.2) as ser, open(log_path, "a", encoding="utf-8") as out:
-                out.write(f"# serial {port} @ {baud}\n")
-                out.flush()
+            with serial.Serial(port, baud, timeout=0.2) as ser, RotatingLog(log_path) as out:
+                out.write(f"# serial {port} @ {baud}")
+                decoder = TraceDecoder()
                 while not stop_event.is_set():
-                    raw = ser.readline()
+                    raw = ser.read(ser.in_waiting or 1)
                     if not raw:
+                        out.maybe_flush()
                         continue
-                    line = raw.decode("utf-8", errors="replace").rstrip()
-                    stamped = f"{dt.datetime.now().isoformat(timespec='milliseconds')} {line}"
-                    print(stamped, flush=True)
-                    out.write(stamped + "\n")
-                    out.flush()
+                    for line in decoder.feed(raw):
+                        stamped = f"{dt.datetime.now().isoformat(timespec='milliseconds')} {line.rstrip()}"
+                        print(stamped, flush=True)
+                        out.write(stamped)
         except Exception as exc:
             print(f"Serial capture stopped: {exc}", flush=True)
 
@@ -250,15 +253,11 @@ def check_heap_in_log(log_path):
     """Return the minimum free= heap value seen in the serial log, or None."""
     pattern = re.compile(r'free=(\d+)')
     min_seen = None
-    try:
-        with open(log_path, encoding="utf-8", errors="replace") as f:
-            for line in f:
-                for m in pattern.finditer(line):
-                    val = int(m.group(1))
-                    if min_seen is None or val < min_seen:
-                        min_seen = val
-    except FileNotFoundError:
-        pass
+    for line in read_lines(log_path):
+        for m in pattern.finditer(line):
+            val = int(m.group(1))
+            if min_seen is None or val < min_seen:
+                min_seen = val
     return min_seen
 
 
@@ -346,6 +345,8 @@ def main():
             print("Heap check: no free= values found in serial log.", flush=True)
 
     print(f"Log file: {log_path}", flush=True)
+    stats = ingest(DEFAULT_DB, [LOG_DIR])
+    print(f"Indexed {stats.lines} new line(s); search with tools/log_archive.py search", flush=True)
 
 
 if __name__ == "__main__":
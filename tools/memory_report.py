@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+memory_report.py — task stack and heap headroom from SweetYaar serial logs.
+
+The firmware prints a memory snapshot after boot, when a Bluetooth session
+ends (the BT tasks' deepest point) and before a low-heap restart:
+
+  [Mem] v=1 heap=8bit free=61234 largest=31744 min=18020
+  [Mem] v=1 task=BtI2STask stack=2048 free=548
+  [Mem] v=1 catalog themes=640 songs=9216 names=6144 index=0 pages=1830 total=17830
+
+`free` on a task line is its stack high-water mark: the least stack it has
+ever had free, in bytes. `stack` is the configured size, 0 for tasks whose
+size this build does not know. This tool takes the worst case of every task
+and heap over any number of logs of one build, and recommends a stack size
+for each task of known size: the most it has used plus a margin (--margin-pct
+of the use, at least --min-margin bytes), rounded up to 256 bytes. Snapshots
+only see the stack depth the logged sessions reached, so capture a long BT
+session and a settings scan before trusting a smaller number. With
+--baseline it compares two firmware builds.
+
+Example
+-------
+  python tools/memory_report.py logs/new-*.log
+  python tools/memory_report.py logs/new-*.log --baseline logs/old-*.log
+  python tools/memory_report.py logs/*.log --margin-pct 40 --min-margin 1024
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import pathlib
+import re
+import sys
+from dataclasses import dataclass, field
+
+MEM_RE = re.compile(r"\[Mem\]\s+v=1\s+(?P<fields>.*\S)")
+STACK_ROUND_BYTES = 256
+
+
+@dataclass
+class TaskUsage:
+    stack: int = 0            # configured bytes, 0 if unknown
+    min_free: int | None = None
+    samples: int = 0
+
+    @property
+    def used(self) -> int | None:
+        if not self.stack or self.min_free is None:
+            return None
+        return self.stack - self.min_free
+
+
+@dataclass
+class HeapUsage:
+    free: int = 0             # last snapshot
+    min_free: int | None = None
+    min_largest: int | None = None
+    samples: int = 0
+
+
+@dataclass
+class MemoryLog:
+    tasks: dict[str, TaskUsage] = field(default_factory=dict)
+    heaps: dict[str, HeapUsage] = field(default_factory=dict)
+    blocks: dict[str, dict[str, int]] = field(default_factory=dict)  # group -> largest seen
+
+
+def parse_fields(line: str) -> list[tuple[str, str]] | None:
+    match = MEM_RE.search(line)
+    if not match:
+        return None
+    return [token.partition("=")[::2] for token in match.group("fields").split()]
+
+
+def lower(current: int | None, value: int) -> int:
+    return value if current is None else min(current, value)
+
+
+def add_line(log: MemoryLog, line: str) -> bool:
+    fields = parse_fields(line)
+    if not fields:
+        return False
+    try:
+        first_key, first_value = fields[0]
+        values = {key: int(value) for key, value in fields[1:]}
+        if first_key == "task":
+            task = log.tasks.setdefault(first_value, TaskUsage())
+            task.stack = values["stack"] or task.stack
+            task.min_free = lower(task.min_free, values["free"])
+            task.samples += 1
+        elif first_key == "heap":
+            heap = log.heaps.setdefault(first_value, HeapUsage())
+            heap.free = values["free"]
+            heap.min_free = lower(heap.min_free, values["min"])
+            heap.min_largest = lower(heap.min_largest, values["largest"])
+            heap.samples += 1
+        elif not first_value:
+            group = log.blocks.setdefault(first_key, {})
+            for key, value in values.items():
+                group[key] = max(group.get(key, 0), value)
+        else:
+            return False
+    except (KeyError, ValueError):
+        return False  # garbled or cut-off line
+    return True
+
+
+def parse_logs(paths: list[pathlib.Path]) -> MemoryLog:
+    log = MemoryLog()
+    for path in paths:
+        with path.open(encoding="utf-8", errors="replace") as f:
+            for line in f:
+                add_line(log, line)
+    return log
+
+
+def recommend_stack(used: int, margin_pct: float, min_margin: int) -> int:
+    margin = max(used * margin_pct / 100.0, min_margin)
+    return int(math.ceil((used + margin) / STACK_ROUND_BYTES) * STACK_ROUND_BYTES)
+
+
+def format_tasks(log: MemoryLog, margin_pct: float, min_margin: int) -> tuple[list[str], int]:
+    """Task table and the bytes the recommendations would free (negative: grow)."""
+    lines = [f"  {'task':<14}{'n':>4}{'stack':>8}{'used':>8}{'min free':>10}{'recommend':>11}{'change':>9}"]
+    saved = 0
+    for name, task in log.tasks.items():
+        used = task.used
+        if used is None:
+            lines.append(f"  {name:<14}{task.samples:>4}{'-':>8}{'-':>8}{task.min_free:>10}{'-':>11}{'-':>9}")
+            continue
+        recommended = recommend_stack(used, margin_pct, min_margin)
+        change = recommended - task.stack
+        saved -= change
+        flag = "  LOW" if task.min_free < min_margin else ""
+        lines.append(f"  {name:<14}{task.samples:>4}{task.stack:>8}{used:>8}{task.min_free:>10}"
+                     f"{recommended:>11}{change:>+9}{flag}")
+    return lines, saved
+
+
+def format_heaps(log: MemoryLog) -> list[str]:
+    lines = [f"  {'heap':<14}{'n':>4}{'free':>10}{'min free':>10}{'min largest':>13}"]
+    for name, heap in log.heaps.items():
+        lines.append(f"  {name:<14}{heap.samples:>4}{heap.free:>10}{heap.min_free:>10}{heap.min_largest:>13}")
+    return lines
+
+
+def format_blocks(log: MemoryLog) -> list[str]:
+    lines = []
+    for group, values in log.blocks.items():
+        lines.append(f"  {group}: " + " ".join(f"{key}={value}" for key, value in values.items()))
+    return lines
+
+
+def change_cell(base: int | None, new: int | None) -> str:
+    if base is None or new is None:
+        return f"{'-' if base is None else base:>10}{'-' if new is None else new:>10}{'-':>9}"
+    return f"{base:>10}{new:>10}{new - base:>+9}"
+
+
+def format_comparison(baseline: MemoryLog, candidate: MemoryLog) -> list[str]:
+    lines = [f"  {'stack used':<16}{'base':>10}{'new':>10}{'delta':>9}"]
+    names = list(baseline.tasks) + [name for name in candidate.tasks if name not in baseline.tasks]
+    for name in names:
+        base = baseline.tasks.get(name)
+        new = candidate.tasks.get(name)
+        lines.append(f"  {name:<16}" + change_cell(base.used if base else None, new.used if new else None))
+    lines.append(f"  {'heap min free':<16}{'base':>10}{'new':>10}{'delta':>9}")
+    names = list(baseline.heaps) + [name for name in candidate.heaps if name not in baseline.heaps]
+    for name in names:
+        base = baseline.heaps.get(name)
+        new = candidate.heaps.get(name)
+        lines.append(f"  {name:<16}" + change_cell(base.min_free if base else None,
+                                                   new.min_free if new else None))
+    return lines
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Stack high-water marks and heap headroom from serial logs")
+    parser.add_argument("logs", nargs="+", type=pathlib.Path, help="Serial logs of the build to report")
+    parser.add_argument("--baseline", nargs="+", type=pathlib.Path, default=[],
+                        help="Serial logs of an earlier build to compare against")
+    parser.add_argument("--margin-pct", type=float, default=25.0,
+                        help="Stack margin as a percentage of the most used (default 25)")
+    parser.add_argument("--min-margin", type=int, default=512,
+                        help="Smallest stack margin in bytes (default 512)")
+    args = parser.parse_args(argv)
+
+    candidate = parse_logs(args.logs)
+    if not candidate.tasks and not candidate.heaps:
+        print("No [Mem] lines found.")
+        return 1
+
+    task_lines, saved = format_tasks(candidate, args.margin_pct, args.min_margin)
+    print("\nTask stacks (worst case over all snapshots, bytes)")
+    print("\n".join(task_lines))
+    verb = "frees" if saved >= 0 else "costs"
+    print(f"  Recommended sizes: margin {args.margin_pct:g}% (min {args.min_margin} B); "
+          f"{verb} {abs(saved)} B of heap")
+    if candidate.heaps:
+        print("\nHeaps (bytes)")
+        print("\n".join(format_heaps(candidate)))
+    if candidate.blocks:
+        print("\nLong-lived blocks (largest seen, bytes)")
+        print("\n".join(format_blocks(candidate)))
+    if args.baseline:
+        baseline = parse_logs(args.baseline)
+        if not baseline.tasks and not baseline.heaps:
+            print("\n(no [Mem] lines in the baseline logs)")
+        else:
+            print("\nvs baseline")
+            print("\n".join(format_comparison(baseline, candidate)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
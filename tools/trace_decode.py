@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+trace_decode.py — turn SweetYaar serial output back into plain log lines.
+
+Hot-path firmware events (BT callbacks, volume changes, read-ahead stats) are
+not printed as text. They are written as small binary frames by
+src/TraceLog.cpp, between the ordinary Serial.printf lines. TraceDecoder takes
+the raw serial bytes and returns text lines: ordinary lines pass through, and
+each frame becomes the line the firmware used to print, e.g.
+"[BT] Connected (free=61232 largest=31744)". The stress and smoke tools read
+serial through this class, so their log patterns did not change.
+
+Example
+-------
+  python tools/trace_decode.py --port /dev/cu.usbserial-0001
+  python tools/trace_decode.py capture.bin --timestamps
+"""
+
+from __future__ import annotations
+
+import argparse
+import struct
+import sys
+from typing import Callable, Optional
+
+MAGIC = b"\xA5\x5A"
+HEADER = struct.Struct("<BBHI")  # id, argc, seq, tUs
+MAX_ARGS = 4
+MAX_TEXT_LINE = 1024
+
+# Argument tables, matching the enums in src/TraceLog.h.
+BT_AUDIO_STATES = {0: "UNKNOWN", 1: "STARTED", 2: "STOPPED", 3: "REMOTE_SUSPEND"}
+VOLUME_REASONS = {0: "volume request", 1: "bedtime state", 2: "song start", 3: "animal start"}
+
+
+def _volume(args: list[int]) -> str:
+    pct, reason = args
+    return f"[Vol] {pct}% ({pct / 100:.2f}, {VOLUME_REASONS.get(reason, reason)})"
+
+
+def _volume_capped(args: list[int]) -> str:
+    requested, effective, cap, reason = args
+    return (f"[Vol] requested={requested}% effective={effective}% bedtimeCap={cap}% "
+            f"({effective / 100:.2f}, {VOLUME_REASONS.get(reason, reason)})")
+
+
+def _bt_prefetch(args: list[int]) -> str:
+    pct, previous, underflows, drops = args
+    return f"[BT] Prefetch {previous}% -> {pct}% (window underflows={underflows} drops={drops})"
+
+
+# id -> (name, argc, formatter). The formatter rebuilds the text line the
+# firmware printed before the event moved to the trace ring.
+EVENTS: dict[int, tuple[str, int, Optional[Callable[[list[int]], str]]]] = {
+    1: ("BtConnected", 2, lambda a: f"[BT] Connected (free={a[0]} largest={a[1]})"),
+    2: ("BtDisconnected", 0, lambda a: "[BT] Disconnected"),
+    3: ("BtAudioState", 1, lambda a: f"[BT] Audio state: {BT_AUDIO_STATES.get(a[0], 'UNKNOWN')}"),
+    4: ("BtSampleRate", 1, lambda a: f"[BT] A2DP sample rate: {a[0]} Hz"),
+    5: ("Volume", 2, _volume),
+    6: ("VolumeCapped", 4, _volume_capped),
+    7: ("WavDecoderIdle", 1, lambda a: f"[WavPlayer] Decoder idle {a[0]} us between tracks"),
+    8: ("WavUnderrun", 2, lambda a: f"[WavPlayer] Read-ahead underrun #{a[0]} (maxReadUs={a[1]})"),
+    9: ("WavStats", 4, None),  # printed together with the WavStatsTiming that follows
+    10: ("WavStatsTiming", 3, None),
+    11: ("BtPrefetch", 4, _bt_prefetch),
+    12: ("BtRx", 4, lambda a: f"[BT] Rx rx=+{a[0]}B rb={a[1]}B underflows={a[2]} drops={a[3]}"),
+}
+
+
+def crc8(data: bytes) -> int:
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+def encode_frame(event_id: int, seq: int, t_us: int, args: list[int]) -> bytes:
+    """Build a frame exactly as TraceLog::encodeFrame() does (used by tests)."""
+    body = HEADER.pack(event_id, len(args), seq & 0xFFFF, t_us & 0xFFFFFFFF)
+    body += b"".join(struct.pack("<i", arg) for arg in args)
+    return MAGIC + body + bytes([crc8(body)])
+
+
+class TraceDecoder:
+    """Incremental splitter for mixed text and trace frames.
+
+    feed() accepts raw serial bytes in chunks of any size and returns the
+    complete lines found so far. Lines are returned as str without their
+    line ending.
+    """
+
+    def __init__(self, timestamps: bool = False) -> None:
+        self.timestamps = timestamps
+        self.frames = 0
+        self.dropped = 0
+        self._buf = bytearray()
+        self._text = bytearray()
+        self._next_seq: Optional[int] = None
+        self._stats: Optional[list[int]] = None
+
+    def feed(self, data: bytes) -> list[str]:
+        self._buf += data
+        lines: list[str] = []
+        while self._buf:
+            start = self._buf.find(MAGIC[:1])
+            if start < 0:
+                self._take_text(len(self._buf), lines)
+                break
+            if start > 0:
+                self._take_text(start, lines)
+                continue
+            frame = self._try_frame()
+            if frame is None:
+                break  # need more bytes to decide
+            if frame == 0:
+                self._take_text(1, lines)  # not a frame after all
+                continue
+            self._emit_frame(frame, lines)
+        return lines
+
+    def flush(self) -> list[str]:
+        """Return whatever partial text is left (end of a capture)."""
+        lines: list[str] = []
+        self._take_text(len(self._buf), lines)
+        if self._text:
+            lines.append(self._text.decode("utf-8", errors="replace").rstrip("\r"))
+            self._text.clear()
+        return lines
+
+    # Returns None if more bytes are needed, 0 if the bytes at the front are
+    # not a valid frame, or the frame length.
+    def _try_frame(self) -> Optional[int]:
+        if len(self._buf) < 2:
+            return None
+        if self._buf[1] != MAGIC[1]:
+            return 0
+        if len(self._buf) < 4:
+            return None
+        argc = self._buf[3]
+        if argc > MAX_ARGS:
+            return 0
+        length = 2 + HEADER.size + 4 * argc + 1
+        if len(self._buf) < length:
+            return None
+        if crc8(bytes(self._buf[2:length - 1])) != self._buf[length - 1]:
+            return 0
+        return length
+
+    def _take_text(self, count: int, lines: list[str]) -> None:
+        chunk = self._buf[:count]
+        del self._buf[:count]
+        for byte in chunk:
+            if byte == 0x0A:
+                lines.append(self._text.decode("utf-8", errors="replace").rstrip("\r"))
+                self._text.clear()
+            else:
+                self._text.append(byte)
+        if len(self._text) > MAX_TEXT_LINE:
+            lines.append(self._text.decode("utf-8", errors="replace"))
+            self._text.clear()
+
+    def _emit_frame(self, length: int, lines: list[str]) -> None:
+        event_id, argc, seq, t_us = HEADER.unpack_from(self._buf, 2)
+        args = list(struct.unpack_from(f"<{argc}i", self._buf, 2 + HEADER.size))
+        del self._buf[:length]
+        self.frames += 1
+
+        # seq is bumped for every record() call, dropped ones included. A seq
+        # lower than expected means the device rebooted.
+        if self._next_seq is not None:
+            missed = (seq - self._next_seq) & 0xFFFF
+            if 0 < missed < 0x8000:
+                self.dropped += missed
+                lines.append(f"[Trace] {missed} event(s) dropped (ring full)")
+        self._next_seq = (seq + 1) & 0xFFFF
+
+        text = self._format(event_id, args)
+        if text is None:
+            return
+        if self.timestamps:
+            text = f"{t_us / 1e6:10.6f} {text}"
+        lines.append(text)
+
+    def _format(self, event_id: int, args: list[int]) -> Optional[str]:
+        event = EVENTS.get(event_id)
+        if event is None or len(args) != event[1]:
+            return f"[Trace] unknown event id={event_id} args={args}"
+        name = event[0]
+        if name == "WavStats":
+            self._stats = args
+            return None
+        if name == "WavStatsTiming":
+            fill, low, underruns, reads = self._stats or [0, 0, 0, 0]
+            self._stats = None
+            max_read_us, gap_us, ring_bytes = args
+            return (f"[WavPlayer] Stats ring={fill}/{ring_bytes}B low={low}B underruns={underruns} "
+                    f"reads={reads} maxReadUs={max_read_us} gapUs={gap_us}")
+        return event[2](args)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Decode SweetYaar serial output with binary trace frames")
+    parser.add_argument("capture", nargs="?", help="Raw serial capture file (default: stdin)")
+    parser.add_argument("--port", help="Read live from this serial port instead")
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--timestamps", action="store_true",
+                        help="Prefix decoded events with the device time in seconds")
+    args = parser.parse_args(argv)
+
+    decoder = TraceDecoder(timestamps=args.timestamps)
+    if args.port:
+        import serial  # type: ignore
+        with serial.Serial(args.port, args.baud, timeout=0.2) as ser:
+            try:
+                while True:
+                    for line in decoder.feed(ser.read(ser.in_waiting or 1)):
+                        print(line, flush=True)
+            except KeyboardInterrupt:
+                pass
+    else:
+        stream = open(args.capture, "rb") if args.capture else sys.stdin.buffer
+        with stream:
+            while chunk := stream.read(4096):
+                for line in decoder.feed(chunk):
+                    print(line)
+    for line in decoder.flush():
+        print(line)
+    if decoder.dropped:
+        print(f"{decoder.dropped} trace event(s) were dropped on the device.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
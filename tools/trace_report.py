@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+trace_report.py — per-stage timing percentiles from SweetYaar serial logs.
+
+The firmware prints one-line timing records in key=value form:
+
+  [BootTrace] v=1 wake=deep_sleep serial=503112 wake_state=1804 nvs=7420 ... total=2412077
+  [PressTrace] v=1 src=button ev=song debounce=52210 dispatch=180 ... total=63070
+
+Numeric values are µs spent in each stage; the text fields (wake, src, ev)
+name the kind of record. This tool collects the lines with one tag from any
+number of captured logs and prints per-stage percentiles for each kind. With
+--baseline it compares two firmware builds stage by stage.
+
+Example
+-------
+  python tools/trace_report.py logs/new-*.log
+  python tools/trace_report.py logs/new-*.log --baseline logs/old-*.log --where wake=deep_sleep
+  python tools/trace_report.py --tag PressTrace logs/*.log --where ev=song
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import pathlib
+import re
+import sys
+from dataclasses import dataclass, field
+
+# Fields that name the kind of record rather than time a stage.
+LABEL_KEYS = ("wake", "src", "ev")
+TRACE_RE = re.compile(r"\[(?P<tag>\w+)\]\s+(?P<fields>v=.*\S)")
+PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class Trace:
+    labels: dict[str, str] = field(default_factory=dict)  # e.g. wake=cold
+    phases: dict[str, int] = field(default_factory=dict)  # µs, firmware order
+
+    @property
+    def group(self) -> str:
+        return " ".join(f"{key}={value}" for key, value in self.labels.items()) or "all"
+
+
+def parse_line(line: str, tag: str) -> Trace | None:
+    match = TRACE_RE.search(line)
+    if not match or match.group("tag") != tag:
+        return None
+    values: dict[str, str] = {}
+    for token in match.group("fields").split():
+        key, sep, value = token.partition("=")
+        if sep:
+            values[key] = value
+    if values.pop("v", None) != "1":
+        return None
+    trace = Trace()
+    for key, value in values.items():
+        if key in LABEL_KEYS:
+            trace.labels[key] = value
+        elif value.isdigit():
+            trace.phases[key] = int(value)
+        else:
+            return None  # garbled line or a negative (wrapped) timer
+    return trace
+
+
+def parse_logs(paths: list[pathlib.Path], tag: str) -> list[Trace]:
+    traces = []
+    for path in paths:
+        with path.open(encoding="utf-8", errors="replace") as f:
+            for line in f:
+                trace = parse_line(line, tag)
+                if trace is not None:
+                    traces.append(trace)
+    return traces
+
+
+def percentile(values: list[int], pct: float) -> float:
+    """Linear-interpolated percentile of a non-empty list."""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return float(ordered[0])
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def phase_order(traces: list[Trace]) -> list[str]:
+    order: list[str] = []
+    for trace in traces:
+        for name in trace.phases:
+            if name not in order:
+                order.append(name)
+    # Keep the total last even if an older build printed fewer stages.
+    if "total" in order:
+        order.remove("total")
+        order.append("total")
+    return order
+
+
+def summarize(traces: list[Trace]) -> dict[str, dict[str, float]]:
+    summary: dict[str, dict[str, float]] = {}
+    for name in phase_order(traces):
+        values = [trace.phases[name] for trace in traces if name in trace.phases]
+        stats = {"n": float(len(values)), "min": float(min(values)), "max": float(max(values))}
+        for pct in PERCENTILES:
+            stats[f"p{pct}"] = percentile(values, pct)
+        summary[name] = stats
+    return summary
+
+
+def ms(us: float) -> str:
+    return f"{us / 1000.0:.1f}"
+
+
+def format_summary(summary: dict[str, dict[str, float]]) -> list[str]:
+    header = f"  {'stage':<12}{'n':>5}" + "".join(f"{'p' + str(p):>10}" for p in PERCENTILES)
+    header += f"{'min':>10}{'max':>10}   (ms)"
+    lines = [header]
+    for name, stats in summary.items():
+        row = f"  {name:<12}{int(stats['n']):>5}"
+        row += "".join(f"{ms(stats[f'p{p}']):>10}" for p in PERCENTILES)
+        row += f"{ms(stats['min']):>10}{ms(stats['max']):>10}"
+        lines.append(row)
+    return lines
+
+
+def format_comparison(baseline: dict[str, dict[str, float]],
+                      candidate: dict[str, dict[str, float]]) -> list[str]:
+    lines = [f"  {'stage':<12}{'base p50':>10}{'new p50':>10}{'delta':>10}{'change':>9}   (ms)"]
+    names = list(baseline)
+    names += [name for name in candidate if name not in baseline]
+    for name in names:
+        base = baseline.get(name, {}).get("p50")
+        new = candidate.get(name, {}).get("p50")
+        if base is None or new is None:
+            lines.append(f"  {name:<12}{ms(base) if base is not None else '-':>10}"
+                         f"{ms(new) if new is not None else '-':>10}{'-':>10}{'-':>9}")
+            continue
+        delta = new - base
+        change = f"{delta / base * 100.0:+.0f}%" if base else "-"
+        lines.append(f"  {name:<12}{ms(base):>10}{ms(new):>10}{delta / 1000.0:>+10.1f}{change:>9}")
+    return lines
+
+
+def group_traces(traces: list[Trace], where: list[str]) -> dict[str, list[Trace]]:
+    filters = [item.partition("=")[::2] for item in where]
+    groups: dict[str, list[Trace]] = {}
+    for trace in traces:
+        if all(trace.labels.get(key) == value for key, value in filters):
+            groups.setdefault(trace.group, []).append(trace)
+    return groups
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Aggregate one-line timing traces from serial logs")
+    parser.add_argument("logs", nargs="+", type=pathlib.Path, help="Serial logs of the build to report")
+    parser.add_argument("--tag", default="BootTrace", help="Record tag: BootTrace (default) or PressTrace")
+    parser.add_argument("--baseline", nargs="+", type=pathlib.Path, default=[],
+                        help="Serial logs of an earlier build to compare against")
+    parser.add_argument("--where", action="append", default=[], metavar="KEY=VALUE",
+                        help="Only records with this label, e.g. wake=cold or src=ble (repeatable)")
+    args = parser.parse_args(argv)
+
+    candidate = group_traces(parse_logs(args.logs, args.tag), args.where)
+    if not candidate:
+        print(f"No [{args.tag}] lines found.")
+        return 1
+    baseline = group_traces(parse_logs(args.baseline, args.tag), args.where) if args.baseline else {}
+
+    for group, traces in sorted(candidate.items()):
+        print(f"\n{group}: {len(traces)} record(s)")
+        summary = summarize(traces)
+        print("\n".join(format_summary(summary)))
+        if args.baseline:
+            base_traces = baseline.get(group, [])
+            if not base_traces:
+                print(f"  (no baseline records with {group})")
+                continue
+            print(f"\n  vs baseline: {len(base_traces)} record(s)")
+            print("\n".join(format_comparison(summarize(base_traces), summary)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())